@@ -1,9 +1,33 @@
 import logging
 
+from bhamon_orchestra_model.database.data_serializer import all_formats, create_serializer
+
 
 logger = logging.getLogger("DatabaseController")
 
 
+# Queries issued by providers on hot paths, with placeholder values since only the filter shape matters
+provider_query_collection = [
+	{ "provider": "RunProvider", "usage": "get", "table": "run", "filter": { "project": "project", "identifier": "run" } },
+	{ "provider": "RunProvider", "usage": "get_list by project", "table": "run", "filter": { "project": "project" }, "order_by": [ ("update_date", "descending"), ("identifier", "descending") ] },
+	{ "provider": "RunProvider", "usage": "get_list by project and job", "table": "run", "filter": { "project": "project", "job": "job" }, "order_by": [ ("update_date", "descending"), ("identifier", "descending") ] },
+	{ "provider": "RunProvider", "usage": "get_list by worker", "table": "run", "filter": { "worker": "worker" }, "order_by": [ ("update_date", "descending"), ("identifier", "descending") ] },
+	{ "provider": "RunProvider", "usage": "get_list by status", "table": "run", "filter": { "status": "running" } },
+	{ "provider": "RunProvider", "usage": "get_list by status, unassigned", "table": "run", "filter": { "status": "pending", "worker": None } },
+	{ "provider": "RunProvider", "usage": "count by worker and status", "table": "run", "filter": { "worker": "worker", "status": "running" } },
+	{ "provider": "RunRetention", "usage": "find kept runs", "table": "run", "filter": { "project": "project", "job": "job", "status": { "$in": [ "succeeded", "failed" ] } }, "order_by": [ ("creation_date", "descending") ] },
+	{ "provider": "RunRetention", "usage": "find expired runs", "table": "run", "filter": { "project": "project", "job": "job", "status": { "$in": [ "succeeded" ] }, "creation_date": { "$lt": "2020-01-01T00:00:00Z" } }, "order_by": [ ("creation_date", "ascending") ] },
+	{ "provider": "JobProvider", "usage": "get", "table": "job", "filter": { "project": "project", "identifier": "job" } },
+	{ "provider": "JobProvider", "usage": "get_list by project", "table": "job", "filter": { "project": "project" } },
+	{ "provider": "ScheduleProvider", "usage": "get", "table": "schedule", "filter": { "project": "project", "identifier": "schedule" } },
+	{ "provider": "ScheduleProvider", "usage": "get_list by project", "table": "schedule", "filter": { "project": "project" } },
+	{ "provider": "UserProvider", "usage": "get", "table": "user", "filter": { "identifier": "user" } },
+	{ "provider": "WorkerProvider", "usage": "get", "table": "worker", "filter": { "identifier": "worker" } },
+	{ "provider": "AuthenticationProvider", "usage": "authenticate_with_password", "table": "user_authentication", "filter": { "user": "user", "type": "password" } },
+	{ "provider": "AuthenticationProvider", "usage": "authenticate_with_token", "table": "user_authentication", "filter": { "user": "user", "type": "token" } },
+]
+
+
 def register_commands(subparsers):
 	command_parser = subparsers.add_parser("initialize-database", help = "initialize the database")
 	command_parser.add_argument("--simulate", action = "store_true", help = "perform a simulation (dry-run)")
@@ -13,6 +37,14 @@ def register_commands(subparsers):
 	command_parser.add_argument("--simulate", action = "store_true", help = "perform a simulation (dry-run)")
 	command_parser.set_defaults(handler = upgrade_database)
 
+	command_parser = subparsers.add_parser("convert-database-format", help = "convert the files of a json database to another format")
+	command_parser.add_argument("--format", required = True, choices = all_formats, help = "set the format to convert to")
+	command_parser.add_argument("--simulate", action = "store_true", help = "perform a simulation (dry-run)")
+	command_parser.set_defaults(handler = convert_database_format)
+
+	command_parser = subparsers.add_parser("analyze-queries", help = "report which provider queries would scan whole tables")
+	command_parser.set_defaults(handler = analyze_queries)
+
 
 def initialize_database(application, arguments):
 	application.database_administration.initialize(simulate = arguments.simulate)
@@ -20,3 +52,22 @@ def initialize_database(application, arguments):
 
 def upgrade_database(application, arguments):
 	application.database_administration.upgrade(simulate = arguments.simulate)
+
+
+def convert_database_format(application, arguments):
+	if not hasattr(application.database_administration, "convert_format"):
+		raise ValueError("Database does not support format conversion")
+	application.database_administration.convert_format(create_serializer(arguments.format), simulate = arguments.simulate)
+
+
+def analyze_queries(application, arguments): # pylint: disable = unused-argument
+	all_reports = []
+
+	for query in provider_query_collection:
+		analysis = application.database_administration.analyze_query(query["table"], query["filter"], query.get("order_by", None))
+		all_reports.append({ "provider": query["provider"], "usage": query["usage"], **analysis })
+
+		if analysis["is_collection_scan"]:
+			logger.warning("Collection scan for %s.%s (Table: '%s', Filter: %s)", query["provider"], query["usage"], query["table"], list(query["filter"]))
+
+	return all_reports
@@ -0,0 +1,62 @@
+import json
+import logging
+
+from bhamon_orchestra_model.run_retention import RunRetention
+
+
+logger = logging.getLogger("RunController")
+
+
+completed_status_collection = [ "succeeded", "failed", "aborted", "exception", "cancelled" ]
+
+
+def register_commands(subparsers):
+	command_parser = subparsers.add_parser("archive-run-logs", help = "compress the logs of completed runs")
+	command_parser.add_argument("--project", metavar = "<identifier>", help = "set the project to archive logs for")
+	command_parser.set_defaults(handler = archive_run_logs)
+
+	command_parser = subparsers.add_parser("collect-runs", help = "delete completed runs according to retention policies")
+	command_parser.add_argument("--policies", required = True, metavar = "<path>", help = "set the path to a json file with the list of retention policies")
+	command_parser.add_argument("--batch-size", type = int, default = 100, metavar = "<count>", help = "set how many runs to delete at once")
+	command_parser.add_argument("--simulate", action = "store_true", help = "perform a simulation (dry-run)")
+	command_parser.set_defaults(handler = collect_runs)
+
+
+def archive_run_logs(application, arguments):
+	run_count = 0
+	log_count = 0
+
+	run_collection = application.run_provider.iter_list_as_documents(
+		project = arguments.project, status = completed_status_collection, projection = [ "project", "identifier" ])
+
+	for run in run_collection:
+		run_count += 1
+
+		archived_count = application.run_provider.archive_step_logs(run["project"], run["identifier"])
+		if archived_count > 0:
+			logger.info("Archived %s logs for run %s %s", archived_count, run["project"], run["identifier"])
+		log_count += archived_count
+
+	return { "run_count": run_count, "log_count": log_count }
+
+
+def collect_runs(application, arguments):
+	with open(arguments.policies, mode = "r", encoding = "utf-8") as policy_file:
+		policy_collection = json.load(policy_file)
+
+	run_retention = RunRetention(application.job_provider, application.run_provider, application.date_time_provider, policy_collection)
+
+	if arguments.simulate:
+		result = run_retention.collect(batch_size = None, simulate = True)
+		for run in result["runs"]:
+			logger.info("Would delete run %s %s (Job: '%s', LogSize: %s)", run["project"], run["identifier"], run["job"], run["log_size"])
+		return { "run_count": result["run_count"], "log_size": result["log_size"], "runs": result["runs"] }
+
+	while True:
+		result = run_retention.collect(batch_size = arguments.batch_size)
+		if result["run_count"] > 0:
+			logger.info("Deleted %s runs, with %s bytes of logs", result["run_count"], result["log_size"])
+		if result["is_complete"]:
+			break
+
+	return run_retention.get_statistics()
@@ -0,0 +1,89 @@
+import logging
+
+from typing import Any, List, Set, Tuple
+
+
+logger = logging.getLogger("CapabilityIndex")
+
+
+class CapabilityIndex:
+	""" Inverted index from capabilities to the workers which have them, to find the workers matching requirements.
+
+	Capabilities are derived from worker properties, as (key, value) pairs, with a pair for each item for properties which are lists,
+	for example a worker with { "operating_system": "linux", "project": [ "first", "second" ] } has the capabilities
+	("operating_system", "linux"), ("project", "first") and ("project", "second"). Properties with other values are not indexed.
+
+	"""
+
+
+	def __init__(self) -> None:
+		self._all_workers = {}
+		self._index = {}
+
+
+	def __len__(self) -> int:
+		return len(self._all_workers)
+
+
+	def add_worker(self, worker_identifier: str, properties: dict) -> None:
+		""" Index the capabilities of a worker, replacing those indexed previously for it """
+
+		self.remove_worker(worker_identifier)
+
+		all_capabilities = get_capabilities(properties)
+		self._all_workers[worker_identifier] = all_capabilities
+		for capability in all_capabilities:
+			self._index.setdefault(capability, set()).add(worker_identifier)
+
+
+	def remove_worker(self, worker_identifier: str) -> None:
+		""" Remove a worker from the index, if it is indexed """
+
+		for capability in self._all_workers.pop(worker_identifier, set()):
+			worker_set = self._index[capability]
+			worker_set.discard(worker_identifier)
+			if len(worker_set) == 0:
+				del self._index[capability]
+
+
+	def find_workers(self, requirements: List[Tuple[str,Any]]) -> Set[str]:
+		""" Return the workers having all the required capabilities, intersecting the worker sets from the smallest """
+
+		if len(requirements) == 0:
+			return set(self._all_workers)
+
+		all_worker_sets = sorted((self._index.get(capability, set()) for capability in requirements), key = len)
+
+		result = set(all_worker_sets[0])
+		for worker_set in all_worker_sets[1:]:
+			if len(result) == 0:
+				break
+			result.intersection_update(worker_set)
+
+		return result
+
+
+
+def get_capabilities(properties: dict) -> Set[Tuple[str,Any]]:
+	""" Derive the capabilities of a worker from its properties """
+
+	all_capabilities = set()
+
+	for key, value in properties.items():
+		for item in value if isinstance(value, list) else [ value ]:
+			if isinstance(item, (str, int, float, bool)) or item is None:
+				all_capabilities.add((key, item))
+
+	return all_capabilities
+
+
+def get_requirements(job: dict) -> List[Tuple[str,Any]]:
+	""" Derive the capabilities required to execute a job, from its requirements property, and its is_controller property which is always required """
+
+	all_requirements = [ ("is_controller", job["properties"].get("is_controller", False)) ]
+
+	for key, value in job["properties"].get("requirements", {}).items():
+		for item in value if isinstance(value, list) else [ value ]:
+			all_requirements.append((key, item))
+
+	return all_requirements
@@ -0,0 +1,56 @@
+import asyncio
+import logging
+
+from typing import Any
+
+
+logger = logging.getLogger("ChangeWatcher")
+
+
+class ChangeWatcher:
+	""" Wait for the next update of a polling loop, waking up early when the database reports changes.
+
+	Providers whose database does not support change notifications are simply polled.
+	A minimum interval between updates avoids updating for every single change when they come in bursts.
+	Changes are only forgotten when clearing them, before an update reads the state they affect,
+	so that changes reported while the update is in progress still wake up the next wait.
+
+	"""
+
+
+	def __init__(self) -> None:
+		self._change_event = asyncio.Event()
+		self._all_watches = []
+
+
+	def watch(self, provider: Any) -> None:
+		""" Watch for changes to the records of a provider """
+
+		event_loop = asyncio.get_event_loop()
+		stop_watching = provider.watch_changes(lambda table: event_loop.call_soon_threadsafe(self._change_event.set))
+		if stop_watching is not None:
+			self._all_watches.append(stop_watching)
+
+
+	def clear(self) -> None:
+		""" Forget the changes reported so far, before reading the state they affect """
+		self._change_event.clear()
+
+
+	async def wait(self, minimum_interval_seconds: float, maximum_interval_seconds: float) -> None:
+		""" Wait until changes are reported since they were last cleared, or until the maximum interval elapses """
+
+		await asyncio.sleep(minimum_interval_seconds)
+
+		try:
+			await asyncio.wait_for(self._change_event.wait(), max(0, maximum_interval_seconds - minimum_interval_seconds))
+		except asyncio.TimeoutError:
+			pass
+
+
+	def dispose(self) -> None:
+		""" Stop watching for changes """
+
+		for stop_watching in self._all_watches:
+			stop_watching()
+		self._all_watches.clear()
@@ -0,0 +1,115 @@
+import datetime
+
+from typing import List, Optional, Set
+
+
+day_of_week_names = [ "sunday", "monday", "tuesday", "wednesday", "thursday", "friday", "saturday" ]
+
+
+class CronExpression:
+	""" Cron expression compiled to the sets of values matched by each field, to match times and compute the next trigger time.
+
+	Expressions have five fields: minute, hour, day of month, month and day of week, with 0 or 7 for sunday.
+	Fields can be a wildcard, a value, a range or a list of those, with an optional step, and day names can be used for days of week.
+	As with pycron, when both the day of month and the day of week are restricted, a day matching either of them matches.
+
+	"""
+
+
+	def __init__(self, expression: str) -> None:
+		all_fields = expression.split()
+		if len(all_fields) != 5:
+			raise ValueError("Cron expression '%s' must have 5 fields" % expression)
+
+		self.expression = expression
+		self.minutes = _parse_field(all_fields[0], 0, 59)
+		self.hours = _parse_field(all_fields[1], 0, 23)
+		self.days_of_month = _parse_field(all_fields[2], 1, 31)
+		self.months = _parse_field(all_fields[3], 1, 12)
+		self.days_of_week = { value % 7 for value in _parse_field(all_fields[4], 0, 7, day_of_week_names) }
+
+		self._is_day_of_month_restricted = "*" not in all_fields[2]
+		self._is_day_of_week_restricted = "*" not in all_fields[4]
+		self._sorted_minutes = sorted(self.minutes)
+		self._sorted_hours = sorted(self.hours)
+
+		self.maximum_search_days = 366 * 8
+
+
+	def matches(self, date_time: datetime.datetime) -> bool:
+		""" Check if a time matches the expression, to the minute """
+		return date_time.minute in self.minutes and date_time.hour in self.hours and self._matches_day(date_time.date())
+
+
+	def get_next(self, date_time: datetime.datetime) -> Optional[datetime.datetime]:
+		""" Return the first time matching the expression strictly after a time, to the minute, or None if it never matches """
+
+		start = date_time.replace(second = 0, microsecond = 0) + datetime.timedelta(minutes = 1)
+		day = start.date()
+
+		for _ in range(self.maximum_search_days):
+			if self._matches_day(day):
+				for hour in self._sorted_hours:
+					if day == start.date() and hour < start.hour:
+						continue
+					for minute in self._sorted_minutes:
+						if day == start.date() and hour == start.hour and minute < start.minute:
+							continue
+						return start.replace(year = day.year, month = day.month, day = day.day, hour = hour, minute = minute)
+
+			day += datetime.timedelta(days = 1)
+
+		return None
+
+
+	def _matches_day(self, date: datetime.date) -> bool:
+		if date.month not in self.months:
+			return False
+
+		matches_day_of_month = date.day in self.days_of_month
+		matches_day_of_week = date.isoweekday() % 7 in self.days_of_week
+
+		if self._is_day_of_month_restricted and self._is_day_of_week_restricted:
+			return matches_day_of_month or matches_day_of_week
+		return matches_day_of_month and matches_day_of_week
+
+
+
+def _parse_field(field: str, minimum: int, maximum: int, names: Optional[List[str]] = None) -> Set[int]:
+	""" Parse a cron field to the set of values it matches """
+
+	all_values = set()
+
+	for item in field.split(","):
+		range_item, _, step = item.partition("/")
+
+		try:
+			step = int(step) if step != "" else 1
+			if range_item == "*":
+				start, end = minimum, maximum
+			elif "-" in range_item:
+				start, end = (_parse_value(value, names) for value in range_item.split("-", 1))
+			else:
+				start = _parse_value(range_item, names)
+				end = maximum if item != range_item else start
+		except ValueError:
+			raise ValueError("Cron field '%s' is invalid" % field) from None
+
+		if step <= 0 or not minimum <= start <= maximum or not minimum <= end <= maximum:
+			raise ValueError("Cron field '%s' is invalid" % field)
+
+		if start <= end:
+			all_values.update(range(start, end + 1, step))
+		else:
+			range_size = maximum - minimum + 1
+			all_values.update(minimum + (value - minimum) % range_size for value in range(start, end + range_size + 1, step))
+
+	return all_values
+
+
+def _parse_value(value: str, names: Optional[List[str]]) -> int:
+	if names is not None:
+		for index, name in enumerate(names):
+			if value.lower() in [ name, name[:3] ]:
+				return index
+	return int(value)
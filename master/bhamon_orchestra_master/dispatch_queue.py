@@ -0,0 +1,81 @@
+import heapq
+import logging
+
+from typing import List, Optional
+
+
+logger = logging.getLogger("DispatchQueue")
+
+
+class DispatchQueue:
+	""" Order pending runs for dispatch, by priority first, then sharing workers fairly between projects.
+
+	Runs with a higher priority are always dispatched first. For runs with the same priority, projects take turns
+	in proportion to their weight, counting the runs they already have in progress, so that a burst of runs
+	from one project does not hold back the runs from other projects. Runs from a project are dispatched oldest first.
+
+	A policy sets the weight and optionally a concurrency limit for a project, or for all projects when it does not set one,
+	and the most specific policy applies. A project does not get more runs in progress than its limit, its other runs staying pending.
+
+	"""
+
+
+	def __init__(self, policy_collection: Optional[List[dict]] = None) -> None:
+		self.policy_collection = policy_collection if policy_collection is not None else []
+
+		for policy in self.policy_collection:
+			if policy.get("weight", 1) <= 0:
+				raise ValueError("Dispatch policy weight must be positive (Project: '%s')" % policy.get("project", None))
+
+
+	def find_policy(self, project: str) -> dict:
+		""" Return the most specific policy for a project, or an empty policy if none applies """
+
+		matching_policies = [ policy for policy in self.policy_collection if policy.get("project", None) in [ None, project ] ]
+		if len(matching_policies) == 0:
+			return {}
+		return max(matching_policies, key = lambda policy: policy.get("project", None) is not None)
+
+
+	def get_weight(self, project: str) -> float:
+		return self.find_policy(project).get("weight", 1)
+
+
+	def get_concurrency_limit(self, project: str) -> Optional[int]:
+		return self.find_policy(project).get("concurrency_limit", None)
+
+
+	def sort(self, run_collection: List[dict], active_run_counts: dict) -> List[dict]:
+		""" Return pending runs in dispatch order, given the number of runs in progress for each project """
+
+		all_runs_by_priority = {}
+		for run in run_collection:
+			all_runs_by_project = all_runs_by_priority.setdefault(run.get("priority", 0), {})
+			all_runs_by_project.setdefault(run["project"], []).append(run)
+
+		project_usage = dict(active_run_counts)
+		sorted_run_collection = []
+
+		for priority in sorted(all_runs_by_priority, reverse = True):
+			all_runs_by_project = all_runs_by_priority[priority]
+			project_heap = []
+
+			for project, project_runs in all_runs_by_project.items():
+				project_runs.sort(key = lambda run: run["creation_date"])
+				heapq.heappush(project_heap, self._create_heap_item(project, project_usage.get(project, 0), project_runs, 0))
+
+			while len(project_heap) > 0:
+				_, _, project, run_index = heapq.heappop(project_heap)
+				project_runs = all_runs_by_project[project]
+				sorted_run_collection.append(project_runs[run_index])
+				project_usage[project] = project_usage.get(project, 0) + 1
+
+				if run_index + 1 < len(project_runs):
+					heapq.heappush(project_heap, self._create_heap_item(project, project_usage[project], project_runs, run_index + 1))
+
+		return sorted_run_collection
+
+
+	def _create_heap_item(self, project: str, usage: int, project_runs: List[dict], run_index: int) -> tuple:
+		""" Create the item ordering a project in the queue, by its share of runs relative to its weight, then by the age of its next run """
+		return (usage / self.get_weight(project), project_runs[run_index]["creation_date"], project, run_index)
@@ -1,29 +1,43 @@
 import asyncio
 import datetime
 import logging
+import time
 
-from typing import List
-
-import pycron
+from typing import Dict, List, Optional
 
+from bhamon_orchestra_master.change_watcher import ChangeWatcher
+from bhamon_orchestra_master.dispatch_queue import DispatchQueue
+from bhamon_orchestra_master.schedule_queue import ScheduleQueue
 from bhamon_orchestra_master.supervisor import Supervisor
 from bhamon_orchestra_master.worker_selector import WorkerSelector
+from bhamon_orchestra_model.async_job_provider import AsyncJobProvider
+from bhamon_orchestra_model.async_run_provider import AsyncRunProvider
+from bhamon_orchestra_model.async_schedule_provider import AsyncScheduleProvider
 from bhamon_orchestra_model.date_time_provider import DateTimeProvider
-from bhamon_orchestra_model.job_provider import JobProvider
-from bhamon_orchestra_model.run_provider import RunProvider
-from bhamon_orchestra_model.schedule_provider import ScheduleProvider
 
 
 logger = logging.getLogger("JobScheduler")
 
 
 class JobScheduler:
-	""" Trigger timed schedules and dispatch pending runs to workers """
+	""" Trigger timed schedules and dispatch pending runs to workers.
+
+	Schedules are indexed by their next trigger time. Each update only reloads the schedules updated since the previous one,
+	since change notifications do not report changes made by other processes, and all schedules are reloaded periodically
+	to remove those which were deleted. Schedules are retrieved again when they are due, so that a schedule deleted
+	or disabled in the meantime does not trigger.
+
+	Pending runs are dispatched in a batch, matched with workers from a single snapshot of the jobs and workers for each update,
+	rather than retrieving them for each run. Executor counts come from the worker instances, which record assignments immediately.
+	The dispatch queue sets the order in which runs get workers and limits the runs in progress for each project.
+
+	"""
 
 
 	def __init__( # pylint: disable = too-many-arguments
-			self, job_provider: JobProvider, run_provider: RunProvider, schedule_provider: ScheduleProvider,
-			supervisor: Supervisor, worker_selector: WorkerSelector, date_time_provider: DateTimeProvider) -> None:
+			self, job_provider: AsyncJobProvider, run_provider: AsyncRunProvider, schedule_provider: AsyncScheduleProvider,
+			supervisor: Supervisor, worker_selector: WorkerSelector, date_time_provider: DateTimeProvider,
+			dispatch_queue: Optional[DispatchQueue] = None) -> None:
 
 		self._job_provider = job_provider
 		self._run_provider = run_provider
@@ -31,22 +45,59 @@ class JobScheduler:
 		self._supervisor = supervisor
 		self._worker_selector = worker_selector
 		self._date_time_provider = date_time_provider
+		self._dispatch_queue = dispatch_queue if dispatch_queue is not None else DispatchQueue()
 
 		self.update_interval_seconds = 10
+		self.minimum_update_interval_seconds = 1
 		self.run_expiration = datetime.timedelta(days = 1)
+		self.schedule_reload_interval = datetime.timedelta(minutes = 5)
+		self.schedule_update_margin = datetime.timedelta(seconds = 10)
+
+		self._schedule_queue = ScheduleQueue()
+		self._schedule_update_date = None
+		self._schedule_reload_date = None
+
+		self.dispatch_count = 0
+		self.assigned_run_count = 0
+		self.last_dispatch_run_count = None
+		self.last_dispatch_assigned_run_count = None
+		self.last_dispatch_duration = None
+		self.maximum_dispatch_duration = None
+
+
+	def get_statistics(self) -> dict:
+		""" Return metrics about dispatching pending runs to workers """
+
+		return {
+			"dispatch_count": self.dispatch_count,
+			"assigned_run_count": self.assigned_run_count,
+			"last_dispatch_run_count": self.last_dispatch_run_count,
+			"last_dispatch_assigned_run_count": self.last_dispatch_assigned_run_count,
+			"last_dispatch_duration": self.last_dispatch_duration,
+			"maximum_dispatch_duration": self.maximum_dispatch_duration,
+		}
 
 
 	async def run(self) -> None:
-		""" Perform updates until cancelled """
+		""" Perform updates until cancelled, waking up early when runs or schedules change """
 
-		while True:
-			try:
-				await asyncio.gather(self.update(), asyncio.sleep(self.update_interval_seconds))
-			except asyncio.CancelledError: # pylint: disable = try-except-raise
-				raise
-			except Exception: # pylint: disable = broad-except
-				logger.error("Unhandled exception", exc_info = True)
-				await asyncio.sleep(self.update_interval_seconds)
+		change_watcher = ChangeWatcher()
+		change_watcher.watch(self._run_provider)
+		change_watcher.watch(self._schedule_provider)
+
+		try:
+			while True:
+				try:
+					change_watcher.clear()
+					await asyncio.gather(self.update(), change_watcher.wait(self.minimum_update_interval_seconds, self.update_interval_seconds))
+				except asyncio.CancelledError: # pylint: disable = try-except-raise
+					raise
+				except Exception: # pylint: disable = broad-except
+					logger.error("Unhandled exception", exc_info = True)
+					await asyncio.sleep(self.update_interval_seconds)
+
+		finally:
+			change_watcher.dispose()
 
 
 	async def update(self) -> None:
@@ -54,67 +105,107 @@ class JobScheduler:
 
 		now = self._date_time_provider.now()
 
-		all_active_schedules = self._list_active_schedules()
+		await self._update_schedule_queue(now)
+
+		schedules_to_trigger = []
+		for schedule, trigger_date in self._schedule_queue.pop_due(now):
+			schedule = await self._schedule_provider.get(schedule["project"], schedule["identifier"])
+			if schedule is not None and schedule["is_enabled"] and await self._should_schedule_trigger(schedule, trigger_date):
+				schedules_to_trigger.append(schedule)
 
-		for schedule in all_active_schedules:
-			if self._should_schedule_trigger(schedule, now):
-				logger.info("Triggering run for schedule '%s'", schedule["identifier"])
-				source = { "type": "schedule", "identifier": schedule["identifier"] }
-				run = self._run_provider.create(schedule["project"], schedule["job"], schedule["parameters"], source)
-				self._schedule_provider.update_status(schedule, last_run = run["identifier"])
+		if len(schedules_to_trigger) > 0:
+			await self._trigger_schedules(schedules_to_trigger)
 
-		all_pending_runs = self._list_pending_runs()
+		all_pending_runs = await self._list_pending_runs()
+		all_active_runs = await self._list_active_runs()
+		runs_to_cancel = []
+		runs_to_dispatch = []
 
-		for run in all_pending_runs:
+		active_run_counts = {}
+		for run in all_active_runs + [ run for run in all_pending_runs if run["worker"] is not None ]:
+			active_run_counts[run["project"]] = active_run_counts.get(run["project"], 0) + 1
+
+		for run in [ run for run in all_pending_runs if run["worker"] is None ]:
 			creation_date = self._date_time_provider.deserialize(run["creation_date"])
 			if run.get("should_cancel", False) or now > creation_date + self.run_expiration:
 				logger.info("Cancelling run '%s'", run["identifier"])
-				self._run_provider.update_status(run, status = "cancelled")
-				continue
+				runs_to_cancel.append(run)
+			else:
+				runs_to_dispatch.append(run)
 
-			try:
-				self.trigger_run(run)
-			except Exception: # pylint: disable = broad-except
-				logger.error("Run trigger '%s' raised an exception", run["identifier"], exc_info = True)
-				self._run_provider.update_status(run, status = "exception")
+		if len(runs_to_dispatch) > 0:
+			await self.dispatch_runs(runs_to_dispatch, active_run_counts)
 
-		all_active_runs = self._list_active_runs()
+		if len(runs_to_cancel) > 0:
+			await self._run_provider.update_status_many(runs_to_cancel, status = "cancelled")
 
 		for run in all_active_runs:
 			if run.get("should_abort", False):
 				self.abort_run(run)
 
 
-	def _list_active_schedules(self) -> List[dict]:
-		""" Retrieve all active schedules from the database """
-		all_schedules = self._schedule_provider.get_list()
-		all_schedules = [ schedule for schedule in all_schedules if schedule["is_enabled"] ]
-		return all_schedules
+	async def _update_schedule_queue(self, now: datetime.datetime) -> None:
+		""" Load the schedules updated since the previous update into the queue, or all schedules when a periodic reload is due """
+
+		if self._schedule_reload_date is None or now >= self._schedule_reload_date:
+			self._schedule_queue.update(await self._schedule_provider.get_list(), now)
+			self._schedule_reload_date = now + self.schedule_reload_interval
 
+		else:
+			# Dates are serialized to the second and other processes may write a schedule with a date
+			# earlier than the previous update, after it queried the schedules, so recent updates are loaded again
+			updated_since = self._date_time_provider.serialize(self._schedule_update_date - self.schedule_update_margin)
+			all_schedules = await self._schedule_provider.get_list(updated_since = updated_since, order_by = [ ("update_date", "ascending") ])
+			self._schedule_queue.update_many(all_schedules, now)
 
-	def _list_pending_runs(self) -> List[dict]:
-		""" Retrieve all pending runs from the database """
-		all_runs = self._run_provider.get_list(status = "pending")
-		all_runs = [ run for run in all_runs if run["worker"] is None ]
-		return all_runs
+		self._schedule_update_date = now
 
 
-	def _list_active_runs(self) -> List[dict]:
+	async def _list_pending_runs(self) -> List[dict]:
+		""" Retrieve all pending runs from the database, including those already assigned to a worker """
+		return await self._run_provider.get_list(status = "pending")
+
+
+	async def _list_active_runs(self) -> List[dict]:
 		""" Retrieve all active runs from the database """
-		return self._run_provider.get_list(status = "running")
+		return await self._run_provider.get_list(status = "running")
 
 
-	def _should_schedule_trigger(self, schedule: dict, now: datetime.datetime) -> bool:
-		""" Check if a new run should be triggered based on a timed schedule """
+	async def _trigger_schedules(self, schedule_collection: List[dict]) -> None:
+		""" Create runs for schedules in a single batch, falling back to one schedule at a time if the batch is rejected, so that an invalid schedule does not block the others """
 
-		now = now.replace(second = 0)
-		if not pycron.is_now(schedule["expression"], now):
-			return False
+		run_request_collection = []
+		for schedule in schedule_collection:
+			logger.info("Triggering run for schedule '%s'", schedule["identifier"])
+			source = { "type": "schedule", "identifier": schedule["identifier"] }
+			run_request_collection.append({ "project": schedule["project"], "job": schedule["job"],
+				"parameters": schedule["parameters"], "source": source, "priority": schedule.get("priority", 0) })
+
+		try:
+			run_collection = await self._run_provider.create_many(run_request_collection)
+		except ValueError:
+			triggered_schedules = []
+			run_collection = []
+
+			for schedule, run_request in zip(schedule_collection, run_request_collection):
+				try:
+					run_collection += await self._run_provider.create_many([ run_request ])
+					triggered_schedules.append(schedule)
+				except ValueError:
+					logger.error("Failed to trigger run for schedule '%s'", schedule["identifier"], exc_info = True)
+
+			schedule_collection = triggered_schedules
+
+		await self._schedule_provider.update_last_run_many(schedule_collection, run_collection)
+
+
+	async def _should_schedule_trigger(self, schedule: dict, trigger_date: datetime.datetime) -> bool:
+		""" Check if a new run should be triggered for a schedule which reached its trigger time """
 
 		if schedule["last_run"] is None:
 			return True
 
-		last_run = self._run_provider.get(schedule["project"], schedule["last_run"])
+		last_run = await self._run_provider.get(schedule["project"], schedule["last_run"])
 		if last_run is None:
 			return True
 
@@ -122,28 +213,74 @@ class JobScheduler:
 			return False
 
 		last_trigger_date = self._date_time_provider.deserialize(last_run["creation_date"]).replace(second = 0)
-		if last_trigger_date == now:
+		if last_trigger_date >= trigger_date:
 			return False
 
 		return True
 
 
-	def trigger_run(self, run: dict) -> bool:
+	async def dispatch_runs(self, run_collection: List[dict], active_run_counts: Optional[dict] = None) -> int:
+		""" Try to start the execution of pending runs, using a single snapshot of the jobs and workers, and return how many were assigned """
+
+		start_time = time.perf_counter()
+
+		all_jobs = { (job["project"], job["identifier"]): job for job in await self._job_provider.get_list() }
+		all_available_workers = await self._worker_selector.get_available_workers()
+		active_run_counts = dict(active_run_counts) if active_run_counts is not None else {}
+		assigned_run_count = 0
+
+		for run in self._dispatch_queue.sort(run_collection, active_run_counts):
+			concurrency_limit = self._dispatch_queue.get_concurrency_limit(run["project"])
+			if concurrency_limit is not None and active_run_counts.get(run["project"], 0) >= concurrency_limit:
+				continue
+
+			try:
+				if await self._dispatch_run(run, all_jobs.get((run["project"], run["job"]), None), all_available_workers):
+					active_run_counts[run["project"]] = active_run_counts.get(run["project"], 0) + 1
+					assigned_run_count += 1
+			except Exception: # pylint: disable = broad-except
+				logger.error("Run trigger '%s' raised an exception", run["identifier"], exc_info = True)
+				await self._run_provider.update_status(run, status = "exception")
+
+		dispatch_duration = time.perf_counter() - start_time
+
+		self.dispatch_count += 1
+		self.assigned_run_count += assigned_run_count
+		self.last_dispatch_run_count = len(run_collection)
+		self.last_dispatch_assigned_run_count = assigned_run_count
+		self.last_dispatch_duration = dispatch_duration
+		self.maximum_dispatch_duration = max(self.maximum_dispatch_duration or 0, dispatch_duration)
+
+		logger.debug("Assigned %s pending runs out of %s (Duration: %.3fs)", assigned_run_count, len(run_collection), dispatch_duration)
+
+		return assigned_run_count
+
+
+	async def trigger_run(self, run: dict) -> bool:
 		""" Try to start a run execution """
 
+		job = await self._job_provider.get(run["project"], run["job"])
+		all_available_workers = await self._worker_selector.get_available_workers()
+		return await self._dispatch_run(run, job, all_available_workers)
+
+
+	async def _dispatch_run(self, run: dict, job: Optional[dict], available_workers: Dict[str,dict]) -> bool:
+		""" Try to start a run execution, on one of the available workers """
+
 		if run["status"] != "pending":
 			raise ValueError("Run '%s' cannot be triggered (Status: '%s')" % (run["identifier"], run["status"]))
+		if job is None:
+			raise ValueError("Job '%s' does not exist in project '%s'" % (run["job"], run["project"]))
 
-		job = self._job_provider.get(run["project"], run["job"])
 		if not job["is_enabled"]:
 			return False
 
-		selected_worker = self._worker_selector(job, run)
+		selected_worker = await self._worker_selector.select_worker_from(available_workers, job, run)
 		if selected_worker is None:
 			return False
 
 		logger.info("Assigning run '%s' to worker '%s'", run["identifier"], selected_worker)
-		self._supervisor.get_worker(selected_worker).assign_run(job, run)
+		await self._supervisor.get_worker(selected_worker).assign_run(job, run)
 		return True
 
 
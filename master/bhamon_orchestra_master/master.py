@@ -3,7 +3,11 @@ import logging
 import platform
 import signal
 
+from typing import Optional
+
 from bhamon_orchestra_master.job_scheduler import JobScheduler
+from bhamon_orchestra_master.run_collector import RunCollector
+from bhamon_orchestra_master.statistics_reporter import StatisticsReporter
 from bhamon_orchestra_master.supervisor import Supervisor
 from bhamon_orchestra_model.job_provider import JobProvider
 from bhamon_orchestra_model.project_provider import ProjectProvider
@@ -21,7 +25,8 @@ class Master:
 	def __init__(self, # pylint: disable = too-many-arguments
 			project_provider: ProjectProvider, job_provider: JobProvider,
 			schedule_provider: ScheduleProvider, worker_provider: WorkerProvider,
-			job_scheduler: JobScheduler, supervisor: Supervisor) -> None:
+			job_scheduler: JobScheduler, supervisor: Supervisor, run_collector: Optional[RunCollector] = None,
+			statistics_reporter: Optional[StatisticsReporter] = None) -> None:
 
 		self._project_provider = project_provider
 		self._job_provider = job_provider
@@ -29,6 +34,8 @@ class Master:
 		self._worker_provider = worker_provider
 		self._job_scheduler = job_scheduler
 		self._supervisor = supervisor
+		self._run_collector = run_collector
+		self._statistics_reporter = statistics_reporter
 
 		self._should_shutdown = False
 
@@ -56,14 +63,17 @@ class Master:
 		shutdown_future = asyncio.ensure_future(self._watch_shutdown())
 		job_scheduler_future = asyncio.ensure_future(self._job_scheduler.run())
 		supervisor_future = asyncio.ensure_future(self._supervisor.run_server())
+		run_collector_future = asyncio.ensure_future(self._run_collector.run()) if self._run_collector is not None else None
+		statistics_reporter_future = asyncio.ensure_future(self._statistics_reporter.run()) if self._statistics_reporter is not None else None
+		all_futures = [ shutdown_future, job_scheduler_future, supervisor_future ]
+		all_futures += [ future for future in [ run_collector_future, statistics_reporter_future ] if future is not None ]
 
 		try:
-			await asyncio.wait([ shutdown_future, job_scheduler_future, supervisor_future ], return_when = asyncio.FIRST_COMPLETED)
+			await asyncio.wait(all_futures, return_when = asyncio.FIRST_COMPLETED)
 
 		finally:
-			shutdown_future.cancel()
-			job_scheduler_future.cancel()
-			supervisor_future.cancel()
+			for future in all_futures:
+				future.cancel()
 
 			try:
 				await job_scheduler_future
@@ -79,6 +89,22 @@ class Master:
 			except Exception: # pylint: disable = broad-except
 				logger.error("Unhandled exception from supervisor", exc_info = True)
 
+			if run_collector_future is not None:
+				try:
+					await run_collector_future
+				except asyncio.CancelledError:
+					pass
+				except Exception: # pylint: disable = broad-except
+					logger.error("Unhandled exception from run collector", exc_info = True)
+
+			if statistics_reporter_future is not None:
+				try:
+					await statistics_reporter_future
+				except asyncio.CancelledError:
+					pass
+				except Exception: # pylint: disable = broad-except
+					logger.error("Unhandled exception from statistics reporter", exc_info = True)
+
 
 	async def _watch_shutdown(self) -> None:
 		while not self._should_shutdown:
@@ -95,24 +121,28 @@ class Master:
 			self._project_provider.create_or_update(project["identifier"], project["display_name"], project["services"])
 
 			all_existing_jobs = self._job_provider.get_list(project = project["identifier"])
-			for existing_job in all_existing_jobs:
-				if existing_job["identifier"] not in [ job["identifier"] for job in project["jobs"] ]:
-					logger.info("Removing project %s job %s", project["identifier"], existing_job["identifier"])
-					self._job_provider.delete(project["identifier"], existing_job["identifier"])
+			all_job_identifiers = [ job["identifier"] for job in project["jobs"] ]
+			jobs_to_remove = [ job["identifier"] for job in all_existing_jobs if job["identifier"] not in all_job_identifiers ]
+
+			for job_identifier in jobs_to_remove:
+				logger.info("Removing project %s job %s", project["identifier"], job_identifier)
+			self._job_provider.delete_many(project["identifier"], jobs_to_remove)
 
 			for job in project["jobs"]:
 				logger.info("Adding/Updating project %s job %s", project["identifier"], job["identifier"])
-				self._job_provider.create_or_update(job["identifier"], project["identifier"], **{ key: value for key, value in job.items() if key != "identifier" })
+			self._job_provider.create_or_update_many(project["identifier"], project["jobs"])
 
 			all_existing_schedules = self._schedule_provider.get_list(project = project["identifier"])
-			for existing_schedule in all_existing_schedules:
-				if existing_schedule["identifier"] not in [ schedule["identifier"] for schedule in project["schedules"] ]:
-					logger.info("Removing project %s schedule %s", project["identifier"], existing_schedule["identifier"])
-					self._schedule_provider.delete(project["identifier"], existing_schedule["identifier"])
+			all_schedule_identifiers = [ schedule["identifier"] for schedule in project["schedules"] ]
+			schedules_to_remove = [ schedule["identifier"] for schedule in all_existing_schedules if schedule["identifier"] not in all_schedule_identifiers ]
+
+			for schedule_identifier in schedules_to_remove:
+				logger.info("Removing project %s schedule %s", project["identifier"], schedule_identifier)
+			self._schedule_provider.delete_many(project["identifier"], schedules_to_remove)
 
 			for schedule in project["schedules"]:
 				logger.info("Adding/Updating project %s schedule %s", project["identifier"], schedule["identifier"])
-				self._schedule_provider.create_or_update(schedule["identifier"], project["identifier"], **{ key: value for key, value in schedule.items() if key != "identifier" })
+			self._schedule_provider.create_or_update_many(project["identifier"], project["schedules"])
 
 
 	def shutdown(self) -> None:
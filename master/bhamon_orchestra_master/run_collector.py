@@ -0,0 +1,56 @@
+import asyncio
+import concurrent.futures
+import functools
+import logging
+
+from typing import Optional
+
+from bhamon_orchestra_model.run_retention import RunRetention
+
+
+logger = logging.getLogger("RunCollector")
+
+
+class RunCollector:
+	""" Delete expired runs periodically, according to retention policies.
+
+	Runs are deleted in bounded batches, run in an executor so that deleting logs does not block the event loop.
+	While batches are full, the next one follows after a short interval, so that a backlog of expired runs
+	is worked through incrementally without holding the database for long.
+
+	"""
+
+
+	def __init__(self, run_retention: RunRetention, executor: Optional[concurrent.futures.Executor] = None) -> None:
+		self._run_retention = run_retention
+		self._executor = executor
+
+		self.update_interval_seconds = 60
+		self.batch_interval_seconds = 1
+		self.batch_size = 100
+
+
+	async def run(self) -> None:
+		""" Perform updates until cancelled """
+
+		while True:
+			try:
+				result = await self.update()
+				await asyncio.sleep(self.update_interval_seconds if result["is_complete"] else self.batch_interval_seconds)
+			except asyncio.CancelledError: # pylint: disable = try-except-raise
+				raise
+			except Exception: # pylint: disable = broad-except
+				logger.error("Unhandled exception", exc_info = True)
+				await asyncio.sleep(self.update_interval_seconds)
+
+
+	async def update(self) -> dict:
+		""" Perform a single update, deleting a batch of expired runs """
+
+		event_loop = asyncio.get_event_loop()
+		result = await event_loop.run_in_executor(self._executor, functools.partial(self._run_retention.collect, batch_size = self.batch_size))
+
+		if result["run_count"] > 0:
+			logger.info("Deleted %s expired runs, with %s bytes of logs", result["run_count"], result["log_size"])
+
+		return result
@@ -0,0 +1,116 @@
+import datetime
+import heapq
+import logging
+
+from typing import List, Optional, Tuple
+
+from bhamon_orchestra_master.cron_expression import CronExpression
+
+
+logger = logging.getLogger("ScheduleQueue")
+
+
+class ScheduleQueue:
+	""" Index of the enabled schedules, ordered by their next trigger time in a priority queue.
+
+	Expressions are compiled once, when a schedule is added or its expression changes, so that an update
+	only looks at the schedules which are due rather than evaluating every expression.
+	A trigger time is only removed from the queue once it is reached, so a late update still triggers
+	the schedules whose trigger time passed since the previous update, instead of missing them.
+
+	"""
+
+
+	def __init__(self) -> None:
+		self._all_entries = {}
+		self._heap = []
+		self._sequence = 0
+
+
+	def __len__(self) -> int:
+		return len(self._all_entries)
+
+
+	def get_next_trigger_date(self) -> Optional[datetime.datetime]:
+		""" Return the earliest trigger time in the queue, or None if it is empty """
+		self._discard_stale_items()
+		return self._heap[0][0] if len(self._heap) > 0 else None
+
+
+	def update(self, schedule_collection: List[dict], now: datetime.datetime) -> None:
+		""" Synchronize the queue with all the current schedules, removing those which are not in the collection """
+
+		self.update_many(schedule_collection, now)
+
+		all_keys = set((schedule["project"], schedule["identifier"]) for schedule in schedule_collection)
+		for key in [ key for key in self._all_entries if key not in all_keys ]:
+			del self._all_entries[key]
+
+
+	def update_many(self, schedule_collection: List[dict], now: datetime.datetime) -> None:
+		""" Synchronize the queue with the schedules which changed, computing trigger times only for those which were added or changed """
+
+		for schedule in schedule_collection:
+			key = (schedule["project"], schedule["identifier"])
+			entry = self._all_entries.get(key, None)
+
+			if not schedule["is_enabled"]:
+				self._all_entries.pop(key, None)
+				continue
+
+			if entry is not None and entry["expression"].expression == schedule["expression"]:
+				entry["schedule"] = schedule
+				continue
+
+			try:
+				expression = CronExpression(schedule["expression"])
+			except ValueError:
+				logger.error("Schedule '%s' has an invalid expression '%s'", schedule["identifier"], schedule["expression"], exc_info = True)
+				self._all_entries.pop(key, None)
+				continue
+
+			# Include the current minute, so that a schedule added or changed during a minute it matches still triggers
+			trigger_date = expression.get_next(now.replace(second = 0, microsecond = 0) - datetime.timedelta(minutes = 1))
+			self._all_entries[key] = { "schedule": schedule, "expression": expression, "trigger_date": trigger_date, "sequence": None }
+			self._push(key)
+
+
+	def pop_due(self, now: datetime.datetime) -> List[Tuple[dict,datetime.datetime]]:
+		""" Remove the schedules whose trigger time is reached and return them with their trigger time, queueing their next trigger time """
+
+		due_collection = []
+
+		while True:
+			self._discard_stale_items()
+			if len(self._heap) == 0 or self._heap[0][0] > now:
+				break
+
+			trigger_date, _, key = heapq.heappop(self._heap)
+			entry = self._all_entries[key]
+			due_collection.append((entry["schedule"], trigger_date))
+
+			# Trigger times missed by a late update are merged into a single trigger
+			entry["trigger_date"] = entry["expression"].get_next(now)
+			self._push(key)
+
+		return due_collection
+
+
+	def _push(self, key: tuple) -> None:
+		entry = self._all_entries[key]
+		entry["sequence"] = self._sequence
+		self._sequence += 1
+
+		if entry["trigger_date"] is not None:
+			heapq.heappush(self._heap, (entry["trigger_date"], entry["sequence"], key))
+
+
+	def _discard_stale_items(self) -> None:
+		""" Remove the items at the top of the queue for schedules which were removed or rescheduled """
+
+		while len(self._heap) > 0:
+			_, sequence, key = self._heap[0]
+			entry = self._all_entries.get(key, None)
+			if entry is not None and entry["sequence"] == sequence:
+				return
+			heapq.heappop(self._heap)
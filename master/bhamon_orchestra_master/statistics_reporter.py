@@ -0,0 +1,52 @@
+import asyncio
+import json
+import logging
+
+from typing import Any, Dict
+
+
+logger = logging.getLogger("StatisticsReporter")
+
+
+class StatisticsReporter:
+	""" Log statistics from components periodically, to monitor their load, such as database cache hits or dispatch durations.
+
+	Sources are objects with a get_statistics method returning a dict, identified by a name in the log.
+	Sources whose statistics did not change since the previous report are not logged again.
+
+	"""
+
+
+	def __init__(self, source_collection: Dict[str,Any]) -> None:
+		self._source_collection = source_collection
+		self._last_statistics = {}
+
+		self.update_interval_seconds = 60
+
+
+	async def run(self) -> None:
+		""" Perform updates until cancelled """
+
+		while True:
+			try:
+				self.update()
+			except Exception: # pylint: disable = broad-except
+				logger.error("Unhandled exception", exc_info = True)
+
+			await asyncio.sleep(self.update_interval_seconds)
+
+
+	def update(self) -> Dict[str,dict]:
+		""" Log the statistics from all sources, and return them by source name """
+
+		all_statistics = {}
+
+		for source_name, source in self._source_collection.items():
+			statistics = source.get_statistics()
+			all_statistics[source_name] = statistics
+
+			if statistics != self._last_statistics.get(source_name, None):
+				logger.info("Statistics for %s: %s", source_name, json.dumps(statistics, sort_keys = True))
+
+		self._last_statistics = all_statistics
+		return all_statistics
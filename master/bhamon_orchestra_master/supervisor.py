@@ -5,12 +5,14 @@ from typing import List, Type
 
 import websockets
 
+from bhamon_orchestra_master.capability_index import CapabilityIndex
+from bhamon_orchestra_master.change_watcher import ChangeWatcher
 from bhamon_orchestra_master.protocol import WebSocketServerProtocol
 from bhamon_orchestra_master.worker import Worker, WorkerError
+from bhamon_orchestra_model.async_run_provider import AsyncRunProvider
+from bhamon_orchestra_model.async_worker_provider import AsyncWorkerProvider
 from bhamon_orchestra_model.network.messenger import Messenger
 from bhamon_orchestra_model.network.websocket import WebSocketConnection
-from bhamon_orchestra_model.run_provider import RunProvider
-from bhamon_orchestra_model.worker_provider import WorkerProvider
 
 
 logger = logging.getLogger("Supervisor")
@@ -21,7 +23,7 @@ class Supervisor:
 
 	def __init__( # pylint: disable = too-many-arguments
 			self, host: str, port: str,
-			run_provider: RunProvider, worker_provider: WorkerProvider,
+			run_provider: AsyncRunProvider, worker_provider: AsyncWorkerProvider,
 			protocol_factory: Type[WebSocketServerProtocol]) -> None:
 
 		self._host = host
@@ -31,26 +33,36 @@ class Supervisor:
 		self._protocol_factory = protocol_factory
 
 		self._active_workers = {}
+		self.capability_index = CapabilityIndex()
 		self.update_interval_seconds = 10
+		self.minimum_update_interval_seconds = 1
 
 
 	async def run_server(self) -> None:
-		""" Run the websocket server to handle worker connections """
+		""" Run the websocket server to handle worker connections, updating when workers change or periodically """
 
-		for worker_record in self._worker_provider.get_list():
+		for worker_record in await self._worker_provider.get_list():
 			if worker_record["is_active"]:
-				self._worker_provider.update_status(worker_record, is_active = False, should_disconnect = False)
+				await self._worker_provider.update_status(worker_record, is_active = False, should_disconnect = False)
 
 		logger.info("Listening for workers on '%s:%s'", self._host, self._port)
-		async with websockets.serve(self._process_connection, self._host, self._port, create_protocol = self._protocol_factory):
-			while True:
-				try:
-					await asyncio.gather(self.update(), asyncio.sleep(self.update_interval_seconds))
-				except asyncio.CancelledError: # pylint: disable = try-except-raise
-					raise
-				except Exception: # pylint: disable = broad-except
-					logger.error("Unhandled exception", exc_info = True)
-					await asyncio.sleep(self.update_interval_seconds)
+		change_watcher = ChangeWatcher()
+		change_watcher.watch(self._worker_provider)
+
+		try:
+			async with websockets.serve(self._process_connection, self._host, self._port, create_protocol = self._protocol_factory):
+				while True:
+					try:
+						change_watcher.clear()
+						await asyncio.gather(self.update(), change_watcher.wait(self.minimum_update_interval_seconds, self.update_interval_seconds))
+					except asyncio.CancelledError: # pylint: disable = try-except-raise
+						raise
+					except Exception: # pylint: disable = broad-except
+						logger.error("Unhandled exception", exc_info = True)
+						await asyncio.sleep(self.update_interval_seconds)
+
+		finally:
+			change_watcher.dispose()
 
 
 	def get_worker(self, worker_identifier: str) -> dict:
@@ -58,20 +70,29 @@ class Supervisor:
 		return self._active_workers[worker_identifier]
 
 
-	def is_worker_available(self, worker_identifier: str) -> bool:
+	async def is_worker_available(self, worker_identifier: str) -> bool:
 		""" Check if a worker is available to execute runs """
 
 		if worker_identifier not in self._active_workers:
 			return False
 
-		worker_record = self._worker_provider.get(worker_identifier)
+		worker_record = await self._worker_provider.get(worker_identifier)
+		return self.is_worker_record_available(worker_record)
+
+
+	def is_worker_record_available(self, worker_record: dict) -> bool:
+		""" Check if a worker is available to execute runs, using an already retrieved worker record """
+
+		if worker_record["identifier"] not in self._active_workers:
+			return False
+
 		return worker_record["is_enabled"] and not worker_record.get("should_disconnect", False)
 
 
 	async def update(self) -> None:
 		""" Perform a single update """
 
-		all_worker_records = self._list_workers()
+		all_worker_records = await self._list_workers()
 
 		for worker_record in all_worker_records:
 			worker_instance = self._active_workers[worker_record["identifier"]]
@@ -79,9 +100,9 @@ class Supervisor:
 				worker_instance.should_disconnect = True
 
 
-	def _list_workers(self) -> List[dict]:
+	async def _list_workers(self) -> List[dict]:
 		""" Retrieve all worker records from the database """
-		all_workers = self._worker_provider.get_list()
+		all_workers = await self._worker_provider.get_list()
 		all_workers = [ worker for worker in all_workers if worker["identifier"] in self._active_workers ]
 		return all_workers
 
@@ -134,35 +155,37 @@ class Supervisor:
 
 		logger.info("Registering worker '%s'", worker_identifier)
 		worker_properties = await messenger_instance.send_request({ "command": "describe" })
-		worker_record = self._register_worker(worker_identifier, user, **worker_properties)
+		worker_record = await self._register_worker(worker_identifier, user, **worker_properties)
 		worker_instance = self._instantiate_worker(worker_identifier, messenger_instance)
 
-		self._worker_provider.update_status(worker_record, is_active = True, should_disconnect = False)
+		await self._worker_provider.update_status(worker_record, is_active = True, should_disconnect = False)
 		self._active_workers[worker_identifier] = worker_instance
+		self.capability_index.add_worker(worker_identifier, worker_properties["properties"])
 
 		try:
 			logger.info("Worker '%s' is now active", worker_identifier)
 			await worker_instance.run()
 
 		finally:
+			self.capability_index.remove_worker(worker_identifier)
 			del self._active_workers[worker_identifier]
-			self._worker_provider.update_status(worker_record, is_active = False, should_disconnect = False)
+			await self._worker_provider.update_status(worker_record, is_active = False, should_disconnect = False)
 
 
-	def _register_worker(self, # pylint: disable = too-many-arguments
+	async def _register_worker(self, # pylint: disable = too-many-arguments
 			worker_identifier: str, owner: str, version: str, display_name: str, properties: dict) -> dict:
 		""" Register the worker by creating or updating its record in the database and checking it is valid """
 
 		if worker_identifier in self._active_workers:
 			raise WorkerError("Worker '%s' is already active" % worker_identifier)
 
-		worker_record = self._worker_provider.get(worker_identifier)
+		worker_record = await self._worker_provider.get(worker_identifier)
 		if worker_record is None:
-			worker_record = self._worker_provider.create(worker_identifier, owner, version, display_name)
+			worker_record = await self._worker_provider.create(worker_identifier, owner, version, display_name)
 		if worker_record["owner"] != owner:
 			raise WorkerError("Worker '%s' is owned by another user (Expected: '%s', Actual: '%s')" % (worker_identifier, worker_record["owner"], owner))
 
-		self._worker_provider.update_properties(worker_record, version, display_name, properties)
+		await self._worker_provider.update_properties(worker_record, version, display_name, properties)
 
 		return worker_record
 
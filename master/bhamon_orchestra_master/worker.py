@@ -4,7 +4,7 @@ import logging
 from typing import List, Optional
 
 from bhamon_orchestra_model.network.messenger import Messenger
-from bhamon_orchestra_model.run_provider import RunProvider
+from bhamon_orchestra_model.async_run_provider import AsyncRunProvider
 
 
 logger = logging.getLogger("Worker")
@@ -18,7 +18,7 @@ class Worker:
 	""" Watcher for a remote worker process """
 
 
-	def __init__(self, identifier: str, messenger: Messenger, run_provider: RunProvider) -> None:
+	def __init__(self, identifier: str, messenger: Messenger, run_provider: AsyncRunProvider) -> None:
 		self.identifier = identifier
 		self._messenger = messenger
 		self._run_provider = run_provider
@@ -27,9 +27,9 @@ class Worker:
 		self.executors = []
 
 
-	def assign_run(self, job: dict, run: dict) -> None:
+	async def assign_run(self, job: dict, run: dict) -> None:
 		""" Assign a pending run to the worker """
-		self._run_provider.update_status(run, worker = self.identifier)
+		await self._run_provider.update_status(run, worker = self.identifier)
 		executor = { "job": job, "run": run, "local_status": "pending", "synchronization": "unknown", "should_abort": False }
 		self.executors.append(executor)
 
@@ -121,7 +121,7 @@ class Worker:
 
 		logger.info("(%s) Recovering run %s", self.identifier, run_identifier)
 		run_request = await self._retrieve_request(run_identifier)
-		run = self._run_provider.get(run_request["job"]["project"], run_identifier)
+		run = await self._run_provider.get(run_request["job"]["project"], run_identifier)
 		return { "job": run_request["job"], "run": run, "local_status": "running", "synchronization": "unknown", "should_abort": False }
 
 
@@ -146,6 +146,7 @@ class Worker:
 
 		clean_request = { "run_identifier": run["identifier"] }
 		await self._execute_remote_command("clean", clean_request)
+		await self._run_provider.archive_step_logs(run["project"], run["identifier"])
 		logger.info("(%s) Completed run %s with status %s", self.identifier, run["identifier"], run["status"])
 
 
@@ -154,9 +155,9 @@ class Worker:
 
 		reset = { "steps": [] }
 
-		for step in self._run_provider.get_all_steps(run["project"], run["identifier"]):
-			if self._run_provider.has_step_log(run["project"], run["identifier"], step["index"]):
-				log_size = self._run_provider.get_step_log_size(run["project"], run["identifier"], step["index"])
+		for step in await self._run_provider.get_all_steps(run["project"], run["identifier"]):
+			if await self._run_provider.has_step_log(run["project"], run["identifier"], step["index"]):
+				log_size = await self._run_provider.get_step_log_size(run["project"], run["identifier"], step["index"])
 				reset["steps"].append({ "index": step["index"], "log_file_cursor": log_size })
 
 		resynchronization_request = { "run_identifier": run["identifier"], "reset": reset }
@@ -178,11 +179,11 @@ class Worker:
 			raise RuntimeError("Update received after completion and verification")
 
 		if "status" in update:
-			self._update_status(executor["run"], update["status"])
+			await self._update_status(executor["run"], update["status"])
 		if "results" in update:
-			self._update_results(executor["run"], update["results"])
+			await self._update_results(executor["run"], update["results"])
 		if "log_chunk" in update:
-			self._update_log_file(executor["run"], update["step_index"], update["log_chunk"])
+			await self._update_log_file(executor["run"], update["step_index"], update["log_chunk"])
 		if "event" in update:
 			self._handle_event(executor, update["event"])
 
@@ -197,25 +198,25 @@ class Worker:
 		raise KeyError("Executor not found for %s" % run_identifier)
 
 
-	def _update_status(self, run: dict, status: dict) -> None:
+	async def _update_status(self, run: dict, status: dict) -> None:
 		""" Process an update for the run status """
 
 		properties_to_update = [ "status", "start_date", "completion_date" ]
-		self._run_provider.update_status(run, ** { key: value for key, value in status.items() if key in properties_to_update })
+		await self._run_provider.update_status(run, ** { key: value for key, value in status.items() if key in properties_to_update })
 
 		step_properties_to_update = [ "name", "index", "status" ]
 		step_collection = [ { key: value for key, value in step.items() if key in step_properties_to_update } for step in status.get("steps", []) ]
-		self._run_provider.update_steps(run, step_collection)
+		await self._run_provider.update_steps(run, step_collection)
 
 
-	def _update_results(self, run: dict, results: dict) -> None:
+	async def _update_results(self, run: dict, results: dict) -> None:
 		""" Process an update for the run results """
-		self._run_provider.set_results(run, results)
+		await self._run_provider.set_results(run, results)
 
 
-	def _update_log_file(self, run: str, step_index: int, log_chunk: str) -> None:
+	async def _update_log_file(self, run: str, step_index: int, log_chunk: str) -> None:
 		""" Process an update for the run log files """
-		self._run_provider.append_step_log(run["project"], run["identifier"], step_index, log_chunk)
+		await self._run_provider.append_step_log(run["project"], run["identifier"], step_index, log_chunk)
 
 
 	def _handle_event(self, executor: dict, event: str) -> None: # pylint: disable = no-self-use
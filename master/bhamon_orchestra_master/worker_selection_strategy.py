@@ -0,0 +1,128 @@
+import abc
+import logging
+import random
+
+from typing import Dict, List, Optional
+
+from bhamon_orchestra_model.async_run_provider import AsyncRunProvider
+
+
+logger = logging.getLogger("WorkerSelectionStrategy")
+
+
+class WorkerSelectionStrategy(abc.ABC):
+	""" Base class for strategies ordering the candidate workers for a run, the first one able to execute it being selected.
+
+	Candidates are dicts with the worker identifier, its executor count and its executor limit.
+
+	"""
+
+
+	@abc.abstractmethod
+	async def sort(self, candidate_collection: List[dict], job: dict, run: dict) -> List[dict]:
+		""" Return the candidate workers for a run, in order of preference """
+
+
+	def record_selection(self, job: dict, run: dict, worker_identifier: str) -> None: # pylint: disable = unused-argument
+		""" Record that a worker was selected to execute a run """
+
+
+
+class RandomStrategy(WorkerSelectionStrategy):
+	""" Strategy selecting workers at random, to spread runs across workers """
+
+
+	async def sort(self, candidate_collection: List[dict], job: dict, run: dict) -> List[dict]: # pylint: disable = unused-argument
+		return random.sample(candidate_collection, len(candidate_collection))
+
+
+
+class LeastLoadedStrategy(WorkerSelectionStrategy):
+	""" Strategy preferring the workers with the lowest ratio of executors to their executor limit, so that runs do not share busy machines """
+
+
+	async def sort(self, candidate_collection: List[dict], job: dict, run: dict) -> List[dict]: # pylint: disable = unused-argument
+		return sorted(random.sample(candidate_collection, len(candidate_collection)), key = get_load)
+
+
+
+class BinPackingStrategy(WorkerSelectionStrategy):
+	""" Strategy preferring the workers with the highest ratio of executors to their executor limit, so that other workers stay idle """
+
+
+	async def sort(self, candidate_collection: List[dict], job: dict, run: dict) -> List[dict]: # pylint: disable = unused-argument
+		return sorted(random.sample(candidate_collection, len(candidate_collection)), key = get_load, reverse = True)
+
+
+
+class WorkspaceAffinityStrategy(WorkerSelectionStrategy):
+	""" Strategy preferring the workers which most recently ran the job, so that runs reuse a warm workspace.
+
+	The recent workers for a job are retrieved from the run history the first time the job is dispatched,
+	then kept up to date as workers are selected. Other candidates are ordered by the fallback strategy.
+
+	"""
+
+
+	def __init__(self, run_provider: Optional[AsyncRunProvider] = None,
+			fallback_strategy: Optional[WorkerSelectionStrategy] = None, history_size: int = 5) -> None:
+		self._run_provider = run_provider
+		self._fallback_strategy = fallback_strategy if fallback_strategy is not None else LeastLoadedStrategy()
+		self.history_size = history_size
+
+		self._all_recent_workers = {}
+
+
+	async def sort(self, candidate_collection: List[dict], job: dict, run: dict) -> List[dict]:
+		recent_workers = await self._get_recent_workers(job["project"], job["identifier"])
+		worker_ranks = { worker: rank for rank, worker in enumerate(recent_workers) }
+
+		sorted_candidates = await self._fallback_strategy.sort(candidate_collection, job, run)
+		return sorted(sorted_candidates, key = lambda candidate: worker_ranks.get(candidate["identifier"], len(worker_ranks)))
+
+
+	def record_selection(self, job: dict, run: dict, worker_identifier: str) -> None:
+		recent_workers = self._all_recent_workers.setdefault((job["project"], job["identifier"]), [])
+		if worker_identifier in recent_workers:
+			recent_workers.remove(worker_identifier)
+		recent_workers.insert(0, worker_identifier)
+		del recent_workers[ self.history_size : ]
+
+		self._fallback_strategy.record_selection(job, run, worker_identifier)
+
+
+	async def _get_recent_workers(self, project: str, job: str) -> List[str]:
+		""" Return the workers which most recently ran a job, most recent first, retrieving them from the run history if they are not known yet """
+
+		recent_workers = self._all_recent_workers.get((project, job), None)
+
+		if recent_workers is None:
+			recent_workers = []
+
+			if self._run_provider is not None:
+				all_runs = await self._run_provider.get_list(project = project, job = job, is_assigned = True,
+					limit = self.history_size * 4, order_by = [ ("creation_date", "descending") ])
+				for run in all_runs:
+					if run["worker"] not in recent_workers and len(recent_workers) < self.history_size:
+						recent_workers.append(run["worker"])
+
+			self._all_recent_workers[(project, job)] = recent_workers
+
+		return recent_workers
+
+
+
+def get_load(candidate: dict) -> float:
+	""" Return the ratio of executors to the executor limit for a candidate worker """
+	return candidate["executor_count"] / candidate["executor_limit"] if candidate["executor_limit"] > 0 else 1.0
+
+
+def create_default_strategies(run_provider: Optional[AsyncRunProvider] = None) -> Dict[str,WorkerSelectionStrategy]:
+	""" Create the standard strategies, by the names jobs use to select them """
+
+	return {
+		"random": RandomStrategy(),
+		"least_loaded": LeastLoadedStrategy(),
+		"bin_packing": BinPackingStrategy(),
+		"workspace_affinity": WorkspaceAffinityStrategy(run_provider),
+	}
@@ -1,10 +1,11 @@
 import logging
-import random
 
-from typing import Optional
+from typing import Dict, Optional
 
+from bhamon_orchestra_master.capability_index import get_requirements
 from bhamon_orchestra_master.supervisor import Supervisor
-from bhamon_orchestra_model.worker_provider import WorkerProvider
+from bhamon_orchestra_master.worker_selection_strategy import WorkerSelectionStrategy, create_default_strategies
+from bhamon_orchestra_model.async_worker_provider import AsyncWorkerProvider
 
 
 logger = logging.getLogger("WorkerSelector")
@@ -13,38 +14,91 @@ logger = logging.getLogger("WorkerSelector")
 class WorkerSelector:
 	""" Callable class for matching a pending run with an available worker.
 
-	Override are_compatible to implement more conditions (operating system, software, resources, projects...).
+	Jobs declare the capabilities they require in their requirements property, matched against worker properties,
+	using the capability index the supervisor maintains for connected workers (see CapabilityIndex).
+	Finding candidate workers is a set intersection rather than a scan of all workers.
+
+	Candidates are ordered by a selection strategy, which jobs choose by name with their worker_selection property,
+	for example to prefer the least loaded workers, or the workers which ran the job recently (see WorkerSelectionStrategy),
+	and the first candidate for which are_compatible holds is selected.
+
+	Override are_compatible to implement more conditions (resources...).
+
+	To dispatch several runs, retrieve the available workers once with get_available_workers,
+	and select a worker for each run from those with select_worker_from.
 
 	"""
 
 
-	def __init__(self, worker_provider: WorkerProvider, supervisor: Supervisor) -> None:
+	def __init__(self, worker_provider: AsyncWorkerProvider, supervisor: Supervisor,
+			strategy_collection: Optional[Dict[str,WorkerSelectionStrategy]] = None, default_strategy: str = "random") -> None:
 		self._worker_provider = worker_provider
 		self._supervisor = supervisor
+		self.strategy_collection = strategy_collection if strategy_collection is not None else create_default_strategies()
+		self.default_strategy = default_strategy
 
 
-	def __call__(self, job: dict, run: dict) -> Optional[str]:
-		return self.select_worker(job, run)
+	async def __call__(self, job: dict, run: dict) -> Optional[str]:
+		return await self.select_worker(job, run)
 
 
-	def select_worker(self, job: dict, run: dict) -> Optional[str]:
+	async def select_worker(self, job: dict, run: dict) -> Optional[str]:
 		""" Find an available and suitable worker to execute the specified run """
 
-		all_workers = self._worker_provider.get_list()
-		all_available_workers = [ worker for worker in all_workers if self._supervisor.is_worker_available(worker["identifier"]) ]
-		random.shuffle(all_available_workers)
+		return await self.select_worker_from(await self.get_available_workers(), job, run)
+
+
+	async def get_available_workers(self) -> Dict[str,dict]:
+		""" Retrieve the records for the workers available to execute runs, by identifier, with a single database request """
+
+		all_workers = await self._worker_provider.get_list()
+		return { worker["identifier"]: worker for worker in all_workers if self._supervisor.is_worker_record_available(worker) }
+
+
+	async def select_worker_from(self, available_workers: Dict[str,dict], job: dict, run: dict) -> Optional[str]:
+		""" Find a suitable worker to execute the specified run among the available workers, in the order set by the job selection strategy """
+
+		all_candidates = [ self._create_candidate(available_workers[worker]) for worker in self._supervisor.capability_index.find_workers(get_requirements(job))
+			if worker in available_workers ]
+
+		strategy = self.get_strategy(job)
+
+		for candidate in await strategy.sort(all_candidates, job, run):
+			if self.are_compatible(available_workers[candidate["identifier"]], job, run):
+				strategy.record_selection(job, run, candidate["identifier"])
+				return candidate["identifier"]
+
+		return None
+
+
+	def get_strategy(self, job: dict) -> WorkerSelectionStrategy:
+		""" Return the selection strategy for a job, from its worker_selection property, or the default strategy """
+
+		strategy_name = job["properties"].get("worker_selection", None) or self.default_strategy
+		strategy = self.strategy_collection.get(strategy_name, None)
+
+		if strategy is None:
+			logger.warning("Unknown worker selection strategy '%s' for job '%s'", strategy_name, job["identifier"])
+			strategy = self.strategy_collection[self.default_strategy]
+
+		return strategy
+
 
-		return next((worker["identifier"] for worker in all_available_workers if self.are_compatible(worker, job, run)), None)
+	def _create_candidate(self, worker: dict) -> dict:
+		return {
+			"identifier": worker["identifier"],
+			"executor_count": len(self._supervisor.get_worker(worker["identifier"]).executors),
+			"executor_limit": worker["properties"].get("executor_limit", 0),
+		}
 
 
 	def are_compatible(self, worker: dict, job: dict, run: dict) -> bool: # pylint: disable = unused-argument
-		""" Check if a worker is able to execute the specified run """
+		""" Check if a worker, which has the capabilities required by the job, is able to execute the specified run """
 
 		executors = self._supervisor.get_worker(worker["identifier"]).executors
 
 		try:
-			return job["properties"]["is_controller"] == worker["properties"]["is_controller"] \
-				and len(executors) < worker["properties"]["executor_limit"]
+			return len(executors) < worker["properties"]["executor_limit"]
 
 		except KeyError:
 			logger.warning("Missing property for matching job and worker", exc_info = True)
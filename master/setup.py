@@ -19,7 +19,7 @@ parameters.update({
 	"description": "Master component for Job Orchestra, responsible for supervising workers and runs",
 	"packages": [ "bhamon_orchestra_master" ],
 	"python_requires": "~= 3.5",
-	"install_requires": [ "pycron ~= 3.0", "websockets ~= 7.0" ],
+	"install_requires": [ "websockets ~= 7.0" ],
 })
 
 setuptools.setup(**parameters)
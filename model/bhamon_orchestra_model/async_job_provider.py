@@ -0,0 +1,33 @@
+import asyncio
+import concurrent.futures
+import functools
+import logging
+
+from typing import Any, Callable, List, Optional, Tuple
+
+from bhamon_orchestra_model.job_provider import JobProvider
+
+
+logger = logging.getLogger("AsyncJobProvider")
+
+
+class AsyncJobProvider:
+	""" Asynchronous counterpart of JobProvider, running operations in an executor so that they do not block the event loop """
+
+
+	def __init__(self, job_provider: JobProvider, executor: Optional[concurrent.futures.Executor] = None) -> None:
+		self.job_provider = job_provider
+		self.executor = executor
+
+
+	async def get_list(self, project: Optional[str] = None, skip: int = 0, limit: Optional[int] = None, order_by: Optional[Tuple[str,str]] = None) -> List[dict]:
+		return await self._execute(self.job_provider.get_list, project = project, skip = skip, limit = limit, order_by = order_by)
+
+
+	async def get(self, project: str, job_identifier: str) -> Optional[dict]:
+		return await self._execute(self.job_provider.get, project, job_identifier)
+
+
+	async def _execute(self, function: Callable, *args, **kwargs) -> Any:
+		""" Run a provider operation in the executor and wait for its result """
+		return await asyncio.get_event_loop().run_in_executor(self.executor, functools.partial(function, *args, **kwargs))
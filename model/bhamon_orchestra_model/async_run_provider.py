@@ -0,0 +1,112 @@
+import asyncio
+import concurrent.futures
+import functools
+import logging
+
+from typing import Any, Callable, List, Optional, Tuple, Union
+
+from bhamon_orchestra_model.run_provider import RunProvider
+
+
+logger = logging.getLogger("AsyncRunProvider")
+
+
+class AsyncRunProvider:
+	""" Asynchronous counterpart of RunProvider, for use from an asyncio event loop.
+
+	Operations are delegated to the wrapped provider and run in an executor,
+	so that database queries and log file accesses do not block the event loop while they wait.
+	Use a bounded thread pool executor to limit how many operations run concurrently against the database.
+	Compressing logs runs in a separate archive executor, without accessing the database,
+	so that archiving large logs does not hold up the database operations queued behind it.
+
+	"""
+
+
+	def __init__(self, run_provider: RunProvider,
+			executor: Optional[concurrent.futures.Executor] = None, archive_executor: Optional[concurrent.futures.Executor] = None) -> None:
+		self.run_provider = run_provider
+		self.executor = executor
+		self.archive_executor = archive_executor
+
+
+	async def count(self, # pylint: disable = too-many-arguments
+			project: Optional[str] = None, job: Optional[str] = None, worker: Optional[str] = None,
+			status: Optional[Union[str,List[str]]] = None, is_assigned: Optional[bool] = None) -> int:
+		return await self._execute(self.run_provider.count, project = project, job = job, worker = worker, status = status, is_assigned = is_assigned)
+
+
+	async def get_list(self, # pylint: disable = too-many-arguments
+			project: Optional[str] = None, job: Optional[str] = None, worker: Optional[str] = None,
+			status: Optional[Union[str,List[str]]] = None, is_assigned: Optional[bool] = None,
+			skip: int = 0, limit: Optional[int] = None, order_by: Optional[Tuple[str,str]] = None, after: Optional[str] = None) -> List[dict]:
+		return await self._execute(self.run_provider.get_list,
+			project = project, job = job, worker = worker, status = status, is_assigned = is_assigned, skip = skip, limit = limit, order_by = order_by, after = after)
+
+
+	def watch_changes(self, callback: Callable[[str],None]) -> Optional[Callable[[],None]]:
+		""" Register a callback for changes, which may be called from another thread, returning a function to stop watching or None if unsupported """
+		return self.run_provider.watch_changes(callback)
+
+
+	async def get(self, project: str, run_identifier: str) -> Optional[dict]:
+		return await self._execute(self.run_provider.get, project, run_identifier)
+
+
+	async def create_many(self, run_request_collection: List[dict]) -> List[dict]:
+		return await self._execute(self.run_provider.create_many, run_request_collection)
+
+
+	async def update_status(self, # pylint: disable = too-many-arguments
+			run: dict, worker: Optional[str] = None, status: Optional[str] = None,
+			start_date: Optional[str] = None, completion_date: Optional[str] = None,
+			should_cancel: Optional[bool] = None, should_abort: Optional[bool] = None) -> None:
+		await self._execute(self.run_provider.update_status, run, worker = worker, status = status,
+			start_date = start_date, completion_date = completion_date, should_cancel = should_cancel, should_abort = should_abort)
+
+
+	async def update_status_many(self, # pylint: disable = too-many-arguments
+			run_collection: List[dict], worker: Optional[str] = None, status: Optional[str] = None,
+			start_date: Optional[str] = None, completion_date: Optional[str] = None,
+			should_cancel: Optional[bool] = None, should_abort: Optional[bool] = None) -> None:
+		await self._execute(self.run_provider.update_status_many, run_collection, worker = worker, status = status,
+			start_date = start_date, completion_date = completion_date, should_cancel = should_cancel, should_abort = should_abort)
+
+
+	async def get_all_steps(self, project: str, run_identifier: str) -> List[dict]:
+		return await self._execute(self.run_provider.get_all_steps, project, run_identifier)
+
+
+	async def update_steps(self, run: dict, step_collection: List[dict]) -> None:
+		await self._execute(self.run_provider.update_steps, run, step_collection)
+
+
+	async def has_step_log(self, project: str, run_identifier: str, step_index: int) -> bool:
+		return await self._execute(self.run_provider.has_step_log, project, run_identifier, step_index)
+
+
+	async def get_step_log_size(self, project: str, run_identifier: str, step_index: int) -> int:
+		return await self._execute(self.run_provider.get_step_log_size, project, run_identifier, step_index)
+
+
+	async def append_step_log(self, project: str, run_identifier: str, step_index: int, log_text: str) -> None:
+		await self._execute(self.run_provider.append_step_log, project, run_identifier, step_index, log_text)
+
+
+	async def flush_step_logs(self, project: str, run_identifier: str) -> None:
+		await self._execute(self.run_provider.flush_step_logs, project, run_identifier)
+
+
+	async def archive_step_logs(self, project: str, run_identifier: str) -> int:
+		step_collection = await self._execute(self.run_provider.get_all_steps, project, run_identifier)
+		archive_function = functools.partial(self.run_provider.archive_step_logs, project, run_identifier, step_collection)
+		return await asyncio.get_event_loop().run_in_executor(self.archive_executor, archive_function)
+
+
+	async def set_results(self, run: dict, results: dict) -> None:
+		await self._execute(self.run_provider.set_results, run, results)
+
+
+	async def _execute(self, function: Callable, *args, **kwargs) -> Any:
+		""" Run a provider operation in the executor and wait for its result """
+		return await asyncio.get_event_loop().run_in_executor(self.executor, functools.partial(function, *args, **kwargs))
@@ -0,0 +1,45 @@
+import asyncio
+import concurrent.futures
+import functools
+import logging
+
+from typing import Any, Callable, List, Optional, Tuple
+
+from bhamon_orchestra_model.schedule_provider import ScheduleProvider
+
+
+logger = logging.getLogger("AsyncScheduleProvider")
+
+
+class AsyncScheduleProvider:
+	""" Asynchronous counterpart of ScheduleProvider, running operations in an executor so that they do not block the event loop """
+
+
+	def __init__(self, schedule_provider: ScheduleProvider, executor: Optional[concurrent.futures.Executor] = None) -> None:
+		self.schedule_provider = schedule_provider
+		self.executor = executor
+
+
+	async def get_list(self, # pylint: disable = too-many-arguments
+			project: Optional[str] = None, job: Optional[str] = None, updated_since: Optional[str] = None,
+			skip: int = 0, limit: Optional[int] = None, order_by: Optional[Tuple[str,str]] = None) -> List[dict]:
+		return await self._execute(self.schedule_provider.get_list,
+			project = project, job = job, updated_since = updated_since, skip = skip, limit = limit, order_by = order_by)
+
+
+	def watch_changes(self, callback: Callable[[str],None]) -> Optional[Callable[[],None]]:
+		""" Register a callback for changes, which may be called from another thread, returning a function to stop watching or None if unsupported """
+		return self.schedule_provider.watch_changes(callback)
+
+
+	async def get(self, project: str, schedule_identifier: str) -> Optional[dict]:
+		return await self._execute(self.schedule_provider.get, project, schedule_identifier)
+
+
+	async def update_last_run_many(self, schedule_collection: List[dict], run_collection: List[dict]) -> None:
+		await self._execute(self.schedule_provider.update_last_run_many, schedule_collection, run_collection)
+
+
+	async def _execute(self, function: Callable, *args, **kwargs) -> Any:
+		""" Run a provider operation in the executor and wait for its result """
+		return await asyncio.get_event_loop().run_in_executor(self.executor, functools.partial(function, *args, **kwargs))
@@ -0,0 +1,50 @@
+import asyncio
+import concurrent.futures
+import functools
+import logging
+
+from typing import Any, Callable, List, Optional, Tuple
+
+from bhamon_orchestra_model.worker_provider import WorkerProvider
+
+
+logger = logging.getLogger("AsyncWorkerProvider")
+
+
+class AsyncWorkerProvider:
+	""" Asynchronous counterpart of WorkerProvider, running operations in an executor so that they do not block the event loop """
+
+
+	def __init__(self, worker_provider: WorkerProvider, executor: Optional[concurrent.futures.Executor] = None) -> None:
+		self.worker_provider = worker_provider
+		self.executor = executor
+
+
+	async def get_list(self, skip: int = 0, limit: Optional[int] = None, order_by: Optional[Tuple[str,str]] = None) -> List[dict]:
+		return await self._execute(self.worker_provider.get_list, skip = skip, limit = limit, order_by = order_by)
+
+
+	def watch_changes(self, callback: Callable[[str],None]) -> Optional[Callable[[],None]]:
+		""" Register a callback for changes, which may be called from another thread, returning a function to stop watching or None if unsupported """
+		return self.worker_provider.watch_changes(callback)
+
+
+	async def get(self, worker_identifier: str) -> Optional[dict]:
+		return await self._execute(self.worker_provider.get, worker_identifier)
+
+
+	async def create(self, worker_identifier: str, owner: str, version: str, display_name: str) -> dict:
+		return await self._execute(self.worker_provider.create, worker_identifier, owner, version, display_name)
+
+
+	async def update_status(self, worker: dict, is_active: Optional[bool] = None, is_enabled: Optional[bool] = None, should_disconnect: Optional[bool] = None) -> None:
+		await self._execute(self.worker_provider.update_status, worker, is_active = is_active, is_enabled = is_enabled, should_disconnect = should_disconnect)
+
+
+	async def update_properties(self, worker: dict, version: str, display_name: str, properties: dict) -> None:
+		await self._execute(self.worker_provider.update_properties, worker, version, display_name, properties)
+
+
+	async def _execute(self, function: Callable, *args, **kwargs) -> Any:
+		""" Run a provider operation in the executor and wait for its result """
+		return await asyncio.get_event_loop().run_in_executor(self.executor, functools.partial(function, *args, **kwargs))
@@ -30,6 +30,8 @@ class AuthenticationProvider:
 		self.token_hash_function = "sha256"
 		self.token_hash_function_parameters = {}
 
+		self.public_fields = [ "identifier", "user", "type", "description", "expiration_date", "creation_date", "update_date" ]
+
 
 	def set_password(self, user: str, password: str) -> dict:
 		now = self.date_time_provider.now()
@@ -93,12 +95,12 @@ class AuthenticationProvider:
 	def get_token_list(self, user: Optional[str] = None, skip: int = 0, limit: Optional[int] = None, order_by: Optional[Tuple[str,str]] = None) -> List[dict]:
 		filter = { "user": user, "type": "token" } # pylint: disable = redefined-builtin
 		filter = { key: value for key, value in filter.items() if value is not None }
-		token_list = self.database_client.find_many(self.table, filter, skip = skip, limit = limit, order_by = order_by)
+		token_list = self.database_client.find_many(self.table, filter, skip = skip, limit = limit, order_by = order_by, projection = self.public_fields)
 		return [ self.convert_to_public(token) for token in token_list ]
 
 
 	def get_token(self, user_identifier: str, token_identifier: str) -> Optional[dict]:
-		token = self.database_client.find_one(self.table, { "identifier": token_identifier, "user": user_identifier, "type": "token" })
+		token = self.database_client.find_one(self.table, { "identifier": token_identifier, "user": user_identifier, "type": "token" }, projection = self.public_fields)
 		return self.convert_to_public(token) if token is not None else None
 
 
@@ -159,6 +161,5 @@ class AuthenticationProvider:
 		raise ValueError("Unsupported hash function '%s'" % function)
 
 
-	def convert_to_public(self, authentication: dict) -> dict: # pylint: disable = no-self-use
-		keys_to_return = [ "identifier", "user", "type", "description", "expiration_date", "creation_date", "update_date" ]
-		return { key: value for key, value in authentication.items() if key in keys_to_return }
+	def convert_to_public(self, authentication: dict) -> dict:
+		return { key: value for key, value in authentication.items() if key in self.public_fields }
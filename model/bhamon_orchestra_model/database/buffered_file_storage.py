@@ -0,0 +1,189 @@
+import collections
+import logging
+import os
+import threading
+import time
+
+from typing import Optional, Tuple
+
+from bhamon_orchestra_model.database.local_file_storage import LocalFileStorage
+
+
+logger = logging.getLogger("BufferedFileStorage")
+
+
+class BufferedFileStorage(LocalFileStorage):
+	""" Client for a file storage on the local file system, with appends buffered in memory and written in batches.
+
+	Appended data is held per file and written by a background thread, or earlier once a file buffer grows too large,
+	through a bounded pool of open files, the least recently used ones being closed once the pool is full.
+	The committed size of a file is only updated after its data is written, so that readers in other processes
+	never see partial data, and data lost before being written is sent again by workers when they resynchronize.
+
+	Reads through this client flush the file first, so that they see all the data appended so far.
+
+	"""
+
+
+	def __init__(self, # pylint: disable = too-many-arguments
+			data_directory: str, flush_interval_seconds: float = 1,
+			maximum_open_files: int = 100, maximum_buffer_size: int = 64 * 1024) -> None:
+		super().__init__(data_directory)
+
+		self.flush_interval_seconds = flush_interval_seconds
+		self.maximum_open_files = maximum_open_files
+		self.maximum_buffer_size = maximum_buffer_size
+
+		self._lock = threading.RLock()
+		self._buffers = {}
+		self._open_files = collections.OrderedDict()
+		self._flush_count = 0
+		self._flush_duration_total = 0
+		self._flush_duration_maximum = 0
+
+		self._should_stop = threading.Event()
+		self._background_thread = threading.Thread(target = self._run_background, name = "BufferedFileStorage", daemon = True)
+		self._background_thread.start()
+
+
+	def get_statistics(self) -> dict:
+		""" Return metrics about open files, buffered data and flush latency """
+
+		with self._lock:
+			return {
+				"open_file_count": len(self._open_files),
+				"buffered_file_count": len(self._buffers),
+				"buffered_size": sum(len(buffer) for buffer in self._buffers.values()),
+				"flush_count": self._flush_count,
+				"flush_duration_average": (self._flush_duration_total / self._flush_count) if self._flush_count > 0 else 0,
+				"flush_duration_maximum": self._flush_duration_maximum,
+			}
+
+
+	def exists(self, file_path: str) -> bool:
+		self._flush_file(os.path.join(self._data_directory, file_path))
+		return super().exists(file_path)
+
+
+	def get_size(self, file_path: str) -> int:
+		""" Return the size of a file in bytes, including buffered data """
+		self._flush_file(os.path.join(self._data_directory, file_path))
+		return super().get_size(file_path)
+
+
+	def load(self, file_path: str) -> str:
+		self._flush_file(os.path.join(self._data_directory, file_path))
+		return super().load(file_path)
+
+
+	def load_chunk(self, file_path: str, skip: int = 0, limit: Optional[int] = None) -> Tuple[str, int]:
+		""" Load up to limit bytes from a file, starting at the skip byte offset, and return the text with the offset to continue from """
+		self._flush_file(os.path.join(self._data_directory, file_path))
+		return super().load_chunk(file_path, skip = skip, limit = limit)
+
+
+	def save(self, file_path: str, data: str) -> None:
+		self._release_file(os.path.join(self._data_directory, file_path))
+		super().save(file_path, data)
+
+
+	def append_unsafe(self, file_path: str, data: str) -> None:
+		""" Add text to the buffer for a file, writing it right away if the buffer is full """
+
+		file_path = os.path.join(self._data_directory, file_path)
+
+		with self._lock:
+			buffer = self._buffers.setdefault(file_path, bytearray())
+			buffer += self._encode_for_append(data)
+			if len(buffer) >= self.maximum_buffer_size:
+				self._flush_file(file_path)
+
+
+	def flush(self, directory: Optional[str] = None) -> None:
+		""" Write buffered data for the files in a directory, or for all files, and close them """
+
+		directory = os.path.join(self._data_directory, directory) if directory is not None else None
+
+		with self._lock:
+			all_file_paths = set(self._buffers) | set(self._open_files)
+			for file_path in all_file_paths:
+				if directory is None or file_path.startswith(os.path.join(directory, "")):
+					self._release_file(file_path)
+
+
+	def archive(self, file_path: str) -> None:
+		self._release_file(os.path.join(self._data_directory, file_path))
+		super().archive(file_path)
+
+
+	def delete(self, file_path: str) -> None:
+		self._release_file(os.path.join(self._data_directory, file_path), should_write = False)
+		super().delete(file_path)
+
+
+	def close(self) -> None:
+		""" Stop the background thread, write all buffered data and close all files """
+
+		self._should_stop.set()
+		self._background_thread.join()
+		self.flush()
+
+
+	def _flush_file(self, file_path: str) -> None:
+		""" Write the buffered data for a file, keeping it open for the next writes """
+
+		with self._lock:
+			buffer = self._buffers.pop(file_path, None)
+			if buffer is None:
+				return
+
+			start_time = time.perf_counter()
+
+			if file_path not in self._open_files and self._is_archived_internal(file_path):
+				self._append_to_archive(file_path, bytes(buffer))
+
+			else:
+				if file_path in self._open_files:
+					self._open_files.move_to_end(file_path)
+				else:
+					while len(self._open_files) >= self.maximum_open_files:
+						self._open_files.popitem(last = False)[1]["file"].close()
+					data_file, committed_size = self._open_for_append(file_path)
+					self._open_files[file_path] = { "file": data_file, "size": committed_size }
+
+				open_file = self._open_files[file_path]
+				open_file["file"].write(buffer)
+				open_file["file"].flush()
+				open_file["size"] += len(buffer)
+				self._write_committed_size(file_path, open_file["size"])
+
+			flush_duration = time.perf_counter() - start_time
+			self._flush_count += 1
+			self._flush_duration_total += flush_duration
+			self._flush_duration_maximum = max(self._flush_duration_maximum, flush_duration)
+
+
+	def _release_file(self, file_path: str, should_write: bool = True) -> None:
+		""" Write the buffered data for a file, unless discarding it, and close it """
+
+		with self._lock:
+			if should_write:
+				self._flush_file(file_path)
+			else:
+				self._buffers.pop(file_path, None)
+
+			open_file = self._open_files.pop(file_path, None)
+			if open_file is not None:
+				open_file["file"].close()
+
+
+	def _run_background(self) -> None:
+		""" Write buffered data periodically, until the client is closed """
+
+		while not self._should_stop.wait(self.flush_interval_seconds):
+			try:
+				with self._lock:
+					for file_path in list(self._buffers):
+						self._flush_file(file_path)
+			except Exception: # pylint: disable = broad-except
+				logger.error("Unhandled exception in background thread", exc_info = True)
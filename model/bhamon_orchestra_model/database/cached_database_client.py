@@ -0,0 +1,170 @@
+import collections
+import copy
+import datetime
+import json
+import logging
+import threading
+
+from typing import Any, Callable, Iterator, List, Optional, Tuple
+
+from bhamon_orchestra_model.database.database_client import DatabaseClient
+from bhamon_orchestra_model.date_time_provider import DateTimeProvider
+
+
+logger = logging.getLogger("CachedDatabaseClient")
+
+
+class CachedDatabaseClient(DatabaseClient):
+	""" Read-through cache in front of another database client, for records which are read often and change rarely.
+
+	Query results are cached by table and query, and expire after a time to live, the least recently used entries being evicted
+	once the cache is full. Writes through this client invalidate all the cached entries for their table,
+	while changes made by other clients or processes are only seen once the entries expire.
+
+	"""
+
+
+	def __init__(self, database_client: DatabaseClient, date_time_provider: DateTimeProvider,
+			time_to_live_seconds: float = 10, maximum_size: int = 1000) -> None:
+		self.database_client = database_client
+		self.date_time_provider = date_time_provider
+		self.time_to_live = datetime.timedelta(seconds = time_to_live_seconds)
+		self.maximum_size = maximum_size
+
+		self.hit_count = 0
+		self.miss_count = 0
+
+		self._lock = threading.Lock()
+		self._entries = collections.OrderedDict()
+		self._table_versions = {}
+
+
+	def get_statistics(self) -> dict:
+		""" Return the cache hit and miss counters, to measure how much load it takes off the database """
+
+		with self._lock:
+			return { "hit_count": self.hit_count, "miss_count": self.miss_count, "size": len(self._entries) }
+
+
+	def clear(self) -> None:
+		""" Remove all cached entries """
+
+		with self._lock:
+			self._entries.clear()
+
+
+	def count(self, table: str, filter: dict) -> int: # pylint: disable = redefined-builtin
+		""" Return how many items are in a table, after applying a filter """
+		return self._get_or_load(table, [ "count", filter ], lambda: self.database_client.count(table, filter))
+
+
+	def find_many(self, # pylint: disable = too-many-arguments
+			table: str, filter: dict, # pylint: disable = redefined-builtin
+			skip: int = 0, limit: Optional[int] = None, order_by: Optional[Tuple[str,str]] = None,
+			projection: Optional[List[str]] = None) -> List[dict]:
+		""" Return a list of items from a table, after applying a filter, with options for limiting and sorting results """
+
+		query = [ "find_many", filter, skip, limit, order_by, projection ]
+		return self._get_or_load(table, query, lambda: self.database_client.find_many(table, filter, skip = skip, limit = limit, order_by = order_by, projection = projection))
+
+
+	def iter_many(self, # pylint: disable = too-many-arguments
+			table: str, filter: dict, # pylint: disable = redefined-builtin
+			skip: int = 0, limit: Optional[int] = None, order_by: Optional[Tuple[str,str]] = None,
+			projection: Optional[List[str]] = None, batch_size: int = 1000) -> Iterator[dict]:
+		""" Iterate on items from a table, with the same options as find_many, without caching since iterating is meant for large results """
+		return self.database_client.iter_many(table, filter, skip = skip, limit = limit, order_by = order_by, projection = projection, batch_size = batch_size)
+
+
+	def find_one(self, table: str, filter: dict, projection: Optional[List[str]] = None) -> Optional[dict]: # pylint: disable = redefined-builtin
+		""" Return a single item (or nothing) from a table, after applying a filter """
+		return self._get_or_load(table, [ "find_one", filter, projection ], lambda: self.database_client.find_one(table, filter, projection = projection))
+
+
+	def insert_one(self, table: str, data: dict) -> dict:
+		""" Insert a new item into a table """
+		return self._write(table, lambda: self.database_client.insert_one(table, data))
+
+
+	def insert_many(self, table: str, data_collection: List[dict]) -> None:
+		""" Insert several new items into a table """
+		self._write(table, lambda: self.database_client.insert_many(table, data_collection))
+
+
+	def update_one(self, table: str, filter: dict, data: dict) -> None: # pylint: disable = redefined-builtin
+		""" Update a single item (or nothing) from a table, after applying a filter """
+		self._write(table, lambda: self.database_client.update_one(table, filter, data))
+
+
+	def update_many(self, table: str, filter: dict, data: dict) -> None: # pylint: disable = redefined-builtin
+		""" Update all items from a table matching a filter """
+		self._write(table, lambda: self.database_client.update_many(table, filter, data))
+
+
+	def delete_one(self, table: str, filter: dict) -> None: # pylint: disable = redefined-builtin
+		""" Delete a single item (or nothing) from a table, after applying a filter """
+		self._write(table, lambda: self.database_client.delete_one(table, filter))
+
+
+	def bulk_write(self, table: str, operation_collection: List[dict]) -> None:
+		""" Apply a batch of write operations on a table, in order, stopping at the first error """
+		self._write(table, lambda: self.database_client.bulk_write(table, operation_collection))
+
+
+	def watch_changes(self, table_collection: List[str], callback: Callable[[str],None]) -> Optional[Callable[[],None]]:
+		""" Register a callback for changes on any of the tables, using the mechanism of the wrapped client """
+		return self.database_client.watch_changes(table_collection, callback)
+
+
+	def close(self) -> None:
+		self.database_client.close()
+
+
+	def _get_or_load(self, table: str, query: list, load_function: Callable[[],Any]) -> Any:
+		""" Return the cached result for a query, loading it from the database client if it is missing or expired """
+
+		cache_key = (table, json.dumps(query, sort_keys = True, default = str))
+		now = self.date_time_provider.now()
+
+		with self._lock:
+			entry = self._entries.get(cache_key, None)
+			if entry is not None and now < entry["expiration"]:
+				self._entries.move_to_end(cache_key)
+				self.hit_count += 1
+				return copy.deepcopy(entry["value"])
+			self.miss_count += 1
+			table_version = self._table_versions.get(table, 0)
+
+		value = load_function()
+
+		with self._lock:
+			# Do not cache a result which may predate a concurrent write
+			if self._table_versions.get(table, 0) != table_version:
+				return value
+
+			self._entries[cache_key] = { "value": copy.deepcopy(value), "expiration": now + self.time_to_live }
+			self._entries.move_to_end(cache_key)
+			while len(self._entries) > self.maximum_size:
+				self._entries.popitem(last = False)
+
+		return value
+
+
+	def _write(self, table: str, write_function: Callable[[],Any]) -> Any:
+		""" Apply a write operation, invalidating the cached entries for its table before and after it so that concurrent reads do not cache stale results """
+
+		self._invalidate(table)
+
+		try:
+			return write_function()
+		finally:
+			self._invalidate(table)
+
+
+	def _invalidate(self, table: str) -> None:
+		""" Remove the cached entries for a table """
+
+		with self._lock:
+			self._table_versions[table] = self._table_versions.get(table, 0) + 1
+			for cache_key in [ cache_key for cache_key in self._entries if cache_key[0] == table ]:
+				del self._entries[cache_key]
@@ -0,0 +1,49 @@
+import logging
+import threading
+
+from typing import Callable, List
+
+
+logger = logging.getLogger("ChangeNotifier")
+
+
+class ChangeNotifier:
+	""" In-process change notifications, for database clients without a native mechanism.
+
+	Only changes made through the same client instance are notified, not those made by other processes.
+
+	"""
+
+
+	def __init__(self) -> None:
+		self._lock = threading.Lock()
+		self._all_listeners = []
+
+
+	def add_listener(self, table_collection: List[str], callback: Callable[[str],None]) -> Callable[[],None]:
+		""" Register a callback for changes on any of the tables, returning a function to unregister it """
+
+		listener = { "table_collection": list(table_collection), "callback": callback }
+
+		with self._lock:
+			self._all_listeners.append(listener)
+
+		return lambda: self._remove_listener(listener)
+
+
+	def notify(self, table: str) -> None:
+		""" Call the listeners registered for a table """
+
+		with self._lock:
+			all_listeners = [ listener for listener in self._all_listeners if table in listener["table_collection"] ]
+
+		for listener in all_listeners:
+			try:
+				listener["callback"](table)
+			except Exception: # pylint: disable = broad-except
+				logger.error("Change listener for table '%s' raised an exception", table, exc_info = True)
+
+
+	def _remove_listener(self, listener: dict) -> None:
+		with self._lock:
+			self._all_listeners = [ other_listener for other_listener in self._all_listeners if other_listener is not listener ]
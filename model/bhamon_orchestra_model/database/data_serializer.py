@@ -0,0 +1,41 @@
+import abc
+
+from typing import Any
+
+
+all_formats = [ "json", "msgpack" ]
+
+
+class DataSerializer(abc.ABC):
+	""" Base class for a serializer converting database tables to and from file content """
+
+
+	@property
+	@abc.abstractmethod
+	def file_extension(self) -> str:
+		""" Return the extension for files holding serialized data, including the leading dot """
+
+
+	@abc.abstractmethod
+	def serialize(self, data: Any) -> bytes:
+		""" Convert data to file content """
+
+
+	@abc.abstractmethod
+	def deserialize(self, data: bytes) -> Any:
+		""" Convert file content back to data """
+
+
+
+def create_serializer(format_name: str) -> DataSerializer:
+	""" Create the serializer for a format, each format having its own file extension so that the files show which one a database uses """
+
+	# pylint: disable = import-outside-toplevel
+
+	if format_name == "json":
+		from bhamon_orchestra_model.database.json_serializer import JsonSerializer
+		return JsonSerializer()
+	if format_name == "msgpack":
+		from bhamon_orchestra_model.database.msgpack_serializer import MsgpackSerializer
+		return MsgpackSerializer()
+	raise ValueError("Unsupported format '%s'" % format_name)
@@ -1,10 +1,19 @@
 import abc
+import heapq
+import itertools
 
-from typing import List, Optional, Tuple
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Tuple
 
 
 class DatabaseClient(abc.ABC):
-	""" Base class for a database client """
+	""" Base class for a database client.
+
+	Filters map field names, with dotted keys for fields in sub-documents, to either a value the field must be equal to
+	or a dictionary of operators the field must satisfy, with the same semantics as MongoDB:
+	{ "$in": [ ... ] }, { "$ne": ... }, { "$lt": ... }, { "$lte": ... }, { "$gt": ... }, { "$gte": ... } and { "$exists": True/False }.
+	A filter may also include an "$or" key, with a list of filters of which at least one must match.
+
+	"""
 
 
 	@abc.abstractmethod
@@ -15,13 +24,26 @@ class DatabaseClient(abc.ABC):
 	@abc.abstractmethod
 	def find_many(self, # pylint: disable = too-many-arguments
 			table: str, filter: dict, # pylint: disable = redefined-builtin
-			skip: int = 0, limit: Optional[int] = None, order_by: Optional[Tuple[str,str]] = None) -> List[dict]:
-		""" Return a list of items from a table, after applying a filter, with options for limiting and sorting results """
+			skip: int = 0, limit: Optional[int] = None, order_by: Optional[Tuple[str,str]] = None,
+			projection: Optional[List[str]] = None) -> List[dict]:
+		""" Return a list of items from a table, after applying a filter, with options for limiting and sorting results.
+
+		The projection, if set, is the list of fields to include in the results, with dotted keys for fields in sub-documents.
+
+		"""
 
 
 	@abc.abstractmethod
-	def find_one(self, table: str, filter: dict) -> Optional[dict]: # pylint: disable = redefined-builtin
-		""" Return a single item (or nothing) from a table, after applying a filter """
+	def iter_many(self, # pylint: disable = too-many-arguments
+			table: str, filter: dict, # pylint: disable = redefined-builtin
+			skip: int = 0, limit: Optional[int] = None, order_by: Optional[Tuple[str,str]] = None,
+			projection: Optional[List[str]] = None, batch_size: int = 1000) -> Iterator[dict]:
+		""" Iterate on items from a table, with the same options as find_many, retrieving them in batches rather than all at once """
+
+
+	@abc.abstractmethod
+	def find_one(self, table: str, filter: dict, projection: Optional[List[str]] = None) -> Optional[dict]: # pylint: disable = redefined-builtin
+		""" Return a single item (or nothing) from a table, after applying a filter, with an option to include only some fields """
 
 
 	@abc.abstractmethod
@@ -29,16 +51,153 @@ class DatabaseClient(abc.ABC):
 		""" Insert a new item into a table """
 
 
+	@abc.abstractmethod
+	def insert_many(self, table: str, data_collection: List[dict]) -> None:
+		""" Insert several new items into a table """
+
+
 	@abc.abstractmethod
 	def update_one(self, table: str, filter: dict, data: dict) -> None: # pylint: disable = redefined-builtin
 		""" Update a single item (or nothing) from a table, after applying a filter """
 
 
+	@abc.abstractmethod
+	def update_many(self, table: str, filter: dict, data: dict) -> None: # pylint: disable = redefined-builtin
+		""" Update all items from a table matching a filter """
+
+
 	@abc.abstractmethod
 	def delete_one(self, table: str, filter: dict) -> None: # pylint: disable = redefined-builtin
 		""" Delete a single item (or nothing) from a table, after applying a filter """
 
 
+	@abc.abstractmethod
+	def bulk_write(self, table: str, operation_collection: List[dict]) -> None:
+		""" Apply a batch of write operations on a table, in order, stopping at the first error.
+
+		Each operation is a dictionary with an "operation" key, with the same name and arguments as the single operation methods:
+		{ "operation": "insert_one", "data": ... }, { "operation": "update_one", "filter": ..., "data": ... },
+		{ "operation": "update_many", "filter": ..., "data": ... }, { "operation": "delete_one", "filter": ... }.
+
+		"""
+
+
+	def watch_changes(self, table_collection: List[str], callback: Callable[[str],None]) -> Optional[Callable[[],None]]: # pylint: disable = no-self-use, unused-argument
+		""" Register a callback to call, with the table name, when items are inserted, updated or deleted in any of the tables.
+
+		The callback may be called from another thread. Returns a function to stop watching,
+		or None if the client does not support change notifications, in which case callers should rely on polling.
+
+		"""
+
+		return None
+
+
+	def _match_filter(self, row: dict, filter: dict) -> bool: # pylint: disable = redefined-builtin
+		""" Check if an item matches a filter """
+
+		for key, expression in filter.items():
+			if key == "$or":
+				if not any(self._match_filter(row, alternative) for alternative in expression):
+					return False
+				continue
+
+			value = self._get_field_value(row, key)
+
+			if is_operator_expression(expression):
+				if not all(self._match_operator(value, operator, argument) for operator, argument in expression.items()):
+					return False
+			elif value is missing_value or value != expression:
+				return False
+
+		return True
+
+
+	def _match_operator(self, value: Any, operator: str, argument: Any) -> bool: # pylint: disable = no-self-use, too-many-return-statements
+		""" Check if a field value satisfies a filter operator, a missing field being considered as null for $in and $ne """
+
+		if operator == "$in":
+			return (None if value is missing_value else value) in argument
+		if operator == "$ne":
+			return (None if value is missing_value else value) != argument
+		if operator == "$exists":
+			return (value is not missing_value) == bool(argument)
+
+		if operator in [ "$lt", "$lte", "$gt", "$gte" ]:
+			if value is missing_value or value is None or argument is None:
+				return False
+
+			try:
+				if operator == "$lt":
+					return value < argument
+				if operator == "$lte":
+					return value <= argument
+				if operator == "$gt":
+					return value > argument
+				return value >= argument
+			except TypeError:
+				return False
+
+		raise ValueError("Unsupported filter operator '%s'" % operator)
+
+
+	def _get_field_value(self, row: dict, key: str) -> Any: # pylint: disable = no-self-use
+		""" Retrieve a field value from an item, following dotted keys into sub-documents, or missing_value if it is absent """
+
+		data = row
+		for key_part in key.split("."):
+			if not isinstance(data, dict) or key_part not in data.keys():
+				return missing_value
+			data = data[key_part]
+		return data
+
+
+	def _apply_projection(self, row: dict, projection: Optional[List[str]]) -> dict: # pylint: disable = no-self-use
+		""" Apply a projection on an item, keeping only the selected fields """
+
+		if projection is None:
+			return row
+
+		result = {}
+		for key in projection:
+			source = row
+			target = result
+			key_parts = key.split(".")
+			for key_part in key_parts[:-1]:
+				if not isinstance(source.get(key_part, None), dict):
+					break
+				source = source[key_part]
+				target = target.setdefault(key_part, {})
+			else:
+				if key_parts[-1] in source:
+					target[key_parts[-1]] = source[key_parts[-1]]
+		return result
+
+
+	def _apply_order_by(self, row_collection: Iterable[dict], expression: Optional[List[Tuple[str,str]]], limit: Optional[int] = None) -> List[dict]:
+		""" Apply an order-by expression on items, keeping only the first ones if a limit is set, without sorting the others """
+
+		if not expression:
+			return list(itertools.islice(row_collection, limit))
+
+		expression = self._normalize_order_by_expression(expression)
+		is_descending_collection = [ direction in [ "desc", "descending" ] for key, direction in expression ]
+
+		# With a single direction, plain tuples can be compared, reversing the order as a whole
+		if len(set(is_descending_collection)) == 1:
+			reverse = is_descending_collection[0]
+			get_sort_key = lambda row: tuple(_get_sort_value(self._get_field_value(row, key)) for key, direction in expression)
+		else:
+			reverse = False
+			get_sort_key = lambda row: _OrderByKey([ _get_sort_value(self._get_field_value(row, key)) for key, direction in expression ], is_descending_collection)
+
+		if limit is None:
+			return sorted(row_collection, key = get_sort_key, reverse = reverse)
+		if reverse:
+			return heapq.nlargest(limit, row_collection, key = get_sort_key)
+		return heapq.nsmallest(limit, row_collection, key = get_sort_key)
+
+
 	def _normalize_order_by_expression(self, expression: Optional[List[Tuple[str,str]]]) -> Optional[List[Tuple[str,str]]]: # pylint: disable = no-self-use
 		""" Normalize an order-by expression to simplify its interpretation """
 
@@ -56,3 +215,50 @@ class DatabaseClient(abc.ABC):
 			else:
 				raise ValueError("Invalid order_by item '%s'" % str(item))
 		return normalized_expression
+
+
+
+class _MissingValue: # pylint: disable = too-few-public-methods
+	""" Marker for fields absent from an item, distinct from fields set to null """
+
+	def __repr__(self) -> str:
+		return "<missing>"
+
+
+missing_value = _MissingValue()
+
+
+class _OrderByKey:
+	""" Composite sort key for an item, comparing its fields in order with a direction for each """
+
+	__slots__ = ( "values", "is_descending_collection" )
+
+
+	def __init__(self, values: List[Any], is_descending_collection: List[bool]) -> None:
+		self.values = values
+		self.is_descending_collection = is_descending_collection
+
+
+	# Equal keys must compare equal, so that heapq breaks ties by insertion order like sorted does
+	def __eq__(self, other: "_OrderByKey") -> bool:
+		return self.values == other.values
+
+
+	__hash__ = None
+
+
+	def __lt__(self, other: "_OrderByKey") -> bool:
+		for value, other_value, is_descending in zip(self.values, other.values, self.is_descending_collection):
+			if value != other_value:
+				return other_value < value if is_descending else value < other_value
+		return False
+
+
+def _get_sort_value(value: Any) -> tuple:
+	""" Wrap a field value to sort it, placing missing and null values before the others """
+	return (0, None) if value is missing_value or value is None else (1, value)
+
+
+def is_operator_expression(expression: Any) -> bool:
+	""" Check if a filter expression is a dictionary of operators rather than a value to compare with """
+	return isinstance(expression, dict) and len(expression) > 0 and all(key.startswith("$") for key in expression)
@@ -1,26 +1,27 @@
-import os
+import abc
+import codecs
 
-from typing import Optional, Tuple
+from typing import Iterator, Optional, Tuple
 
 
-class FileStorage:
+class FileStorage(abc.ABC):
+	""" Base class for a file storage, holding text files such as run logs.
 
+	Sizes and cursors are byte offsets in the utf-8 content of files, and loading a chunk never cuts a character.
+	Appended text has its newlines normalized to line feeds, and reads never return a partially written append.
+	Operations on a missing file raise FileNotFoundError.
 
-	def __init__(self, data_directory: str) -> None:
-		self._data_directory = data_directory
+	"""
 
 
+	@abc.abstractmethod
 	def exists(self, file_path: str) -> bool:
-		file_path = os.path.join(self._data_directory, file_path)
-		return os.path.isfile(file_path)
+		""" Check if a file exists """
 
 
-	def get_universal_size(self, file_path: str) -> int:
-		"""
-		Return the actual content size once loaded rather than the size of the file itself,
-		which can change because of newline characters being translated.
-		"""
-		return len(self.load(file_path))
+	@abc.abstractmethod
+	def get_size(self, file_path: str) -> int:
+		""" Return the size of a file in bytes """
 
 
 	def load_or_default(self, file_path: str, default_value: Optional[str] = None) -> Optional[str]:
@@ -30,10 +31,9 @@ class FileStorage:
 			return default_value
 
 
+	@abc.abstractmethod
 	def load(self, file_path: str) -> str:
-		file_path = os.path.join(self._data_directory, file_path)
-		with open(file_path, mode = "r") as data_file:
-			return data_file.read()
+		""" Load the whole content of a file """
 
 
 	def load_chunk_or_default(self, file_path: str, default_value: Optional[str] = None, skip: int = 0, limit: Optional[int] = None) -> Tuple[Optional[str], int]:
@@ -43,30 +43,57 @@ class FileStorage:
 			return default_value, 0
 
 
+	@abc.abstractmethod
 	def load_chunk(self, file_path: str, skip: int = 0, limit: Optional[int] = None) -> Tuple[str, int]:
-		file_path = os.path.join(self._data_directory, file_path)
-		with open(file_path, mode = "r") as data_file:
-			data_file.seek(skip)
-			return data_file.read(limit), data_file.tell()
+		""" Load up to limit bytes from a file, starting at the skip byte offset, and return the text with the offset to continue from """
 
 
+	def iter_chunks(self, file_path: str, chunk_size: int = 1024 * 1024) -> Iterator[str]:
+		""" Iterate on the content of a file in chunks of up to chunk_size bytes, stopping at its size when iterating started """
+
+		size = self.get_size(file_path)
+		cursor = 0
+
+		while cursor < size:
+			text, next_cursor = self.load_chunk(file_path, skip = cursor, limit = min(chunk_size, size - cursor))
+			if next_cursor == cursor:
+				break
+			yield text
+			cursor = next_cursor
+
+
+	@abc.abstractmethod
 	def save(self, file_path: str, data: str) -> None:
-		file_path = os.path.join(self._data_directory, file_path)
-		if not os.path.exists(os.path.dirname(file_path)):
-			os.makedirs(os.path.dirname(file_path))
-		with open(file_path + ".tmp", mode = "w") as data_file:
-			data_file.write(data)
-		os.replace(file_path + ".tmp", file_path)
+		""" Replace the content of a file """
 
 
+	@abc.abstractmethod
 	def append_unsafe(self, file_path: str, data: str) -> None:
-		file_path = os.path.join(self._data_directory, file_path)
-		if not os.path.exists(os.path.dirname(file_path)):
-			os.makedirs(os.path.dirname(file_path))
-		with open(file_path, mode = "a") as data_file:
-			data_file.write(data)
+		""" Append text to a file, without synchronization between several writers to the same file """
+
+
+	def flush(self, directory: Optional[str] = None) -> None:
+		""" Write buffered data for the files in a directory, or for all files, for storages which buffer writes """
+
 
+	def is_archived(self, file_path: str) -> bool: # pylint: disable = no-self-use, unused-argument
+		""" Check if a file was archived, for storages which support archiving """
+		return False
 
+
+	def archive(self, file_path: str) -> None:
+		""" Replace a file with a compressed archive, for storages which support archiving """
+
+
+	@abc.abstractmethod
 	def delete(self, file_path: str) -> None:
-		file_path = os.path.join(self._data_directory, file_path)
-		os.remove(file_path)
+		""" Delete a file """
+
+
+
+def decode_chunk(data: bytes) -> Tuple[str, int]:
+	""" Decode a chunk of utf-8 bytes, excluding a character cut at its end, and return the text with how many bytes it covers """
+
+	decoder = codecs.getincrementaldecoder("utf-8")(errors = "replace")
+	text = decoder.decode(data, final = False)
+	return text, len(data) - len(decoder.getstate()[0])
@@ -0,0 +1,279 @@
+import copy
+import hashlib
+import json
+import logging
+import os
+import threading
+
+from typing import Iterator, List, Optional, Tuple
+
+from bhamon_orchestra_model.database.data_serializer import DataSerializer
+from bhamon_orchestra_model.database.json_database_client import JsonDatabaseClient
+
+
+logger = logging.getLogger("JournaledJsonDatabaseClient")
+
+# Journals written before bulk writes were supported name their operations differently
+legacy_journal_operations = { "insert": "insert_one", "update": "update_one", "delete": "delete_one" }
+
+
+class JournaledJsonDatabaseClient(JsonDatabaseClient):
+	""" Client for a database storing data as json files, with tables cached in memory and changes recorded in an append-only journal.
+
+	Each table is loaded once, by reading its snapshot file and replaying its journal, and is then served from memory.
+	The indexes for a table are cached with it, and read again only when the index metadata file changes.
+	Changes are appended to the journal, which is synchronized to disk in batches by a background thread,
+	which also rewrites the snapshot and resets the journal once it grows too large.
+
+	The journal starts with the digest of the snapshot it applies to, so that a journal left over
+	after an interrupted compaction is recognized and ignored rather than replayed twice.
+
+	The client must be the only one accessing the data directory, since other processes would not see changes held in memory.
+
+	"""
+
+
+	def __init__(self, # pylint: disable = too-many-arguments
+			data_directory: str, serializer: Optional[DataSerializer] = None,
+			synchronization_interval_seconds: float = 1, compaction_threshold: int = 1000) -> None:
+		super().__init__(data_directory, serializer)
+
+		self.synchronization_interval_seconds = synchronization_interval_seconds
+		self.compaction_threshold = compaction_threshold
+
+		self._lock = threading.RLock()
+		self._tables = {}
+		self._should_stop = threading.Event()
+		self._background_thread = threading.Thread(target = self._run_background, name = "JournaledJsonDatabaseClient", daemon = True)
+		self._background_thread.start()
+
+
+	def count(self, table: str, filter: dict) -> int: # pylint: disable = redefined-builtin
+		""" Return how many items are in a table, after applying a filter """
+
+		with self._lock:
+			return super().count(table, filter)
+
+
+	def find_many(self, # pylint: disable = too-many-arguments
+			table: str, filter: dict, # pylint: disable = redefined-builtin
+			skip: int = 0, limit: Optional[int] = None, order_by: Optional[Tuple[str,str]] = None,
+			projection: Optional[List[str]] = None) -> List[dict]:
+		""" Return a list of items from a table, after applying a filter, with options for limiting and sorting results """
+
+		with self._lock:
+			return copy.deepcopy(super().find_many(table, filter, skip = skip, limit = limit, order_by = order_by, projection = projection))
+
+
+	def iter_many(self, # pylint: disable = too-many-arguments
+			table: str, filter: dict, # pylint: disable = redefined-builtin
+			skip: int = 0, limit: Optional[int] = None, order_by: Optional[Tuple[str,str]] = None,
+			projection: Optional[List[str]] = None, batch_size: int = 1000) -> Iterator[dict]:
+		""" Iterate on items from a table, with the same options as find_many, the results being copied at once to release the lock """
+
+		with self._lock:
+			result_collection = self.find_many(table, filter, skip = skip, limit = limit, order_by = order_by, projection = projection)
+		yield from result_collection
+
+
+	def find_one(self, table: str, filter: dict, projection: Optional[List[str]] = None) -> Optional[dict]: # pylint: disable = redefined-builtin
+		""" Return a single item (or nothing) from a table, after applying a filter """
+
+		with self._lock:
+			return copy.deepcopy(super().find_one(table, filter, projection = projection))
+
+
+	def bulk_write(self, table: str, operation_collection: List[dict]) -> None:
+		""" Apply a batch of write operations on a table, in order, stopping at the first error """
+
+		with self._lock:
+			all_rows = self._load(table)
+			all_indexes = self._load_indexes(table)
+
+			try:
+				for operation in operation_collection:
+					self._apply_operation(table, all_rows, all_indexes, copy.deepcopy(operation))
+					self._append_to_journal(table, operation)
+			finally:
+				if len(operation_collection) > 0:
+					self.change_notifier.notify(table)
+
+
+	def close(self) -> None:
+		""" Stop the background thread and write a snapshot for all tables with pending changes """
+
+		self._should_stop.set()
+		self._background_thread.join()
+
+		with self._lock:
+			for table, table_state in self._tables.items():
+				if table_state["journal_size"] > 0:
+					self._compact(table)
+				if table_state["journal_file"] is not None:
+					table_state["journal_file"].close()
+			self._tables.clear()
+
+
+	def _load(self, table: str) -> List[dict]:
+		""" Load all items from a table, from the cache or from the disk on first access """
+
+		if table not in self._tables:
+			self._tables[table] = self._load_from_disk(table)
+		return self._tables[table]["rows"]
+
+
+	def _load_from_disk(self, table: str) -> dict:
+		""" Load a table by reading its snapshot and replaying its journal, then start a new journal if needed """
+
+		snapshot_file_path = os.path.join(self._data_directory, table + self._serializer.file_extension)
+		journal_file_path = os.path.join(self._data_directory, table + ".journal")
+
+		rows = []
+		snapshot_digest = None
+		if os.path.exists(snapshot_file_path):
+			with open(snapshot_file_path, mode = "rb") as snapshot_file:
+				snapshot_data = snapshot_file.read()
+			rows = self._serializer.deserialize(snapshot_data)
+			snapshot_digest = hashlib.sha256(snapshot_data).hexdigest()
+
+		journal_entries = self._read_journal(table, journal_file_path, snapshot_digest)
+		for entry in journal_entries or []:
+			self._apply_operation(table, rows, [], entry)
+
+		table_state = { "rows": rows, "indexes": None, "index_modification_time": None, "journal_file": None, "journal_size": 0, "is_synchronized": True }
+
+		if journal_entries is not None and len(journal_entries) == 0:
+			table_state["journal_file"] = open(journal_file_path, mode = "ab") # pylint: disable = consider-using-with
+		elif journal_entries is not None:
+			self._tables[table] = table_state
+			self._compact(table)
+		elif snapshot_digest is not None:
+			self._start_journal(table_state, journal_file_path, snapshot_digest)
+
+		return table_state
+
+
+	def _load_indexes(self, table: str) -> List[dict]:
+		""" Load all indexes for a table, from the cache unless the index metadata file changed since it was read """
+
+		table_state = self._tables[table]
+		file_path = os.path.join(self._data_directory, "admin" + self._serializer.file_extension)
+
+		try:
+			modification_time = os.stat(file_path).st_mtime_ns
+		except FileNotFoundError:
+			modification_time = None
+
+		if table_state["indexes"] is None or table_state["index_modification_time"] != modification_time:
+			table_state["indexes"] = super()._load_indexes(table)
+			table_state["index_modification_time"] = modification_time
+
+		return table_state["indexes"]
+
+
+	def _read_journal(self, table: str, journal_file_path: str, snapshot_digest: Optional[str]) -> Optional[List[dict]]:
+		""" Read the journal entries applying to the snapshot, return None if there is no usable journal """
+
+		if not os.path.exists(journal_file_path):
+			return None
+
+		with open(journal_file_path, mode = "rb") as journal_file:
+			all_lines = journal_file.read().decode("utf-8").splitlines()
+
+		try:
+			header = json.loads(all_lines[0])
+		except (IndexError, ValueError):
+			logger.warning("Ignoring journal for table '%s' (Reason: 'invalid header')", table)
+			return None
+
+		if header.get("snapshot") != snapshot_digest:
+			logger.warning("Ignoring journal for table '%s' (Reason: 'snapshot mismatch')", table)
+			return None
+
+		journal_entries = []
+		for line in all_lines[1:]:
+			try:
+				entry = json.loads(line)
+			except ValueError:
+				logger.warning("Ignoring incomplete journal entry for table '%s'", table)
+				break
+
+			entry["operation"] = legacy_journal_operations.get(entry["operation"], entry["operation"])
+			journal_entries.append(entry)
+
+		return journal_entries
+
+
+	def _append_to_journal(self, table: str, entry: dict) -> None:
+		""" Record a change in the journal, relying on the background thread to synchronize it to disk """
+
+		table_state = self._tables[table]
+
+		# The table does not exist on disk yet, the snapshot includes the change
+		if table_state["journal_file"] is None:
+			self._compact(table)
+			return
+
+		table_state["journal_file"].write((json.dumps(entry) + "\n").encode("utf-8"))
+		table_state["journal_file"].flush()
+		table_state["journal_size"] += 1
+		table_state["is_synchronized"] = False
+
+
+	def _compact(self, table: str) -> None:
+		""" Rewrite the table snapshot and start a new journal for it """
+
+		table_state = self._tables[table]
+		snapshot_file_path = os.path.join(self._data_directory, table + self._serializer.file_extension)
+		journal_file_path = os.path.join(self._data_directory, table + ".journal")
+
+		snapshot_data = self._serializer.serialize(table_state["rows"])
+
+		if not os.path.exists(self._data_directory):
+			os.makedirs(self._data_directory)
+
+		self._write_durably(snapshot_file_path + ".tmp", snapshot_data)
+		os.replace(snapshot_file_path + ".tmp", snapshot_file_path)
+
+		self._start_journal(table_state, journal_file_path, hashlib.sha256(snapshot_data).hexdigest())
+
+
+	def _start_journal(self, table_state: dict, journal_file_path: str, snapshot_digest: str) -> None:
+		""" Replace the table journal with an empty one, applying to the snapshot with the provided digest """
+
+		journal_header = json.dumps({ "snapshot": snapshot_digest }) + "\n"
+		self._write_durably(journal_file_path + ".tmp", journal_header.encode("utf-8"))
+
+		if table_state["journal_file"] is not None:
+			table_state["journal_file"].close()
+
+		os.replace(journal_file_path + ".tmp", journal_file_path)
+
+		table_state["journal_file"] = open(journal_file_path, mode = "ab") # pylint: disable = consider-using-with
+		table_state["journal_size"] = 0
+		table_state["is_synchronized"] = True
+
+
+	def _write_durably(self, file_path: str, data: bytes) -> None: # pylint: disable = no-self-use
+		""" Write a file and wait for its content to reach the disk """
+
+		with open(file_path, mode = "wb") as data_file:
+			data_file.write(data)
+			data_file.flush()
+			os.fsync(data_file.fileno())
+
+
+	def _run_background(self) -> None:
+		""" Synchronize journals and compact tables periodically, until the client is closed """
+
+		while not self._should_stop.wait(self.synchronization_interval_seconds):
+			try:
+				with self._lock:
+					for table, table_state in self._tables.items():
+						if table_state["journal_size"] >= self.compaction_threshold:
+							self._compact(table)
+						elif not table_state["is_synchronized"]:
+							os.fsync(table_state["journal_file"].fileno())
+							table_state["is_synchronized"] = True
+			except Exception: # pylint: disable = broad-except
+				logger.error("Unhandled exception in background thread", exc_info = True)
@@ -1,8 +1,10 @@
-import json
 import logging
 import os
 
-from typing import List, Tuple
+from typing import List, Optional, Tuple
+
+from bhamon_orchestra_model.database.data_serializer import DataSerializer
+from bhamon_orchestra_model.database.json_serializer import JsonSerializer
 
 
 logger = logging.getLogger("JsonDatabaseAdministration")
@@ -12,8 +14,9 @@ class JsonDatabaseAdministration:
 	""" Administration client for a database storing data as json files, intended for development only. """
 
 
-	def __init__(self, data_directory: str) -> None:
+	def __init__(self, data_directory: str, serializer: Optional[DataSerializer] = None) -> None:
 		self._data_directory = data_directory
+		self._serializer = serializer if serializer is not None else JsonSerializer()
 
 
 	def initialize(self, simulate: bool = False) -> None:
@@ -22,6 +25,10 @@ class JsonDatabaseAdministration:
 		logger.info("Creating run index")
 		if not simulate:
 			self.create_index("run", "identifier_unique", [ ("project", "ascending"), ("identifier", "ascending") ], is_unique = True)
+			self.create_index("run", "update_date", [ ("project", "ascending"), ("update_date", "descending"), ("identifier", "descending") ])
+			self.create_index("run", "status", [ ("status", "ascending") ])
+			self.create_index("run", "worker_status", [ ("worker", "ascending"), ("status", "ascending") ])
+			self.create_index("run", "job_creation_date", [ ("project", "ascending"), ("job", "ascending") ]) # Without the date, which is only used in ranges
 
 		logger.info("Creating job index")
 		if not simulate:
@@ -35,6 +42,10 @@ class JsonDatabaseAdministration:
 		if not simulate:
 			self.create_index("user", "identifier_unique", [ ("identifier", "ascending") ], is_unique = True)
 
+		logger.info("Creating user authentication index")
+		if not simulate:
+			self.create_index("user_authentication", "user_type", [ ("user", "ascending"), ("type", "ascending") ])
+
 		logger.info("Creating worker index")
 		if not simulate:
 			self.create_index("worker", "identifier_unique", [ ("identifier", "ascending") ], is_unique = True)
@@ -44,6 +55,40 @@ class JsonDatabaseAdministration:
 		raise NotImplementedError("Upgrading a JSON database is not supported")
 
 
+	def convert_format(self, serializer: DataSerializer, simulate: bool = False) -> None:
+		""" Rewrite all the database files with another serializer, the database clients must be stopped and then configured with it """
+
+		logger.info("Converting format to '%s'" + (" (simulation)" if simulate else ""), serializer.file_extension) # pylint: disable = logging-not-lazy
+
+		all_file_names = sorted(os.listdir(self._data_directory)) if os.path.exists(self._data_directory) else []
+
+		for file_name in all_file_names:
+			if file_name.endswith(".journal"):
+				with open(os.path.join(self._data_directory, file_name), mode = "rb") as journal_file:
+					if len(journal_file.read().splitlines()) > 1:
+						raise ValueError("Journal '%s' has pending changes, the journaled client must be closed properly before converting" % file_name)
+
+		for file_name in all_file_names:
+			if not file_name.endswith(self._serializer.file_extension):
+				continue
+
+			source_file_path = os.path.join(self._data_directory, file_name)
+			destination_file_path = source_file_path[ : - len(self._serializer.file_extension) ] + serializer.file_extension
+			logger.info("Converting '%s' to '%s'", source_file_path, destination_file_path)
+
+			if not simulate:
+				with open(source_file_path, mode = "rb") as source_file:
+					data = self._serializer.deserialize(source_file.read())
+				with open(destination_file_path + ".tmp", mode = "wb") as destination_file:
+					destination_file.write(serializer.serialize(data))
+				os.replace(destination_file_path + ".tmp", destination_file_path)
+				if destination_file_path != source_file_path:
+					os.remove(source_file_path)
+
+		if not simulate:
+			self._serializer = serializer
+
+
 	def create_index(self, table: str, identifier: str, field_collection: List[Tuple[str,str]], is_unique: bool = False) -> None:
 		field_collection = [ field for field, direction in field_collection ]
 
@@ -65,22 +110,54 @@ class JsonDatabaseAdministration:
 		self._save(administration_data)
 
 
+	def analyze_query(self, table: str, filter: dict, order_by: Optional[List[Tuple[str,str]]] = None) -> dict: # pylint: disable = redefined-builtin
+		""" Find which index a database would use for a query, based on the index metadata, preferring indexes matching more filter fields """
+
+		selected_index = None
+		selected_index_score = (0, False)
+
+		for index in self._load()["indexes"]:
+			if index["table"] != table:
+				continue
+
+			# Like MongoDB, an index is usable for the leading fields it shares with the filter, and for sorting on the fields following them
+			filter_field_count = 0
+			for field in index["field_collection"]:
+				if field not in filter:
+					break
+				filter_field_count += 1
+
+			remaining_fields = index["field_collection"][filter_field_count:]
+			is_sort_supported = bool(order_by) and len(remaining_fields) > 0 and remaining_fields[0] == order_by[0][0]
+
+			index_score = (filter_field_count, is_sort_supported)
+			if index_score > selected_index_score:
+				selected_index = index
+				selected_index_score = index_score
+
+		return {
+			"table": table,
+			"index": selected_index["identifier"] if selected_index is not None else None,
+			"is_collection_scan": selected_index is None,
+		}
+
+
 	def close(self) -> None:
 		pass
 
 
 	def _load(self) -> dict:
-		file_path = os.path.join(self._data_directory, "admin.json")
+		file_path = os.path.join(self._data_directory, "admin" + self._serializer.file_extension)
 		if not os.path.exists(file_path):
 			return { "indexes": [] }
-		with open(file_path) as data_file:
-			return json.load(data_file)
+		with open(file_path, mode = "rb") as data_file:
+			return self._serializer.deserialize(data_file.read())
 
 
 	def _save(self, administration_data: dict) -> None:
-		file_path = os.path.join(self._data_directory, "admin.json")
+		file_path = os.path.join(self._data_directory, "admin" + self._serializer.file_extension)
 		if not os.path.exists(os.path.dirname(file_path)):
 			os.makedirs(os.path.dirname(file_path))
-		with open(file_path + ".tmp", "w") as administration_data_file:
-			json.dump(administration_data, administration_data_file, indent = 4)
+		with open(file_path + ".tmp", mode = "wb") as administration_data_file:
+			administration_data_file.write(self._serializer.serialize(administration_data))
 		os.replace(file_path + ".tmp", file_path)
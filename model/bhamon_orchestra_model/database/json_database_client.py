@@ -1,21 +1,30 @@
-import json
+import itertools
 import logging
 import os
 
-from typing import List, Optional, Tuple
+from typing import Callable, Iterator, List, Optional, Tuple
 
+from bhamon_orchestra_model.database.change_notifier import ChangeNotifier
+from bhamon_orchestra_model.database.data_serializer import DataSerializer
 from bhamon_orchestra_model.database.database_client import DatabaseClient
+from bhamon_orchestra_model.database.json_serializer import JsonSerializer
 
 
 logger = logging.getLogger("JsonDatabaseClient")
 
 
 class JsonDatabaseClient(DatabaseClient):
-	""" Client for a database storing data as json files, intended for development only. """
+	""" Client for a database storing data as json files, intended for development only.
 
+	The file format can be changed with a serializer, for example to compact json or MessagePack, as long as the administration client uses the same.
 
-	def __init__(self, data_directory: str) -> None:
+	"""
+
+
+	def __init__(self, data_directory: str, serializer: Optional[DataSerializer] = None) -> None:
 		self._data_directory = data_directory
+		self._serializer = serializer if serializer is not None else JsonSerializer()
+		self.change_notifier = ChangeNotifier()
 
 
 	def count(self, table: str, filter: dict) -> int: # pylint: disable = redefined-builtin
@@ -25,57 +34,86 @@ class JsonDatabaseClient(DatabaseClient):
 
 	def find_many(self, # pylint: disable = too-many-arguments
 			table: str, filter: dict, # pylint: disable = redefined-builtin
-			skip: int = 0, limit: Optional[int] = None, order_by: Optional[Tuple[str,str]] = None) -> List[dict]:
+			skip: int = 0, limit: Optional[int] = None, order_by: Optional[Tuple[str,str]] = None,
+			projection: Optional[List[str]] = None) -> List[dict]:
 		""" Return a list of items from a table, after applying a filter, with options for limiting and sorting results """
 
-		start_index = skip
+		results = ( row for row in self._load(table) if self._match_filter(row, filter) )
+		results = self._apply_order_by(results, order_by, limit = (skip + limit) if limit is not None else None)
+		return [ self._apply_projection(row, projection) for row in results[ skip : ] ]
+
+
+	def iter_many(self, # pylint: disable = too-many-arguments
+			table: str, filter: dict, # pylint: disable = redefined-builtin
+			skip: int = 0, limit: Optional[int] = None, order_by: Optional[Tuple[str,str]] = None,
+			projection: Optional[List[str]] = None, batch_size: int = 1000) -> Iterator[dict]:
+		""" Iterate on items from a table, with the same options as find_many, the table file being loaded at once regardless of the batch size """
+
+		if order_by is not None:
+			yield from self.find_many(table, filter, skip = skip, limit = limit, order_by = order_by, projection = projection)
+			return
+
 		end_index = (skip + limit) if limit is not None else None
-		results = self._load(table)
-		results = self._apply_order_by(results, order_by)
-		results = [ row for row in results if self._match_filter(row, filter) ]
-		return results[ start_index : end_index ]
+		results = ( row for row in self._load(table) if self._match_filter(row, filter) )
+		for row in itertools.islice(results, skip, end_index):
+			yield self._apply_projection(row, projection)
 
 
-	def find_one(self, table: str, filter: dict) -> Optional[dict]: # pylint: disable = redefined-builtin
+	def find_one(self, table: str, filter: dict, projection: Optional[List[str]] = None) -> Optional[dict]: # pylint: disable = redefined-builtin
 		""" Return a single item (or nothing) from a table, after applying a filter """
-		return next(( row for row in self._load(table) if self._match_filter(row, filter) ), None)
+		row = next(( row for row in self._load(table) if self._match_filter(row, filter) ), None)
+		return self._apply_projection(row, projection) if row is not None else None
 
 
 	def insert_one(self, table: str, data: dict) -> dict:
 		""" Insert a new item into a table """
+		self.bulk_write(table, [ { "operation": "insert_one", "data": data } ])
 
-		all_indexes = self._load_indexes(table)
-		all_rows = self._load(table)
-
-		for index in [ x for x in all_indexes if x["is_unique"] ]:
-			index_filter = { key: data[key] for key in index["field_collection"] }
-			matched_row = next(( row for row in all_rows if self._match_filter(row, index_filter) ), None)
 
-			if matched_row is not None:
-				raise ValueError("Duplicate key '%s' in table '%s' for index '%s'" % (index_filter, table, index["identifier"]))
-
-		all_rows.append(data)
-		self._save(table, all_rows)
+	def insert_many(self, table: str, data_collection: List[dict]) -> None:
+		""" Insert several new items into a table """
+		self.bulk_write(table, [ { "operation": "insert_one", "data": data } for data in data_collection ])
 
 
 	def update_one(self, table: str, filter: dict, data: dict) -> None: # pylint: disable = redefined-builtin
 		""" Update a single item (or nothing) from a table, after applying a filter """
+		self.bulk_write(table, [ { "operation": "update_one", "filter": filter, "data": data } ])
 
-		all_rows = self._load(table)
-		matched_row = next(( row for row in all_rows if self._match_filter(row, filter) ), None)
-		if matched_row is not None:
-			matched_row.update(data)
-			self._save(table, all_rows)
+
+	def update_many(self, table: str, filter: dict, data: dict) -> None: # pylint: disable = redefined-builtin
+		""" Update all items from a table matching a filter """
+		self.bulk_write(table, [ { "operation": "update_many", "filter": filter, "data": data } ])
 
 
 	def delete_one(self, table: str, filter: dict) -> None: # pylint: disable = redefined-builtin
 		""" Delete a single item (or nothing) from a table, after applying a filter """
+		self.bulk_write(table, [ { "operation": "delete_one", "filter": filter } ])
+
+
+	def bulk_write(self, table: str, operation_collection: List[dict]) -> None:
+		""" Apply a batch of write operations on a table, in order, stopping at the first error """
+
+		if len(operation_collection) == 0:
+			return
 
+		all_indexes = self._load_indexes(table)
 		all_rows = self._load(table)
-		matched_row = next(( row for row in all_rows if self._match_filter(row, filter) ), None)
-		if matched_row is not None:
-			all_rows.remove(matched_row)
-			self._save(table, all_rows)
+
+		has_changes = False
+
+		try:
+			for operation in operation_collection:
+				if self._apply_operation(table, all_rows, all_indexes, operation):
+					has_changes = True
+		finally:
+			if has_changes:
+				self._save(table, all_rows)
+				self.change_notifier.notify(table)
+
+
+	def watch_changes(self, table_collection: List[str], callback: Callable[[str],None]) -> Optional[Callable[[],None]]:
+		""" Register a callback to call, with the table name, when items are inserted, updated or deleted through this client """
+		return self.change_notifier.add_listener(table_collection, callback)
 
 
 	def close(self) -> None:
@@ -85,60 +123,66 @@ class JsonDatabaseClient(DatabaseClient):
 	def _load(self, table: str) -> List[dict]:
 		""" Load all items from a table """
 
-		file_path = os.path.join(self._data_directory, table + ".json")
+		file_path = os.path.join(self._data_directory, table + self._serializer.file_extension)
 		if not os.path.exists(file_path):
 			return []
-		with open(file_path) as data_file:
-			return json.load(data_file)
+		with open(file_path, mode = "rb") as data_file:
+			return self._serializer.deserialize(data_file.read())
 
 
 	def _save(self, table: str, table_data: List[dict]) -> None:
 		""" Save all the items from a table """
 
-		file_path = os.path.join(self._data_directory, table + ".json")
+		file_path = os.path.join(self._data_directory, table + self._serializer.file_extension)
 		if not os.path.exists(os.path.dirname(file_path)):
 			os.makedirs(os.path.dirname(file_path))
-		with open(file_path + ".tmp", "w") as table_data_file:
-			json.dump(table_data, table_data_file, indent = 4)
+		with open(file_path + ".tmp", mode = "wb") as table_data_file:
+			table_data_file.write(self._serializer.serialize(table_data))
 		os.replace(file_path + ".tmp", file_path)
 
 
 	def _load_indexes(self, table: str) -> List[dict]:
 		""" Load all indexes for a table """
 
-		file_path = os.path.join(self._data_directory, "admin.json")
+		file_path = os.path.join(self._data_directory, "admin" + self._serializer.file_extension)
 		if not os.path.exists(file_path):
 			return []
-		with open(file_path) as administration_data_file:
-			administration_data = json.load(administration_data_file)
+		with open(file_path, mode = "rb") as administration_data_file:
+			administration_data = self._serializer.deserialize(administration_data_file.read())
 
 		return [ index for index in administration_data["indexes"] if index["table"] == table ]
 
 
-	def _match_filter(self, row: dict, filter: dict) -> bool: # pylint: disable = no-self-use, redefined-builtin
-		""" Check if an item matches a filter """
+	def _apply_operation(self, table: str, all_rows: List[dict], all_indexes: List[dict], operation: dict) -> bool:
+		""" Apply a single write operation on a list of items, return whether any item changed """
+
+		if operation["operation"] == "insert_one":
+			for index in [ x for x in all_indexes if x["is_unique"] ]:
+				index_filter = { key: operation["data"][key] for key in index["field_collection"] }
+				matched_row = next(( row for row in all_rows if self._match_filter(row, index_filter) ), None)
 
-		for key, value in filter.items():
-			data = row
-			for key_part in key.split("."):
-				if key_part not in data.keys():
-					return False
-				data = data[key_part]
-			if data != value:
-				return False
-		return True
+				if matched_row is not None:
+					raise ValueError("Duplicate key '%s' in table '%s' for index '%s'" % (index_filter, table, index["identifier"]))
 
+			all_rows.append(operation["data"])
+			return True
 
-	def _apply_order_by(self, row_collection: List[dict], expression: Optional[List[Tuple[str,str]]]) -> List[dict]:
-		""" Apply an order-by expression on a list of items """
+		if operation["operation"] == "update_one":
+			matched_row = next(( row for row in all_rows if self._match_filter(row, operation["filter"]) ), None)
+			if matched_row is not None:
+				matched_row.update(operation["data"])
+			return matched_row is not None
+
+		if operation["operation"] == "update_many":
+			matched_rows = [ row for row in all_rows if self._match_filter(row, operation["filter"]) ]
+			for row in matched_rows:
+				row.update(operation["data"])
+			return len(matched_rows) > 0
 
-		if expression is None:
-			return row_collection
+		if operation["operation"] == "delete_one":
+			matched_row = next(( row for row in all_rows if self._match_filter(row, operation["filter"]) ), None)
+			if matched_row is not None:
+				all_rows.remove(matched_row)
+			return matched_row is not None
 
-		for key, direction in reversed(self._normalize_order_by_expression(expression)):
-			if direction in [ "asc", "ascending" ]:
-				reverse = False
-			elif direction in [ "desc", "descending" ]:
-				reverse = True
-			row_collection = sorted(row_collection, key = lambda x: x[key], reverse = reverse) # pylint: disable = cell-var-from-loop
-		return row_collection
+		raise ValueError("Unsupported operation '%s'" % operation["operation"])
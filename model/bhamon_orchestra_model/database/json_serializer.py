@@ -0,0 +1,22 @@
+import json
+
+from typing import Any
+
+from bhamon_orchestra_model.database.data_serializer import DataSerializer
+
+
+class JsonSerializer(DataSerializer):
+	""" Serializer for json files, indented for readability """
+
+
+	@property
+	def file_extension(self) -> str:
+		return ".json"
+
+
+	def serialize(self, data: Any) -> bytes:
+		return json.dumps(data, indent = 4).encode("utf-8")
+
+
+	def deserialize(self, data: bytes) -> Any:
+		return json.loads(data.decode("utf-8"))
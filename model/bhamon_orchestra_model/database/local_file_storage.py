@@ -0,0 +1,269 @@
+import bisect
+import gzip
+import json
+import os
+
+from typing import BinaryIO, Optional, Tuple
+
+from bhamon_orchestra_model.database.file_storage import FileStorage, decode_chunk
+
+
+class LocalFileStorage(FileStorage):
+	""" Client for a file storage on the local file system.
+
+	Files which are appended to, such as logs, are stored as utf-8 with newlines normalized to line feeds,
+	and have a sidecar file recording their committed size in bytes. Sizes and cursors are byte offsets,
+	so that getting the size of a file does not read it and loading a chunk seeks directly to it.
+	Reads stop at the committed size, so that a partially written append is never returned.
+
+	Files which are not written to anymore can be archived, replacing them with a gzip file made of independent frames,
+	with an index sidecar mapping offsets in the original file to frames, so that loading a chunk only decompresses the frames it covers.
+	Archived files are read transparently, and appending to one adds a frame.
+
+	"""
+
+
+	def __init__(self, data_directory: str, archive_frame_size: int = 256 * 1024, archive_compression_level: int = 6) -> None:
+		self._data_directory = data_directory
+		self.archive_frame_size = archive_frame_size
+		self.archive_compression_level = archive_compression_level
+
+
+	def exists(self, file_path: str) -> bool:
+		file_path = os.path.join(self._data_directory, file_path)
+		return os.path.isfile(file_path) or os.path.isfile(file_path + ".gz")
+
+
+	def is_archived(self, file_path: str) -> bool:
+		file_path = os.path.join(self._data_directory, file_path)
+		return self._is_archived_internal(file_path)
+
+
+	def get_size(self, file_path: str) -> int:
+		""" Return the size of a file in bytes, from its sidecar if it has one """
+		file_path = os.path.join(self._data_directory, file_path)
+		return self._get_size_internal(file_path)
+
+
+	def load(self, file_path: str) -> str:
+		""" Load a whole file, up to its committed size """
+		file_path = os.path.join(self._data_directory, file_path)
+		return self._read_range(file_path, 0, self._get_size_internal(file_path)).decode("utf-8")
+
+
+	def load_chunk(self, file_path: str, skip: int = 0, limit: Optional[int] = None) -> Tuple[str, int]:
+		""" Load up to limit bytes from a file, starting at the skip byte offset, and return the text with the offset to continue from """
+
+		file_path = os.path.join(self._data_directory, file_path)
+		available_size = max(self._get_size_internal(file_path) - skip, 0)
+		read_size = min(limit, available_size) if limit is not None else available_size
+
+		data = self._read_range(file_path, skip, read_size)
+
+		# Read the rest of a character cut by the limit rather than returning nothing
+		if len(data) > 0 and decode_chunk(data)[1] == 0:
+			data += self._read_range(file_path, skip + len(data), min(3, available_size - len(data)))
+
+		text, chunk_size = decode_chunk(data)
+		return text, skip + chunk_size
+
+
+	def save(self, file_path: str, data: str) -> None:
+		file_path = os.path.join(self._data_directory, file_path)
+		if not os.path.exists(os.path.dirname(file_path)):
+			os.makedirs(os.path.dirname(file_path))
+		with open(file_path + ".tmp", mode = "w", encoding = "utf-8", newline = "\n") as data_file:
+			data_file.write(data)
+		os.replace(file_path + ".tmp", file_path)
+
+		for sidecar_path in [ file_path + ".size", file_path + ".gz", file_path + ".gz.index" ]:
+			if os.path.exists(sidecar_path):
+				os.remove(sidecar_path)
+
+
+	def append_unsafe(self, file_path: str, data: str) -> None:
+		""" Append text to a file and update its committed size, discarding any partial append left by an interrupted write """
+
+		file_path = os.path.join(self._data_directory, file_path)
+		data = self._encode_for_append(data)
+
+		if self._is_archived_internal(file_path):
+			self._append_to_archive(file_path, data)
+			return
+
+		data_file, committed_size = self._open_for_append(file_path)
+
+		with data_file:
+			data_file.write(data)
+
+		self._write_committed_size(file_path, committed_size + len(data))
+
+
+	def archive(self, file_path: str) -> None:
+		""" Replace a file with a compressed archive, in frames of a fixed uncompressed size, keeping the original until the archive is complete """
+
+		file_path = os.path.join(self._data_directory, file_path)
+		if self._is_archived_internal(file_path):
+			return
+
+		size = self._get_size_internal(file_path)
+		frame_collection = []
+
+		with open(file_path, mode = "rb") as data_file:
+			with open(file_path + ".gz.tmp", mode = "wb") as archive_file:
+				for frame_offset in range(0, size, self.archive_frame_size):
+					frame_collection.append([ frame_offset, archive_file.tell() ])
+					archive_file.write(gzip.compress(data_file.read(min(self.archive_frame_size, size - frame_offset)), self.archive_compression_level))
+				compressed_size = archive_file.tell()
+
+		self._write_archive_index(file_path, { "size": size, "compressed_size": compressed_size, "frames": frame_collection })
+		os.replace(file_path + ".gz.tmp", file_path + ".gz")
+
+		os.remove(file_path)
+		if os.path.exists(file_path + ".size"):
+			os.remove(file_path + ".size")
+
+
+	def delete(self, file_path: str) -> None:
+		file_path = os.path.join(self._data_directory, file_path)
+
+		if self._is_archived_internal(file_path):
+			os.remove(file_path + ".gz")
+			os.remove(file_path + ".gz.index")
+			return
+
+		os.remove(file_path)
+
+		if os.path.exists(file_path + ".size"):
+			os.remove(file_path + ".size")
+
+
+	def _encode_for_append(self, data: str) -> bytes: # pylint: disable = no-self-use
+		""" Convert text to the bytes to append, with newlines normalized """
+		return data.replace("\r\n", "\n").encode("utf-8")
+
+
+	def _open_for_append(self, file_path: str) -> Tuple[BinaryIO, int]:
+		""" Open a file for appending, discarding any partial append left by an interrupted write, and return it with its committed size """
+
+		if not os.path.exists(os.path.dirname(file_path)):
+			os.makedirs(os.path.dirname(file_path))
+
+		committed_size = self._read_committed_size(file_path)
+		data_file = open(file_path, mode = "ab") # pylint: disable = consider-using-with
+
+		if committed_size is None:
+			committed_size = data_file.tell()
+		elif data_file.tell() != committed_size:
+			data_file.truncate(committed_size)
+
+		return data_file, committed_size
+
+
+	def _get_size_internal(self, file_path: str) -> int:
+		if not self._is_archived_internal(file_path):
+			try:
+				committed_size = self._read_committed_size(file_path)
+				return committed_size if committed_size is not None else os.path.getsize(file_path)
+			except FileNotFoundError:
+				if not self._is_archived_internal(file_path):
+					raise
+
+		return self._read_archive_index(file_path)["size"]
+
+
+	def _read_range(self, file_path: str, offset: int, size: int) -> bytes:
+		""" Read a range of bytes from a file, decompressing it if the file is archived """
+
+		if not self._is_archived_internal(file_path):
+			try:
+				with open(file_path, mode = "rb") as data_file:
+					data_file.seek(offset)
+					return data_file.read(size)
+			except FileNotFoundError:
+				# The file may have been archived since checking, in which case it is read from the archive
+				if not self._is_archived_internal(file_path):
+					raise
+
+		return self._read_archive_range(file_path, self._read_archive_index(file_path), offset, size)
+
+
+	def _read_committed_size(self, file_path: str) -> Optional[int]: # pylint: disable = no-self-use
+		""" Read the size recorded in the sidecar for a file, if it has one """
+
+		try:
+			with open(file_path + ".size", mode = "r", encoding = "utf-8") as size_file:
+				return int(size_file.read())
+		except (OSError, ValueError):
+			return None
+
+
+	def _write_committed_size(self, file_path: str, size: int) -> None: # pylint: disable = no-self-use
+		""" Record the size of a file in its sidecar, replacing it atomically """
+
+		with open(file_path + ".size.tmp", mode = "w", encoding = "utf-8") as size_file:
+			size_file.write(str(size))
+		os.replace(file_path + ".size.tmp", file_path + ".size")
+
+
+	def _is_archived_internal(self, file_path: str) -> bool: # pylint: disable = no-self-use
+		""" Check if a file is archived, the original file taking precedence while an archive is being created """
+		return not os.path.isfile(file_path) and os.path.isfile(file_path + ".gz")
+
+
+	def _read_archive_index(self, file_path: str) -> dict: # pylint: disable = no-self-use
+		with open(file_path + ".gz.index", mode = "r", encoding = "utf-8") as index_file:
+			return json.load(index_file)
+
+
+	def _write_archive_index(self, file_path: str, archive_index: dict) -> None: # pylint: disable = no-self-use
+		""" Write the index for an archive, replacing it atomically, which commits the frames it lists """
+
+		with open(file_path + ".gz.index.tmp", mode = "w", encoding = "utf-8") as index_file:
+			json.dump(archive_index, index_file)
+		os.replace(file_path + ".gz.index.tmp", file_path + ".gz.index")
+
+
+	def _read_archive_range(self, file_path: str, archive_index: dict, offset: int, size: int) -> bytes: # pylint: disable = no-self-use
+		""" Read a range of bytes from an archived file, decompressing only the frames it covers """
+
+		frame_collection = archive_index["frames"]
+		end_offset = min(offset + size, archive_index["size"])
+		frame_index = max(bisect.bisect_right([ frame[0] for frame in frame_collection ], offset) - 1, 0)
+		data = bytearray()
+
+		with open(file_path + ".gz", mode = "rb") as archive_file:
+			while frame_index < len(frame_collection) and frame_collection[frame_index][0] < end_offset:
+				frame_start, compressed_start = frame_collection[frame_index]
+				compressed_end = _get_frame_end(archive_index, frame_index)
+				archive_file.seek(compressed_start)
+				frame_data = gzip.decompress(archive_file.read(compressed_end - compressed_start))
+				data += frame_data[ max(offset - frame_start, 0) : end_offset - frame_start ]
+				frame_index += 1
+
+		return bytes(data)
+
+
+	def _append_to_archive(self, file_path: str, data: bytes) -> None:
+		""" Append data to an archived file as a new frame, discarding any partial frame left by an interrupted write """
+
+		archive_index = self._read_archive_index(file_path)
+
+		with open(file_path + ".gz", mode = "ab") as archive_file:
+			if archive_file.tell() != archive_index["compressed_size"]:
+				archive_file.truncate(archive_index["compressed_size"])
+			archive_file.write(gzip.compress(data, self.archive_compression_level))
+			compressed_size = archive_file.tell()
+
+		archive_index["frames"].append([ archive_index["size"], archive_index["compressed_size"] ])
+		archive_index["size"] += len(data)
+		archive_index["compressed_size"] = compressed_size
+		self._write_archive_index(file_path, archive_index)
+
+
+
+def _get_frame_end(archive_index: dict, frame_index: int) -> int:
+	""" Return the offset in the compressed file where a frame ends """
+
+	frame_collection = archive_index["frames"]
+	return frame_collection[frame_index + 1][1] if frame_index + 1 < len(frame_collection) else archive_index["compressed_size"]
@@ -0,0 +1,74 @@
+import logging
+
+from typing import List, Optional, Tuple
+
+from bhamon_orchestra_model.database.memory_database_client import MemoryDatabaseClient
+
+
+logger = logging.getLogger("MemoryDatabaseAdministration")
+
+
+class MemoryDatabaseAdministration:
+	""" Administration client for a database storing data in memory, intended for development only. """
+
+
+	def __init__(self, database_client: MemoryDatabaseClient) -> None:
+		self._database_client = database_client
+
+
+	def initialize(self, simulate: bool = False) -> None:
+		logger.info("Initializing" + (" (simulation)" if simulate else "")) # pylint: disable = logging-not-lazy
+
+		logger.info("Creating run index")
+		if not simulate:
+			self.create_index("run", "identifier_unique", [ ("project", "ascending"), ("identifier", "ascending") ], is_unique = True)
+			self.create_index("run", "project", [ ("project", "ascending") ])
+			self.create_index("run", "status", [ ("status", "ascending") ])
+			self.create_index("run", "worker", [ ("worker", "ascending") ])
+			self.create_index("run", "worker_status", [ ("worker", "ascending"), ("status", "ascending") ])
+			self.create_index("run", "job_creation_date", [ ("project", "ascending"), ("job", "ascending") ]) # Without the date, which is only used in ranges
+
+		logger.info("Creating job index")
+		if not simulate:
+			self.create_index("job", "identifier_unique", [ ("project", "ascending"), ("identifier", "ascending") ], is_unique = True)
+
+		logger.info("Creating schedule index")
+		if not simulate:
+			self.create_index("schedule", "identifier_unique", [ ("project", "ascending"), ("identifier", "ascending") ], is_unique = True)
+
+		logger.info("Creating user index")
+		if not simulate:
+			self.create_index("user", "identifier_unique", [ ("identifier", "ascending") ], is_unique = True)
+
+		logger.info("Creating user authentication index")
+		if not simulate:
+			self.create_index("user_authentication", "user_type", [ ("user", "ascending"), ("type", "ascending") ])
+
+		logger.info("Creating worker index")
+		if not simulate:
+			self.create_index("worker", "identifier_unique", [ ("identifier", "ascending") ], is_unique = True)
+
+
+	def upgrade(self, simulate: bool = False) -> None:
+		raise NotImplementedError("Upgrading a memory database is not supported")
+
+
+	def create_index(self, table: str, identifier: str, field_collection: List[Tuple[str,str]], is_unique: bool = False) -> None:
+		field_collection = [ field for field, direction in field_collection ]
+		self._database_client.create_index(table, identifier, field_collection, is_unique = is_unique)
+
+
+	def analyze_query(self, table: str, filter: dict, order_by: Optional[List[Tuple[str,str]]] = None) -> dict: # pylint: disable = redefined-builtin, unused-argument
+		""" Find which index the database client would use for a query, sorting being always done in memory """
+
+		index_identifier = self._database_client.get_query_index(table, filter)
+
+		return {
+			"table": table,
+			"index": index_identifier,
+			"is_collection_scan": index_identifier is None,
+		}
+
+
+	def close(self) -> None:
+		pass
@@ -1,94 +1,265 @@
+import itertools
 import logging
 
-from typing import List, Optional, Tuple
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Tuple
 
-from bhamon_orchestra_model.database.database_client import DatabaseClient
+from bhamon_orchestra_model.database.change_notifier import ChangeNotifier
+from bhamon_orchestra_model.database.database_client import DatabaseClient, is_operator_expression, missing_value
 
 
 logger = logging.getLogger("MemoryDatabaseClient")
 
 
 class MemoryDatabaseClient(DatabaseClient):
-	""" Client for a database storing data in memory, intended for development only. """
+	""" Client for a database storing data in memory, intended for development only.
+
+	Indexes are maintained as hash tables mapping field values to items,
+	so that queries filtering on all the fields of an index do not scan the whole table.
+
+	"""
 
 
 	def __init__(self) -> None:
 		self.database = {}
+		self.indexes = {}
+		self._row_index_keys = {}
+		self._next_row_key = 0
+		self.change_notifier = ChangeNotifier()
 
 
 	def count(self, table: str, filter: dict) -> int: # pylint: disable = redefined-builtin
 		""" Return how many items are in a table, after applying a filter """
-		return sum(1 for row in self.database.get(table, []) if self._match_filter(row, filter))
+		return sum(1 for row_key, row in self._find_candidates(table, filter) if self._match_filter(row, filter))
 
 
 	def find_many(self, # pylint: disable = too-many-arguments
 			table: str, filter: dict, # pylint: disable = redefined-builtin
-			skip: int = 0, limit: Optional[int] = None, order_by: Optional[Tuple[str,str]] = None) -> List[dict]:
+			skip: int = 0, limit: Optional[int] = None, order_by: Optional[Tuple[str,str]] = None,
+			projection: Optional[List[str]] = None) -> List[dict]:
 		""" Return a list of items from a table, after applying a filter, with options for limiting and sorting results """
 
-		start_index = skip
+		results = ( row for row_key, row in self._find_candidates(table, filter) if self._match_filter(row, filter) )
+		results = self._apply_order_by(results, order_by, limit = (skip + limit) if limit is not None else None)
+		return [ self._apply_projection(row, projection) for row in results[ skip : ] ]
+
+
+	def iter_many(self, # pylint: disable = too-many-arguments
+			table: str, filter: dict, # pylint: disable = redefined-builtin
+			skip: int = 0, limit: Optional[int] = None, order_by: Optional[Tuple[str,str]] = None,
+			projection: Optional[List[str]] = None, batch_size: int = 1000) -> Iterator[dict]:
+		""" Iterate on items from a table, with the same options as find_many, filtering lazily unless results must be sorted """
+
+		if order_by is not None:
+			yield from self.find_many(table, filter, skip = skip, limit = limit, order_by = order_by, projection = projection)
+			return
+
 		end_index = (skip + limit) if limit is not None else None
-		results = self.database.get(table, [])
-		results = self._apply_order_by(results, order_by)
-		results = [ row for row in results if self._match_filter(row, filter) ]
-		return results[ start_index : end_index ]
+		candidates = list(self._find_candidates(table, filter))
+		results = ( row for row_key, row in candidates if self._match_filter(row, filter) )
+		for row in itertools.islice(results, skip, end_index):
+			yield self._apply_projection(row, projection)
 
 
-	def find_one(self, table: str, filter: dict) -> Optional[dict]: # pylint: disable = redefined-builtin
+	def find_one(self, table: str, filter: dict, projection: Optional[List[str]] = None) -> Optional[dict]: # pylint: disable = redefined-builtin
 		""" Return a single item (or nothing) from a table, after applying a filter """
-		return next(( row for row in self.database.get(table, []) if self._match_filter(row, filter) ), None)
+		row = next(( row for row_key, row in self._find_candidates(table, filter) if self._match_filter(row, filter) ), None)
+		return self._apply_projection(row, projection) if row is not None else None
 
 
 	def insert_one(self, table: str, data: dict) -> dict:
 		""" Insert a new item into a table """
 
-		if table not in self.database:
-			self.database[table] = []
-		self.database[table].append(data)
+		self._check_unique_indexes(table, data)
+
+		row_key = self._next_row_key
+		self._next_row_key += 1
+
+		self.database.setdefault(table, {})[row_key] = data
+		self._add_to_indexes(table, row_key, data)
+		self.change_notifier.notify(table)
+
+
+	def insert_many(self, table: str, data_collection: List[dict]) -> None:
+		""" Insert several new items into a table """
+
+		for data in data_collection:
+			self.insert_one(table, data)
 
 
 	def update_one(self, table: str, filter: dict, data: dict) -> None: # pylint: disable = redefined-builtin
 		""" Update a single item (or nothing) from a table, after applying a filter """
 
-		all_rows = self.database.get(table, [])
-		matched_row = next(( row for row in all_rows if self._match_filter(row, filter) ), None)
-		if matched_row is not None:
+		matched_row_key = next(( row_key for row_key, row in self._find_candidates(table, filter) if self._match_filter(row, filter) ), None)
+		if matched_row_key is not None:
+			matched_row = self.database[table][matched_row_key]
+			self._check_unique_indexes(table, { **matched_row, **data }, matched_row_key)
+			self._remove_from_indexes(table, matched_row_key)
+			matched_row.update(data)
+			self._add_to_indexes(table, matched_row_key, matched_row)
+			self.change_notifier.notify(table)
+
+
+	def update_many(self, table: str, filter: dict, data: dict) -> None: # pylint: disable = redefined-builtin
+		""" Update all items from a table matching a filter """
+
+		matched_row_keys = [ row_key for row_key, row in self._find_candidates(table, filter) if self._match_filter(row, filter) ]
+		for row_key in matched_row_keys:
+			matched_row = self.database[table][row_key]
+			self._check_unique_indexes(table, { **matched_row, **data }, row_key)
+			self._remove_from_indexes(table, row_key)
 			matched_row.update(data)
+			self._add_to_indexes(table, row_key, matched_row)
+
+		if len(matched_row_keys) > 0:
+			self.change_notifier.notify(table)
 
 
 	def delete_one(self, table: str, filter: dict) -> None: # pylint: disable = redefined-builtin
 		""" Delete a single item (or nothing) from a table, after applying a filter """
 
-		all_rows = self.database.get(table, [])
-		matched_row = next(( row for row in all_rows if self._match_filter(row, filter) ), None)
-		if matched_row is not None:
-			all_rows.remove(matched_row)
+		matched_row_key = next(( row_key for row_key, row in self._find_candidates(table, filter) if self._match_filter(row, filter) ), None)
+		if matched_row_key is not None:
+			self._remove_from_indexes(table, matched_row_key)
+			del self.database[table][matched_row_key]
+			self.change_notifier.notify(table)
+
+
+	def bulk_write(self, table: str, operation_collection: List[dict]) -> None:
+		""" Apply a batch of write operations on a table, in order, stopping at the first error """
+
+		for operation in operation_collection:
+			if operation["operation"] == "insert_one":
+				self.insert_one(table, operation["data"])
+			elif operation["operation"] == "update_one":
+				self.update_one(table, operation["filter"], operation["data"])
+			elif operation["operation"] == "update_many":
+				self.update_many(table, operation["filter"], operation["data"])
+			elif operation["operation"] == "delete_one":
+				self.delete_one(table, operation["filter"])
+			else:
+				raise ValueError("Unsupported operation '%s'" % operation["operation"])
+
+
+	def watch_changes(self, table_collection: List[str], callback: Callable[[str],None]) -> Optional[Callable[[],None]]:
+		""" Register a callback to call, with the table name, when items are inserted, updated or deleted through this client """
+		return self.change_notifier.add_listener(table_collection, callback)
+
+
+	def create_index(self, table: str, identifier: str, field_collection: List[str], is_unique: bool = False) -> None:
+		""" Create an index on a table and fill it with the existing items """
+
+		table_indexes = self.indexes.setdefault(table, [])
+
+		existing_index = next(( index for index in table_indexes if index["identifier"] == identifier ), None)
+		if existing_index is not None:
+			raise ValueError("Index '%s' already exists for table '%s'" % (identifier, table))
+
+		index = { "identifier": identifier, "field_collection": list(field_collection), "is_unique": is_unique, "entries": {} }
+
+		for row_key, row in self.database.get(table, {}).items():
+			index_key = self._get_index_key(index, row)
+			if index["is_unique"] and len(index["entries"].get(index_key, {})) > 0:
+				raise ValueError("Duplicate key in table '%s' for index '%s'" % (table, identifier))
+			index["entries"].setdefault(index_key, {})[row_key] = row
+			self._row_index_keys.setdefault(table, {}).setdefault(row_key, {})[identifier] = index_key
+
+		table_indexes.append(index)
+
+
+	def get_query_index(self, table: str, filter: dict) -> Optional[str]: # pylint: disable = redefined-builtin
+		""" Return the identifier of the index used to find the items matching a filter, if any """
+		index = self._select_index(table, filter)
+		return index["identifier"] if index is not None else None
+
+
+	def _find_candidates(self, table: str, filter: dict) -> Iterable[Tuple[int,dict]]: # pylint: disable = redefined-builtin
+		""" Return the items which may match a filter, in insertion order, using an index when possible """
+
+		index = self._select_index(table, filter)
+		if index is None:
+			return self.database.get(table, {}).items()
+
+		index_entries = {}
+		for index_key in self._get_filter_index_keys(index, filter):
+			index_entries.update(index["entries"].get(index_key, {}))
+		return [ (row_key, index_entries[row_key]) for row_key in sorted(index_entries) ]
+
+
+	def _select_index(self, table: str, filter: dict) -> Optional[dict]: # pylint: disable = redefined-builtin
+		""" Select the index covering the most fields from a filter, considering only equality and $in expressions """
+
+		selected_index = None
+		for index in self.indexes.get(table, []):
+			if all(field in filter and self._is_index_expression(filter[field]) for field in index["field_collection"]):
+				if selected_index is None or len(index["field_collection"]) > len(selected_index["field_collection"]):
+					selected_index = index
+		return selected_index
+
+
+	def _check_unique_indexes(self, table: str, row: dict, row_key: Optional[int] = None) -> None:
+		""" Check an item does not have the same key as another item in the unique indexes of its table, ignoring the item itself when it is updated """
+
+		for index in self.indexes.get(table, []):
+			if index["is_unique"] and any(other_row_key != row_key for other_row_key in index["entries"].get(self._get_index_key(index, row), {})):
+				index_filter = { field: self._get_field_value(row, field) for field in index["field_collection"] }
+				raise ValueError("Duplicate key '%s' in table '%s' for index '%s'" % (index_filter, table, index["identifier"]))
+
+
+	def _add_to_indexes(self, table: str, row_key: int, row: dict) -> None:
+		""" Add an item to all the indexes of its table """
+
+		row_index_keys = self._row_index_keys.setdefault(table, {}).setdefault(row_key, {})
+		for index in self.indexes.get(table, []):
+			index_key = self._get_index_key(index, row)
+			index["entries"].setdefault(index_key, {})[row_key] = row
+			row_index_keys[index["identifier"]] = index_key
+
+
+	def _remove_from_indexes(self, table: str, row_key: int) -> None:
+		""" Remove an item from all the indexes of its table, using the keys it was indexed with """
+
+		row_index_keys = self._row_index_keys.get(table, {}).pop(row_key, {})
+		for index in self.indexes.get(table, []):
+			index_key = row_index_keys[index["identifier"]]
+			index_entry = index["entries"][index_key]
+			del index_entry[row_key]
+			if len(index_entry) == 0:
+				del index["entries"][index_key]
+
+
+	def _get_index_key(self, index: dict, row: dict) -> tuple:
+		""" Compute the key for an item in an index """
+		return tuple(_make_hashable(self._get_field_value(row, field)) for field in index["field_collection"])
+
+
+	def _get_filter_index_keys(self, index: dict, filter: dict) -> List[tuple]: # pylint: disable = no-self-use, redefined-builtin
+		""" Compute the keys to look up in an index to find the items matching a filter """
+
+		all_field_values = []
+		for field in index["field_collection"]:
+			if is_operator_expression(filter[field]):
+				field_values = list(filter[field]["$in"])
+				# Missing fields are considered as null by $in
+				if None in field_values:
+					field_values.append(missing_value)
+			else:
+				field_values = [ filter[field] ]
+			all_field_values.append([ _make_hashable(value) for value in field_values ])
 
+		return list(itertools.product(*all_field_values))
 
-	def _match_filter(self, row: dict, filter: dict) -> bool: # pylint: disable = no-self-use, redefined-builtin
-		""" Check if an item matches a filter """
 
-		for key, value in filter.items():
-			data = row
-			for key_part in key.split("."):
-				if key_part not in data.keys():
-					return False
-				data = data[key_part]
-			if data != value:
-				return False
-		return True
+	def _is_index_expression(self, expression: Any) -> bool: # pylint: disable = no-self-use
+		""" Check if a filter expression can be resolved with index lookups """
+		return not is_operator_expression(expression) or list(expression) == [ "$in" ]
 
 
-	def _apply_order_by(self, row_collection: List[dict], expression: Optional[List[Tuple[str,str]]]) -> List[dict]:
-		""" Apply an order-by expression on a list of items """
 
-		if expression is None:
-			return row_collection
+def _make_hashable(value: Any) -> Any:
+	""" Convert a field value to a hashable equivalent, to use it as part of an index key """
 
-		for key, direction in reversed(self._normalize_order_by_expression(expression)):
-			if direction in [ "asc", "ascending" ]:
-				reverse = False
-			elif direction in [ "desc", "descending" ]:
-				reverse = True
-			row_collection = sorted(row_collection, key = lambda x: x[key], reverse = reverse) # pylint: disable = cell-var-from-loop
-		return row_collection
+	if isinstance(value, dict):
+		return frozenset((key, _make_hashable(item)) for key, item in value.items())
+	if isinstance(value, list):
+		return tuple(_make_hashable(item) for item in value)
+	return value
@@ -2,12 +2,18 @@ import logging
 
 from typing import Optional, Tuple
 
+from bhamon_orchestra_model.database.file_storage import FileStorage, decode_chunk
+
 
 logger = logging.getLogger("MemoryFileStorage")
 
 
-class MemoryFileStorage:
-	""" Client for a file storage in memory, intended for development only. """
+class MemoryFileStorage(FileStorage):
+	""" Client for a file storage in memory, intended for development only.
+
+	Files are stored as utf-8 bytes, so that sizes and cursors are byte offsets like with other storages.
+
+	"""
 
 
 	def __init__(self) -> None:
@@ -18,39 +24,43 @@ class MemoryFileStorage:
 		return file_path in self.storage
 
 
-	def get_universal_size(self, file_path: str) -> int:
-		return len(self.storage[file_path])
-
-
-	def load_or_default(self, file_path: str, default_value: Optional[str] = None) -> Optional[str]:
-		return self.storage.get(file_path, default_value)
+	def get_size(self, file_path: str) -> int:
+		""" Return the size of a file in bytes """
+		return len(self._get_data(file_path))
 
 
 	def load(self, file_path: str) -> str:
-		return self.storage[file_path]
-
-
-	def load_chunk_or_default(self, file_path: str, default_value: Optional[str] = None, skip: int = 0, limit: Optional[int] = None) -> Tuple[Optional[str], int]:
-		try:
-			return self.load_chunk(file_path, skip = skip, limit = limit)
-		except KeyError:
-			return default_value, 0
+		return self._get_data(file_path).decode("utf-8")
 
 
 	def load_chunk(self, file_path: str, skip: int = 0, limit: Optional[int] = None) -> Tuple[str, int]:
-		start_index = skip
+		""" Load up to limit bytes from a file, starting at the skip byte offset, and return the text with the offset to continue from """
+
+		data = self._get_data(file_path)
 		end_index = (skip + limit) if limit is not None else None
-		result = self.storage[file_path][ start_index : end_index ]
-		return result, len(result)
+
+		text, chunk_size = decode_chunk(data[ skip : end_index ])
+		if chunk_size == 0 and limit is not None:
+			text, chunk_size = decode_chunk(data[ skip : end_index + 3 ])
+
+		return text, skip + chunk_size
 
 
 	def save(self, file_path: str, data: str) -> None:
-		self.storage[file_path] = data
+		self.storage[file_path] = data.encode("utf-8")
 
 
 	def append_unsafe(self, file_path: str, data: str) -> None:
-		self.storage[file_path] = self.storage.get(file_path, "") + data
+		self.storage[file_path] = self.storage.get(file_path, b"") + data.replace("\r\n", "\n").encode("utf-8")
 
 
 	def delete(self, file_path: str) -> None:
+		self._get_data(file_path)
 		del self.storage[file_path]
+
+
+	def _get_data(self, file_path: str) -> bytes:
+		try:
+			return self.storage[file_path]
+		except KeyError:
+			raise FileNotFoundError("File '%s' does not exist" % file_path) from None
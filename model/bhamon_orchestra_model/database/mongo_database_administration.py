@@ -1,6 +1,6 @@
 import logging
 
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 
 import pymongo
 
@@ -22,6 +22,10 @@ class MongoDatabaseAdministration:
 		logger.info("Creating run index")
 		if not simulate:
 			self.create_index("run", "identifier_unique", [ ("project", "ascending"), ("identifier", "ascending") ], is_unique = True)
+			self.create_index("run", "update_date", [ ("project", "ascending"), ("update_date", "descending"), ("identifier", "descending") ])
+			self.create_index("run", "status", [ ("status", "ascending") ])
+			self.create_index("run", "worker_status", [ ("worker", "ascending"), ("status", "ascending") ])
+			self.create_index("run", "job_creation_date", [ ("project", "ascending"), ("job", "ascending"), ("creation_date", "ascending") ])
 
 		logger.info("Creating job index")
 		if not simulate:
@@ -30,11 +34,16 @@ class MongoDatabaseAdministration:
 		logger.info("Creating schedule index")
 		if not simulate:
 			self.create_index("schedule", "identifier_unique", [ ("project", "ascending"), ("identifier", "ascending") ], is_unique = True)
+			self.create_index("schedule", "update_date", [ ("update_date", "ascending") ])
 
 		logger.info("Creating user index")
 		if not simulate:
 			self.create_index("user", "identifier_unique", [ ("identifier", "ascending") ], is_unique = True)
 
+		logger.info("Creating user authentication index")
+		if not simulate:
+			self.create_index("user_authentication", "user_type", [ ("user", "ascending"), ("type", "ascending") ])
+
 		logger.info("Creating worker index")
 		if not simulate:
 			self.create_index("worker", "identifier_unique", [ ("identifier", "ascending") ], is_unique = True)
@@ -53,8 +62,9 @@ class MongoDatabaseAdministration:
 			self.mongo_client.get_database()["run"].update_many({ "worker": { "$exists": False } }, { "$set": { "worker": None } })
 
 		logger.info("Updating run project and job fields")
-		for run in self.mongo_client.get_database()["run"].find():
-			if "project" not in run:
+		run_cursor = self.mongo_client.get_database()["run"].find({ "project": { "$exists": False } }, { "identifier": True, "job": True }, batch_size = 1000)
+		with run_cursor:
+			for run in run_cursor:
 				project, job = run["job"].split("_", 1)
 				logger.info("Run %s: Job %s => Project %s, Job %s", run["identifier"], run["job"], project, job)
 				if not simulate:
@@ -62,14 +72,42 @@ class MongoDatabaseAdministration:
 
 
 	def create_index(self, table: str, identifier: str, field_collection: List[Tuple[str,str]], is_unique: bool = False) -> None:
+		mongo_field_collection = self._convert_field_collection(field_collection)
+		self.mongo_client.get_database()[table].create_index(mongo_field_collection, name = identifier, unique = is_unique)
+
+
+	def analyze_query(self, table: str, filter: dict, order_by: Optional[List[Tuple[str,str]]] = None) -> dict: # pylint: disable = redefined-builtin
+		""" Find which index the database uses for a query, based on the winning plan from its explain output """
+
+		sort = self._convert_field_collection(order_by) if order_by else None
+		explanation = self.mongo_client.get_database()[table].find(filter, sort = sort).explain()
+
+		all_stages = []
+		stages_to_visit = [ explanation["queryPlanner"]["winningPlan"] ]
+		while len(stages_to_visit) > 0:
+			stage = stages_to_visit.pop()
+			all_stages.append(stage)
+			if "inputStage" in stage:
+				stages_to_visit.append(stage["inputStage"])
+			stages_to_visit.extend(stage.get("inputStages", []))
+
+		index_identifier = next(( stage["indexName"] for stage in all_stages if stage["stage"] == "IXSCAN" ), None)
+
+		return {
+			"table": table,
+			"index": index_identifier,
+			"is_collection_scan": any(stage["stage"] == "COLLSCAN" for stage in all_stages),
+		}
+
+
+	def _convert_field_collection(self, field_collection: List[Tuple[str,str]]) -> List[Tuple[str,int]]: # pylint: disable = no-self-use
 		mongo_field_collection = []
 		for field, direction in field_collection:
 			if direction in [ "asc", "ascending" ]:
 				mongo_field_collection.append((field, pymongo.ASCENDING))
 			elif direction in [ "desc", "descending" ]:
 				mongo_field_collection.append((field, pymongo.DESCENDING))
-
-		self.mongo_client.get_database()[table].create_index(mongo_field_collection, name = identifier, unique = is_unique)
+		return mongo_field_collection
 
 
 	def close(self) -> None:
@@ -1,6 +1,7 @@
 import logging
+import threading
 
-from typing import List, Optional, Tuple
+from typing import Callable, Iterator, List, Optional, Tuple
 
 import pymongo
 
@@ -25,7 +26,8 @@ class MongoDatabaseClient(DatabaseClient):
 
 	def find_many(self, # pylint: disable = too-many-arguments
 			table: str, filter: dict, # pylint: disable = redefined-builtin
-			skip: int = 0, limit: Optional[int] = None, order_by: Optional[Tuple[str,str]] = None) -> List[dict]:
+			skip: int = 0, limit: Optional[int] = None, order_by: Optional[Tuple[str,str]] = None,
+			projection: Optional[List[str]] = None) -> List[dict]:
 		""" Return a list of items from a table, after applying a filter, with options for limiting and sorting results """
 
 		if limit == 0:
@@ -33,12 +35,31 @@ class MongoDatabaseClient(DatabaseClient):
 
 		limit = limit if limit is not None else 0
 		order_by = self._convert_order_by_expression(order_by)
-		return list(self.mongo_client.get_database()[table].find(filter, { "_id": False }, skip = skip, limit = limit, sort = order_by))
+		projection = self._convert_projection(projection)
+		return list(self.mongo_client.get_database()[table].find(filter, projection, skip = skip, limit = limit, sort = order_by))
 
 
-	def find_one(self, table: str, filter: dict) -> Optional[dict]: # pylint: disable = redefined-builtin
+	def iter_many(self, # pylint: disable = too-many-arguments
+			table: str, filter: dict, # pylint: disable = redefined-builtin
+			skip: int = 0, limit: Optional[int] = None, order_by: Optional[Tuple[str,str]] = None,
+			projection: Optional[List[str]] = None, batch_size: int = 1000) -> Iterator[dict]:
+		""" Iterate on items from a table, with the same options as find_many, retrieving them in batches rather than all at once """
+
+		if limit == 0:
+			return
+
+		limit = limit if limit is not None else 0
+		order_by = self._convert_order_by_expression(order_by)
+		projection = self._convert_projection(projection)
+		cursor = self.mongo_client.get_database()[table].find(filter, projection, skip = skip, limit = limit, sort = order_by, batch_size = batch_size)
+
+		with cursor:
+			yield from cursor
+
+
+	def find_one(self, table: str, filter: dict, projection: Optional[List[str]] = None) -> Optional[dict]: # pylint: disable = redefined-builtin
 		""" Return a single item (or nothing) from a table, after applying a filter """
-		return self.mongo_client.get_database()[table].find_one(filter, { "_id": False })
+		return self.mongo_client.get_database()[table].find_one(filter, self._convert_projection(projection))
 
 
 	def insert_one(self, table: str, data: dict) -> dict:
@@ -47,20 +68,110 @@ class MongoDatabaseClient(DatabaseClient):
 		del data["_id"]
 
 
+	def insert_many(self, table: str, data_collection: List[dict]) -> None:
+		""" Insert several new items into a table """
+
+		if len(data_collection) == 0:
+			return
+
+		try:
+			self.mongo_client.get_database()[table].insert_many(data_collection)
+		finally:
+			for data in data_collection:
+				data.pop("_id", None)
+
+
 	def update_one(self, table: str, filter: dict, data: dict) -> None: # pylint: disable = redefined-builtin
 		""" Update a single item (or nothing) from a table, after applying a filter """
 		self.mongo_client.get_database()[table].update_one(filter, { "$set": data })
 
 
+	def update_many(self, table: str, filter: dict, data: dict) -> None: # pylint: disable = redefined-builtin
+		""" Update all items from a table matching a filter """
+		self.mongo_client.get_database()[table].update_many(filter, { "$set": data })
+
+
 	def delete_one(self, table: str, filter: dict) -> None: # pylint: disable = redefined-builtin
 		""" Delete a single item (or nothing) from a table, after applying a filter """
 		self.mongo_client.get_database()[table].delete_one(filter)
 
 
+	def bulk_write(self, table: str, operation_collection: List[dict]) -> None:
+		""" Apply a batch of write operations on a table, in order, stopping at the first error """
+
+		if len(operation_collection) == 0:
+			return
+
+		mongo_operation_collection = [ self._convert_operation(operation) for operation in operation_collection ]
+
+		try:
+			self.mongo_client.get_database()[table].bulk_write(mongo_operation_collection, ordered = True)
+		finally:
+			for operation in operation_collection:
+				if operation["operation"] == "insert_one":
+					operation["data"].pop("_id", None)
+
+
+	def watch_changes(self, table_collection: List[str], callback: Callable[[str],None]) -> Optional[Callable[[],None]]:
+		""" Register a callback to call, with the table name, when items are inserted, updated or deleted, using a change stream.
+
+		Change streams require a replica set, the callback is never called otherwise.
+
+		"""
+
+		pipeline = [ { "$match": { "ns.coll": { "$in": list(table_collection) } } } ]
+		should_stop = threading.Event()
+
+		watch_thread = threading.Thread(target = self._watch_changes, args = (pipeline, callback, should_stop), name = "MongoDatabaseClient.watch_changes", daemon = True)
+		watch_thread.start()
+
+		return should_stop.set
+
+
+	def _watch_changes(self, pipeline: List[dict], callback: Callable[[str],None], should_stop: threading.Event) -> None:
+		""" Read a change stream until stopped, calling the callback for each change """
+
+		try:
+			with self.mongo_client.get_database().watch(pipeline, max_await_time_ms = 1000) as change_stream:
+				while not should_stop.is_set() and change_stream.alive:
+					change = change_stream.try_next()
+					if change is not None and not should_stop.is_set():
+						try:
+							callback(change["ns"]["coll"])
+						except Exception: # pylint: disable = broad-except
+							logger.error("Change listener for table '%s' raised an exception", change["ns"]["coll"], exc_info = True)
+
+		except pymongo.errors.PyMongoError:
+			logger.warning("Change notifications are not available, falling back to polling", exc_info = True)
+
+
 	def close(self) -> None:
 		self.mongo_client.close()
 
 
+	def _convert_operation(self, operation: dict) -> object: # pylint: disable = no-self-use
+		""" Convert a write operation to its pymongo representation """
+
+		if operation["operation"] == "insert_one":
+			return pymongo.InsertOne(operation["data"])
+		if operation["operation"] == "update_one":
+			return pymongo.UpdateOne(operation["filter"], { "$set": operation["data"] })
+		if operation["operation"] == "update_many":
+			return pymongo.UpdateMany(operation["filter"], { "$set": operation["data"] })
+		if operation["operation"] == "delete_one":
+			return pymongo.DeleteOne(operation["filter"])
+		raise ValueError("Unsupported operation '%s'" % operation["operation"])
+
+
+	def _convert_projection(self, projection: Optional[List[str]]) -> dict: # pylint: disable = no-self-use
+		""" Convert a projection to its pymongo representation, always excluding the internal identifier """
+
+		mongo_projection = { "_id": False }
+		if projection is not None:
+			mongo_projection.update({ key: True for key in projection })
+		return mongo_projection
+
+
 	def _convert_order_by_expression(self, expression: Optional[List[Tuple[str,str]]]) -> Optional[List[Tuple[str,int]]]:
 		""" Convert a order-by expression to its pymongo representation """
 
@@ -0,0 +1,22 @@
+from typing import Any
+
+import msgpack
+
+from bhamon_orchestra_model.database.data_serializer import DataSerializer
+
+
+class MsgpackSerializer(DataSerializer):
+	""" Serializer for MessagePack files, a compact binary format faster to load and save than json """
+
+
+	@property
+	def file_extension(self) -> str:
+		return ".msgpack"
+
+
+	def serialize(self, data: Any) -> bytes:
+		return msgpack.packb(data, use_bin_type = True)
+
+
+	def deserialize(self, data: bytes) -> Any:
+		return msgpack.unpackb(data, raw = False)
@@ -0,0 +1,254 @@
+import logging
+
+from typing import Any, Callable, List, Optional, Tuple
+
+from bhamon_orchestra_model.database.file_storage import FileStorage, decode_chunk
+
+
+logger = logging.getLogger("S3FileStorage")
+
+
+class S3FileStorage(FileStorage):
+	""" Client for a file storage in an S3 compatible object store, so that several services can share it.
+
+	Objects cannot be appended to, so each file is stored as segments, objects named after the byte offset where they start.
+	Appending to a file adds a segment, and once a file ends with too many small segments, they are merged into one,
+	so that the number of objects per file stays bounded while appends only upload the appended data.
+	A merged segment replaces the first segment it covers before the others are removed, and segments starting
+	within a previous one are ignored, so that readers see consistent content while segments are merged.
+	A reader which listed the segments before a merge and finds one removed lists them again and retries once.
+	Once the first segment to merge is large enough to be a multipart upload part, it is copied within the object store
+	rather than downloaded and uploaded again, so that a merge only transfers the small segments appended since the previous one.
+
+	The client is expected to be an S3 client from boto3, for example created with boto3.client("s3", endpoint_url = ...)
+	for a MinIO server. Appends rely on the segments for a file being known by the writer, so a file should only be
+	appended to by a single instance.
+
+	"""
+
+
+	def __init__(self, # pylint: disable = too-many-arguments
+			s3_client: Any, bucket: str, prefix: str = "",
+			segment_size: int = 8 * 1024 * 1024, maximum_segment_count: int = 32) -> None:
+		self.s3_client = s3_client
+		self.bucket = bucket
+		self.prefix = prefix
+		self.segment_size = segment_size
+		self.maximum_segment_count = maximum_segment_count
+		self.minimum_part_size = 5 * 1024 * 1024
+
+		self._segment_cache = {}
+
+
+	def exists(self, file_path: str) -> bool:
+		response = self.s3_client.list_objects_v2(Bucket = self.bucket, Prefix = self._get_segment_prefix(file_path), MaxKeys = 1)
+		return response.get("KeyCount", 0) > 0
+
+
+	def get_size(self, file_path: str) -> int:
+		""" Return the size of a file in bytes, from the listing of its segments """
+		segment_collection = self._list_segments(file_path)
+		return segment_collection[-1]["offset"] + segment_collection[-1]["size"]
+
+
+	def load(self, file_path: str) -> str:
+		return self._read_segments(file_path, lambda segment_collection:
+			self._read_range(segment_collection, 0, segment_collection[-1]["offset"] + segment_collection[-1]["size"]).decode("utf-8"))
+
+
+	def load_chunk(self, file_path: str, skip: int = 0, limit: Optional[int] = None) -> Tuple[str, int]:
+		""" Load up to limit bytes from a file, starting at the skip byte offset, and return the text with the offset to continue from """
+		return self._read_segments(file_path, lambda segment_collection: self._load_chunk_from_segments(segment_collection, skip, limit))
+
+
+	def _load_chunk_from_segments(self, segment_collection: List[dict], skip: int, limit: Optional[int]) -> Tuple[str, int]:
+		available_size = max(segment_collection[-1]["offset"] + segment_collection[-1]["size"] - skip, 0)
+		read_size = min(limit, available_size) if limit is not None else available_size
+
+		data = self._read_range(segment_collection, skip, read_size)
+
+		# Read the rest of a character cut by the limit rather than returning nothing
+		if len(data) > 0 and decode_chunk(data)[1] == 0:
+			data += self._read_range(segment_collection, skip + len(data), min(3, available_size - len(data)))
+
+		text, chunk_size = decode_chunk(data)
+		return text, skip + chunk_size
+
+
+	def save(self, file_path: str, data: str) -> None:
+		if self.exists(file_path):
+			self.delete(file_path)
+
+		data = data.encode("utf-8")
+		self.s3_client.put_object(Bucket = self.bucket, Key = self._get_segment_key(file_path, 0), Body = data)
+		self._segment_cache[file_path] = [ { "key": self._get_segment_key(file_path, 0), "offset": 0, "size": len(data) } ]
+
+
+	def append_unsafe(self, file_path: str, data: str) -> None:
+		""" Append text to a file as a new segment, merging the last segments if there are too many small ones """
+
+		data = data.replace("\r\n", "\n").encode("utf-8")
+		if len(data) == 0:
+			return
+
+		segment_collection = self._segment_cache.get(file_path, None)
+		if segment_collection is None:
+			segment_collection = self._list_segments(file_path) if self.exists(file_path) else []
+
+		offset = (segment_collection[-1]["offset"] + segment_collection[-1]["size"]) if len(segment_collection) > 0 else 0
+		segment = { "key": self._get_segment_key(file_path, offset), "offset": offset, "size": len(data) }
+		self.s3_client.put_object(Bucket = self.bucket, Key = segment["key"], Body = data)
+		segment_collection = segment_collection + [ segment ]
+
+		self._segment_cache[file_path] = self._merge_segments(segment_collection)
+
+
+	def flush(self, directory: Optional[str] = None) -> None:
+		""" Forget the segments known for the files in a directory, or for all files, once they are not appended to anymore """
+
+		if directory is None:
+			self._segment_cache.clear()
+			return
+
+		directory_prefix = directory.replace("\\", "/").rstrip("/") + "/"
+		for file_path in [ file_path for file_path in self._segment_cache if file_path.replace("\\", "/").startswith(directory_prefix) ]:
+			del self._segment_cache[file_path]
+
+
+	def delete(self, file_path: str) -> None:
+		self._segment_cache.pop(file_path, None)
+		all_keys = [ entry["Key"] for entry in self._list_objects(self._get_segment_prefix(file_path)) ]
+		if len(all_keys) == 0:
+			raise FileNotFoundError("File '%s' does not exist" % file_path)
+
+		for batch_start in range(0, len(all_keys), 1000):
+			delete_request = { "Objects": [ { "Key": key } for key in all_keys[ batch_start : batch_start + 1000 ] ], "Quiet": True }
+			self.s3_client.delete_objects(Bucket = self.bucket, Delete = delete_request)
+
+
+	def _get_segment_prefix(self, file_path: str) -> str:
+		return self.prefix + file_path.replace("\\", "/") + ".segments/"
+
+
+	def _get_segment_key(self, file_path: str, offset: int) -> str:
+		return self._get_segment_prefix(file_path) + "%016d" % offset
+
+
+	def _list_objects(self, prefix: str) -> List[dict]:
+		""" List all the objects under a prefix, in key order, across as many requests as needed """
+
+		all_objects = []
+		list_request = { "Bucket": self.bucket, "Prefix": prefix }
+
+		while True:
+			response = self.s3_client.list_objects_v2(**list_request)
+			all_objects += response.get("Contents", [])
+			if not response.get("IsTruncated", False):
+				return all_objects
+			list_request["ContinuationToken"] = response["NextContinuationToken"]
+
+
+	def _list_segments(self, file_path: str) -> List[dict]:
+		""" List the segments for a file, ignoring those starting within a previous segment, left over by an interrupted merge """
+
+		segment_prefix = self._get_segment_prefix(file_path)
+		segment_collection = []
+		end_offset = 0
+
+		for entry in self._list_objects(segment_prefix):
+			offset = int(entry["Key"][ len(segment_prefix) : ])
+			if offset >= end_offset:
+				segment_collection.append({ "key": entry["Key"], "offset": offset, "size": entry["Size"] })
+				end_offset = offset + entry["Size"]
+
+		if len(segment_collection) == 0:
+			raise FileNotFoundError("File '%s' does not exist" % file_path)
+
+		return segment_collection
+
+
+	def _read_segments(self, file_path: str, read_function: Callable[[List[dict]],Any]) -> Any:
+		""" Read from the segments of a file, listing them again and retrying once if a segment was removed by a merge after they were listed """
+
+		try:
+			return read_function(self._list_segments(file_path))
+		except SegmentNotFoundError:
+			logger.debug("Retrying read for '%s' after a segment was removed", file_path)
+			return read_function(self._list_segments(file_path))
+
+
+	def _read_range(self, segment_collection: List[dict], offset: int, size: int) -> bytes:
+		""" Read a range of bytes from the segments of a file, with a ranged request for each segment it covers """
+
+		end_offset = offset + size
+		data = bytearray()
+
+		for segment in segment_collection:
+			range_start = max(offset, segment["offset"])
+			range_end = min(end_offset, segment["offset"] + segment["size"])
+			if range_start < range_end:
+				byte_range = "bytes=%s-%s" % (range_start - segment["offset"], range_end - segment["offset"] - 1)
+				try:
+					response = self.s3_client.get_object(Bucket = self.bucket, Key = segment["key"], Range = byte_range)
+				except self.s3_client.exceptions.NoSuchKey:
+					raise SegmentNotFoundError("Segment '%s' does not exist" % segment["key"]) from None
+				data += response["Body"].read()
+
+		return bytes(data)
+
+
+	def _merge_segments(self, segment_collection: List[dict]) -> List[dict]:
+		""" Merge the small segments at the end of a file into one, once there are too many of them, and return the resulting segments """
+
+		merge_start = len(segment_collection)
+		merge_size = 0
+		while merge_start > 0 and merge_size < self.segment_size and segment_collection[merge_start - 1]["size"] < self.segment_size:
+			merge_start -= 1
+			merge_size += segment_collection[merge_start]["size"]
+
+		if len(segment_collection) - merge_start < max(self.maximum_segment_count, 2):
+			return segment_collection
+
+		segments_to_merge = segment_collection[ merge_start : ]
+		merged_segment = { "key": segments_to_merge[0]["key"], "offset": segments_to_merge[0]["offset"], "size": merge_size }
+
+		if segments_to_merge[0]["size"] >= self.minimum_part_size:
+			data = self._read_range(segments_to_merge[1:], segments_to_merge[1]["offset"], merge_size - segments_to_merge[0]["size"])
+			self._append_to_object(merged_segment["key"], data)
+		else:
+			data = self._read_range(segments_to_merge, segments_to_merge[0]["offset"], merge_size)
+			self.s3_client.put_object(Bucket = self.bucket, Key = merged_segment["key"], Body = data)
+
+		delete_request = { "Objects": [ { "Key": segment["key"] } for segment in segments_to_merge[1:] ], "Quiet": True }
+		self.s3_client.delete_objects(Bucket = self.bucket, Delete = delete_request)
+
+		logger.debug("Merged %s segments into %s", len(segments_to_merge), merged_segment["key"])
+
+		return segment_collection[ : merge_start ] + [ merged_segment ]
+
+
+	def _append_to_object(self, key: str, data: bytes) -> None:
+		""" Replace an object with its content followed by data, copying the existing content within the object store as the first part of a multipart upload """
+
+		upload = self.s3_client.create_multipart_upload(Bucket = self.bucket, Key = key)
+
+		try:
+			copy_response = self.s3_client.upload_part_copy(Bucket = self.bucket, Key = key, UploadId = upload["UploadId"],
+				PartNumber = 1, CopySource = { "Bucket": self.bucket, "Key": key })
+			upload_response = self.s3_client.upload_part(Bucket = self.bucket, Key = key, UploadId = upload["UploadId"], PartNumber = 2, Body = data)
+
+			all_parts = [
+				{ "PartNumber": 1, "ETag": copy_response["CopyPartResult"]["ETag"] },
+				{ "PartNumber": 2, "ETag": upload_response["ETag"] },
+			]
+
+			self.s3_client.complete_multipart_upload(Bucket = self.bucket, Key = key, UploadId = upload["UploadId"], MultipartUpload = { "Parts": all_parts })
+
+		except: # pylint: disable = bare-except
+			self.s3_client.abort_multipart_upload(Bucket = self.bucket, Key = key, UploadId = upload["UploadId"])
+			raise
+
+
+
+class SegmentNotFoundError(FileNotFoundError):
+	""" Error raised when a segment listed for a file does not exist anymore, usually because it was merged """
@@ -0,0 +1,81 @@
+import logging
+import re
+
+from typing import List, Optional, Tuple
+
+from bhamon_orchestra_model.database.sqlite_database_client import SqliteDatabaseClient
+
+
+logger = logging.getLogger("SqliteDatabaseAdministration")
+
+
+class SqliteDatabaseAdministration:
+	""" Administration client for a database storing data in a SQLite file. """
+
+
+	def __init__(self, database_client: SqliteDatabaseClient) -> None:
+		self._database_client = database_client
+
+
+	def initialize(self, simulate: bool = False) -> None:
+		logger.info("Initializing" + (" (simulation)" if simulate else "")) # pylint: disable = logging-not-lazy
+
+		logger.info("Creating run index")
+		if not simulate:
+			self.create_index("run", "identifier_unique", [ ("project", "ascending"), ("identifier", "ascending") ], is_unique = True)
+			self.create_index("run", "update_date", [ ("project", "ascending"), ("update_date", "descending"), ("identifier", "descending") ])
+			self.create_index("run", "status", [ ("status", "ascending") ])
+			self.create_index("run", "worker_status", [ ("worker", "ascending"), ("status", "ascending") ])
+			self.create_index("run", "job_creation_date", [ ("project", "ascending"), ("job", "ascending"), ("creation_date", "ascending") ])
+
+		logger.info("Creating job index")
+		if not simulate:
+			self.create_index("job", "identifier_unique", [ ("project", "ascending"), ("identifier", "ascending") ], is_unique = True)
+
+		logger.info("Creating schedule index")
+		if not simulate:
+			self.create_index("schedule", "identifier_unique", [ ("project", "ascending"), ("identifier", "ascending") ], is_unique = True)
+			self.create_index("schedule", "update_date", [ ("update_date", "ascending") ])
+
+		logger.info("Creating user index")
+		if not simulate:
+			self.create_index("user", "identifier_unique", [ ("identifier", "ascending") ], is_unique = True)
+
+		logger.info("Creating user authentication index")
+		if not simulate:
+			self.create_index("user_authentication", "user_type", [ ("user", "ascending"), ("type", "ascending") ])
+
+		logger.info("Creating worker index")
+		if not simulate:
+			self.create_index("worker", "identifier_unique", [ ("identifier", "ascending") ], is_unique = True)
+
+
+	def upgrade(self, simulate: bool = False) -> None:
+		raise NotImplementedError("Upgrading a SQLite database is not supported")
+
+
+	def create_index(self, table: str, identifier: str, field_collection: List[Tuple[str,str]], is_unique: bool = False) -> None:
+		self._database_client.create_index(table, identifier, field_collection, is_unique = is_unique)
+
+
+	def analyze_query(self, table: str, filter: dict, order_by: Optional[List[Tuple[str,str]]] = None) -> dict: # pylint: disable = redefined-builtin
+		""" Find which index the database uses for a query, based on its query plan """
+
+		query_plan = self._database_client.get_query_plan(table, filter, order_by)
+
+		index_identifier = None
+		for step in query_plan:
+			index_match = re.search(r"USING (?:COVERING )?INDEX \"?([^\" ]+)\"?", step)
+			if index_match is not None and index_match.group(1).startswith(table + "_"):
+				index_identifier = index_match.group(1)[ len(table) + 1 : ]
+				break
+
+		return {
+			"table": table,
+			"index": index_identifier,
+			"is_collection_scan": any(step.startswith("SCAN") and "INDEX" not in step for step in query_plan),
+		}
+
+
+	def close(self) -> None:
+		self._database_client.close()
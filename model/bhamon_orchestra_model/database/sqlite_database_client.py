@@ -0,0 +1,406 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+
+from typing import Any, Callable, Iterator, List, Optional, Tuple
+
+from bhamon_orchestra_model.database.change_notifier import ChangeNotifier
+from bhamon_orchestra_model.database.database_client import DatabaseClient, is_operator_expression
+
+
+logger = logging.getLogger("SqliteDatabaseClient")
+
+
+class SqliteDatabaseClient(DatabaseClient):
+	""" Client for a database storing data in a SQLite file, for single node deployments.
+
+	Each table stores items as json documents. Fields referenced by indexes are exposed as generated columns,
+	so that filters and sorts on them use the indexes, while other fields are read from the documents with json functions.
+	Filters which cannot be translated exactly to SQL, such as equality with a sub-document, are applied in Python instead.
+
+	The database runs in write-ahead logging mode so that readers do not block the writer, and each thread has its own connection.
+
+	"""
+
+
+	def __init__(self, database_path: str) -> None:
+		self.database_path = database_path
+
+		self._thread_local = threading.local()
+		self._lock = threading.Lock()
+		self._all_connections = []
+		self._all_tables = set()
+		self._column_cache = {}
+		self.change_notifier = ChangeNotifier()
+
+
+	def count(self, table: str, filter: dict) -> int: # pylint: disable = redefined-builtin
+		""" Return how many items are in a table, after applying a filter """
+
+		connection = self._get_connection(table)
+		condition = self._translate_filter(filter, self._get_columns(connection, table))
+
+		if condition is None:
+			return sum(1 for row_key, row in self._find_rows(connection, table, filter))
+
+		query = "SELECT COUNT(*) FROM %s WHERE %s" % (_quote_identifier(table), condition[0])
+		return connection.execute(query, condition[1]).fetchone()[0]
+
+
+	def find_many(self, # pylint: disable = too-many-arguments
+			table: str, filter: dict, # pylint: disable = redefined-builtin
+			skip: int = 0, limit: Optional[int] = None, order_by: Optional[Tuple[str,str]] = None,
+			projection: Optional[List[str]] = None) -> List[dict]:
+		""" Return a list of items from a table, after applying a filter, with options for limiting and sorting results """
+		return list(self.iter_many(table, filter, skip = skip, limit = limit, order_by = order_by, projection = projection))
+
+
+	def iter_many(self, # pylint: disable = too-many-arguments
+			table: str, filter: dict, # pylint: disable = redefined-builtin
+			skip: int = 0, limit: Optional[int] = None, order_by: Optional[Tuple[str,str]] = None,
+			projection: Optional[List[str]] = None, batch_size: int = 1000) -> Iterator[dict]:
+		""" Iterate on items from a table, with the same options as find_many, retrieving them in batches rather than all at once """
+
+		connection = self._get_connection(table)
+		for row_key, row in self._find_rows(connection, table, filter, skip = skip, limit = limit, order_by = order_by, batch_size = batch_size): # pylint: disable = unused-variable
+			yield self._apply_projection(row, projection)
+
+
+	def find_one(self, table: str, filter: dict, projection: Optional[List[str]] = None) -> Optional[dict]: # pylint: disable = redefined-builtin
+		""" Return a single item (or nothing) from a table, after applying a filter """
+		return next(iter(self.iter_many(table, filter, limit = 1, projection = projection)), None)
+
+
+	def insert_one(self, table: str, data: dict) -> dict:
+		""" Insert a new item into a table """
+		self.bulk_write(table, [ { "operation": "insert_one", "data": data } ])
+
+
+	def insert_many(self, table: str, data_collection: List[dict]) -> None:
+		""" Insert several new items into a table """
+		self.bulk_write(table, [ { "operation": "insert_one", "data": data } for data in data_collection ])
+
+
+	def update_one(self, table: str, filter: dict, data: dict) -> None: # pylint: disable = redefined-builtin
+		""" Update a single item (or nothing) from a table, after applying a filter """
+		self.bulk_write(table, [ { "operation": "update_one", "filter": filter, "data": data } ])
+
+
+	def update_many(self, table: str, filter: dict, data: dict) -> None: # pylint: disable = redefined-builtin
+		""" Update all items from a table matching a filter """
+		self.bulk_write(table, [ { "operation": "update_many", "filter": filter, "data": data } ])
+
+
+	def delete_one(self, table: str, filter: dict) -> None: # pylint: disable = redefined-builtin
+		""" Delete a single item (or nothing) from a table, after applying a filter """
+		self.bulk_write(table, [ { "operation": "delete_one", "filter": filter } ])
+
+
+	def bulk_write(self, table: str, operation_collection: List[dict]) -> None:
+		""" Apply a batch of write operations on a table, in order, stopping at the first error """
+
+		if len(operation_collection) == 0:
+			return
+
+		connection = self._get_connection(table)
+		change_count = connection.total_changes
+		connection.execute("BEGIN IMMEDIATE")
+
+		# Like other clients, operations applied before an error are kept, and listeners are notified only if items changed
+		try:
+			for operation in operation_collection:
+				self._apply_operation(connection, table, operation)
+		finally:
+			# SQLite rolls back the transaction by itself on some errors, in which case nothing is kept
+			if connection.in_transaction:
+				connection.execute("COMMIT")
+				if connection.total_changes > change_count:
+					self.change_notifier.notify(table)
+
+
+	def watch_changes(self, table_collection: List[str], callback: Callable[[str],None]) -> Optional[Callable[[],None]]:
+		""" Register a callback to call, with the table name, when items are inserted, updated or deleted through this client """
+		return self.change_notifier.add_listener(table_collection, callback)
+
+
+	def create_index(self, table: str, identifier: str, field_collection: List[Tuple[str,str]], is_unique: bool = False) -> None:
+		""" Create an index on a table, adding generated columns for the fields it references """
+
+		connection = self._get_connection(table)
+		index_name = table + "_" + identifier
+
+		if connection.execute("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = ?", (index_name,)).fetchone() is not None:
+			raise ValueError("Index '%s' already exists for table '%s'" % (identifier, table))
+
+		all_columns = self._get_columns(connection, table)
+		index_column_collection = []
+
+		for field, direction in field_collection:
+			if field not in all_columns:
+				column_definition = "%s GENERATED ALWAYS AS (json_extract(document, %s)) VIRTUAL" % (_quote_identifier(_column_prefix + field), _get_json_path(field))
+				connection.execute("ALTER TABLE %s ADD COLUMN %s" % (_quote_identifier(table), column_definition))
+			index_column_collection.append(_quote_identifier(_column_prefix + field) + (" DESC" if direction in [ "desc", "descending" ] else " ASC"))
+
+		query = "CREATE %s %s ON %s (%s)" % ("UNIQUE INDEX" if is_unique else "INDEX", _quote_identifier(index_name), _quote_identifier(table), ", ".join(index_column_collection))
+
+		try:
+			connection.execute(query)
+		except sqlite3.IntegrityError as exception:
+			raise ValueError("Duplicate key in table '%s' for index '%s'" % (table, identifier)) from exception
+
+
+	def get_query_plan(self, table: str, filter: dict, order_by: Optional[List[Tuple[str,str]]] = None) -> List[str]: # pylint: disable = redefined-builtin
+		""" Return the steps SQLite would take to find the items matching a filter, as reported by EXPLAIN QUERY PLAN """
+
+		connection = self._get_connection(table)
+		query, parameters = self._build_select_query(connection, table, filter, order_by)
+		return [ step[3] for step in connection.execute("EXPLAIN QUERY PLAN " + query, parameters) ]
+
+
+	def close(self) -> None:
+		with self._lock:
+			for connection in self._all_connections:
+				connection.close()
+			self._all_connections.clear()
+		self._thread_local = threading.local()
+
+
+	def _get_connection(self, table: str) -> sqlite3.Connection:
+		""" Return the connection for the current thread, creating the table if needed """
+
+		connection = getattr(self._thread_local, "connection", None)
+
+		if connection is None:
+			if os.path.dirname(self.database_path) != "" and not os.path.exists(os.path.dirname(self.database_path)):
+				os.makedirs(os.path.dirname(self.database_path))
+
+			connection = sqlite3.connect(self.database_path, timeout = 30, isolation_level = None, check_same_thread = False)
+			connection.execute("PRAGMA journal_mode = WAL")
+			connection.execute("PRAGMA synchronous = NORMAL")
+
+			self._thread_local.connection = connection
+			with self._lock:
+				self._all_connections.append(connection)
+
+		if table not in self._all_tables:
+			connection.execute("CREATE TABLE IF NOT EXISTS %s (row_key INTEGER PRIMARY KEY, document TEXT NOT NULL)" % _quote_identifier(table))
+			self._all_tables.add(table)
+
+		return connection
+
+
+	def _get_columns(self, connection: sqlite3.Connection, table: str) -> dict:
+		""" Return the generated columns of a table, by field, reloading them when the database schema changes """
+
+		schema_version = connection.execute("PRAGMA schema_version").fetchone()[0]
+		cache_entry = self._column_cache.get(table, None)
+
+		if cache_entry is None or cache_entry["schema_version"] != schema_version:
+			all_columns = {}
+			for column_information in connection.execute("PRAGMA table_xinfo(%s)" % _quote_identifier(table)):
+				if column_information[1].startswith(_column_prefix):
+					all_columns[column_information[1][ len(_column_prefix) : ]] = _quote_identifier(column_information[1])
+			cache_entry = { "schema_version": schema_version, "columns": all_columns }
+			self._column_cache[table] = cache_entry
+
+		return cache_entry["columns"]
+
+
+	def _find_rows(self, # pylint: disable = too-many-arguments
+			connection: sqlite3.Connection, table: str, filter: dict, # pylint: disable = redefined-builtin
+			skip: int = 0, limit: Optional[int] = None, order_by: Optional[List[Tuple[str,str]]] = None, batch_size: int = 1000) -> Iterator[Tuple[int,dict]]:
+		""" Iterate on the items matching a filter, with their row keys, filtering in SQL when possible and in Python otherwise """
+
+		if limit == 0:
+			return
+
+		query, parameters = self._build_select_query(connection, table, filter, order_by)
+		is_filtered_in_python = self._translate_filter(filter, self._get_columns(connection, table)) is None
+
+		if not is_filtered_in_python:
+			query += " LIMIT ? OFFSET ?"
+			parameters += [ limit if limit is not None else -1, skip ]
+
+		cursor = connection.execute(query, parameters)
+
+		try:
+			if is_filtered_in_python:
+				all_rows = ( (row_key, json.loads(document)) for row_key, document in _iterate_in_batches(cursor, batch_size) )
+				all_rows = [ (row_key, row) for row_key, row in all_rows if self._match_filter(row, filter) ]
+				if order_by:
+					row_keys = { id(row): row_key for row_key, row in all_rows }
+					ordered_rows = self._apply_order_by([ row for row_key, row in all_rows ], order_by, limit = (skip + limit) if limit is not None else None)
+					all_rows = [ (row_keys[id(row)], row) for row in ordered_rows ]
+				yield from all_rows[ skip : (skip + limit) if limit is not None else None ]
+
+			else:
+				for row_key, document in _iterate_in_batches(cursor, batch_size):
+					yield (row_key, json.loads(document))
+
+		finally:
+			cursor.close()
+
+
+	def _build_select_query(self, connection: sqlite3.Connection, table: str, filter: dict, order_by: Optional[List[Tuple[str,str]]]) -> Tuple[str,list]: # pylint: disable = redefined-builtin
+		""" Build the query selecting the items matching a filter, or all items if the filter cannot be translated """
+
+		all_columns = self._get_columns(connection, table)
+		condition = self._translate_filter(filter, all_columns)
+
+		query = "SELECT row_key, document FROM %s" % _quote_identifier(table)
+		parameters = []
+
+		if condition is not None:
+			query += " WHERE " + condition[0]
+			parameters += condition[1]
+
+		order_by_clause = []
+		if condition is not None and order_by:
+			for key, direction in self._normalize_order_by_expression(order_by):
+				order_by_clause.append(self._get_field_expression(key, all_columns) + (" DESC" if direction in [ "desc", "descending" ] else " ASC"))
+		order_by_clause.append("row_key ASC")
+
+		query += " ORDER BY " + ", ".join(order_by_clause)
+		return query, parameters
+
+
+	def _translate_filter(self, filter: dict, all_columns: dict) -> Optional[Tuple[str,list]]: # pylint: disable = redefined-builtin
+		""" Translate a filter to a SQL condition with its parameters, or return None if it cannot be translated exactly """
+
+		all_conditions = []
+		all_parameters = []
+
+		for key, expression in filter.items():
+			if key == "$or":
+				all_alternatives = [ self._translate_filter(alternative, all_columns) for alternative in expression ]
+				if any(alternative is None for alternative in all_alternatives):
+					return None
+				all_conditions.append("(" + " OR ".join([ "(%s)" % condition for condition, parameters in all_alternatives ] or [ "0" ]) + ")")
+				for condition, parameters in all_alternatives:
+					all_parameters += parameters
+				continue
+
+			field_expression = self._get_field_expression(key, all_columns)
+			type_expression = "json_type(document, %s)" % _get_json_path(key)
+			all_operators = expression.items() if is_operator_expression(expression) else [ ("$eq", expression) ]
+
+			for operator, argument in all_operators:
+				condition = _translate_operator(field_expression, type_expression, operator, argument)
+				if condition is None:
+					return None
+				all_conditions.append(condition[0])
+				all_parameters += condition[1]
+
+		return (" AND ".join(all_conditions) if len(all_conditions) > 0 else "1"), all_parameters
+
+
+	def _get_field_expression(self, key: str, all_columns: dict) -> str: # pylint: disable = no-self-use
+		""" Return the SQL expression for a field value, using its generated column if there is one """
+		return all_columns.get(key, None) or "json_extract(document, %s)" % _get_json_path(key)
+
+
+	def _apply_operation(self, connection: sqlite3.Connection, table: str, operation: dict) -> None:
+		""" Apply a single write operation on a table """
+
+		if operation["operation"] == "insert_one":
+			self._execute_write(connection, table, "INSERT INTO %s (document) VALUES (?)" % _quote_identifier(table), [ json.dumps(operation["data"]) ])
+			return
+
+		if operation["operation"] in [ "update_one", "update_many" ]:
+			limit = 1 if operation["operation"] == "update_one" else None
+			for row_key, row in list(self._find_rows(connection, table, operation["filter"], limit = limit)):
+				row.update(operation["data"])
+				self._execute_write(connection, table, "UPDATE %s SET document = ? WHERE row_key = ?" % _quote_identifier(table), [ json.dumps(row), row_key ])
+			return
+
+		if operation["operation"] == "delete_one":
+			for row_key, row in list(self._find_rows(connection, table, operation["filter"], limit = 1)): # pylint: disable = unused-variable
+				connection.execute("DELETE FROM %s WHERE row_key = ?" % _quote_identifier(table), [ row_key ])
+			return
+
+		raise ValueError("Unsupported operation '%s'" % operation["operation"])
+
+
+	def _execute_write(self, connection: sqlite3.Connection, table: str, query: str, parameters: list) -> None: # pylint: disable = no-self-use
+		""" Execute a write query, reporting unique index violations like other clients """
+
+		try:
+			connection.execute(query, parameters)
+		except sqlite3.IntegrityError as exception:
+			raise ValueError("Duplicate key in table '%s' (%s)" % (table, exception)) from exception
+
+
+
+_column_prefix = "field:"
+
+
+def _quote_identifier(identifier: str) -> str:
+	""" Quote a table, column or index name for use in a SQL query """
+	return "\"" + identifier.replace("\"", "\"\"") + "\""
+
+
+def _get_json_path(key: str) -> str:
+	""" Convert a dotted key to a SQL string literal for the matching json path """
+
+	if "\"" in key:
+		raise ValueError("Unsupported field '%s'" % key)
+	json_path = "$" + "".join(".\"%s\"" % key_part for key_part in key.split("."))
+	return "'" + json_path.replace("'", "''") + "'"
+
+
+def _translate_operator(field_expression: str, type_expression: str, operator: str, argument: Any) -> Optional[Tuple[str,list]]: # pylint: disable = too-many-return-statements
+	""" Translate a filter operator to a SQL condition with the same semantics as DatabaseClient._match_filter, or return None if it cannot be """
+
+	if operator == "$eq":
+		if argument is None:
+			return "%s = 'null'" % type_expression, []
+		if isinstance(argument, (dict, list)):
+			return None
+		return "%s = ?" % field_expression, [ argument ]
+
+	if operator == "$ne":
+		if argument is None:
+			return "%s IS NOT NULL" % field_expression, []
+		if isinstance(argument, (dict, list)):
+			return None
+		return "(%s IS NULL OR %s != ?)" % (field_expression, field_expression), [ argument ]
+
+	if operator == "$in":
+		if any(isinstance(value, (dict, list)) for value in argument):
+			return None
+		all_values = [ value for value in argument if value is not None ]
+		all_conditions = []
+		if len(all_values) > 0:
+			all_conditions.append("%s IN (%s)" % (field_expression, ", ".join("?" * len(all_values))))
+		if None in argument:
+			all_conditions.append("%s IS NULL" % field_expression)
+		return "(" + (" OR ".join(all_conditions) or "0") + ")", all_values
+
+	if operator == "$exists":
+		return "%s IS %s" % (type_expression, "NOT NULL" if argument else "NULL"), []
+
+	if operator in [ "$lt", "$lte", "$gt", "$gte" ]:
+		sql_operator = { "$lt": "<", "$lte": "<=", "$gt": ">", "$gte": ">=" }[operator]
+
+		# Values of different types are never compared, as in Python
+		if argument is None:
+			return "0", []
+		if isinstance(argument, str):
+			return "(%s = 'text' AND %s %s ?)" % (type_expression, field_expression, sql_operator), [ argument ]
+		if isinstance(argument, (int, float)):
+			return "(%s IN ('integer', 'real', 'true', 'false') AND %s %s ?)" % (type_expression, field_expression, sql_operator), [ argument ]
+		return None
+
+	raise ValueError("Unsupported filter operator '%s'" % operator)
+
+
+def _iterate_in_batches(cursor: sqlite3.Cursor, batch_size: int) -> Iterator[tuple]:
+	""" Iterate on the results of a query, fetching them in batches """
+
+	while True:
+		all_results = cursor.fetchmany(batch_size)
+		if len(all_results) == 0:
+			break
+		yield from all_results
@@ -1,3 +1,4 @@
+import datetime
 import logging
 
 from typing import List, Optional, Tuple
@@ -38,41 +39,62 @@ class JobProvider:
 	def create_or_update(self, # pylint: disable = too-many-arguments
 			job_identifier: str, project: str, display_name: str, description: str,
 			workspace: str, steps: list, parameters: list, properties: dict) -> dict:
+		job_definition = {
+			"identifier": job_identifier,
+			"display_name": display_name,
+			"description": description,
+			"workspace": workspace,
+			"steps": steps,
+			"parameters": parameters,
+			"properties": properties,
+		}
+
+		job, operation = self._create_or_update_operation(project, self.get(project, job_identifier), job_definition, self.date_time_provider.now())
+		self.database_client.bulk_write(self.table, [ operation ])
+		return job
+
+
+	def create_or_update_many(self, project: str, job_collection: List[dict]) -> List[dict]:
 		now = self.date_time_provider.now()
-		job = self.get(project, job_identifier)
+		all_existing_jobs = { job["identifier"]: job for job in self.database_client.find_many(self.table, { "project": project }) }
+		operation_collection = []
+		result_collection = []
+
+		for job_definition in job_collection:
+			job, operation = self._create_or_update_operation(project, all_existing_jobs.get(job_definition["identifier"]), job_definition, now)
+			operation_collection.append(operation)
+			result_collection.append(job)
+
+		self.database_client.bulk_write(self.table, operation_collection)
+		return result_collection
+
+
+	def _create_or_update_operation(self, project: str, job: Optional[dict], job_definition: dict, now: datetime.datetime) -> Tuple[dict,dict]:
+		""" Return the job record and the write operation to create it, or to update it if it already exists """
+
+		update_data = {
+			"display_name": job_definition["display_name"],
+			"description": job_definition["description"],
+			"workspace": job_definition["workspace"],
+			"steps": job_definition["steps"],
+			"parameters": job_definition["parameters"],
+			"properties": job_definition["properties"],
+			"update_date": self.date_time_provider.serialize(now),
+		}
 
 		if job is None:
 			job = {
 				"project": project,
-				"identifier": job_identifier,
-				"display_name": display_name,
-				"description": description,
-				"workspace": workspace,
-				"steps": steps,
-				"parameters": parameters,
-				"properties": properties,
+				"identifier": job_definition["identifier"],
+				**update_data,
 				"is_enabled": True,
 				"creation_date": self.date_time_provider.serialize(now),
-				"update_date": self.date_time_provider.serialize(now),
-			}
-
-			self.database_client.insert_one(self.table, job)
-
-		else:
-			update_data = {
-				"display_name": display_name,
-				"description": description,
-				"workspace": workspace,
-				"steps": steps,
-				"parameters": parameters,
-				"properties": properties,
-				"update_date": self.date_time_provider.serialize(now),
 			}
 
-			job.update(update_data)
-			self.database_client.update_one(self.table, { "project": project, "identifier": job_identifier }, update_data)
+			return (job, { "operation": "insert_one", "data": job })
 
-		return job
+		job.update(update_data)
+		return (job, { "operation": "update_one", "filter": { "project": project, "identifier": job["identifier"] }, "data": update_data })
 
 
 	def update_status(self, job: dict, is_enabled: Optional[bool] = None) -> None:
@@ -91,3 +113,8 @@ class JobProvider:
 
 	def delete(self, project: str, job_identifier: str) -> None:
 		self.database_client.delete_one(self.table, { "project": project, "identifier": job_identifier })
+
+
+	def delete_many(self, project: str, job_identifier_collection: List[str]) -> None:
+		operation_collection = [ { "operation": "delete_one", "filter": { "project": project, "identifier": job_identifier } } for job_identifier in job_identifier_collection ]
+		self.database_client.bulk_write(self.table, operation_collection)
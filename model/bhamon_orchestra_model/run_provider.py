@@ -1,16 +1,16 @@
-import io
+import base64
 import json
 import logging
 import os
 import time
 import uuid
-import zipfile
 
-from typing import List, Optional, Tuple
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, Union
 
 from bhamon_orchestra_model.database.database_client import DatabaseClient
 from bhamon_orchestra_model.database.file_storage import FileStorage
 from bhamon_orchestra_model.date_time_provider import DateTimeProvider
+from bhamon_orchestra_model.zip_stream_writer import ZipStreamWriter
 
 
 logger = logging.getLogger("RunProvider")
@@ -25,59 +25,219 @@ class RunProvider:
 		self.date_time_provider = date_time_provider
 		self.table = "run"
 
+		self.public_fields = [
+			"identifier", "project", "job", "worker", "parameters", "source", "priority", "status",
+			"start_date", "completion_date", "should_cancel", "should_abort", "creation_date", "update_date",
+		]
 
-	def count(self, project: Optional[str] = None, job: Optional[str] = None, worker: Optional[str] = None, status: Optional[str] = None) -> int:
-		filter = { "project": project, "job": job, "worker": worker, "status": status } # pylint: disable = redefined-builtin
-		filter = { key: value for key, value in filter.items() if value is not None }
+
+	def count(self, # pylint: disable = too-many-arguments
+			project: Optional[str] = None, job: Optional[str] = None, worker: Optional[str] = None,
+			status: Optional[Union[str,List[str]]] = None, is_assigned: Optional[bool] = None) -> int:
+		filter = self._build_filter(project, job, worker, status, is_assigned) # pylint: disable = redefined-builtin
 		return self.database_client.count(self.table, filter)
 
 
 	def get_list(self, # pylint: disable = too-many-arguments
-			project: Optional[str] = None, job: Optional[str] = None, worker: Optional[str] = None, status: Optional[str] = None,
-			skip: int = 0, limit: Optional[int] = None, order_by: Optional[Tuple[str,str]] = None) -> List[dict]:
-		filter = { "project": project, "job": job, "worker": worker, "status": status } # pylint: disable = redefined-builtin
-		filter = { key: value for key, value in filter.items() if value is not None }
-		run_collection = self.database_client.find_many(self.table, filter, skip = skip, limit = limit, order_by = order_by)
+			project: Optional[str] = None, job: Optional[str] = None, worker: Optional[str] = None,
+			status: Optional[Union[str,List[str]]] = None, is_assigned: Optional[bool] = None,
+			skip: int = 0, limit: Optional[int] = None, order_by: Optional[Tuple[str,str]] = None, after: Optional[str] = None) -> List[dict]:
+		""" Return a list of runs, after applying filters, with options for limiting and sorting results.
+
+		When sorting by update date, results can be paginated by passing as the after argument
+		the cursor of the last run from the previous page, which seeks to the following runs rather than skipping them.
+
+		"""
+
+		filter = self._build_filter(project, job, worker, status, is_assigned) # pylint: disable = redefined-builtin
+		order_by = self._complete_order_by(order_by)
+		if after is not None:
+			filter.update(self._build_cursor_filter(order_by, after))
+		run_collection = self.database_client.find_many(self.table, filter, skip = skip, limit = limit, order_by = order_by, projection = self.public_fields)
 		return [ self.convert_to_public(run) for run in run_collection ]
 
 
 	def get_list_as_documents(self, # pylint: disable = too-many-arguments
-			project: Optional[str] = None, job: Optional[str] = None, worker: Optional[str] = None, status: Optional[str] = None,
-			skip: int = 0, limit: Optional[int] = None, order_by: Optional[Tuple[str,str]] = None) -> List[dict]:
-		filter = { "project": project, "job": job, "worker": worker, "status": status } # pylint: disable = redefined-builtin
+			project: Optional[str] = None, job: Optional[str] = None, worker: Optional[str] = None,
+			status: Optional[Union[str,List[str]]] = None, is_assigned: Optional[bool] = None,
+			skip: int = 0, limit: Optional[int] = None, order_by: Optional[Tuple[str,str]] = None, projection: Optional[List[str]] = None) -> List[dict]:
+		filter = self._build_filter(project, job, worker, status, is_assigned) # pylint: disable = redefined-builtin
+		return self.database_client.find_many(self.table, filter, skip = skip, limit = limit, order_by = order_by, projection = projection)
+
+
+	def iter_list_as_documents(self, # pylint: disable = too-many-arguments
+			project: Optional[str] = None, job: Optional[str] = None, worker: Optional[str] = None,
+			status: Optional[Union[str,List[str]]] = None, is_assigned: Optional[bool] = None,
+			skip: int = 0, limit: Optional[int] = None, order_by: Optional[Tuple[str,str]] = None, projection: Optional[List[str]] = None) -> Iterator[dict]:
+		filter = self._build_filter(project, job, worker, status, is_assigned) # pylint: disable = redefined-builtin
+		return self.database_client.iter_many(self.table, filter, skip = skip, limit = limit, order_by = order_by, projection = projection)
+
+
+	def get_list_created_before(self, # pylint: disable = too-many-arguments
+			project: str, job: str, creation_dates: List[Tuple[List[str],str]],
+			limit: Optional[int] = None, projection: Optional[List[str]] = None) -> List[dict]:
+		""" Return the runs created before a date depending on their status, given as pairs of status collection and date, oldest first """
+
+		filter = self._build_filter(project, job, None, None, None) # pylint: disable = redefined-builtin
+		filter["$or"] = [ { "status": { "$in": status_collection }, "creation_date": { "$lt": creation_date } } for status_collection, creation_date in creation_dates ]
+		order_by = [ ("creation_date", "ascending") ]
+		return self.database_client.find_many(self.table, filter, limit = limit, order_by = order_by, projection = projection)
+
+
+	def get_queue_statistics(self, project: Optional[str] = None) -> dict:
+		""" Return the depth of the queue of pending runs, by priority, with the counts of assigned and running runs """
+
+		all_pending_runs = self.get_list_as_documents(project = project, status = "pending", projection = [ "priority", "worker", "creation_date" ])
+		all_queued_runs = [ run for run in all_pending_runs if run.get("worker", None) is None ]
+
+		queued_run_count_by_priority = {}
+		for run in all_queued_runs:
+			priority = str(run.get("priority", 0))
+			queued_run_count_by_priority[priority] = queued_run_count_by_priority.get(priority, 0) + 1
+
+		return {
+			"queued_run_count": len(all_queued_runs),
+			"queued_run_count_by_priority": queued_run_count_by_priority,
+			"oldest_queued_run_creation_date": min((run["creation_date"] for run in all_queued_runs), default = None),
+			"assigned_run_count": len(all_pending_runs) - len(all_queued_runs),
+			"running_run_count": self.count(project = project, status = "running"),
+		}
+
+
+	def _build_filter(self, # pylint: disable = no-self-use, too-many-arguments
+			project: Optional[str], job: Optional[str], worker: Optional[str],
+			status: Optional[Union[str,List[str]]], is_assigned: Optional[bool]) -> dict:
+		""" Build a database filter from the criteria to apply, ignoring those which are not set """
+
+		filter = { "project": project, "job": job, "worker": worker } # pylint: disable = redefined-builtin
 		filter = { key: value for key, value in filter.items() if value is not None }
-		return self.database_client.find_many(self.table, filter, skip = skip, limit = limit, order_by = order_by)
+
+		if isinstance(status, list):
+			filter["status"] = { "$in": status }
+		elif status is not None:
+			filter["status"] = status
+
+		if is_assigned is not None and "worker" not in filter:
+			filter["worker"] = { "$ne": None } if is_assigned else None
+
+		return filter
+
+
+	def get_cursor(self, run: dict) -> str: # pylint: disable = no-self-use
+		""" Return an opaque cursor for a run, to retrieve the runs following it with get_list """
+		cursor_data = json.dumps([ run["update_date"], run["identifier"] ])
+		return base64.urlsafe_b64encode(cursor_data.encode("utf-8")).decode("ascii")
+
+
+	def _complete_order_by(self, order_by: Optional[List[Tuple[str,str]]]) -> Optional[List[Tuple[str,str]]]: # pylint: disable = no-self-use
+		""" Add the identifier to an order-by expression on the update date, so that runs updated at the same time have a stable order """
+
+		if order_by is None or len(order_by) != 1 or order_by[0][0] != "update_date":
+			return order_by
+
+		direction = order_by[0][1] if len(order_by[0]) > 1 else "ascending"
+		return [ ("update_date", direction), ("identifier", direction) ]
+
+
+	def _build_cursor_filter(self, order_by: Optional[List[Tuple[str,str]]], cursor: str) -> dict: # pylint: disable = no-self-use
+		""" Build a database filter selecting the runs following a cursor, according to the sort order """
+
+		all_directions = [ (item[1] if len(item) > 1 else "ascending") in [ "desc", "descending" ] for item in order_by or [] ]
+		if [ item[0] for item in order_by or [] ] != [ "update_date", "identifier" ] or all_directions[0] != all_directions[1]:
+			raise ValueError("Cursor requires ordering by update date (OrderBy: '%s')" % (order_by,))
+
+		try:
+			update_date, identifier = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8"))
+		except (TypeError, ValueError) as exception:
+			raise ValueError("Invalid cursor '%s'" % cursor) from exception
+
+		is_descending = all_directions[0]
+		bound_operator = "$lte" if is_descending else "$gte"
+		strict_operator = "$lt" if is_descending else "$gt"
+
+		return {
+			"update_date": { bound_operator: update_date },
+			"$or": [ { "update_date": { strict_operator: update_date } }, { "identifier": { strict_operator: identifier } } ],
+		}
+
+
+	def watch_changes(self, callback: Callable[[str],None]) -> Optional[Callable[[],None]]:
+		""" Register a callback for changes to runs, returning a function to stop watching, or None if the database does not support it """
+		return self.database_client.watch_changes([ self.table ], callback)
 
 
 	def get(self, project: str, run_identifier: str) -> Optional[dict]:
-		run = self.database_client.find_one(self.table, { "project": project, "identifier": run_identifier })
+		run = self.database_client.find_one(self.table, { "project": project, "identifier": run_identifier }, projection = self.public_fields)
 		return self.convert_to_public(run) if run is not None else None
 
 
-	def create(self, project: str, job: str, parameters: dict, source: dict) -> dict:
+	def create(self, project: str, job: str, parameters: dict, source: dict, priority: int = 0) -> dict: # pylint: disable = too-many-arguments
+		""" Create a pending run, runs with a higher priority being dispatched first """
+		run = self._create_record(project, job, parameters, source, priority)
+		self.database_client.insert_one(self.table, run)
+		return run
+
+
+	def create_many(self, run_request_collection: List[dict]) -> List[dict]:
+		""" Create several runs at once, from requests with the same arguments as create """
+
+		run_collection = [ self._create_record(**run_request) for run_request in run_request_collection ]
+		self.database_client.insert_many(self.table, run_collection)
+		return run_collection
+
+
+	def _create_record(self, project: str, job: str, parameters: dict, source: dict, priority: int = 0) -> dict: # pylint: disable = too-many-arguments
 		now = self.date_time_provider.now()
 
-		run = {
+		if not isinstance(priority, int) or isinstance(priority, bool):
+			raise ValueError("Run priority must be an integer (Value: '%s')" % (priority,))
+
+		return {
 			"identifier": str(uuid.uuid4()),
 			"project": project,
 			"job": job,
 			"parameters": parameters,
 			"source": source,
+			"priority": priority,
 			"status": "pending",
 			"worker": None,
 			"creation_date": self.date_time_provider.serialize(now),
 			"update_date": self.date_time_provider.serialize(now),
 		}
 
-		self.database_client.insert_one(self.table, run)
-		return run
-
 
 	def update_status(self, # pylint: disable = too-many-arguments
 			run: dict, worker: Optional[str] = None, status: Optional[str] = None,
 			start_date: Optional[str] = None, completion_date: Optional[str] = None,
 			should_cancel: Optional[bool] = None, should_abort: Optional[bool] = None) -> None:
 
+		update_data = self._build_status_update(worker, status, start_date, completion_date, should_cancel, should_abort)
+
+		run.update(update_data)
+		self.database_client.update_one(self.table, { "project": run["project"], "identifier": run["identifier"] }, update_data)
+
+
+	def update_status_many(self, # pylint: disable = too-many-arguments
+			run_collection: List[dict], worker: Optional[str] = None, status: Optional[str] = None,
+			start_date: Optional[str] = None, completion_date: Optional[str] = None,
+			should_cancel: Optional[bool] = None, should_abort: Optional[bool] = None) -> None:
+		""" Apply the same status update to several runs at once """
+
+		update_data = self._build_status_update(worker, status, start_date, completion_date, should_cancel, should_abort)
+
+		operation_collection = []
+		for run in run_collection:
+			run.update(update_data)
+			operation_collection.append({ "operation": "update_one", "filter": { "project": run["project"], "identifier": run["identifier"] }, "data": update_data })
+
+		self.database_client.bulk_write(self.table, operation_collection)
+
+
+	def _build_status_update(self, # pylint: disable = too-many-arguments
+			worker: Optional[str], status: Optional[str], start_date: Optional[str], completion_date: Optional[str],
+			should_cancel: Optional[bool], should_abort: Optional[bool]) -> dict:
+		""" Build the data for a status update, with only the fields which are set and the update date """
+
 		now = self.date_time_provider.now()
 
 		update_data = {
@@ -90,18 +250,15 @@ class RunProvider:
 			"update_date": self.date_time_provider.serialize(now),
 		}
 
-		update_data = { key: value for key, value in update_data.items() if value is not None }
-
-		run.update(update_data)
-		self.database_client.update_one(self.table, { "project": run["project"], "identifier": run["identifier"] }, update_data)
+		return { key: value for key, value in update_data.items() if value is not None }
 
 
 	def get_all_steps(self, project: str, run_identifier: str) -> List[dict]:
-		return self.database_client.find_one(self.table, { "project": project, "identifier": run_identifier }).get("steps", [])
+		return self.database_client.find_one(self.table, { "project": project, "identifier": run_identifier }, projection = [ "steps" ]).get("steps", [])
 
 
 	def get_step(self, project: str, run_identifier: str, step_index: int) -> dict:
-		return self.database_client.find_one(self.table, { "project": project, "identifier": run_identifier })["steps"][step_index]
+		return self.database_client.find_one(self.table, { "project": project, "identifier": run_identifier }, projection = [ "steps" ])["steps"][step_index]
 
 
 	def update_steps(self, run: dict, step_collection: List[dict]) -> None:
@@ -118,7 +275,11 @@ class RunProvider:
 
 	def _get_step_log_path(self, project: str, run_identifier: str, step_index: int) -> str:
 		run_step = self.get_step(project, run_identifier, step_index)
-		return os.path.join("projects", project, "runs", run_identifier, "step_{index}_{name}.log".format(**run_step))
+		return self._format_step_log_path(project, run_identifier, run_step)
+
+
+	def _format_step_log_path(self, project: str, run_identifier: str, step: dict) -> str: # pylint: disable = no-self-use
+		return os.path.join("projects", project, "runs", run_identifier, "step_{index}_{name}.log".format(**step))
 
 
 	def has_step_log(self, project: str, run_identifier: str, step_index: int) -> bool:
@@ -135,19 +296,107 @@ class RunProvider:
 
 
 	def get_step_log_size(self, project: str, run_identifier: str, step_index: int) -> int:
-		return self.file_storage.get_universal_size(self._get_step_log_path(project, run_identifier, step_index))
+		return self.file_storage.get_size(self._get_step_log_path(project, run_identifier, step_index))
 
 
 	def append_step_log(self, project: str, run_identifier: str, step_index: int, log_text: str) -> None:
 		self.file_storage.append_unsafe(self._get_step_log_path(project, run_identifier, step_index), log_text)
 
 
+	def flush_step_logs(self, project: str, run_identifier: str) -> None:
+		""" Write any buffered log data for a run, once it has completed """
+		self.file_storage.flush(os.path.join("projects", project, "runs", run_identifier))
+
+
+	def archive_step_logs(self, project: str, run_identifier: str, step_collection: Optional[List[dict]] = None) -> int:
+		""" Compress the logs for a run, once it has completed, and return how many were archived, without accessing the database if the steps are provided """
+
+		if step_collection is None:
+			step_collection = self.get_all_steps(project, run_identifier)
+
+		self.flush_step_logs(project, run_identifier)
+		archived_count = 0
+
+		for step in step_collection:
+			log_path = self._format_step_log_path(project, run_identifier, step)
+			if self.file_storage.exists(log_path) and not self.file_storage.is_archived(log_path):
+				self.file_storage.archive(log_path)
+				archived_count += 1
+
+		return archived_count
+
+
+	def get_log_size(self, project: str, run_identifier: str) -> int:
+		""" Return the total size of the logs for a run, in bytes """
+
+		log_size = 0
+		for step in self.get_all_steps(project, run_identifier):
+			log_path = self._format_step_log_path(project, run_identifier, step)
+			if self.file_storage.exists(log_path):
+				log_size += self.file_storage.get_size(log_path)
+		return log_size
+
+
 	def delete_step_log(self, project: str, run_identifier: str, step_index: int) -> None:
 		self.file_storage.delete(self._get_step_log_path(project, run_identifier, step_index))
 
 
+	def delete(self, project: str, run_identifier: str) -> int:
+		""" Delete a completed run with its logs, and return the size of the deleted logs in bytes """
+
+		run = self.database_client.find_one(self.table, { "project": project, "identifier": run_identifier }, projection = [ "identifier", "status", "steps" ])
+		if run is None:
+			raise ValueError("Run '%s' does not exist" % run_identifier)
+		if run["status"] in [ "pending", "running" ]:
+			raise ValueError("Run '%s' is %s" % (run_identifier, run["status"]))
+
+		# Delete the logs first, so that logs are not left behind if the deletion is interrupted
+		log_size = self._delete_logs(project, run)
+		self.database_client.delete_one(self.table, { "project": project, "identifier": run_identifier })
+		return log_size
+
+
+	def delete_many(self, project: str, run_identifier_collection: List[str]) -> Dict[str,int]:
+		""" Delete completed runs with their logs, the runs in a single write, and return the size of the deleted logs in bytes for each deleted run.
+
+		Runs which cannot be deleted are skipped, so that they do not prevent deleting the others.
+
+		"""
+
+		all_runs = self.database_client.find_many(self.table, { "project": project, "identifier": { "$in": run_identifier_collection } }, projection = [ "identifier", "status", "steps" ])
+		all_log_sizes = {}
+
+		for run in all_runs:
+			if run["status"] in [ "pending", "running" ]:
+				logger.warning("Skipping deletion for run '%s' (Status: '%s')", run["identifier"], run["status"])
+				continue
+
+			try:
+				all_log_sizes[run["identifier"]] = self._delete_logs(project, run)
+			except Exception: # pylint: disable = broad-except
+				logger.error("Failed to delete logs for run '%s'", run["identifier"], exc_info = True)
+
+		operation_collection = [ { "operation": "delete_one", "filter": { "project": project, "identifier": run_identifier } } for run_identifier in all_log_sizes ]
+		self.database_client.bulk_write(self.table, operation_collection)
+		return all_log_sizes
+
+
+	def _delete_logs(self, project: str, run: dict) -> int:
+		""" Delete the step logs for a run, and return their size in bytes """
+
+		log_size = 0
+
+		for step in run.get("steps", []):
+			log_path = self._format_step_log_path(project, run["identifier"], step)
+			if self.file_storage.exists(log_path):
+				log_size += self.file_storage.get_size(log_path)
+				self.file_storage.delete(log_path)
+
+		return log_size
+
+
 	def get_results(self, project: str, run_identifier: str) -> dict:
-		return self.database_client.find_one(self.table, { "project": project, "identifier": run_identifier }).get("results", {})
+		return self.database_client.find_one(self.table, { "project": project, "identifier": run_identifier }, projection = [ "results" ]).get("results", {})
 
 
 	def set_results(self, run: dict, results: dict) -> None:
@@ -162,32 +411,32 @@ class RunProvider:
 		self.database_client.update_one(self.table, { "project": run["project"], "identifier": run["identifier"] }, update_data)
 
 
-	def get_archive(self, project: str, run_identifier: str) -> dict:
+	def get_archive(self, project: str, run_identifier: str, chunk_size: int = 1024 * 1024) -> Optional[dict]:
+		""" Return a zip archive with the run record and its logs, as a stream of chunks produced while it is iterated """
+
 		run = self.database_client.find_one(self.table, { "project": project, "identifier": run_identifier })
 		if run is None:
 			return None
 
 		file_name = run_identifier + ".zip"
+		return { "file_name": file_name, "data": self._generate_archive(run, chunk_size), "type": "zip" }
+
+
+	def _generate_archive(self, run: dict, chunk_size: int) -> Iterator[bytes]:
 		now = time.gmtime()
+		archive_writer = ZipStreamWriter()
 
-		with io.BytesIO() as file_object:
-			with zipfile.ZipFile(file_object, mode = "w", compression = zipfile.ZIP_DEFLATED) as archive:
-				entry_info = zipfile.ZipInfo("run.json", now[0:6])
-				entry_info.external_attr = 0o644 << 16
-				archive.writestr(entry_info, json.dumps(run, indent = 4))
-				for step in run.get("steps", []):
-					log_path = self._get_step_log_path(project, run_identifier, step["index"])
-					entry_info = zipfile.ZipInfo(os.path.basename(log_path), now[0:6])
-					entry_info.external_attr = 0o644 << 16
-					archive.writestr(entry_info, self.file_storage.load_or_default(log_path, ""))
+		run_data = json.dumps(run, indent = 4).encode("utf-8")
+		yield from archive_writer.write_entry("run.json", [ run_data ], now[0:6], size_hint = len(run_data))
 
-			return { "file_name": file_name, "data": file_object.getvalue(), "type": "zip" }
+		for step in run.get("steps", []):
+			log_path = self._format_step_log_path(run["project"], run["identifier"], step)
+			log_size = self.file_storage.get_size(log_path) if self.file_storage.exists(log_path) else 0
+			log_data = (chunk.encode("utf-8") for chunk in self.file_storage.iter_chunks(log_path, chunk_size)) if log_size > 0 else []
+			yield from archive_writer.write_entry(os.path.basename(log_path), log_data, now[0:6], size_hint = log_size)
 
+		yield from archive_writer.finish()
 
-	def convert_to_public(self, run: dict) -> dict: # pylint: disable = no-self-use
-		keys_to_return = [
-			"identifier", "project", "job", "worker", "parameters", "source", "status",
-			"start_date", "completion_date", "should_cancel", "should_abort", "creation_date", "update_date",
-		]
 
-		return { key: value for key, value in run.items() if key in keys_to_return }
+	def convert_to_public(self, run: dict) -> dict:
+		return { key: value for key, value in run.items() if key in self.public_fields }
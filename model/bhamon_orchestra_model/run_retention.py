@@ -0,0 +1,145 @@
+import datetime
+import logging
+import time
+
+from typing import Dict, List, Optional, Tuple
+
+from bhamon_orchestra_model.date_time_provider import DateTimeProvider
+from bhamon_orchestra_model.job_provider import JobProvider
+from bhamon_orchestra_model.run_provider import RunProvider
+
+
+logger = logging.getLogger("RunRetention")
+
+
+failure_status_collection = [ "failed", "exception" ]
+other_completed_status_collection = [ "succeeded", "aborted", "cancelled" ]
+
+
+class RunRetention:
+	""" Engine deleting completed runs and their logs, according to retention policies.
+
+	A policy applies to the jobs of a project, to a single job, or to all jobs when it sets neither project nor job,
+	and the most specific policy applies for each job. A policy can set:
+	keep_count, the number of most recent completed runs to always keep;
+	maximum_age_days, the age after which completed runs are deleted, unless kept by keep_count;
+	failure_maximum_age_days, the same for runs which failed or raised an exception, to keep them longer.
+	Without any age, runs beyond keep_count are deleted whatever their age, and without either, no run is deleted.
+
+	Runs are deleted in bounded batches, oldest first for each job, so that collecting can run incrementally.
+	The run records for a batch are deleted in a single write for each project, and a run which fails to be deleted
+	is skipped until the next batch rather than preventing the others from being deleted.
+	Runs for jobs which were removed from the configuration are not collected.
+
+	"""
+
+
+	def __init__(self, job_provider: JobProvider, run_provider: RunProvider,
+			date_time_provider: DateTimeProvider, policy_collection: List[dict]) -> None:
+		self._job_provider = job_provider
+		self._run_provider = run_provider
+		self._date_time_provider = date_time_provider
+		self.policy_collection = policy_collection
+
+		self.deleted_run_count = 0
+		self.deleted_log_size = 0
+		self.last_collect_duration = None
+
+
+	def get_statistics(self) -> dict:
+		""" Return metrics about deleted runs and reclaimed log storage """
+		return { "deleted_run_count": self.deleted_run_count, "deleted_log_size": self.deleted_log_size, "last_collect_duration": self.last_collect_duration }
+
+
+	def find_policy(self, project: str, job: str) -> Optional[dict]:
+		""" Return the most specific policy for a job, if any """
+
+		matching_policies = [ policy for policy in self.policy_collection
+			if policy.get("project", None) in [ None, project ] and policy.get("job", None) in [ None, job ] ]
+		if len(matching_policies) == 0:
+			return None
+		return max(matching_policies, key = lambda policy: (policy.get("project", None) is not None, policy.get("job", None) is not None))
+
+
+	def collect(self, batch_size: Optional[int] = 100, simulate: bool = False) -> dict:
+		""" Delete up to batch_size expired runs, or only list them when simulating, and return what was collected """
+
+		start_time = time.perf_counter()
+		expired_run_collection = []
+
+		for job in self._job_provider.get_list():
+			policy = self.find_policy(job["project"], job["identifier"])
+			if policy is None:
+				continue
+
+			limit = (batch_size - len(expired_run_collection)) if batch_size is not None else None
+			expired_run_collection += self._find_expired_runs(job["project"], job["identifier"], policy, limit)
+
+			if batch_size is not None and len(expired_run_collection) >= batch_size:
+				break
+
+		if simulate:
+			all_log_sizes = { (run["project"], run["identifier"]): self._run_provider.get_log_size(run["project"], run["identifier"]) for run in expired_run_collection }
+		else:
+			all_log_sizes = self._delete_runs(expired_run_collection)
+			self.last_collect_duration = time.perf_counter() - start_time
+
+		run_collection = [ { "project": run["project"], "job": run["job"], "identifier": run["identifier"], "log_size": all_log_sizes[(run["project"], run["identifier"])] }
+			for run in expired_run_collection if (run["project"], run["identifier"]) in all_log_sizes ]
+
+		return {
+			"runs": run_collection,
+			"run_count": len(run_collection),
+			"log_size": sum(run["log_size"] for run in run_collection),
+			# Without any run deleted, the next batch would fail on the same runs
+			"is_complete": batch_size is None or len(expired_run_collection) < batch_size or len(run_collection) == 0,
+		}
+
+
+	def _delete_runs(self, run_collection: List[dict]) -> Dict[Tuple[str,str],int]:
+		""" Delete runs with a single write for each project, and return the size of the deleted logs for each deleted run """
+
+		all_run_identifiers_by_project = {}
+		for run in run_collection:
+			logger.debug("Deleting run %s %s", run["project"], run["identifier"])
+			all_run_identifiers_by_project.setdefault(run["project"], []).append(run["identifier"])
+
+		all_log_sizes = {}
+		for project, run_identifier_collection in all_run_identifiers_by_project.items():
+			for run_identifier, log_size in self._run_provider.delete_many(project, run_identifier_collection).items():
+				all_log_sizes[(project, run_identifier)] = log_size
+
+		self.deleted_run_count += len(all_log_sizes)
+		self.deleted_log_size += sum(all_log_sizes.values())
+
+		return all_log_sizes
+
+
+	def _find_expired_runs(self, project: str, job: str, policy: dict, limit: Optional[int]) -> List[dict]:
+		""" Find the completed runs for a job which its policy does not keep anymore, oldest first """
+
+		keep_date = None
+		if policy.get("keep_count", None):
+			kept_runs = self._run_provider.get_list_as_documents(project = project, job = job, status = failure_status_collection + other_completed_status_collection,
+				skip = policy["keep_count"] - 1, limit = 1, order_by = [ ("creation_date", "descending") ], projection = [ "creation_date" ])
+			if len(kept_runs) == 0:
+				return []
+			keep_date = kept_runs[0]["creation_date"]
+
+		now = self._date_time_provider.now()
+		maximum_age = policy.get("maximum_age_days", None)
+		failure_maximum_age = policy.get("failure_maximum_age_days", maximum_age)
+		status_groups = [ (other_completed_status_collection, maximum_age), (failure_status_collection, failure_maximum_age) ]
+		creation_dates = []
+
+		for status_collection, maximum_age_days in status_groups:
+			all_dates = [ keep_date ] if keep_date is not None else []
+			if maximum_age_days is not None:
+				all_dates.append(self._date_time_provider.serialize(now - datetime.timedelta(days = maximum_age_days)))
+			if len(all_dates) > 0:
+				creation_dates.append((status_collection, min(all_dates)))
+
+		if len(creation_dates) == 0:
+			return []
+
+		return self._run_provider.get_list_created_before(project, job, creation_dates, limit = limit, projection = [ "project", "job", "identifier", "creation_date" ])
@@ -1,6 +1,7 @@
+import datetime
 import logging
 
-from typing import List, Optional, Tuple
+from typing import Callable, List, Optional, Tuple
 
 from bhamon_orchestra_model.database.database_client import DatabaseClient
 from bhamon_orchestra_model.date_time_provider import DateTimeProvider
@@ -25,51 +26,94 @@ class ScheduleProvider:
 
 
 	def get_list(self, # pylint: disable = too-many-arguments
-			project: Optional[str] = None, job: Optional[str] = None,
+			project: Optional[str] = None, job: Optional[str] = None, updated_since: Optional[str] = None,
 			skip: int = 0, limit: Optional[int] = None, order_by: Optional[Tuple[str,str]] = None) -> List[dict]:
+		""" Return a list of schedules, after applying filters, including only those updated at or after a date if updated_since is set """
+
 		filter = { "project": project, "job": job } # pylint: disable = redefined-builtin
 		filter = { key: value for key, value in filter.items() if value is not None }
+
+		if updated_since is not None:
+			filter["update_date"] = { "$gte": updated_since }
+
 		return self.database_client.find_many(self.table, filter, skip = skip, limit = limit, order_by = order_by)
 
 
+	def watch_changes(self, callback: Callable[[str],None]) -> Optional[Callable[[],None]]:
+		""" Register a callback for changes to schedules, returning a function to stop watching, or None if the database does not support it """
+		return self.database_client.watch_changes([ self.table ], callback)
+
+
 	def get(self, project: str, schedule_identifier: str) -> Optional[dict]:
 		return self.database_client.find_one(self.table, { "project": project, "identifier": schedule_identifier })
 
 
 	def create_or_update(self, # pylint: disable = too-many-arguments
-			schedule_identifier: str, project: str, display_name: str, job: str, parameters: dict, expression: str) -> dict:
+			schedule_identifier: str, project: str, display_name: str, job: str, parameters: dict, expression: str, priority: int = 0) -> dict:
+		schedule_definition = {
+			"identifier": schedule_identifier,
+			"display_name": display_name,
+			"job": job,
+			"parameters": parameters,
+			"expression": expression,
+			"priority": priority,
+		}
+
+		schedule, operation = self._create_or_update_operation(project, self.get(project, schedule_identifier), schedule_definition, self.date_time_provider.now())
+		self.database_client.bulk_write(self.table, [ operation ])
+		return schedule
+
+
+	def create_or_update_many(self, project: str, schedule_collection: List[dict]) -> List[dict]:
 		now = self.date_time_provider.now()
-		schedule = self.get(project, schedule_identifier)
+		all_existing_schedules = { schedule["identifier"]: schedule for schedule in self.database_client.find_many(self.table, { "project": project }) }
+		operation_collection = []
+		result_collection = []
+
+		for schedule_definition in schedule_collection:
+			schedule, operation = self._create_or_update_operation(project, all_existing_schedules.get(schedule_definition["identifier"]), schedule_definition, now)
+			operation_collection.append(operation)
+			result_collection.append(schedule)
+
+		self.database_client.bulk_write(self.table, operation_collection)
+		return result_collection
+
+
+	def _create_or_update_operation(self, project: str, schedule: Optional[dict], schedule_definition: dict, now: datetime.datetime) -> Tuple[dict,dict]:
+		""" Return the schedule record and the write operation to create it, or to update it if it already exists """
+
+		self._validate_priority(schedule_definition["identifier"], schedule_definition.get("priority", 0))
+
+		update_data = {
+			"display_name": schedule_definition["display_name"],
+			"job": schedule_definition["job"],
+			"parameters": schedule_definition["parameters"],
+			"expression": schedule_definition["expression"],
+			"priority": schedule_definition.get("priority", 0),
+			"update_date": self.date_time_provider.serialize(now),
+		}
 
 		if schedule is None:
 			schedule = {
 				"project": project,
-				"identifier": schedule_identifier,
-				"display_name": display_name,
-				"job": job,
-				"parameters": parameters,
-				"expression": expression,
+				"identifier": schedule_definition["identifier"],
+				**update_data,
 				"is_enabled": False,
 				"last_run": None,
 				"creation_date": self.date_time_provider.serialize(now),
-				"update_date": self.date_time_provider.serialize(now),
 			}
 
-			self.database_client.insert_one(self.table, schedule)
+			return (schedule, { "operation": "insert_one", "data": schedule })
 
-		else:
-			update_data = {
-				"display_name": display_name,
-				"job": job,
-				"parameters": parameters,
-				"expression": expression,
-				"update_date": self.date_time_provider.serialize(now),
-			}
+		schedule.update(update_data)
+		return (schedule, { "operation": "update_one", "filter": { "project": project, "identifier": schedule["identifier"] }, "data": update_data })
 
-			schedule.update(update_data)
-			self.database_client.update_one(self.table, { "project": project, "identifier": schedule_identifier }, update_data)
 
-		return schedule
+	def _validate_priority(self, schedule_identifier: str, priority: int) -> None: # pylint: disable = no-self-use
+		""" Check a schedule priority is valid, so that the runs it triggers can be created """
+
+		if not isinstance(priority, int) or isinstance(priority, bool):
+			raise ValueError("Schedule priority must be an integer (Schedule: '%s', Value: '%s')" % (schedule_identifier, priority))
 
 
 	def update_status(self, schedule: dict, is_enabled: Optional[bool] = None, last_run: Optional[str] = None) -> None:
@@ -87,5 +131,28 @@ class ScheduleProvider:
 		self.database_client.update_one(self.table, { "project": schedule["project"], "identifier": schedule["identifier"] }, update_data)
 
 
+	def update_last_run_many(self, schedule_collection: List[dict], run_collection: List[dict]) -> None:
+		""" Update the last run for several schedules, matching schedules and runs by their position """
+
+		now = self.date_time_provider.now()
+		operation_collection = []
+
+		for schedule, run in zip(schedule_collection, run_collection):
+			update_data = {
+				"last_run": run["identifier"],
+				"update_date": self.date_time_provider.serialize(now),
+			}
+
+			schedule.update(update_data)
+			operation_collection.append({ "operation": "update_one", "filter": { "project": schedule["project"], "identifier": schedule["identifier"] }, "data": update_data })
+
+		self.database_client.bulk_write(self.table, operation_collection)
+
+
 	def delete(self, project: str, schedule_identifier: str) -> None:
 		self.database_client.delete_one(self.table, { "project": project, "identifier": schedule_identifier })
+
+
+	def delete_many(self, project: str, schedule_identifier_collection: List[str]) -> None:
+		operation_collection = [ { "operation": "delete_one", "filter": { "project": project, "identifier": schedule_identifier } } for schedule_identifier in schedule_identifier_collection ]
+		self.database_client.bulk_write(self.table, operation_collection)
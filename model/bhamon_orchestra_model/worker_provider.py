@@ -1,6 +1,6 @@
 import logging
 
-from typing import List, Optional, Tuple
+from typing import Callable, List, Optional, Tuple
 
 from bhamon_orchestra_model.database.database_client import DatabaseClient
 from bhamon_orchestra_model.date_time_provider import DateTimeProvider
@@ -27,6 +27,11 @@ class WorkerProvider:
 		return self.database_client.find_many(self.table, {}, skip = skip, limit = limit, order_by = order_by)
 
 
+	def watch_changes(self, callback: Callable[[str],None]) -> Optional[Callable[[],None]]:
+		""" Register a callback for changes to workers, returning a function to stop watching, or None if the database does not support it """
+		return self.database_client.watch_changes([ self.table ], callback)
+
+
 	def get(self, worker_identifier: str) -> Optional[dict]:
 		return self.database_client.find_one(self.table, { "identifier": worker_identifier })
 
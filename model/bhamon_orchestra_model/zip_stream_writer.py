@@ -0,0 +1,133 @@
+import struct
+import zlib
+
+from typing import Iterable, Iterator, Tuple
+
+
+zip64_limit = 0xFFFFFFFF
+
+# Margin for the deflate overhead, so that an entry close to the limit uses zip64 before its compressed size exceeds it
+zip64_margin = 0x1000000
+
+
+class ZipStreamWriter:
+	""" Writer for zip archives, producing them as a stream of chunks rather than in a seekable file.
+
+	Entries are deflated as their data is iterated, with their checksum and sizes in a data descriptor following them,
+	so that the writer holds at most one chunk of an entry in memory. Zip64 records are used for entries expected to be
+	too large for the standard ones, and for the end records once the archive itself becomes too large.
+
+	"""
+
+
+	def __init__(self, compression_level: int = 6) -> None:
+		self.compression_level = compression_level
+		self._offset = 0
+		self._entry_collection = []
+
+
+	def write_entry(self, # pylint: disable = too-many-arguments
+			name: str, data: Iterable[bytes], date_time: Tuple[int,int,int,int,int,int],
+			size_hint: int = 0, force_zip64: bool = False) -> Iterator[bytes]:
+		""" Produce the chunks for an entry, compressing its data as it is iterated """
+
+		entry = {
+			"name": name.encode("utf-8"),
+			"date_time": date_time,
+			"offset": self._offset,
+			"crc": 0,
+			"compressed_size": 0,
+			"size": 0,
+			"is_zip64": force_zip64 or size_hint >= zip64_limit - zip64_margin,
+		}
+
+		yield self._produce(self._create_local_header(entry))
+
+		compressor = zlib.compressobj(self.compression_level, zlib.DEFLATED, -15)
+		for chunk in data:
+			entry["crc"] = zlib.crc32(chunk, entry["crc"])
+			entry["size"] += len(chunk)
+			compressed_chunk = compressor.compress(chunk)
+			if len(compressed_chunk) > 0:
+				entry["compressed_size"] += len(compressed_chunk)
+				yield self._produce(compressed_chunk)
+
+		compressed_chunk = compressor.flush()
+		entry["compressed_size"] += len(compressed_chunk)
+		yield self._produce(compressed_chunk)
+
+		if not entry["is_zip64"] and (entry["size"] > zip64_limit or entry["compressed_size"] > zip64_limit):
+			raise ValueError("Entry '%s' is too large for an archive without zip64" % name)
+
+		size_format = "<QQ" if entry["is_zip64"] else "<LL"
+		yield self._produce(struct.pack("<LL", 0x08074B50, entry["crc"]) + struct.pack(size_format, entry["compressed_size"], entry["size"]))
+
+		self._entry_collection.append(entry)
+
+
+	def finish(self) -> Iterator[bytes]:
+		""" Produce the central directory and the end records, completing the archive """
+
+		central_directory_offset = self._offset
+		for entry in self._entry_collection:
+			yield self._produce(self._create_central_directory_header(entry))
+		central_directory_size = self._offset - central_directory_offset
+
+		entry_count = len(self._entry_collection)
+		is_zip64 = entry_count >= 0xFFFF or central_directory_size >= zip64_limit or central_directory_offset >= zip64_limit
+
+		if is_zip64:
+			zip64_end_offset = self._offset
+			yield self._produce(struct.pack("<LQHHLLQQQQ", 0x06064B50, 44, 45, 45, 0, 0, entry_count, entry_count, central_directory_size, central_directory_offset))
+			yield self._produce(struct.pack("<LLQL", 0x07064B50, 0, zip64_end_offset, 1))
+
+		yield self._produce(struct.pack("<LHHHHLLH", 0x06054B50, 0, 0,
+			min(entry_count, 0xFFFF), min(entry_count, 0xFFFF), min(central_directory_size, zip64_limit), min(central_directory_offset, zip64_limit), 0))
+
+
+	def _produce(self, chunk: bytes) -> bytes:
+		self._offset += len(chunk)
+		return chunk
+
+
+	def _create_local_header(self, entry: dict) -> bytes: # pylint: disable = no-self-use
+		""" Create the header preceding the entry data, with the checksum and sizes left to the data descriptor """
+
+		version = 45 if entry["is_zip64"] else 20
+		size = zip64_limit if entry["is_zip64"] else 0
+		extra = struct.pack("<HHQQ", 0x0001, 16, 0, 0) if entry["is_zip64"] else b""
+		dos_time, dos_date = _convert_to_dos_date_time(entry["date_time"])
+
+		header = struct.pack("<LHHHHHLLLHH", 0x04034B50, version, 0x0808, 8, dos_time, dos_date, 0, size, size, len(entry["name"]), len(extra))
+		return header + entry["name"] + extra
+
+
+	def _create_central_directory_header(self, entry: dict) -> bytes: # pylint: disable = no-self-use
+		""" Create the central directory header for an entry, moving the values too large for it to a zip64 extra field """
+
+		zip64_values = []
+		size = entry["size"]
+		compressed_size = entry["compressed_size"]
+		offset = entry["offset"]
+
+		if entry["is_zip64"]:
+			zip64_values += [ entry["size"], entry["compressed_size"] ]
+			size = zip64_limit
+			compressed_size = zip64_limit
+		if entry["offset"] >= zip64_limit:
+			zip64_values.append(entry["offset"])
+			offset = zip64_limit
+
+		extra = struct.pack("<HH" + "Q" * len(zip64_values), 0x0001, 8 * len(zip64_values), *zip64_values) if len(zip64_values) > 0 else b""
+		version = 45 if len(zip64_values) > 0 else 20
+		dos_time, dos_date = _convert_to_dos_date_time(entry["date_time"])
+
+		header = struct.pack("<LHHHHHHLLLHHHHHLL", 0x02014B50, (3 << 8) | version, version, 0x0808, 8, dos_time, dos_date,
+			entry["crc"], compressed_size, size, len(entry["name"]), len(extra), 0, 0, 0, 0o644 << 16, offset)
+		return header + entry["name"] + extra
+
+
+
+def _convert_to_dos_date_time(date_time: Tuple[int,int,int,int,int,int]) -> Tuple[int,int]:
+	year, month, day, hour, minute, second = date_time
+	return (hour << 11) | (minute << 5) | (second // 2), ((year - 1980) << 9) | (month << 5) | day
@@ -27,6 +27,7 @@ parameters.update({
 
 	"python_requires": "~= 3.5",
 	"install_requires": [ "python-dateutil ~= 2.8", "python2-secrets ~= 1.0 ; python_version < '3.6'" ],
+	"extras_require": { "msgpack": [ "msgpack ~= 1.0" ] },
 })
 
 setuptools.setup(**parameters)
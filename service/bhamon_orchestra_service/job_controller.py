@@ -45,7 +45,13 @@ def get_runs(project_identifier, job_identifier):
 def trigger(project_identifier, job_identifier):
 	trigger_data = flask.request.get_json()
 	job = flask.current_app.job_provider.get(project_identifier, job_identifier)
-	run = flask.current_app.run_provider.create(job["project"], job_identifier, **trigger_data)
+
+	try:
+		run = flask.current_app.run_provider.create(job["project"], job_identifier, **trigger_data)
+	except ValueError:
+		logger.warning("Invalid trigger request", exc_info = True)
+		flask.abort(400)
+
 	return flask.jsonify({ "project_identifier": project_identifier, "job_identifier": job_identifier, "run_identifier": run["identifier"] })
 
 
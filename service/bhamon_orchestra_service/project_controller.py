@@ -8,6 +8,12 @@ from bhamon_orchestra_model.revision_control.github import GitHubClient
 
 logger = logging.getLogger("ProjectController")
 
+# Run fields needed to compute revision status, leaving out steps and most results
+run_status_fields = [
+	"identifier", "project", "job", "worker", "parameters", "status",
+	"results.revision_control", "start_date", "completion_date", "creation_date", "update_date",
+]
+
 
 def get_count():
 	return flask.jsonify(flask.current_app.project_provider.count())
@@ -87,9 +93,10 @@ def get_revision_status(project_identifier, revision_reference):
 		"project": project_identifier,
 		"limit": max(min(flask.request.args.get("run_limit", default = 1000, type = int), 10000), 100),
 		"order_by": [("update_date", "descending")],
+		"projection": run_status_fields,
 	}
 
-	run_collection = flask.current_app.run_provider.get_list_as_documents(**run_query_parameters)
+	run_collection = flask.current_app.run_provider.iter_list_as_documents(**run_query_parameters)
 
 	for run in run_collection:
 		revision_identifier = run.get("results", {}).get("revision_control", {}).get("revision", None)
@@ -137,10 +144,11 @@ def get_project_status(project_identifier):
 		"project": project_identifier,
 		"limit": max(min(flask.request.args.get("run_limit", default = 1000, type = int), 10000), 100),
 		"order_by": [("update_date", "descending")],
+		"projection": run_status_fields,
 	}
 
 	revision_collection = revision_control_client.get_revision_list(**revision_query_parameters)
-	run_collection = flask.current_app.run_provider.get_list_as_documents(**run_query_parameters)
+	run_collection = flask.current_app.run_provider.iter_list_as_documents(**run_query_parameters)
 
 	revision_dictionary = { revision["identifier"]: revision for revision in revision_collection }
 	for revision in revision_collection:
@@ -26,9 +26,23 @@ def get_collection(project_identifier):
 		"skip": max(flask.request.args.get("skip", default = 0, type = int), 0),
 		"limit": max(min(flask.request.args.get("limit", default = 100, type = int), 1000), 0),
 		"order_by": [ tuple(x.split(" ")) for x in flask.request.args.getlist("order_by") ],
+		"after": flask.request.args.get("after", default = None),
 	}
 
-	return flask.jsonify(flask.current_app.run_provider.get_list(**query_parameters))
+	try:
+		run_collection = flask.current_app.run_provider.get_list(**query_parameters)
+	except ValueError:
+		logger.warning("Invalid run collection request", exc_info = True)
+		flask.abort(400)
+
+	response = flask.jsonify(run_collection)
+	if len(run_collection) > 0 and len(run_collection) == query_parameters["limit"]:
+		response.headers["X-Orchestra-NextCursor"] = flask.current_app.run_provider.get_cursor(run_collection[-1])
+	return response
+
+
+def get_queue(project_identifier):
+	return flask.jsonify(flask.current_app.run_provider.get_queue_statistics(project_identifier))
 
 
 def get(project_identifier, run_identifier):
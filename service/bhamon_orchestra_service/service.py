@@ -63,6 +63,7 @@ def register_routes(application): # pylint: disable = too-many-statements
 	add_url_rule(application, "/project/<project_identifier>/job/<job_identifier>/disable", [ "POST" ], job_controller.disable)
 	add_url_rule(application, "/project/<project_identifier>/run_count", [ "GET" ], run_controller.get_count)
 	add_url_rule(application, "/project/<project_identifier>/run_collection", [ "GET" ], run_controller.get_collection)
+	add_url_rule(application, "/project/<project_identifier>/run_queue", [ "GET" ], run_controller.get_queue)
 	add_url_rule(application, "/project/<project_identifier>/run/<run_identifier>", [ "GET" ], run_controller.get)
 	add_url_rule(application, "/project/<project_identifier>/run/<run_identifier>/step_collection", [ "GET" ], run_controller.get_step_collection)
 	add_url_rule(application, "/project/<project_identifier>/run/<run_identifier>/step/<int:step_index>", [ "GET" ], run_controller.get_step)
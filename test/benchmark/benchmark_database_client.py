@@ -0,0 +1,81 @@
+""" Benchmark for the json and SQLite database clients, on the queries issued by the run provider """
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+from bhamon_orchestra_model.database.json_database_administration import JsonDatabaseAdministration
+from bhamon_orchestra_model.database.json_database_client import JsonDatabaseClient
+from bhamon_orchestra_model.database.sqlite_database_administration import SqliteDatabaseAdministration
+from bhamon_orchestra_model.database.sqlite_database_client import SqliteDatabaseClient
+
+from benchmark_database_format import create_run
+
+
+all_queries = {
+	"get": lambda database_client, run: database_client.find_one("run", { "project": "examples", "identifier": run["identifier"] }),
+	"list by project": lambda database_client, run: database_client.find_many("run", { "project": "examples" },
+		limit = 20, order_by = [ ("update_date", "descending"), ("identifier", "descending") ]),
+	"count by worker": lambda database_client, run: database_client.count("run", { "worker": run["worker"], "status": "running" }),
+	"update": lambda database_client, run: database_client.update_one("run", { "project": "examples", "identifier": run["identifier"] }, { "status": "running" }),
+}
+
+
+def main():
+	arguments = parse_arguments()
+
+	run_collection = [ create_run(index) for index in range(arguments.run_count) ]
+	for index, run in enumerate(run_collection):
+		run["update_date"] = "2020-01-01T00:00:%02dZ" % (index % 60)
+
+	print("%-10s %-18s %12s" % ("Client", "Query", "Time (ms)"))
+
+	for client_name in [ "json", "sqlite" ]:
+		for query_name, duration in measure(client_name, run_collection, arguments.iterations).items():
+			print("%-10s %-18s %12.2f" % (client_name, query_name, duration * 1000))
+
+
+def parse_arguments():
+	argument_parser = argparse.ArgumentParser()
+	argument_parser.add_argument("--run-count", type = int, default = 10000, metavar = "<count>", help = "set how many runs the table holds")
+	argument_parser.add_argument("--iterations", type = int, default = 10, metavar = "<count>", help = "set how many times each query is measured")
+	return argument_parser.parse_args()
+
+
+def create_database(client_name, data_directory):
+	if client_name == "json":
+		return JsonDatabaseAdministration(data_directory), JsonDatabaseClient(data_directory)
+	if client_name == "sqlite":
+		database_client = SqliteDatabaseClient(os.path.join(data_directory, "database.sqlite"))
+		return SqliteDatabaseAdministration(database_client), database_client
+	raise ValueError("Unsupported client '%s'" % client_name)
+
+
+def measure(client_name, run_collection, iterations):
+	""" Measure the average time for each query, on a database initialized with the standard indexes """
+
+	data_directory = tempfile.mkdtemp()
+
+	try:
+		database_administration, database_client = create_database(client_name, data_directory)
+		database_administration.initialize()
+		database_client.insert_many("run", run_collection)
+
+		all_durations = {}
+		for query_name, query in all_queries.items():
+			start = time.perf_counter()
+			for iteration in range(iterations):
+				query(database_client, run_collection[(iteration * 7919) % len(run_collection)])
+			all_durations[query_name] = (time.perf_counter() - start) / iterations
+
+		database_client.close()
+		return all_durations
+
+	finally:
+		shutil.rmtree(data_directory)
+
+
+if __name__ == "__main__":
+	main()
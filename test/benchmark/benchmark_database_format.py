@@ -0,0 +1,87 @@
+""" Benchmark for the file formats of JsonDatabaseClient """
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+import uuid
+
+from bhamon_orchestra_model.database.json_database_client import JsonDatabaseClient
+from bhamon_orchestra_model.database.json_serializer import JsonSerializer
+
+
+def main():
+	arguments = parse_arguments()
+
+	all_serializers = { "json": JsonSerializer() }
+
+	try:
+		from bhamon_orchestra_model.database.msgpack_serializer import MsgpackSerializer # pylint: disable = import-outside-toplevel
+		all_serializers["msgpack"] = MsgpackSerializer()
+	except ImportError:
+		print("Skipping msgpack, the package is not installed")
+
+	run_collection = [ create_run(index) for index in range(arguments.run_count) ]
+
+	print("%-15s %12s %12s %12s" % ("Format", "Size (KB)", "Load (ms)", "Save (ms)"))
+
+	for format_name, serializer in all_serializers.items():
+		result = measure(serializer, run_collection, arguments.iterations)
+		print("%-15s %12.0f %12.1f %12.1f" % (format_name, result["size"] / 1024, result["load"] * 1000, result["save"] * 1000))
+
+
+def parse_arguments():
+	argument_parser = argparse.ArgumentParser()
+	argument_parser.add_argument("--run-count", type = int, default = 10000, metavar = "<count>", help = "set how many runs the table holds")
+	argument_parser.add_argument("--iterations", type = int, default = 10, metavar = "<count>", help = "set how many times each operation is measured")
+	return argument_parser.parse_args()
+
+
+def create_run(index):
+	return {
+		"identifier": str(uuid.uuid4()),
+		"project": "examples",
+		"job": "job_%s" % (index % 20),
+		"parameters": { "revision": "%040x" % index },
+		"source": { "type": "schedule", "identifier": "schedule_%s" % (index % 5) },
+		"status": "succeeded",
+		"worker": "worker_%s" % (index % 10),
+		"steps": [ { "index": step_index, "name": "step_%s" % step_index, "status": "succeeded" } for step_index in range(5) ],
+		"results": { "revision_control": { "revision": "%040x" % index } },
+		"creation_date": "2020-01-01T00:00:00Z",
+		"update_date": "2020-01-01T00:00:00Z",
+	}
+
+
+def measure(serializer, run_collection, iterations):
+	""" Measure the average time to load the whole run table and to save it after a change, which the client does for every write """
+
+	data_directory = tempfile.mkdtemp()
+
+	try:
+		database_client = JsonDatabaseClient(data_directory, serializer)
+		database_client.insert_many("run", run_collection)
+
+		load_start = time.perf_counter()
+		for _ in range(iterations):
+			database_client.count("run", {})
+		load_duration = (time.perf_counter() - load_start) / iterations
+
+		update_start = time.perf_counter()
+		for _ in range(iterations):
+			database_client.update_one("run", { "identifier": run_collection[-1]["identifier"] }, { "status": "failed" })
+		update_duration = (time.perf_counter() - update_start) / iterations
+
+		return {
+			"size": os.path.getsize(os.path.join(data_directory, "run" + serializer.file_extension)),
+			"load": load_duration,
+			"save": update_duration - load_duration,
+		}
+
+	finally:
+		shutil.rmtree(data_directory)
+
+
+if __name__ == "__main__":
+	main()
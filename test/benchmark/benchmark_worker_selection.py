@@ -0,0 +1,148 @@
+""" Simulation benchmark for the worker selection strategies, replaying a run history to compare queue wait times """
+
+import argparse
+import asyncio
+import collections
+import heapq
+import itertools
+import json
+import random
+
+from bhamon_orchestra_master.worker_selection_strategy import create_default_strategies
+from bhamon_orchestra_model.date_time_provider import DateTimeProvider
+
+
+def main():
+	arguments = parse_arguments()
+
+	if arguments.history is not None:
+		run_collection = load_history(arguments.history)
+	else:
+		run_collection = generate_history(arguments.run_count, arguments.seed)
+
+	print("Simulating %s runs on %s workers with %s executors" % (len(run_collection), arguments.worker_count, arguments.executor_limit))
+	print("%-20s %14s %14s %14s %14s" % ("Strategy", "Wait (s)", "Wait p95 (s)", "Duration (s)", "Cold starts"))
+
+	event_loop = asyncio.get_event_loop()
+
+	for strategy_name in create_default_strategies():
+		random.seed(arguments.seed)
+		result = event_loop.run_until_complete(simulate(strategy_name, run_collection, arguments))
+		print("%-20s %14.1f %14.1f %14.1f %14s" % (strategy_name, result["wait_mean"], result["wait_p95"], result["duration_mean"], result["cold_start_count"]))
+
+
+def parse_arguments():
+	argument_parser = argparse.ArgumentParser()
+	argument_parser.add_argument("--history", metavar = "<path>", help = "set a json file with recorded runs to replay, as returned by the service run collection route")
+	argument_parser.add_argument("--run-count", type = int, default = 2000, metavar = "<count>", help = "set how many runs to generate when not replaying a history")
+	argument_parser.add_argument("--worker-count", type = int, default = 8, metavar = "<count>", help = "set how many workers execute runs")
+	argument_parser.add_argument("--executor-limit", type = int, default = 2, metavar = "<count>", help = "set how many runs a worker executes at once")
+	argument_parser.add_argument("--setup-seconds", type = float, default = 120, metavar = "<seconds>", help = "set the time added to runs without a warm workspace")
+	argument_parser.add_argument("--workspace-cache-size", type = int, default = 4, metavar = "<count>", help = "set how many workspaces a worker keeps warm")
+	argument_parser.add_argument("--contention", type = float, default = 0.5, metavar = "<ratio>", help = "set how much slower runs get on a fully loaded worker")
+	argument_parser.add_argument("--seed", type = int, default = 0, metavar = "<seed>", help = "set the seed for random choices")
+	return argument_parser.parse_args()
+
+
+def load_history(file_path):
+	""" Load recorded runs, keeping their arrival time and their duration, in seconds """
+
+	date_time_provider = DateTimeProvider()
+
+	with open(file_path, mode = "r", encoding = "utf-8") as history_file:
+		all_runs = [ run for run in json.load(history_file) if run.get("start_date", None) is not None and run.get("completion_date", None) is not None ]
+
+	all_runs.sort(key = lambda run: run["creation_date"])
+	start_time = date_time_provider.deserialize(all_runs[0]["creation_date"]) if len(all_runs) > 0 else None
+
+	return [
+		{
+			"identifier": run["identifier"],
+			"project": run["project"],
+			"job": run["job"],
+			"arrival": (date_time_provider.deserialize(run["creation_date"]) - start_time).total_seconds(),
+			"duration": (date_time_provider.deserialize(run["completion_date"]) - date_time_provider.deserialize(run["start_date"])).total_seconds(),
+		}
+		for run in all_runs
+	]
+
+
+def generate_history(run_count, seed):
+	""" Generate runs for a few jobs with varied durations, arriving steadily with occasional bursts """
+
+	generator = random.Random(seed)
+	job_durations = { "job_%02d" % index: generator.uniform(30, 600) for index in range(20) }
+	all_runs = []
+	arrival = 0
+
+	for index in range(run_count):
+		arrival += 0 if generator.random() < 0.2 else generator.expovariate(1 / 60)
+		job = generator.choice(sorted(job_durations))
+		duration = job_durations[job] * generator.uniform(0.8, 1.2)
+		all_runs.append({ "identifier": "run_%s" % index, "project": "examples", "job": job, "arrival": arrival, "duration": duration })
+
+	return all_runs
+
+
+async def simulate(strategy_name, run_collection, arguments): # pylint: disable = too-many-locals
+	""" Replay runs through a strategy, with workers keeping a few warm workspaces, and measure how long runs wait for a worker """
+
+	strategy = create_default_strategies()[strategy_name]
+	all_workers = { "worker_%02d" % index: { "executor_count": 0, "workspaces": collections.OrderedDict() } for index in range(arguments.worker_count) }
+	event_counter = itertools.count()
+	event_queue = [ (run["arrival"], next(event_counter), "arrival", run) for run in run_collection ]
+	heapq.heapify(event_queue)
+	pending_runs = collections.deque()
+	all_waits = []
+	all_durations = []
+	cold_start_count = 0
+
+	while len(event_queue) > 0:
+		now, _, event_type, payload = heapq.heappop(event_queue)
+		if event_type == "arrival":
+			pending_runs.append(payload)
+		else:
+			all_workers[payload]["executor_count"] -= 1
+
+		while len(pending_runs) > 0:
+			run = pending_runs[0]
+			job = { "project": run["project"], "identifier": run["job"], "properties": {} }
+			candidate_collection = [ { "identifier": identifier, "executor_count": worker["executor_count"], "executor_limit": arguments.executor_limit }
+				for identifier, worker in all_workers.items() ]
+
+			sorted_candidates = await strategy.sort(candidate_collection, job, run)
+			selected_worker = next((candidate["identifier"] for candidate in sorted_candidates if candidate["executor_count"] < arguments.executor_limit), None)
+			if selected_worker is None:
+				break
+
+			strategy.record_selection(job, run, selected_worker)
+			pending_runs.popleft()
+			worker = all_workers[selected_worker]
+
+			duration = run["duration"] * (1 + arguments.contention * worker["executor_count"] / arguments.executor_limit)
+			if run["job"] in worker["workspaces"]:
+				worker["workspaces"].move_to_end(run["job"])
+			else:
+				duration += arguments.setup_seconds
+				cold_start_count += 1
+				worker["workspaces"][run["job"]] = True
+				if len(worker["workspaces"]) > arguments.workspace_cache_size:
+					worker["workspaces"].popitem(last = False)
+
+			worker["executor_count"] += 1
+			all_waits.append(now - run["arrival"])
+			all_durations.append(duration)
+			heapq.heappush(event_queue, (now + duration, next(event_counter), "completion", selected_worker))
+
+	all_waits.sort()
+
+	return {
+		"wait_mean": sum(all_waits) / len(all_waits) if len(all_waits) > 0 else 0,
+		"wait_p95": all_waits[int(len(all_waits) * 0.95)] if len(all_waits) > 0 else 0,
+		"duration_mean": sum(all_durations) / len(all_durations) if len(all_durations) > 0 else 0,
+		"cold_start_count": cold_start_count,
+	}
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,97 @@
+import io
+import re
+import types
+
+
+class FakeS3Client:
+	""" Fake S3 client for unit tests, storing objects in memory and implementing the subset of the boto3 client used by S3FileStorage """
+
+
+	def __init__(self, maximum_list_size = 1000):
+		self.maximum_list_size = maximum_list_size
+		self.storage = {}
+		self.uploads = {}
+		self.request_count = 0
+		self.transferred_size = 0
+		self.exceptions = types.SimpleNamespace(NoSuchKey = NoSuchKeyError)
+
+
+	def put_object(self, Bucket, Key, Body): # pylint: disable = invalid-name
+		self.request_count += 1
+		self.storage[(Bucket, Key)] = bytes(Body)
+		self.transferred_size += len(Body)
+		return {}
+
+
+	def get_object(self, Bucket, Key, Range = None): # pylint: disable = invalid-name
+		self.request_count += 1
+		if (Bucket, Key) not in self.storage:
+			raise NoSuchKeyError("Object '%s' does not exist" % Key)
+
+		data = self.storage[(Bucket, Key)]
+		if Range is not None:
+			range_start, range_end = re.match(r"^bytes=([0-9]+)-([0-9]+)$", Range).groups()
+			data = data[ int(range_start) : int(range_end) + 1 ]
+		self.transferred_size += len(data)
+		return { "Body": io.BytesIO(data), "ContentLength": len(data) }
+
+
+	def list_objects_v2(self, Bucket, Prefix = "", MaxKeys = None, ContinuationToken = None): # pylint: disable = invalid-name
+		self.request_count += 1
+		all_keys = sorted(key for bucket, key in self.storage if bucket == Bucket and key.startswith(Prefix) and (ContinuationToken is None or key > ContinuationToken))
+		page_size = min(MaxKeys, self.maximum_list_size) if MaxKeys is not None else self.maximum_list_size
+
+		response = {
+			"Contents": [ { "Key": key, "Size": len(self.storage[(Bucket, key)]) } for key in all_keys[ : page_size ] ],
+			"KeyCount": len(all_keys[ : page_size ]),
+			"IsTruncated": len(all_keys) > page_size,
+		}
+
+		if response["IsTruncated"]:
+			response["NextContinuationToken"] = all_keys[ page_size - 1 ]
+		return response
+
+
+	def delete_objects(self, Bucket, Delete): # pylint: disable = invalid-name
+		self.request_count += 1
+		for entry in Delete["Objects"]:
+			self.storage.pop((Bucket, entry["Key"]), None)
+		return {}
+
+
+	def create_multipart_upload(self, Bucket, Key): # pylint: disable = invalid-name
+		self.request_count += 1
+		upload_identifier = str(len(self.uploads))
+		self.uploads[upload_identifier] = { "bucket": Bucket, "key": Key, "parts": {} }
+		return { "UploadId": upload_identifier }
+
+
+	def upload_part_copy(self, Bucket, Key, UploadId, PartNumber, CopySource): # pylint: disable = invalid-name, too-many-arguments
+		self.request_count += 1
+		self.uploads[UploadId]["parts"][PartNumber] = self.storage[(CopySource["Bucket"], CopySource["Key"])]
+		return { "CopyPartResult": { "ETag": str(PartNumber) } }
+
+
+	def upload_part(self, Bucket, Key, UploadId, PartNumber, Body): # pylint: disable = invalid-name, too-many-arguments
+		self.request_count += 1
+		self.uploads[UploadId]["parts"][PartNumber] = bytes(Body)
+		self.transferred_size += len(Body)
+		return { "ETag": str(PartNumber) }
+
+
+	def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload): # pylint: disable = invalid-name
+		self.request_count += 1
+		upload = self.uploads.pop(UploadId)
+		self.storage[(Bucket, Key)] = b"".join(upload["parts"][part["PartNumber"]] for part in MultipartUpload["Parts"])
+		return {}
+
+
+	def abort_multipart_upload(self, Bucket, Key, UploadId): # pylint: disable = invalid-name
+		self.request_count += 1
+		self.uploads.pop(UploadId, None)
+		return {}
+
+
+
+class NoSuchKeyError(Exception):
+	""" Error raised when getting an object which does not exist """
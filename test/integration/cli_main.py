@@ -5,7 +5,7 @@ import types
 
 from bhamon_orchestra_model.authentication_provider import AuthenticationProvider
 from bhamon_orchestra_model.authorization_provider import AuthorizationProvider
-from bhamon_orchestra_model.database.file_storage import FileStorage
+from bhamon_orchestra_model.database.local_file_storage import LocalFileStorage
 from bhamon_orchestra_model.date_time_provider import DateTimeProvider
 from bhamon_orchestra_model.job_provider import JobProvider
 from bhamon_orchestra_model.project_provider import ProjectProvider
@@ -16,6 +16,7 @@ from bhamon_orchestra_model.worker_provider import WorkerProvider
 
 import bhamon_orchestra_cli.admin_controller as admin_controller
 import bhamon_orchestra_cli.database_controller as database_controller
+import bhamon_orchestra_cli.run_controller as run_controller
 
 import environment
 
@@ -38,6 +39,7 @@ def parse_arguments():
 
 	admin_controller.register_commands(subparsers)
 	database_controller.register_commands(subparsers)
+	run_controller.register_commands(subparsers)
 
 	return main_parser.parse_args()
 
@@ -45,11 +47,12 @@ def parse_arguments():
 def create_application(arguments):
 	database_administration_instance = environment.create_database_administration(arguments.database)
 	database_client_instance = environment.create_database_client(arguments.database)
-	file_storage_instance = FileStorage(".")
+	file_storage_instance = LocalFileStorage(".")
 	date_time_provider_instance = DateTimeProvider()
 
 	application = types.SimpleNamespace()
 	application.database_administration = database_administration_instance
+	application.date_time_provider = date_time_provider_instance
 	application.authentication_provider = AuthenticationProvider(database_client_instance, date_time_provider_instance)
 	application.authorization_provider = AuthorizationProvider()
 	application.job_provider = JobProvider(database_client_instance, date_time_provider_instance)
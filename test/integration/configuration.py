@@ -11,6 +11,15 @@ def configure():
 		"projects": [
 			example_project,
 		],
+
+		"retention_policies": [
+			{ "project": "examples", "keep_count": 100, "maximum_age_days": 30, "failure_maximum_age_days": 90 },
+		],
+
+		"dispatch_policies": [
+			{ "weight": 1 },
+			{ "project": "examples", "weight": 1, "concurrency_limit": 10 },
+		],
 	}
 
 
@@ -48,6 +57,8 @@ def success():
 
 		"properties": {
 			"is_controller": False,
+			"requirements": { "project": "examples" },
+			"worker_selection": "workspace_affinity",
 		},
 
 		"parameters": [],
@@ -67,6 +78,7 @@ def sleep():
 
 		"properties": {
 			"is_controller": False,
+			"requirements": { "project": "examples" },
 		},
 
 		"parameters": [],
@@ -86,6 +98,7 @@ def failure():
 
 		"properties": {
 			"is_controller": False,
+			"requirements": { "project": "examples" },
 		},
 
 		"parameters": [],
@@ -105,6 +118,7 @@ def exception():
 
 		"properties": {
 			"is_controller": False,
+			"requirements": { "project": "examples" },
 		},
 
 		"parameters": [],
@@ -131,6 +145,7 @@ def controller_success():
 
 		"properties": {
 			"is_controller": True,
+			"requirements": { "project": "examples" },
 		},
 
 		"parameters": [],
@@ -159,6 +174,7 @@ def controller_failure():
 
 		"properties": {
 			"is_controller": True,
+			"requirements": { "project": "examples" },
 		},
 
 		"parameters": [],
@@ -10,7 +10,7 @@ import pymongo
 
 from bhamon_orchestra_model.authentication_provider import AuthenticationProvider
 from bhamon_orchestra_model.authorization_provider import AuthorizationProvider
-from bhamon_orchestra_model.database.file_storage import FileStorage
+from bhamon_orchestra_model.database.local_file_storage import LocalFileStorage
 from bhamon_orchestra_model.date_time_provider import DateTimeProvider
 from bhamon_orchestra_model.job_provider import JobProvider
 from bhamon_orchestra_model.project_provider import ProjectProvider
@@ -77,7 +77,7 @@ class OrchestraContext: # pylint: disable = too-many-instance-attributes
 			date_time_provider_instance = DateTimeProvider()
 
 			self.database_client = environment.create_database_client(self.database_uri)
-			self.file_storage = FileStorage(os.path.join(self.temporary_directory, "master"))
+			self.file_storage = LocalFileStorage(os.path.join(self.temporary_directory, "master"))
 
 			self.authentication_provider = AuthenticationProvider(self.database_client, date_time_provider_instance)
 			self.authorization_provider = AuthorizationProvider()
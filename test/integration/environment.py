@@ -5,10 +5,14 @@ import sys
 
 import pymongo
 
+from bhamon_orchestra_model.database.data_serializer import create_serializer
+from bhamon_orchestra_model.database.journaled_json_database_client import JournaledJsonDatabaseClient
 from bhamon_orchestra_model.database.json_database_administration import JsonDatabaseAdministration
 from bhamon_orchestra_model.database.json_database_client import JsonDatabaseClient
 from bhamon_orchestra_model.database.mongo_database_administration import MongoDatabaseAdministration
 from bhamon_orchestra_model.database.mongo_database_client import MongoDatabaseClient
+from bhamon_orchestra_model.database.sqlite_database_administration import SqliteDatabaseAdministration
+from bhamon_orchestra_model.database.sqlite_database_client import SqliteDatabaseClient
 
 
 log_format = "[{levelname}][{name}] {message}"
@@ -30,21 +34,34 @@ def configure_logging(log_level):
 
 
 def create_database_administration(database_uri):
-	if database_uri.startswith("json://"):
-		return JsonDatabaseAdministration(re.sub("^json://", "", database_uri))
+	if database_uri.startswith("json://") or database_uri.startswith("json-journaled://"):
+		return JsonDatabaseAdministration(*parse_json_database_uri(database_uri))
 	if database_uri.startswith("mongodb://"):
 		return MongoDatabaseAdministration(pymongo.MongoClient(database_uri))
+	if database_uri.startswith("sqlite://"):
+		return SqliteDatabaseAdministration(SqliteDatabaseClient(re.sub("^sqlite://", "", database_uri)))
 	raise ValueError("Unsupported database uri '%s'" % database_uri)
 
 
 def create_database_client(database_uri):
 	if database_uri.startswith("json://"):
-		return JsonDatabaseClient(re.sub("^json://", "", database_uri))
+		return JsonDatabaseClient(*parse_json_database_uri(database_uri))
+	if database_uri.startswith("json-journaled://"):
+		return JournaledJsonDatabaseClient(*parse_json_database_uri(database_uri))
 	if database_uri.startswith("mongodb://"):
 		return MongoDatabaseClient(pymongo.MongoClient(database_uri))
+	if database_uri.startswith("sqlite://"):
+		return SqliteDatabaseClient(re.sub("^sqlite://", "", database_uri))
 	raise ValueError("Unsupported database uri '%s'" % database_uri)
 
 
+def parse_json_database_uri(database_uri):
+	""" Parse a uri like json://<path>?format=<format> to the data directory and serializer for a json database """
+
+	match = re.search(r"^(json|json-journaled)://(?P<path>[^?]*)(\?format=(?P<format>.*))?$", database_uri)
+	return (match.group("path"), create_serializer(match.group("format") or "json"))
+
+
 def load_environment():
 	return {
 		"python3_executable": sys.executable,
@@ -72,10 +89,21 @@ def get_test_context_database_uri(temporary_directory, database_type):
 
 	if database_type == "json":
 		return "json://" + os.path.join(temporary_directory, "master")
+	if database_type == "json-msgpack":
+		return "json://" + os.path.join(temporary_directory, "master") + "?format=msgpack"
+	if database_type == "json-journaled":
+		return "json-journaled://" + os.path.join(temporary_directory, "master")
 	if database_type == "mongo":
 		return "mongodb://127.0.0.1:27017/" + database_name
+	if database_type == "sqlite":
+		return "sqlite://" + os.path.join(temporary_directory, "master", "database.sqlite")
 	raise ValueError("Unsupported database type '%s'" % database_type)
 
 
 def get_all_database_types():
-	return [ "json", "mongo" ]
+	return [ "json", "json-msgpack", "mongo", "sqlite" ]
+
+
+def get_all_database_client_types():
+	""" Return the database types for tests with a single database client, including those which do not support several processes sharing the database """
+	return get_all_database_types() + [ "json-journaled" ]
@@ -1,21 +1,32 @@
 import argparse
+import concurrent.futures
 import functools
 import logging
 
 import filelock
 
+from bhamon_orchestra_master.dispatch_queue import DispatchQueue
 from bhamon_orchestra_master.job_scheduler import JobScheduler
 from bhamon_orchestra_master.master import Master
 from bhamon_orchestra_master.protocol import WebSocketServerProtocol
+from bhamon_orchestra_master.run_collector import RunCollector
+from bhamon_orchestra_master.statistics_reporter import StatisticsReporter
 from bhamon_orchestra_master.supervisor import Supervisor
+from bhamon_orchestra_master.worker_selection_strategy import create_default_strategies
 from bhamon_orchestra_master.worker_selector import WorkerSelector
+from bhamon_orchestra_model.async_job_provider import AsyncJobProvider
+from bhamon_orchestra_model.async_run_provider import AsyncRunProvider
+from bhamon_orchestra_model.async_schedule_provider import AsyncScheduleProvider
+from bhamon_orchestra_model.async_worker_provider import AsyncWorkerProvider
 from bhamon_orchestra_model.authentication_provider import AuthenticationProvider
 from bhamon_orchestra_model.authorization_provider import AuthorizationProvider
-from bhamon_orchestra_model.database.file_storage import FileStorage
+from bhamon_orchestra_model.database.buffered_file_storage import BufferedFileStorage
+from bhamon_orchestra_model.database.cached_database_client import CachedDatabaseClient
 from bhamon_orchestra_model.date_time_provider import DateTimeProvider
 from bhamon_orchestra_model.job_provider import JobProvider
 from bhamon_orchestra_model.project_provider import ProjectProvider
 from bhamon_orchestra_model.run_provider import RunProvider
+from bhamon_orchestra_model.run_retention import RunRetention
 from bhamon_orchestra_model.schedule_provider import ScheduleProvider
 from bhamon_orchestra_model.user_provider import UserProvider
 from bhamon_orchestra_model.worker_provider import WorkerProvider
@@ -29,8 +40,13 @@ def main():
 	arguments = parse_arguments()
 
 	with filelock.FileLock("master.lock", 5):
-		application = create_application(arguments)
-		application.run()
+		file_storage_instance = BufferedFileStorage(".")
+
+		try:
+			application = create_application(arguments, file_storage_instance)
+			application.run()
+		finally:
+			file_storage_instance.close()
 
 
 def parse_arguments():
@@ -41,19 +57,30 @@ def parse_arguments():
 	return argument_parser.parse_args()
 
 
-def create_application(arguments): # pylint: disable = too-many-locals
+def create_application(arguments, file_storage_instance): # pylint: disable = too-many-locals
+	master_configuration = configuration.configure()
 	database_client_instance = environment.create_database_client(arguments.database)
-	file_storage_instance = FileStorage(".")
 	date_time_provider_instance = DateTimeProvider()
 
+	# Jobs, projects and workers are read for every pending run but change rarely
+	cached_database_client_instance = CachedDatabaseClient(database_client_instance, date_time_provider_instance, time_to_live_seconds = 5)
+
 	authentication_provider_instance = AuthenticationProvider(database_client_instance, date_time_provider_instance)
 	authorization_provider_instance = AuthorizationProvider()
-	job_provider_instance = JobProvider(database_client_instance, date_time_provider_instance)
-	project_provider_instance = ProjectProvider(database_client_instance, date_time_provider_instance)
+	job_provider_instance = JobProvider(cached_database_client_instance, date_time_provider_instance)
+	project_provider_instance = ProjectProvider(cached_database_client_instance, date_time_provider_instance)
 	run_provider_instance = RunProvider(database_client_instance, file_storage_instance, date_time_provider_instance)
 	schedule_provider_instance = ScheduleProvider(database_client_instance, date_time_provider_instance)
 	user_provider_instance = UserProvider(database_client_instance, date_time_provider_instance)
-	worker_provider_instance = WorkerProvider(database_client_instance, date_time_provider_instance)
+	worker_provider_instance = WorkerProvider(cached_database_client_instance, date_time_provider_instance)
+
+	# The json database client is not thread safe, so its operations must not run concurrently
+	database_executor = concurrent.futures.ThreadPoolExecutor(max_workers = 1 if arguments.database.startswith("json://") else 4)
+	archive_executor = concurrent.futures.ThreadPoolExecutor(max_workers = 1)
+	async_run_provider_instance = AsyncRunProvider(run_provider_instance, database_executor, archive_executor)
+	async_worker_provider_instance = AsyncWorkerProvider(worker_provider_instance, database_executor)
+	async_job_provider_instance = AsyncJobProvider(job_provider_instance, database_executor)
+	async_schedule_provider_instance = AsyncScheduleProvider(schedule_provider_instance, database_executor)
 
 	protocol_factory = functools.partial(
 		WebSocketServerProtocol,
@@ -65,25 +92,37 @@ def create_application(arguments): # pylint: disable = too-many-locals
 	supervisor_instance = Supervisor(
 		host = arguments.address,
 		port = arguments.port,
-		worker_provider = worker_provider_instance,
-		run_provider = run_provider_instance,
+		worker_provider = async_worker_provider_instance,
+		run_provider = async_run_provider_instance,
 		protocol_factory = protocol_factory,
 	)
 
 	worker_selector_instance = WorkerSelector(
-		worker_provider = worker_provider_instance,
+		worker_provider = async_worker_provider_instance,
 		supervisor = supervisor_instance,
+		strategy_collection = create_default_strategies(async_run_provider_instance),
 	)
 
 	job_scheduler_instance = JobScheduler(
-		job_provider = job_provider_instance,
-		run_provider = run_provider_instance,
-		schedule_provider = schedule_provider_instance,
+		job_provider = async_job_provider_instance,
+		run_provider = async_run_provider_instance,
+		schedule_provider = async_schedule_provider_instance,
 		supervisor = supervisor_instance,
 		worker_selector = worker_selector_instance,
 		date_time_provider = date_time_provider_instance,
+		dispatch_queue = DispatchQueue(master_configuration["dispatch_policies"]),
 	)
 
+	run_retention_instance = RunRetention(job_provider_instance, run_provider_instance, date_time_provider_instance, master_configuration["retention_policies"])
+	run_collector_instance = RunCollector(run_retention_instance, database_executor)
+
+	statistics_reporter_instance = StatisticsReporter({
+		"database cache": cached_database_client_instance,
+		"file storage": file_storage_instance,
+		"job scheduler": job_scheduler_instance,
+		"run retention": run_retention_instance,
+	})
+
 	master_instance = Master(
 		project_provider = project_provider_instance,
 		job_provider = job_provider_instance,
@@ -91,13 +130,16 @@ def create_application(arguments): # pylint: disable = too-many-locals
 		worker_provider = worker_provider_instance,
 		job_scheduler = job_scheduler_instance,
 		supervisor = supervisor_instance,
+		run_collector = run_collector_instance,
+		statistics_reporter = statistics_reporter_instance,
 	)
 
 	# Rapid updates to reduce delays in tests
 	job_scheduler_instance.update_interval_seconds = 1
 	supervisor_instance.update_interval_seconds = 1
+	statistics_reporter_instance.update_interval_seconds = 10
 
-	master_instance.apply_configuration(configuration.configure())
+	master_instance.apply_configuration(master_configuration)
 
 	return master_instance
 
@@ -5,7 +5,7 @@ import flask
 
 from bhamon_orchestra_model.authentication_provider import AuthenticationProvider
 from bhamon_orchestra_model.authorization_provider import AuthorizationProvider
-from bhamon_orchestra_model.database.file_storage import FileStorage
+from bhamon_orchestra_model.database.local_file_storage import LocalFileStorage
 from bhamon_orchestra_model.date_time_provider import DateTimeProvider
 from bhamon_orchestra_model.job_provider import JobProvider
 from bhamon_orchestra_model.project_provider import ProjectProvider
@@ -37,7 +37,7 @@ def parse_arguments():
 
 def create_application(arguments):
 	database_client_instance = environment.create_database_client(arguments.database)
-	file_storage_instance = FileStorage(".")
+	file_storage_instance = LocalFileStorage(".")
 	date_time_provider_instance = DateTimeProvider()
 
 	application = flask.Flask(__name__)
@@ -6,7 +6,7 @@ from . import context
 from . import environment
 
 
-@pytest.mark.parametrize("database_type", environment.get_all_database_types())
+@pytest.mark.parametrize("database_type", environment.get_all_database_client_types())
 def test_single(tmpdir, database_type):
 	""" Test database operations with a single record """
 
@@ -23,7 +23,7 @@ def test_single(tmpdir, database_type):
 		assert context_instance.database_client.count(table, {}) == 0
 
 
-@pytest.mark.parametrize("database_type", environment.get_all_database_types())
+@pytest.mark.parametrize("database_type", environment.get_all_database_client_types())
 def test_many(tmpdir, database_type):
 	""" Test database operations with several records """
 
@@ -46,7 +46,7 @@ def test_many(tmpdir, database_type):
 		assert context_instance.database_client.count(table, {}) == 2
 
 
-@pytest.mark.parametrize("database_type", environment.get_all_database_types())
+@pytest.mark.parametrize("database_type", environment.get_all_database_client_types())
 def test_index(tmpdir, database_type):
 	""" Test database operations on a table with an index """
 
@@ -64,3 +64,102 @@ def test_index(tmpdir, database_type):
 		with pytest.raises(Exception):
 			context_instance.database_client.insert_one(table, record)
 		assert context_instance.database_client.count(table, {}) == 1
+
+
+@pytest.mark.parametrize("database_type", environment.get_all_database_client_types())
+def test_bulk_write(tmpdir, database_type):
+	""" Test applying a batch of write operations """
+
+	table = "record"
+
+	with context.DatabaseContext(tmpdir, database_type) as context_instance:
+		context_instance.database_administration.create_index(table, "id_unique", [ ("id", "ascending") ], is_unique = True)
+
+		context_instance.database_client.insert_many(table, [ { "id": 1, "key": "first" }, { "id": 2, "key": "second" } ])
+		assert context_instance.database_client.count(table, {}) == 2
+
+		context_instance.database_client.bulk_write(table, [
+			{ "operation": "insert_one", "data": { "id": 3, "key": "third" } },
+			{ "operation": "update_one", "filter": { "id": 1 }, "data": { "key": "updated" } },
+			{ "operation": "delete_one", "filter": { "id": 2 } },
+		])
+
+		assert context_instance.database_client.find_many(table, {}) == [ { "id": 1, "key": "updated" }, { "id": 3, "key": "third" } ]
+
+		with pytest.raises(Exception):
+			context_instance.database_client.bulk_write(table, [
+				{ "operation": "update_one", "filter": { "id": 1 }, "data": { "key": "before_error" } },
+				{ "operation": "insert_one", "data": { "id": 3, "key": "duplicate" } },
+				{ "operation": "update_one", "filter": { "id": 3 }, "data": { "key": "after_error" } },
+			])
+
+		assert context_instance.database_client.find_many(table, {}) == [ { "id": 1, "key": "before_error" }, { "id": 3, "key": "third" } ]
+
+
+@pytest.mark.parametrize("database_type", environment.get_all_database_client_types())
+def test_projection(tmpdir, database_type):
+	""" Test retrieving only some fields from records """
+
+	table = "record"
+	record = { "id": 1, "key": "first", "results": { "revision": "abc", "steps": [ 1, 2 ] } }
+
+	with context.DatabaseContext(tmpdir, database_type) as context_instance:
+		context_instance.database_client.insert_one(table, record)
+
+		assert context_instance.database_client.find_many(table, {}, projection = [ "id", "results.revision" ]) == [ { "id": 1, "results": { "revision": "abc" } } ]
+		assert context_instance.database_client.find_one(table, { "id": 1 }, projection = [ "key", "missing" ]) == { "key": "first" }
+		assert context_instance.database_client.find_one(table, { "id": 1 }) == record
+
+
+@pytest.mark.parametrize("database_type", environment.get_all_database_client_types())
+def test_iter_many(tmpdir, database_type):
+	""" Test iterating on records in batches """
+
+	table = "record"
+	record_collection = [ { "id": index, "key": "even" if index % 2 == 0 else "odd" } for index in range(10) ]
+
+	with context.DatabaseContext(tmpdir, database_type) as context_instance:
+		context_instance.database_client.insert_many(table, record_collection)
+
+		assert list(context_instance.database_client.iter_many(table, {}, batch_size = 3)) == record_collection
+		assert list(context_instance.database_client.iter_many(table, { "key": "odd" }, skip = 1, limit = 2, batch_size = 1)) == record_collection[3:7:2]
+		assert list(context_instance.database_client.iter_many(table, {}, limit = 2, order_by = [ ("id", "descending") ], projection = [ "id" ])) == [ { "id": 9 }, { "id": 8 } ]
+
+
+@pytest.mark.parametrize("database_type", environment.get_all_database_client_types())
+def test_filter_operators(tmpdir, database_type):
+	""" Test filtering records with query operators """
+
+	table = "record"
+	first_record = { "id": 1, "status": "pending", "worker": None }
+	second_record = { "id": 2, "status": "running", "worker": "worker_01" }
+	third_record = { "id": 3, "status": "succeeded", "worker": "worker_01", "results": { "size": 10 } }
+
+	with context.DatabaseContext(tmpdir, database_type) as context_instance:
+		context_instance.database_client.insert_many(table, [ first_record, second_record, third_record ])
+
+		assert context_instance.database_client.find_many(table, { "status": { "$in": [ "pending", "running" ] } }) == [ first_record, second_record ]
+		assert context_instance.database_client.find_many(table, { "worker": { "$ne": None } }) == [ second_record, third_record ]
+		assert context_instance.database_client.find_many(table, { "id": { "$gt": 1, "$lte": 2 } }) == [ second_record ]
+		assert context_instance.database_client.find_many(table, { "id": { "$lt": 2 } }) == [ first_record ]
+		assert context_instance.database_client.find_many(table, { "id": { "$gte": 3 } }) == [ third_record ]
+		assert context_instance.database_client.find_many(table, { "results.size": { "$exists": True } }) == [ third_record ]
+		assert context_instance.database_client.find_many(table, { "results": { "$exists": False }, "status": { "$ne": "running" } }) == [ first_record ]
+		assert context_instance.database_client.count(table, { "results.size": { "$in": [ None, 10 ] } }) == 3
+
+
+@pytest.mark.parametrize("database_type", environment.get_all_database_client_types())
+def test_analyze_query(tmpdir, database_type):
+	""" Test finding which index is used by a query """
+
+	with context.DatabaseContext(tmpdir, database_type) as context_instance:
+		context_instance.database_administration.initialize()
+
+		analysis = context_instance.database_administration.analyze_query("run", { "project": "project", "identifier": "run" })
+		assert analysis == { "table": "run", "index": "identifier_unique", "is_collection_scan": False }
+
+		analysis = context_instance.database_administration.analyze_query("run", { "worker": "worker", "status": "running" })
+		assert analysis == { "table": "run", "index": "worker_status", "is_collection_scan": False }
+
+		analysis = context_instance.database_administration.analyze_query("run", { "job": "job" })
+		assert analysis == { "table": "run", "index": None, "is_collection_scan": True }
@@ -0,0 +1,39 @@
+""" Unit tests for CapabilityIndex """
+
+from bhamon_orchestra_master.capability_index import CapabilityIndex, get_capabilities, get_requirements
+
+
+def test_get_capabilities():
+	""" Test deriving capabilities from worker properties and requirements from job properties """
+
+	worker_properties = { "is_controller": False, "executor_limit": 2, "operating_system": "linux", "project": [ "first", "second" ], "paths": { "python": "python3" } }
+	job_properties = { "is_controller": False, "requirements": { "operating_system": "linux", "project": [ "first" ] } }
+
+	assert get_capabilities(worker_properties) == {
+		("is_controller", False), ("executor_limit", 2), ("operating_system", "linux"), ("project", "first"), ("project", "second") }
+	assert get_requirements({ "properties": job_properties }) == [ ("is_controller", False), ("operating_system", "linux"), ("project", "first") ]
+	assert get_requirements({ "properties": {} }) == [ ("is_controller", False) ]
+
+
+def test_find_workers():
+	""" Test finding workers as they are added and removed """
+
+	capability_index = CapabilityIndex()
+	capability_index.add_worker("linux_01", { "is_controller": False, "operating_system": "linux", "toolchain": [ "gcc", "clang" ] })
+	capability_index.add_worker("linux_02", { "is_controller": False, "operating_system": "linux", "toolchain": [ "gcc" ] })
+	capability_index.add_worker("windows_01", { "is_controller": False, "operating_system": "windows", "toolchain": [ "msvc", "clang" ] })
+	capability_index.add_worker("controller", { "is_controller": True })
+
+	assert capability_index.find_workers([ ("is_controller", False), ("toolchain", "clang") ]) == { "linux_01", "windows_01" }
+	assert capability_index.find_workers([ ("operating_system", "linux"), ("toolchain", "gcc") ]) == { "linux_01", "linux_02" }
+	assert capability_index.find_workers([ ("operating_system", "macos") ]) == set()
+	assert capability_index.find_workers([]) == { "linux_01", "linux_02", "windows_01", "controller" }
+
+	capability_index.remove_worker("linux_01")
+	capability_index.add_worker("windows_01", { "is_controller": False, "operating_system": "windows", "toolchain": [ "msvc" ] })
+
+	assert capability_index.find_workers([ ("toolchain", "clang") ]) == set()
+	assert capability_index.find_workers([ ("operating_system", "linux") ]) == { "linux_02" }
+	assert len(capability_index) == 3
+	assert capability_index._index.keys() == { ("is_controller", False), ("is_controller", True), ("operating_system", "linux"), # pylint: disable = protected-access
+		("operating_system", "windows"), ("toolchain", "gcc"), ("toolchain", "msvc") }
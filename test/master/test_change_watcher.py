@@ -0,0 +1,59 @@
+""" Unit tests for ChangeWatcher """
+
+import asyncio
+import time
+
+import pytest
+
+from bhamon_orchestra_master.change_watcher import ChangeWatcher
+from bhamon_orchestra_model.database.memory_database_client import MemoryDatabaseClient
+from bhamon_orchestra_model.worker_provider import WorkerProvider
+
+from ..fakes.fake_date_time_provider import FakeDateTimeProvider
+
+
+@pytest.mark.asyncio
+async def test_wait():
+	""" Test waiting wakes up early on changes, and waits for the maximum interval otherwise """
+
+	worker_provider_instance = WorkerProvider(MemoryDatabaseClient(), FakeDateTimeProvider())
+	change_watcher = ChangeWatcher()
+	change_watcher.watch(worker_provider_instance)
+
+	try:
+		start_time = time.monotonic()
+		await change_watcher.wait(0, 0.5)
+		assert time.monotonic() - start_time >= 0.5
+
+		start_time = time.monotonic()
+		asyncio.get_event_loop().call_later(0.1, worker_provider_instance.create, "my_worker", "user", "1.0", "My Worker")
+		await change_watcher.wait(0, 5)
+		assert time.monotonic() - start_time < 1
+
+	finally:
+		change_watcher.dispose()
+
+
+@pytest.mark.asyncio
+async def test_wait_with_change_during_update():
+	""" Test waiting wakes up for changes reported while an update is in progress, including after an earlier change woke it up """
+
+	worker_provider_instance = WorkerProvider(MemoryDatabaseClient(), FakeDateTimeProvider())
+	change_watcher = ChangeWatcher()
+	change_watcher.watch(worker_provider_instance)
+
+	async def update():
+		worker_provider_instance.create("first_worker", "user", "1.0", "First Worker")
+		await asyncio.sleep(0.2)
+		worker_provider_instance.create("second_worker", "user", "1.0", "Second Worker")
+
+	try:
+		change_watcher.clear()
+		await asyncio.gather(update(), change_watcher.wait(0, 5))
+
+		start_time = time.monotonic()
+		await change_watcher.wait(0, 5)
+		assert time.monotonic() - start_time < 1
+
+	finally:
+		change_watcher.dispose()
@@ -0,0 +1,63 @@
+""" Unit tests for CronExpression """
+
+import datetime
+
+import pytest
+
+from bhamon_orchestra_master.cron_expression import CronExpression
+
+
+expression_collection = [
+	"* * * * *",
+	"*/15 * * * *",
+	"0 */6 * * *",
+	"30 8-18/2 * * *",
+	"0 0 1,15 * *",
+	"0 0 */10 */2 *",
+	"0 12 * * mon-fri",
+	"0 12 * * sat,sunday",
+	"0 0 13 * 5",
+	"45 23 * 12 0",
+]
+
+
+@pytest.mark.parametrize("expression", expression_collection)
+def test_matches(expression):
+	""" Test matching times against pycron, which evaluated schedule expressions before they were compiled """
+
+	pycron = pytest.importorskip("pycron")
+	cron_expression = CronExpression(expression)
+	date_time = datetime.datetime(2020, 1, 1)
+
+	while date_time < datetime.datetime(2021, 1, 1):
+		assert cron_expression.matches(date_time) == pycron.is_now(expression, date_time), date_time
+		date_time += datetime.timedelta(minutes = 7)
+
+
+def test_get_next():
+	""" Test computing the next trigger time """
+
+	assert CronExpression("* * * * *").get_next(datetime.datetime(2020, 1, 1, 10, 20, 30)) == datetime.datetime(2020, 1, 1, 10, 21)
+	assert CronExpression("0 0 * * *").get_next(datetime.datetime(2020, 1, 1, 0, 0, 0)) == datetime.datetime(2020, 1, 2, 0, 0)
+	assert CronExpression("30 8-18/2 * * *").get_next(datetime.datetime(2020, 1, 1, 18, 30)) == datetime.datetime(2020, 1, 2, 8, 30)
+	assert CronExpression("0 12 * * mon-fri").get_next(datetime.datetime(2020, 1, 3, 12, 0)) == datetime.datetime(2020, 1, 6, 12, 0)
+	assert CronExpression("0 0 29 2 *").get_next(datetime.datetime(2020, 3, 1)) == datetime.datetime(2024, 2, 29)
+	assert CronExpression("0 0 31 2 *").get_next(datetime.datetime(2020, 1, 1)) is None
+
+
+def test_get_next_wrapping_range():
+	""" Test computing the next trigger time for ranges wrapping around the end of a field """
+
+	cron_expression = CronExpression("0 22-2 * * fri-mon")
+
+	assert cron_expression.hours == { 22, 23, 0, 1, 2 }
+	assert cron_expression.days_of_week == { 5, 6, 0, 1 }
+	assert cron_expression.get_next(datetime.datetime(2020, 1, 1, 12, 0)) == datetime.datetime(2020, 1, 3, 0, 0)
+
+
+@pytest.mark.parametrize("expression", [ "* * * *", "60 * * * *", "* * 0 * *", "*/0 * * * *", "* * * * someday" ])
+def test_invalid(expression):
+	""" Test compiling invalid expressions """
+
+	with pytest.raises(ValueError):
+		CronExpression(expression)
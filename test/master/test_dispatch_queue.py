@@ -0,0 +1,48 @@
+""" Unit tests for DispatchQueue """
+
+import pytest
+
+from bhamon_orchestra_master.dispatch_queue import DispatchQueue
+
+
+def create_runs(project, count, priority = 0, start_index = 0):
+	return [ { "project": project, "identifier": "%s_%s" % (project, index), "priority": priority, "creation_date": "2020-01-01T00:%02d:00Z" % index }
+		for index in range(start_index, start_index + count) ]
+
+
+def test_sort_priority():
+	""" Test dispatching runs with a higher priority first, then oldest first """
+
+	dispatch_queue = DispatchQueue()
+	run_collection = create_runs("examples", 2) + create_runs("examples", 2, priority = 10, start_index = 2) + create_runs("examples", 1, priority = -1, start_index = 4)
+
+	sorted_runs = dispatch_queue.sort(list(reversed(run_collection)), {})
+
+	assert [ run["identifier"] for run in sorted_runs ] == [ "examples_2", "examples_3", "examples_0", "examples_1", "examples_4" ]
+
+
+def test_sort_fair_share():
+	""" Test sharing dispatch between projects according to their weight and to their runs in progress """
+
+	dispatch_queue = DispatchQueue([ { "project": "important", "weight": 2 } ])
+	run_collection = create_runs("burst", 100) + create_runs("other", 2, start_index = 50) + create_runs("important", 4, start_index = 60)
+
+	sorted_runs = dispatch_queue.sort(run_collection, { "other": 1 })
+
+	assert [ run["identifier"] for run in sorted_runs[:8] ] \
+		== [ "burst_0", "important_60", "important_61", "burst_1", "other_50", "important_62", "important_63", "burst_2" ]
+	assert sorted([ run["identifier"] for run in sorted_runs ]) == sorted([ run["identifier"] for run in run_collection ])
+
+
+def test_policies():
+	""" Test finding the most specific policy for a project """
+
+	dispatch_queue = DispatchQueue([ { "concurrency_limit": 5 }, { "project": "examples", "weight": 3 } ])
+
+	assert dispatch_queue.get_weight("examples") == 3
+	assert dispatch_queue.get_concurrency_limit("examples") is None
+	assert dispatch_queue.get_weight("other") == 1
+	assert dispatch_queue.get_concurrency_limit("other") == 5
+
+	with pytest.raises(ValueError):
+		DispatchQueue([ { "weight": 0 } ])
@@ -0,0 +1,83 @@
+""" Unit tests for ScheduleQueue """
+
+import datetime
+
+from bhamon_orchestra_master.schedule_queue import ScheduleQueue
+
+
+def create_schedule(identifier, expression, is_enabled = True):
+	return { "project": "examples", "identifier": identifier, "job": "empty", "parameters": {}, "expression": expression, "is_enabled": is_enabled, "last_run": None }
+
+
+def test_pop_due():
+	""" Test triggering schedules in the order of their trigger times """
+
+	schedule_queue = ScheduleQueue()
+	now = datetime.datetime(2020, 1, 1, 10, 0, 30)
+
+	schedule_queue.update([ create_schedule("hourly", "0 * * * *"), create_schedule("quarter", "*/15 * * * *"), create_schedule("disabled", "* * * * *", False) ], now)
+
+	assert len(schedule_queue) == 2
+	assert sorted((schedule["identifier"], trigger_date) for schedule, trigger_date in schedule_queue.pop_due(now)) \
+		== [ ("hourly", datetime.datetime(2020, 1, 1, 10, 0)), ("quarter", datetime.datetime(2020, 1, 1, 10, 0)) ]
+	assert schedule_queue.pop_due(now) == []
+	assert schedule_queue.get_next_trigger_date() == datetime.datetime(2020, 1, 1, 10, 15)
+
+	now = datetime.datetime(2020, 1, 1, 10, 15, 0)
+	assert [ (schedule["identifier"], trigger_date) for schedule, trigger_date in schedule_queue.pop_due(now) ] == [ ("quarter", now) ]
+
+
+def test_pop_due_late():
+	""" Test triggering schedules when an update comes after their trigger time """
+
+	schedule_queue = ScheduleQueue()
+	schedule_queue.update([ create_schedule("daily", "0 0 * * *") ], datetime.datetime(2020, 1, 1, 12, 0))
+
+	assert schedule_queue.pop_due(datetime.datetime(2020, 1, 1, 23, 59, 59)) == []
+
+	due_collection = schedule_queue.pop_due(datetime.datetime(2020, 1, 4, 0, 1, 10))
+	assert [ trigger_date for _, trigger_date in due_collection ] == [ datetime.datetime(2020, 1, 2) ]
+	assert schedule_queue.get_next_trigger_date() == datetime.datetime(2020, 1, 5)
+
+
+def test_update():
+	""" Test reloading schedules which changed """
+
+	schedule_queue = ScheduleQueue()
+	now = datetime.datetime(2020, 1, 1, 10, 5)
+
+	schedule_queue.update([ create_schedule("first", "0 * * * *"), create_schedule("second", "0 * * * *"), create_schedule("third", "invalid") ], now)
+	assert len(schedule_queue) == 2
+	assert schedule_queue.get_next_trigger_date() == datetime.datetime(2020, 1, 1, 11, 0)
+
+	updated_schedule = create_schedule("first", "0 * * * *")
+	updated_schedule["parameters"] = { "key": "value" }
+	schedule_queue.update([ updated_schedule, create_schedule("second", "30 * * * *"), create_schedule("third", "0 * * * *", False) ], now)
+
+	assert len(schedule_queue) == 2
+	assert schedule_queue.get_next_trigger_date() == datetime.datetime(2020, 1, 1, 10, 30)
+
+	due_collection = schedule_queue.pop_due(datetime.datetime(2020, 1, 1, 11, 0))
+	assert [ (schedule["identifier"], schedule["parameters"]) for schedule, _ in due_collection ] == [ ("second", {}), ("first", { "key": "value" }) ]
+
+	schedule_queue.update([], now)
+	assert len(schedule_queue) == 0
+	assert schedule_queue.get_next_trigger_date() is None
+
+
+def test_update_many():
+	""" Test reloading only the schedules which changed, leaving the other schedules in the queue """
+
+	schedule_queue = ScheduleQueue()
+	now = datetime.datetime(2020, 1, 1, 10, 5)
+
+	schedule_queue.update([ create_schedule("first", "0 * * * *"), create_schedule("second", "0 * * * *"), create_schedule("third", "0 * * * *") ], now)
+	assert len(schedule_queue) == 3
+
+	schedule_queue.update_many([ create_schedule("second", "30 * * * *"), create_schedule("third", "0 * * * *", False), create_schedule("fourth", "invalid") ], now)
+
+	assert len(schedule_queue) == 2
+	assert schedule_queue.get_next_trigger_date() == datetime.datetime(2020, 1, 1, 10, 30)
+
+	due_collection = schedule_queue.pop_due(datetime.datetime(2020, 1, 1, 11, 0))
+	assert [ schedule["identifier"] for schedule, _ in due_collection ] == [ "second", "first" ]
@@ -2,13 +2,25 @@
 
 """ Unit tests for JobScheduler """
 
+import asyncio
+import datetime
+import time
+
 import pytest
 
 from bhamon_orchestra_master.job_scheduler import JobScheduler
 from bhamon_orchestra_master.supervisor import Supervisor
 from bhamon_orchestra_master.worker import Worker
+from bhamon_orchestra_master.worker_selector import WorkerSelector
+from bhamon_orchestra_model.async_job_provider import AsyncJobProvider
+from bhamon_orchestra_model.async_run_provider import AsyncRunProvider
+from bhamon_orchestra_model.async_schedule_provider import AsyncScheduleProvider
+from bhamon_orchestra_model.async_worker_provider import AsyncWorkerProvider
 from bhamon_orchestra_model.database.memory_database_client import MemoryDatabaseClient
+from bhamon_orchestra_model.job_provider import JobProvider
 from bhamon_orchestra_model.run_provider import RunProvider
+from bhamon_orchestra_model.schedule_provider import ScheduleProvider
+from bhamon_orchestra_model.worker_provider import WorkerProvider
 
 from ..fakes.fake_date_time_provider import FakeDateTimeProvider
 
@@ -20,7 +32,7 @@ def test_abort_run_pending():
 	date_time_provider_instance = FakeDateTimeProvider()
 	run_provider_instance = RunProvider(database_client_instance, None, date_time_provider_instance)
 	supervisor_instance = Supervisor(None, None, None, None, None)
-	job_scheduler_instance = JobScheduler(None, run_provider_instance, None, supervisor_instance, None, date_time_provider_instance)
+	job_scheduler_instance = JobScheduler(None, AsyncRunProvider(run_provider_instance), None, supervisor_instance, None, date_time_provider_instance)
 
 	job = { "project": "examples", "identifier": "empty" }
 	run = run_provider_instance.create(job["project"], job["identifier"], {}, None)
@@ -34,21 +46,22 @@ def test_abort_run_pending():
 	assert run["status"] == "pending"
 
 
-def test_abort_run_running_connected():
+@pytest.mark.asyncio
+async def test_abort_run_running_connected():
 	""" Test aborting an in progress run on a connected worker """
 
 	database_client_instance = MemoryDatabaseClient()
 	date_time_provider_instance = FakeDateTimeProvider()
 	run_provider_instance = RunProvider(database_client_instance, None, date_time_provider_instance)
-	worker_instance = Worker("worker_test", None, run_provider_instance)
+	worker_instance = Worker("worker_test", None, AsyncRunProvider(run_provider_instance))
 	supervisor_instance = Supervisor(None, None, None, None, None)
-	job_scheduler_instance = JobScheduler(None, run_provider_instance, None, supervisor_instance, None, date_time_provider_instance)
+	job_scheduler_instance = JobScheduler(None, AsyncRunProvider(run_provider_instance), None, supervisor_instance, None, date_time_provider_instance)
 
 	supervisor_instance._active_workers[worker_instance.identifier] = worker_instance
 
 	job = { "project": "examples", "identifier": "empty" }
 	run = run_provider_instance.create(job["project"], job["identifier"], {}, None)
-	worker_instance.assign_run(job, run)
+	await worker_instance.assign_run(job, run)
 	run_provider_instance.update_status(run, status = "running")
 
 	assert run["status"] == "running"
@@ -63,19 +76,20 @@ def test_abort_run_running_connected():
 	assert worker_instance.executors[0]["should_abort"] is True
 
 
-def test_abort_run_running_disconnected():
+@pytest.mark.asyncio
+async def test_abort_run_running_disconnected():
 	""" Test aborting an in progress run on a disconnected worker """
 
 	database_client_instance = MemoryDatabaseClient()
 	date_time_provider_instance = FakeDateTimeProvider()
 	run_provider_instance = RunProvider(database_client_instance, None, date_time_provider_instance)
-	worker_instance = Worker("worker_test", None, run_provider_instance)
+	worker_instance = Worker("worker_test", None, AsyncRunProvider(run_provider_instance))
 	supervisor_instance = Supervisor(None, None, None, None, None)
-	job_scheduler_instance = JobScheduler(None, run_provider_instance, None, supervisor_instance, None, date_time_provider_instance)
+	job_scheduler_instance = JobScheduler(None, AsyncRunProvider(run_provider_instance), None, supervisor_instance, None, date_time_provider_instance)
 
 	job = { "project": "examples", "identifier": "empty" }
 	run = run_provider_instance.create(job["project"], job["identifier"], {}, None)
-	worker_instance.assign_run(job, run)
+	await worker_instance.assign_run(job, run)
 	run_provider_instance.update_status(run, status = "running")
 
 	assert run["status"] == "running"
@@ -97,7 +111,7 @@ def test_abort_run_completed():
 	date_time_provider_instance = FakeDateTimeProvider()
 	run_provider_instance = RunProvider(database_client_instance, None, date_time_provider_instance)
 	supervisor_instance = Supervisor(None, None, None, None, None)
-	job_scheduler_instance = JobScheduler(None, run_provider_instance, None, supervisor_instance, None, date_time_provider_instance)
+	job_scheduler_instance = JobScheduler(None, AsyncRunProvider(run_provider_instance), None, supervisor_instance, None, date_time_provider_instance)
 
 	job = { "project": "examples", "identifier": "empty" }
 	run = run_provider_instance.create(job["project"], job["identifier"], {}, None)
@@ -110,3 +124,203 @@ def test_abort_run_completed():
 		job_scheduler_instance.abort_run(run)
 
 	assert run["status"] == "succeeded"
+
+
+@pytest.mark.asyncio
+async def test_run_with_change_during_update():
+	""" Test the update loop wakes up for runs changed while an update is in progress, such as runs completed by workers """
+
+	database_client_instance = MemoryDatabaseClient()
+	date_time_provider_instance = FakeDateTimeProvider()
+	run_provider_instance = RunProvider(database_client_instance, None, date_time_provider_instance)
+	schedule_provider_instance = ScheduleProvider(database_client_instance, date_time_provider_instance)
+	job_scheduler_instance = JobScheduler(None, AsyncRunProvider(run_provider_instance), AsyncScheduleProvider(schedule_provider_instance),
+		None, None, date_time_provider_instance)
+
+	job_scheduler_instance.minimum_update_interval_seconds = 0
+	job_scheduler_instance.update_interval_seconds = 5
+	all_update_times = []
+
+	async def update():
+		all_update_times.append(time.monotonic())
+		if len(all_update_times) == 1:
+			run_provider_instance.create("examples", "empty", {}, None)
+			await asyncio.sleep(0.1)
+
+	job_scheduler_instance.update = update
+	run_task = asyncio.ensure_future(job_scheduler_instance.run())
+
+	try:
+		await asyncio.sleep(1)
+	finally:
+		run_task.cancel()
+		with pytest.raises(asyncio.CancelledError):
+			await run_task
+
+	assert len(all_update_times) == 2
+	assert all_update_times[1] - all_update_times[0] < 1
+
+
+@pytest.mark.asyncio
+async def test_update_schedules():
+	""" Test triggering runs for a schedule, once per trigger time, including when updates are late """
+
+	database_client_instance = MemoryDatabaseClient()
+	date_time_provider_instance = FakeDateTimeProvider()
+	job_provider_instance = JobProvider(database_client_instance, date_time_provider_instance)
+	run_provider_instance = RunProvider(database_client_instance, None, date_time_provider_instance)
+	schedule_provider_instance = ScheduleProvider(database_client_instance, date_time_provider_instance)
+	worker_provider_instance = WorkerProvider(database_client_instance, date_time_provider_instance)
+	supervisor_instance = Supervisor(None, None, None, AsyncWorkerProvider(worker_provider_instance), None)
+	worker_selector_instance = WorkerSelector(AsyncWorkerProvider(worker_provider_instance), supervisor_instance)
+	job_scheduler_instance = JobScheduler(AsyncJobProvider(job_provider_instance), AsyncRunProvider(run_provider_instance),
+		AsyncScheduleProvider(schedule_provider_instance), supervisor_instance, worker_selector_instance, date_time_provider_instance)
+
+	job = job_provider_instance.create_or_update("empty", "examples", "Empty", "", "examples", [], [], {})
+	job_provider_instance.update_status(job, is_enabled = False)
+	schedule = schedule_provider_instance.create_or_update("every_two_minutes", "examples", "Every Two Minutes", "empty", {}, "*/2 * * * *")
+	schedule_provider_instance.update_status(schedule, is_enabled = True)
+
+	date_time_provider_instance.now_value = datetime.datetime(2020, 1, 1, 10, 0, 5)
+	await job_scheduler_instance.update()
+	await job_scheduler_instance.update()
+	assert run_provider_instance.count() == 1
+
+	run_provider_instance.update_status(run_provider_instance.get_list()[0], status = "succeeded")
+
+	date_time_provider_instance.now_value = datetime.datetime(2020, 1, 1, 10, 1, 50)
+	await job_scheduler_instance.update()
+	assert run_provider_instance.count() == 1
+
+	date_time_provider_instance.now_value = datetime.datetime(2020, 1, 1, 10, 3, 10)
+	await job_scheduler_instance.update()
+	assert run_provider_instance.count() == 2
+	assert schedule_provider_instance.get("examples", "every_two_minutes")["last_run"] is not None
+
+
+@pytest.mark.asyncio
+async def test_update_schedules_incremental():
+	""" Test loading only the schedules updated since the previous update, and all schedules periodically """
+
+	database_client_instance = MemoryDatabaseClient()
+	date_time_provider_instance = FakeDateTimeProvider()
+	job_provider_instance = JobProvider(database_client_instance, date_time_provider_instance)
+	run_provider_instance = RunProvider(database_client_instance, None, date_time_provider_instance)
+	schedule_provider_instance = ScheduleProvider(database_client_instance, date_time_provider_instance)
+	worker_provider_instance = WorkerProvider(database_client_instance, date_time_provider_instance)
+	supervisor_instance = Supervisor(None, None, None, AsyncWorkerProvider(worker_provider_instance), None)
+	worker_selector_instance = WorkerSelector(AsyncWorkerProvider(worker_provider_instance), supervisor_instance)
+	job_scheduler_instance = JobScheduler(AsyncJobProvider(job_provider_instance), AsyncRunProvider(run_provider_instance),
+		AsyncScheduleProvider(schedule_provider_instance), supervisor_instance, worker_selector_instance, date_time_provider_instance)
+
+	all_updated_since = []
+	get_list = schedule_provider_instance.get_list
+
+	def get_list_and_record(**kwargs):
+		all_updated_since.append(kwargs["updated_since"])
+		return get_list(**kwargs)
+
+	schedule_provider_instance.get_list = get_list_and_record
+
+	job = job_provider_instance.create_or_update("empty", "examples", "Empty", "", "examples", [], [], {})
+	job_provider_instance.update_status(job, is_enabled = False)
+	schedule = schedule_provider_instance.create_or_update("first", "examples", "First", "empty", {}, "9 * * * *")
+	schedule_provider_instance.update_status(schedule, is_enabled = True)
+
+	date_time_provider_instance.now_value = datetime.datetime(2020, 1, 1, 10, 5, 0)
+	await job_scheduler_instance.update()
+	assert len(job_scheduler_instance._schedule_queue) == 1
+
+	date_time_provider_instance.now_value = datetime.datetime(2020, 1, 1, 10, 6, 0)
+	schedule = schedule_provider_instance.create_or_update("second", "examples", "Second", "empty", {}, "8 * * * *")
+	schedule_provider_instance.update_status(schedule, is_enabled = True)
+	await job_scheduler_instance.update()
+	assert len(job_scheduler_instance._schedule_queue) == 2
+
+	schedule_provider_instance.delete("examples", "first")
+
+	date_time_provider_instance.now_value = datetime.datetime(2020, 1, 1, 10, 9, 10)
+	await job_scheduler_instance.update()
+	assert len(job_scheduler_instance._schedule_queue) == 2
+	assert [ run["source"]["identifier"] for run in run_provider_instance.get_list() ] == [ "second" ]
+
+	date_time_provider_instance.now_value = datetime.datetime(2020, 1, 1, 10, 10, 10)
+	await job_scheduler_instance.update()
+	assert len(job_scheduler_instance._schedule_queue) == 1
+
+	assert all_updated_since == [ None, "2020-01-01T10:04:50Z", "2020-01-01T10:05:50Z", None ]
+
+
+@pytest.mark.asyncio
+async def test_update_schedules_invalid():
+	""" Test an invalid schedule is rejected when stored, and does not prevent other schedules from triggering if it is stored anyway """
+
+	database_client_instance = MemoryDatabaseClient()
+	date_time_provider_instance = FakeDateTimeProvider()
+	job_provider_instance = JobProvider(database_client_instance, date_time_provider_instance)
+	run_provider_instance = RunProvider(database_client_instance, None, date_time_provider_instance)
+	schedule_provider_instance = ScheduleProvider(database_client_instance, date_time_provider_instance)
+	worker_provider_instance = WorkerProvider(database_client_instance, date_time_provider_instance)
+	supervisor_instance = Supervisor(None, None, None, AsyncWorkerProvider(worker_provider_instance), None)
+	worker_selector_instance = WorkerSelector(AsyncWorkerProvider(worker_provider_instance), supervisor_instance)
+	job_scheduler_instance = JobScheduler(AsyncJobProvider(job_provider_instance), AsyncRunProvider(run_provider_instance),
+		AsyncScheduleProvider(schedule_provider_instance), supervisor_instance, worker_selector_instance, date_time_provider_instance)
+
+	job = job_provider_instance.create_or_update("empty", "examples", "Empty", "", "examples", [], [], {})
+	job_provider_instance.update_status(job, is_enabled = False)
+
+	with pytest.raises(ValueError):
+		schedule_provider_instance.create_or_update("invalid", "examples", "Invalid", "empty", {}, "* * * * *", priority = "high")
+	with pytest.raises(ValueError):
+		schedule_provider_instance.create_or_update_many("examples", [
+			{ "identifier": "invalid", "display_name": "Invalid", "job": "empty", "parameters": {}, "expression": "* * * * *", "priority": "high" } ])
+	assert schedule_provider_instance.count() == 0
+
+	for schedule_identifier in [ "first", "invalid", "second" ]:
+		schedule = schedule_provider_instance.create_or_update(schedule_identifier, "examples", schedule_identifier, "empty", {}, "* * * * *")
+		schedule_provider_instance.update_status(schedule, is_enabled = True)
+	database_client_instance.update_one("schedule", { "identifier": "invalid" }, { "priority": "high" })
+
+	date_time_provider_instance.now_value = datetime.datetime(2020, 1, 1, 10, 0, 5)
+	await job_scheduler_instance.update()
+
+	assert sorted(run["source"]["identifier"] for run in run_provider_instance.get_list()) == [ "first", "second" ]
+	assert schedule_provider_instance.get("examples", "first")["last_run"] is not None
+	assert schedule_provider_instance.get("examples", "invalid")["last_run"] is None
+
+
+@pytest.mark.asyncio
+async def test_dispatch_runs():
+	""" Test dispatching pending runs to workers, within their executor limits, from a single snapshot of workers """
+
+	database_client_instance = MemoryDatabaseClient()
+	date_time_provider_instance = FakeDateTimeProvider()
+	job_provider_instance = JobProvider(database_client_instance, date_time_provider_instance)
+	run_provider_instance = RunProvider(database_client_instance, None, date_time_provider_instance)
+	worker_provider_instance = WorkerProvider(database_client_instance, date_time_provider_instance)
+	supervisor_instance = Supervisor(None, None, None, AsyncWorkerProvider(worker_provider_instance), None)
+	worker_selector_instance = WorkerSelector(AsyncWorkerProvider(worker_provider_instance), supervisor_instance)
+	job_scheduler_instance = JobScheduler(AsyncJobProvider(job_provider_instance), AsyncRunProvider(run_provider_instance),
+		None, supervisor_instance, worker_selector_instance, date_time_provider_instance)
+
+	job_provider_instance.create_or_update("empty", "examples", "Empty", "", "examples", [], [], { "is_controller": False })
+
+	for worker_identifier in [ "worker_01", "worker_02", "worker_03" ]:
+		worker_properties = { "is_controller": False, "executor_limit": 1 }
+		worker_record = worker_provider_instance.create(worker_identifier, "user", "1.0", worker_identifier)
+		worker_provider_instance.update_properties(worker_record, "1.0", worker_identifier, worker_properties)
+		supervisor_instance._active_workers[worker_identifier] = Worker(worker_identifier, None, AsyncRunProvider(run_provider_instance))
+		supervisor_instance.capability_index.add_worker(worker_identifier, worker_properties)
+
+	worker_provider_instance.update_status(worker_provider_instance.get("worker_03"), is_enabled = False)
+
+	all_runs = [ run_provider_instance.create("examples", "empty", {}, None) for index in range(3) ]
+	all_runs.append(run_provider_instance.create("examples", "missing", {}, None))
+
+	assigned_run_count = await job_scheduler_instance.dispatch_runs(all_runs)
+
+	assert assigned_run_count == 2
+	assert sorted(run.get("worker", None) or "" for run in all_runs[:3]) == [ "", "worker_01", "worker_02" ]
+	assert all_runs[3]["status"] == "exception"
+	assert job_scheduler_instance.get_statistics()["last_dispatch_run_count"] == 4
+	assert job_scheduler_instance.get_statistics()["last_dispatch_assigned_run_count"] == 2
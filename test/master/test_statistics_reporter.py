@@ -0,0 +1,32 @@
+""" Unit tests for StatisticsReporter """
+
+import logging
+
+from bhamon_orchestra_master.statistics_reporter import StatisticsReporter
+from bhamon_orchestra_model.database.cached_database_client import CachedDatabaseClient
+from bhamon_orchestra_model.database.memory_database_client import MemoryDatabaseClient
+
+from ..fakes.fake_date_time_provider import FakeDateTimeProvider
+
+
+def test_update(caplog):
+	""" Test statistics are reported as they change, and not logged again while they do not """
+
+	database_client_instance = CachedDatabaseClient(MemoryDatabaseClient(), FakeDateTimeProvider(), time_to_live_seconds = 10)
+	statistics_reporter = StatisticsReporter({ "database cache": database_client_instance })
+	table = "record"
+
+	database_client_instance.insert_one(table, { "id": 1, "key": "value" })
+
+	with caplog.at_level(logging.INFO, logger = "StatisticsReporter"):
+		assert statistics_reporter.update() == { "database cache": { "hit_count": 0, "miss_count": 0, "size": 0 } }
+
+		database_client_instance.find_one(table, { "id": 1 })
+		database_client_instance.find_one(table, { "id": 1 })
+		assert statistics_reporter.update() == { "database cache": { "hit_count": 1, "miss_count": 1, "size": 1 } }
+		assert statistics_reporter.update() == { "database cache": { "hit_count": 1, "miss_count": 1, "size": 1 } }
+
+	assert [ record.getMessage() for record in caplog.records if record.name == "StatisticsReporter" ] == [
+		"Statistics for database cache: {\"hit_count\": 0, \"miss_count\": 0, \"size\": 0}",
+		"Statistics for database cache: {\"hit_count\": 1, \"miss_count\": 1, \"size\": 1}",
+	]
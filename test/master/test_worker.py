@@ -6,6 +6,7 @@ from unittest.mock import Mock, patch
 
 import pytest
 
+from bhamon_orchestra_model.async_run_provider import AsyncRunProvider
 from bhamon_orchestra_model.database.memory_database_client import MemoryDatabaseClient
 from bhamon_orchestra_model.database.memory_file_storage import MemoryFileStorage
 from bhamon_orchestra_model.run_provider import RunProvider
@@ -25,7 +26,7 @@ RemoteWorker._resynchronize = lambda self, run_identifier, reset: None
 async def test_start_execution_success():
 	""" Test _start_execution in normal conditions """
 
-	run_provider_instance = Mock(spec = RunProvider)
+	run_provider_instance = Mock(spec = AsyncRunProvider)
 	worker_remote_instance = RemoteWorker("my_worker", None, None, None, None, None, None)
 	worker_remote_instance.executor_factory = FakeExecutorWatcher
 	worker_messenger = InProcessMessenger(worker_remote_instance._handle_request)
@@ -42,7 +43,7 @@ async def test_start_execution_success():
 async def test_abort_execution_success():
 	""" Test _abort_execution in normal conditions """
 
-	run_provider_instance = Mock(spec = RunProvider)
+	run_provider_instance = Mock(spec = AsyncRunProvider)
 	worker_remote_instance = RemoteWorker("my_worker", None, None, None, None, None, None)
 	worker_remote_instance.executor_factory = FakeExecutorWatcher
 	worker_messenger = InProcessMessenger(worker_remote_instance._handle_request)
@@ -61,14 +62,14 @@ async def test_abort_execution_success():
 async def test_finish_execution_success():
 	""" Test _finish_execution in normal conditions """
 
-	run_provider_instance = Mock(spec = RunProvider)
+	run_provider_instance = Mock(spec = AsyncRunProvider)
 	worker_remote_instance = RemoteWorker("my_worker", None, None, None, None, None, None)
 	worker_remote_instance.executor_factory = FakeExecutorWatcher
 	worker_messenger = InProcessMessenger(worker_remote_instance._handle_request)
 	worker_local_instance = LocalWorker("my_worker", worker_messenger, run_provider_instance)
 
 	job = { "identifier": "my_job" }
-	run = { "identifier": "my_run", "job": job["identifier"], "status": "succeeded", "steps": [] }
+	run = { "project": "my_project", "identifier": "my_run", "job": job["identifier"], "status": "succeeded", "steps": [] }
 
 	worker_remote_instance._active_executors.append(FakeExecutorWatcher(run["identifier"]))
 
@@ -87,7 +88,7 @@ async def test_process_success():
 	worker_remote_instance = RemoteWorker("my_worker", None, None, None, None, None, None)
 	worker_remote_instance.executor_factory = FakeExecutorWatcher
 	worker_messenger = InProcessMessenger(worker_remote_instance._handle_request)
-	worker_local_instance = LocalWorker("my_worker", worker_messenger, run_provider_instance)
+	worker_local_instance = LocalWorker("my_worker", worker_messenger, AsyncRunProvider(run_provider_instance))
 
 	job = { "project": "my_project", "identifier": "my_job" }
 	run = run_provider_instance.create(job["project"], job["identifier"], {}, None)
@@ -95,7 +96,7 @@ async def test_process_success():
 	assert run["status"] == "pending"
 	assert len(worker_local_instance.executors) == 0
 
-	worker_local_instance.assign_run(job, run)
+	await worker_local_instance.assign_run(job, run)
 	local_executor = worker_local_instance.executors[0]
 
 	assert local_executor["local_status"] == "pending"
@@ -161,7 +162,7 @@ async def test_process_abort():
 	worker_remote_instance = RemoteWorker("my_worker", None, None, None, None, None, None)
 	worker_remote_instance.executor_factory = FakeExecutorWatcher
 	worker_messenger = InProcessMessenger(worker_remote_instance._handle_request)
-	worker_local_instance = LocalWorker("my_worker", worker_messenger, run_provider_instance)
+	worker_local_instance = LocalWorker("my_worker", worker_messenger, AsyncRunProvider(run_provider_instance))
 
 	job = { "project": "my_project", "identifier": "my_job" }
 	run = run_provider_instance.create(job["project"], job["identifier"], {}, None)
@@ -169,7 +170,7 @@ async def test_process_abort():
 	assert run["status"] == "pending"
 	assert len(worker_local_instance.executors) == 0
 
-	worker_local_instance.assign_run(job, run)
+	await worker_local_instance.assign_run(job, run)
 	local_executor = worker_local_instance.executors[0]
 
 	assert local_executor["local_status"] == "pending"
@@ -243,7 +244,7 @@ async def test_process_recovery_during_execution(): # pylint: disable = too-many
 	worker_remote_instance = RemoteWorker("my_worker", None, None, None, None, None, None)
 	worker_remote_instance.executor_factory = FakeExecutorWatcher
 	worker_messenger = InProcessMessenger(worker_remote_instance._handle_request)
-	worker_local_instance = LocalWorker("my_worker", worker_messenger, run_provider_instance)
+	worker_local_instance = LocalWorker("my_worker", worker_messenger, AsyncRunProvider(run_provider_instance))
 
 	job = { "project": "my_project", "identifier": "my_job" }
 	run = run_provider_instance.create(job["project"], job["identifier"], {}, None)
@@ -251,7 +252,7 @@ async def test_process_recovery_during_execution(): # pylint: disable = too-many
 	assert run["status"] == "pending"
 	assert len(worker_local_instance.executors) == 0
 
-	worker_local_instance.assign_run(job, run)
+	await worker_local_instance.assign_run(job, run)
 	local_executor = worker_local_instance.executors[0]
 
 	assert local_executor["local_status"] == "pending"
@@ -277,7 +278,7 @@ async def test_process_recovery_during_execution(): # pylint: disable = too-many
 	assert len(worker_local_instance.executors) == 1
 
 	# New worker to simulate disconnection
-	worker_local_instance = LocalWorker("my_worker", worker_messenger, run_provider_instance)
+	worker_local_instance = LocalWorker("my_worker", worker_messenger, AsyncRunProvider(run_provider_instance))
 
 	assert run["status"] == "running"
 	assert len(worker_local_instance.executors) == 0
@@ -342,7 +343,7 @@ async def test_process_recovery_after_execution(): # pylint: disable = too-many-
 	worker_remote_instance = RemoteWorker("my_worker", None, None, None, None, None, None)
 	worker_remote_instance.executor_factory = FakeExecutorWatcher
 	worker_messenger = InProcessMessenger(worker_remote_instance._handle_request)
-	worker_local_instance = LocalWorker("my_worker", worker_messenger, run_provider_instance)
+	worker_local_instance = LocalWorker("my_worker", worker_messenger, AsyncRunProvider(run_provider_instance))
 
 	job = { "project": "my_project", "identifier": "my_job" }
 	run = run_provider_instance.create(job["project"], job["identifier"], {}, None)
@@ -350,7 +351,7 @@ async def test_process_recovery_after_execution(): # pylint: disable = too-many-
 	assert run["status"] == "pending"
 	assert len(worker_local_instance.executors) == 0
 
-	worker_local_instance.assign_run(job, run)
+	await worker_local_instance.assign_run(job, run)
 	local_executor = worker_local_instance.executors[0]
 
 	assert local_executor["local_status"] == "pending"
@@ -376,7 +377,7 @@ async def test_process_recovery_after_execution(): # pylint: disable = too-many-
 	assert len(worker_local_instance.executors) == 1
 
 	# New worker to simulate disconnection
-	worker_local_instance = LocalWorker("my_worker", worker_messenger, run_provider_instance)
+	worker_local_instance = LocalWorker("my_worker", worker_messenger, AsyncRunProvider(run_provider_instance))
 
 	assert run["status"] == "running"
 	assert len(worker_local_instance.executors) == 0
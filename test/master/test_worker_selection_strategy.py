@@ -0,0 +1,52 @@
+""" Unit tests for worker selection strategies """
+
+import pytest
+
+from bhamon_orchestra_master.worker_selection_strategy import BinPackingStrategy, LeastLoadedStrategy, RandomStrategy, WorkspaceAffinityStrategy
+from bhamon_orchestra_model.async_run_provider import AsyncRunProvider
+from bhamon_orchestra_model.database.memory_database_client import MemoryDatabaseClient
+from bhamon_orchestra_model.run_provider import RunProvider
+
+from ..fakes.fake_date_time_provider import FakeDateTimeProvider
+
+
+def create_candidates():
+	return [
+		{ "identifier": "idle", "executor_count": 0, "executor_limit": 4 },
+		{ "identifier": "busy", "executor_count": 3, "executor_limit": 4 },
+		{ "identifier": "half", "executor_count": 1, "executor_limit": 2 },
+	]
+
+
+@pytest.mark.asyncio
+async def test_load_strategies():
+	""" Test ordering workers by load """
+
+	job = { "project": "examples", "identifier": "empty", "properties": {} }
+	run = { "project": "examples", "job": "empty", "identifier": "run" }
+
+	assert sorted(candidate["identifier"] for candidate in await RandomStrategy().sort(create_candidates(), job, run)) == [ "busy", "half", "idle" ]
+	assert [ candidate["identifier"] for candidate in await LeastLoadedStrategy().sort(create_candidates(), job, run) ] == [ "idle", "half", "busy" ]
+	assert [ candidate["identifier"] for candidate in await BinPackingStrategy().sort(create_candidates(), job, run) ] == [ "busy", "half", "idle" ]
+
+
+@pytest.mark.asyncio
+async def test_workspace_affinity():
+	""" Test preferring the workers which recently ran a job, from the run history then from selections """
+
+	database_client_instance = MemoryDatabaseClient()
+	run_provider_instance = RunProvider(database_client_instance, None, FakeDateTimeProvider())
+	strategy = WorkspaceAffinityStrategy(AsyncRunProvider(run_provider_instance), history_size = 2)
+
+	job = { "project": "examples", "identifier": "empty", "properties": {} }
+	other_job = { "project": "examples", "identifier": "other", "properties": {} }
+	run = run_provider_instance.create("examples", "empty", {}, None)
+	run_provider_instance.update_status(run, worker = "busy")
+
+	assert [ candidate["identifier"] for candidate in await strategy.sort(create_candidates(), job, run) ] == [ "busy", "idle", "half" ]
+	assert [ candidate["identifier"] for candidate in await strategy.sort(create_candidates(), other_job, run) ] == [ "idle", "half", "busy" ]
+
+	strategy.record_selection(job, run, "half")
+	strategy.record_selection(job, run, "idle")
+
+	assert [ candidate["identifier"] for candidate in await strategy.sort(create_candidates(), job, run) ] == [ "idle", "half", "busy" ]
@@ -0,0 +1,99 @@
+""" Unit tests for BufferedFileStorage """
+
+import os
+
+from bhamon_orchestra_model.database.buffered_file_storage import BufferedFileStorage
+from bhamon_orchestra_model.database.local_file_storage import LocalFileStorage
+
+
+def test_append(tmpdir):
+	""" Test appends are buffered until flushed, while reads through the buffered storage see them right away """
+
+	file_storage = BufferedFileStorage(str(tmpdir), flush_interval_seconds = 60)
+	reader_storage = LocalFileStorage(str(tmpdir))
+	file_path = os.path.join("runs", "run_1", "step.log")
+
+	try:
+		file_storage.append_unsafe(file_path, "first line\r\n")
+		file_storage.append_unsafe(file_path, "second line\n")
+
+		assert not reader_storage.exists(file_path)
+		assert file_storage.get_statistics()["buffered_size"] == len("first line\nsecond line\n")
+
+		assert file_storage.load(file_path) == "first line\nsecond line\n"
+		assert reader_storage.get_size(file_path) == len("first line\nsecond line\n")
+		assert file_storage.get_statistics()["open_file_count"] == 1
+
+		file_storage.append_unsafe(file_path, "third line\n")
+		file_storage.flush(os.path.join("runs", "run_2"))
+		assert reader_storage.get_size(file_path) == len("first line\nsecond line\n")
+
+		file_storage.flush(os.path.join("runs", "run_1"))
+		assert reader_storage.load_chunk(file_path) == ("first line\nsecond line\nthird line\n", len("first line\nsecond line\nthird line\n"))
+		assert file_storage.get_statistics()["open_file_count"] == 0
+		assert file_storage.get_statistics()["buffered_size"] == 0
+
+	finally:
+		file_storage.close()
+
+
+def test_limits(tmpdir):
+	""" Test full buffers are written right away and the least recently used files are closed once too many are open """
+
+	file_storage = BufferedFileStorage(str(tmpdir), flush_interval_seconds = 60, maximum_open_files = 2, maximum_buffer_size = 10)
+	reader_storage = LocalFileStorage(str(tmpdir))
+
+	try:
+		file_storage.append_unsafe("first.log", "short\n")
+		assert not reader_storage.exists("first.log")
+		file_storage.append_unsafe("first.log", "full\n")
+		assert reader_storage.load("first.log") == "short\nfull\n"
+
+		file_storage.append_unsafe("second.log", "0123456789\n")
+		file_storage.append_unsafe("third.log", "0123456789\n")
+		assert file_storage.get_statistics()["open_file_count"] == 2
+
+		file_storage.append_unsafe("first.log", "0123456789\n")
+		assert reader_storage.load("first.log") == "short\nfull\n0123456789\n"
+		assert file_storage.get_statistics()["flush_count"] == 4
+
+	finally:
+		file_storage.close()
+
+
+def test_close(tmpdir):
+	""" Test closing writes the remaining buffered data and discards the data for deleted files """
+
+	file_storage = BufferedFileStorage(str(tmpdir), flush_interval_seconds = 60)
+	reader_storage = LocalFileStorage(str(tmpdir))
+
+	file_storage.append_unsafe("kept.log", "kept\n")
+	file_storage.append_unsafe("deleted.log", "deleted\n")
+	file_storage.load("deleted.log")
+	file_storage.append_unsafe("deleted.log", "discarded\n")
+	file_storage.delete("deleted.log")
+	file_storage.close()
+
+	assert reader_storage.load("kept.log") == "kept\n"
+	assert sorted(os.listdir(str(tmpdir))) == [ "kept.log", "kept.log.size" ]
+
+
+def test_archive(tmpdir):
+	""" Test archiving writes the buffered data first, and later appends are added to the archive """
+
+	file_storage = BufferedFileStorage(str(tmpdir), flush_interval_seconds = 60)
+	reader_storage = LocalFileStorage(str(tmpdir))
+
+	try:
+		file_storage.append_unsafe("step.log", "first line\n")
+		file_storage.archive("step.log")
+		assert reader_storage.is_archived("step.log")
+		assert reader_storage.load("step.log") == "first line\n"
+
+		file_storage.append_unsafe("step.log", "second line\n")
+		file_storage.flush()
+		assert reader_storage.is_archived("step.log")
+		assert reader_storage.load("step.log") == "first line\nsecond line\n"
+
+	finally:
+		file_storage.close()
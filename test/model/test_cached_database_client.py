@@ -0,0 +1,72 @@
+""" Unit tests for CachedDatabaseClient """
+
+import datetime
+
+from bhamon_orchestra_model.database.cached_database_client import CachedDatabaseClient
+from bhamon_orchestra_model.database.memory_database_client import MemoryDatabaseClient
+
+from ..fakes.fake_date_time_provider import FakeDateTimeProvider
+
+
+def test_read_through():
+	""" Test queries are served from the cache until they expire """
+
+	date_time_provider_instance = FakeDateTimeProvider()
+	database_client_instance = MemoryDatabaseClient()
+	client = CachedDatabaseClient(database_client_instance, date_time_provider_instance, time_to_live_seconds = 10)
+	table = "record"
+
+	client.insert_one(table, { "id": 1, "key": "value" })
+
+	assert client.find_one(table, { "id": 1 }) == { "id": 1, "key": "value" }
+	assert client.find_one(table, { "id": 1 }) == { "id": 1, "key": "value" }
+	assert client.get_statistics() == { "hit_count": 1, "miss_count": 1, "size": 1 }
+
+	# Changes from other clients are seen once the entry expires
+	database_client_instance.update_one(table, { "id": 1 }, { "key": "updated" })
+	assert client.find_one(table, { "id": 1 }) == { "id": 1, "key": "value" }
+
+	date_time_provider_instance.now_value += datetime.timedelta(seconds = 10)
+	assert client.find_one(table, { "id": 1 }) == { "id": 1, "key": "updated" }
+	assert client.get_statistics() == { "hit_count": 2, "miss_count": 2, "size": 1 }
+
+
+def test_invalidation():
+	""" Test writes through the client invalidate the cached queries for their table """
+
+	date_time_provider_instance = FakeDateTimeProvider()
+	client = CachedDatabaseClient(MemoryDatabaseClient(), date_time_provider_instance)
+
+	client.insert_one("record", { "id": 1, "key": "first" })
+	client.insert_one("other", { "id": 1 })
+
+	assert client.count("record", {}) == 1
+	assert client.find_many("other", {}) == [ { "id": 1 } ]
+
+	client.insert_one("record", { "id": 2, "key": "second" })
+	assert client.count("record", {}) == 2
+	assert client.find_many("other", {}) == [ { "id": 1 } ]
+	assert client.get_statistics() == { "hit_count": 1, "miss_count": 3, "size": 2 }
+
+	# Results are copied so that callers modifying them do not alter the cache
+	client.find_many("other", {})[0]["id"] = 2
+	assert client.find_many("other", {}) == [ { "id": 1 } ]
+
+
+def test_eviction():
+	""" Test the least recently used entries are evicted once the cache is full """
+
+	date_time_provider_instance = FakeDateTimeProvider()
+	client = CachedDatabaseClient(MemoryDatabaseClient(), date_time_provider_instance, maximum_size = 2)
+
+	client.insert_many("record", [ { "id": index } for index in range(3) ])
+
+	client.find_one("record", { "id": 0 })
+	client.find_one("record", { "id": 1 })
+	client.find_one("record", { "id": 0 })
+	client.find_one("record", { "id": 2 })
+	assert client.get_statistics() == { "hit_count": 1, "miss_count": 3, "size": 2 }
+
+	client.find_one("record", { "id": 0 })
+	client.find_one("record", { "id": 1 })
+	assert client.get_statistics() == { "hit_count": 2, "miss_count": 4, "size": 2 }
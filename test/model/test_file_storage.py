@@ -0,0 +1,242 @@
+# pylint: disable = protected-access
+
+""" Unit tests for FileStorage implementations """
+
+import os
+
+import pytest
+
+from bhamon_orchestra_model.database.local_file_storage import LocalFileStorage
+from bhamon_orchestra_model.database.memory_file_storage import MemoryFileStorage
+from bhamon_orchestra_model.database.s3_file_storage import S3FileStorage
+
+from ..fakes.fake_s3_client import FakeS3Client
+
+
+def create_file_storage(storage_type, tmpdir):
+	if storage_type == "file":
+		return LocalFileStorage(str(tmpdir))
+	if storage_type == "memory":
+		return MemoryFileStorage()
+	if storage_type == "s3":
+		return S3FileStorage(FakeS3Client(maximum_list_size = 2), "orchestra", prefix = "data/", segment_size = 16, maximum_segment_count = 3)
+	raise ValueError("Unsupported storage type '%s'" % storage_type)
+
+
+@pytest.mark.parametrize("storage_type", [ "file", "memory", "s3" ])
+def test_append(tmpdir, storage_type):
+	""" Test appending text, with sizes and cursors as byte offsets """
+
+	file_storage = create_file_storage(storage_type, tmpdir)
+	file_path = os.path.join("logs", "step.log")
+
+	file_storage.append_unsafe(file_path, "first line\r\n")
+	file_storage.append_unsafe(file_path, "second line with é\n")
+
+	assert file_storage.load(file_path) == "first line\nsecond line with é\n"
+	assert file_storage.get_size(file_path) == len("first line\nsecond line with é\n".encode("utf-8"))
+	assert file_storage.load_chunk(file_path) == ("first line\nsecond line with é\n", file_storage.get_size(file_path))
+
+
+@pytest.mark.parametrize("storage_type", [ "file", "memory", "s3" ])
+def test_load_chunk(tmpdir, storage_type):
+	""" Test loading chunks never cuts characters and returns the cursor to continue from """
+
+	file_storage = create_file_storage(storage_type, tmpdir)
+	file_path = os.path.join("logs", "step.log")
+	text = "aé€😀\n" * 3
+
+	file_storage.append_unsafe(file_path, text)
+
+	cursor = 0
+	for limit in [ 1, 2, 3, 4, 5 ]:
+		cursor = 0
+		all_chunks = []
+		while cursor < file_storage.get_size(file_path):
+			chunk, next_cursor = file_storage.load_chunk(file_path, skip = cursor, limit = limit)
+			assert next_cursor > cursor
+			all_chunks.append(chunk)
+			cursor = next_cursor
+		assert "".join(all_chunks) == text
+
+	assert file_storage.load_chunk(file_path, skip = cursor) == ("", cursor)
+	assert file_storage.load_chunk_or_default("missing.log", "", skip = 10) == ("", 0)
+
+
+@pytest.mark.parametrize("storage_type", [ "file", "memory", "s3" ])
+def test_save_and_delete(tmpdir, storage_type):
+	""" Test replacing and deleting files, and operations on missing files """
+
+	file_storage = create_file_storage(storage_type, tmpdir)
+	file_path = os.path.join("data", "file.txt")
+
+	assert not file_storage.exists(file_path)
+	assert file_storage.load_or_default(file_path, "default") == "default"
+	assert file_storage.load_chunk_or_default(file_path, "default") == ("default", 0)
+	with pytest.raises(FileNotFoundError):
+		file_storage.get_size(file_path)
+	with pytest.raises(FileNotFoundError):
+		file_storage.delete(file_path)
+
+	file_storage.append_unsafe(file_path, "appended line\n" * 5)
+	file_storage.save(file_path, "saved é")
+	assert file_storage.load(file_path) == "saved é"
+	assert list(file_storage.iter_chunks(file_path, chunk_size = 2)) == [ "sa", "ve", "d ", "é" ]
+
+	file_storage.delete(file_path)
+	assert not file_storage.exists(file_path)
+
+
+def test_interrupted_append(tmpdir):
+	""" Test data past the committed size, from an interrupted append, is ignored and then discarded """
+
+	file_storage = LocalFileStorage(str(tmpdir))
+	file_path = os.path.join("logs", "step.log")
+
+	file_storage.append_unsafe(file_path, "first line\n")
+	with open(os.path.join(str(tmpdir), file_path), mode = "ab") as log_file:
+		log_file.write(b"partial")
+
+	assert file_storage.get_size(file_path) == len("first line\n")
+	assert file_storage.load_chunk(file_path) == ("first line\n", len("first line\n"))
+	assert file_storage.load(file_path) == "first line\n"
+
+	file_storage.append_unsafe(file_path, "second line\n")
+	assert file_storage.load(file_path) == "first line\nsecond line\n"
+
+	file_storage.delete(file_path)
+	assert os.listdir(os.path.join(str(tmpdir), "logs")) == []
+
+
+def test_archive(tmpdir):
+	""" Test archived files are read transparently, with chunks spanning several frames """
+
+	file_storage = LocalFileStorage(str(tmpdir), archive_frame_size = 7)
+	file_path = os.path.join("logs", "step.log")
+	text = "".join("line %s é\n" % index for index in range(20))
+
+	file_storage.append_unsafe(file_path, text)
+	file_storage.archive(file_path)
+
+	assert file_storage.is_archived(file_path)
+	assert sorted(os.listdir(os.path.join(str(tmpdir), "logs"))) == [ "step.log.gz", "step.log.gz.index" ]
+	assert file_storage.exists(file_path)
+	assert file_storage.get_size(file_path) == len(text.encode("utf-8"))
+	assert file_storage.load(file_path) == text
+
+	for limit in [ 1, 5, 16, None ]:
+		cursor = 0
+		all_chunks = []
+		while cursor < file_storage.get_size(file_path):
+			chunk, cursor = file_storage.load_chunk(file_path, skip = cursor, limit = limit)
+			all_chunks.append(chunk)
+		assert "".join(all_chunks) == text
+
+	file_storage.append_unsafe(file_path, "appended\n")
+	assert file_storage.load_chunk(file_path, skip = len(text.encode("utf-8"))) == ("appended\n", len((text + "appended\n").encode("utf-8")))
+
+	file_storage.delete(file_path)
+	assert os.listdir(os.path.join(str(tmpdir), "logs")) == []
+
+
+def test_archive_interrupted_append(tmpdir):
+	""" Test a partial frame, from an interrupted append to an archived file, is ignored and then discarded """
+
+	file_storage = LocalFileStorage(str(tmpdir))
+	file_path = os.path.join("logs", "step.log")
+
+	file_storage.append_unsafe(file_path, "first line\n")
+	file_storage.archive(file_path)
+	with open(os.path.join(str(tmpdir), file_path + ".gz"), mode = "ab") as archive_file:
+		archive_file.write(b"partial")
+
+	assert file_storage.load(file_path) == "first line\n"
+
+	file_storage.append_unsafe(file_path, "second line\n")
+	assert file_storage.load(file_path) == "first line\nsecond line\n"
+
+
+def test_archive_while_reading(tmpdir, monkeypatch):
+	""" Test a reader which found a file not archived yet reads it from the archive rather than failing, when it is archived meanwhile """
+
+	file_storage = LocalFileStorage(str(tmpdir))
+	file_path = os.path.join("logs", "step.log")
+
+	file_storage.append_unsafe(file_path, "first line\nsecond line\n")
+	file_storage.archive(file_path)
+
+	is_archived = file_storage._is_archived_internal
+	all_results = [ True, False, True, False ]
+	monkeypatch.setattr(file_storage, "_is_archived_internal", lambda file_path: all_results.pop() if len(all_results) > 0 else is_archived(file_path))
+
+	assert file_storage.load_chunk(file_path, skip = len("first line\n")) == ("second line\n", len("first line\nsecond line\n"))
+	assert file_storage.load_chunk_or_default(os.path.join("logs", "missing.log"), skip = 5) == (None, 0)
+
+
+def test_s3_segments():
+	""" Test appends to an S3 file storage add segments, merged once there are too many small ones """
+
+	s3_client = FakeS3Client(maximum_list_size = 2)
+	file_storage = S3FileStorage(s3_client, "orchestra", segment_size = 16, maximum_segment_count = 3)
+	file_path = os.path.join("logs", "step.log")
+	text = "".join("line %s\n" % index for index in range(10))
+
+	for line in text.splitlines(True):
+		file_storage.append_unsafe(file_path, line)
+
+	all_keys = sorted(key for bucket, key in s3_client.storage)
+	assert len(all_keys) < 10
+	assert all(key.startswith("logs/step.log.segments/") for key in all_keys)
+	assert file_storage.load(file_path) == text
+
+	# A new client, without known segments, continues after the existing ones
+	other_storage = S3FileStorage(s3_client, "orchestra", segment_size = 16, maximum_segment_count = 3)
+	other_storage.append_unsafe(file_path, "last line\n")
+	assert file_storage.load(file_path) == text + "last line\n"
+	assert file_storage.get_size(file_path) == len(text + "last line\n")
+
+	# A segment left over by an interrupted merge is ignored
+	s3_client.storage[("orchestra", "logs/step.log.segments/%016d" % 3)] = b"stale"
+	assert file_storage.load(file_path) == text + "last line\n"
+
+	file_storage.delete(file_path)
+	assert s3_client.storage == {}
+
+
+def test_s3_segments_merge_copy():
+	""" Test merging segments copies the first one within the object store once it is large enough, rather than transferring it again """
+
+	s3_client = FakeS3Client()
+	file_storage = S3FileStorage(s3_client, "orchestra", segment_size = 10000, maximum_segment_count = 4)
+	file_storage.minimum_part_size = 16
+	file_path = os.path.join("logs", "step.log")
+	text = "".join("line %03d\n" % index for index in range(200))
+
+	for line in text.splitlines(True):
+		file_storage.append_unsafe(file_path, line)
+
+	assert len(s3_client.storage) < 4
+	assert file_storage.load(file_path) == text
+
+	# Appended data is uploaded, then downloaded and uploaded again by a single merge, plus the first segment while it is small
+	assert s3_client.transferred_size < 4 * len(text)
+
+
+def test_s3_segments_merged_while_reading(monkeypatch):
+	""" Test a reader which listed segments before they were merged lists them again rather than failing """
+
+	s3_client = FakeS3Client()
+	file_storage = S3FileStorage(s3_client, "orchestra", segment_size = 1000, maximum_segment_count = 3)
+	file_path = os.path.join("logs", "step.log")
+
+	file_storage.append_unsafe(file_path, "first line\n")
+	file_storage.append_unsafe(file_path, "second line\n")
+	stale_segments = file_storage._list_segments(file_path)
+	file_storage.append_unsafe(file_path, "third line\n")
+	assert len(file_storage._list_segments(file_path)) == 1
+
+	list_segments = file_storage._list_segments
+	all_listings = [ stale_segments ]
+	monkeypatch.setattr(file_storage, "_list_segments", lambda file_path: all_listings.pop() if len(all_listings) > 0 else list_segments(file_path))
+
+	assert file_storage.load_chunk(file_path, skip = len("first line\n")) == ("second line\nthird line\n", len("first line\nsecond line\nthird line\n"))
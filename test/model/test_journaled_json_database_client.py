@@ -0,0 +1,134 @@
+# pylint: disable = protected-access
+
+""" Unit tests for JournaledJsonDatabaseClient """
+
+import os
+
+import pytest
+
+from bhamon_orchestra_model.database.journaled_json_database_client import JournaledJsonDatabaseClient
+from bhamon_orchestra_model.database.json_database_administration import JsonDatabaseAdministration
+from bhamon_orchestra_model.database.json_database_client import JsonDatabaseClient
+
+
+def test_persistence(tmpdir):
+	""" Test data is saved when closing the client and restored by a new one """
+
+	table = "record"
+	first_record = { "id": 1, "key": "first" }
+	second_record = { "id": 2, "key": "second" }
+
+	client = JournaledJsonDatabaseClient(str(tmpdir))
+	client.insert_one(table, first_record)
+	client.insert_one(table, second_record)
+	client.update_one(table, { "id": 1 }, { "key": "updated" })
+	client.delete_one(table, { "id": 2 })
+	client.close()
+
+	client = JournaledJsonDatabaseClient(str(tmpdir))
+	assert client.find_many(table, {}) == [ { "id": 1, "key": "updated" } ]
+	client.close()
+
+
+def test_recovery(tmpdir):
+	""" Test changes recorded in the journal are replayed when the client did not close """
+
+	table = "record"
+
+	client = JournaledJsonDatabaseClient(str(tmpdir), compaction_threshold = 100)
+	client.insert_one(table, { "id": 1, "key": "first" })
+	client.insert_one(table, { "id": 2, "key": "second" })
+	client.update_one(table, { "id": 2 }, { "key": "updated" })
+
+	recovered_client = JournaledJsonDatabaseClient(str(tmpdir))
+	assert recovered_client.find_many(table, {}) == [ { "id": 1, "key": "first" }, { "id": 2, "key": "updated" } ]
+	recovered_client.close()
+
+
+def test_recovery_after_compaction(tmpdir):
+	""" Test a journal left over from an interrupted compaction is not replayed over the new snapshot """
+
+	table = "record"
+
+	client = JournaledJsonDatabaseClient(str(tmpdir), compaction_threshold = 100)
+	client.insert_one(table, { "id": 1, "key": "first" })
+	client.insert_one(table, { "id": 2, "key": "second" })
+
+	journal_file_path = os.path.join(str(tmpdir), table + ".journal")
+	with open(journal_file_path, mode = "rb") as journal_file:
+		journal_data = journal_file.read()
+
+	# Simulate an interruption after the snapshot was replaced but before the journal was
+	client.close()
+	with open(journal_file_path, mode = "wb") as journal_file:
+		journal_file.write(journal_data)
+
+	recovered_client = JournaledJsonDatabaseClient(str(tmpdir))
+	assert recovered_client.find_many(table, {}) == [ { "id": 1, "key": "first" }, { "id": 2, "key": "second" } ]
+	recovered_client.close()
+
+
+def test_recovery_legacy_journal(tmpdir):
+	""" Test a journal with the operation names used before bulk writes is replayed """
+
+	table = "record"
+
+	client = JournaledJsonDatabaseClient(str(tmpdir), compaction_threshold = 100)
+	client.insert_one(table, { "id": 1, "key": "first" })
+	client.insert_one(table, { "id": 2, "key": "second" })
+
+	journal_file_path = os.path.join(str(tmpdir), table + ".journal")
+	with open(journal_file_path, mode = "rb") as journal_file:
+		journal_header = journal_file.read().decode("utf-8").splitlines()[0]
+
+	with open(journal_file_path, mode = "wb") as journal_file:
+		journal_file.write((journal_header + "\n").encode("utf-8"))
+		journal_file.write(b'{"operation": "insert", "data": {"id": 3, "key": "third"}}\n')
+		journal_file.write(b'{"operation": "update", "filter": {"id": 1}, "data": {"key": "updated"}}\n')
+		journal_file.write(b'{"operation": "delete", "filter": {"id": 2}}\n')
+
+	recovered_client = JournaledJsonDatabaseClient(str(tmpdir))
+	assert recovered_client.find_many(table, {}) == [ { "id": 1, "key": "updated" }, { "id": 3, "key": "third" } ]
+	recovered_client.close()
+
+
+def test_isolation(tmpdir):
+	""" Test results returned by the client are not affected by later changes """
+
+	table = "record"
+
+	client = JournaledJsonDatabaseClient(str(tmpdir))
+	client.insert_one(table, { "id": 1, "key": "first" })
+
+	record = client.find_one(table, { "id": 1 })
+	record["key"] = "modified"
+	client.update_one(table, { "id": 1 }, { "key": "updated" })
+
+	assert record == { "id": 1, "key": "modified" }
+	assert client.find_one(table, { "id": 1 }) == { "id": 1, "key": "updated" }
+	client.close()
+
+
+def test_index_cache(tmpdir, monkeypatch):
+	""" Test indexes are read once for writes, and again when the index metadata changes """
+
+	table = "record"
+	administration = JsonDatabaseAdministration(str(tmpdir))
+	client = JournaledJsonDatabaseClient(str(tmpdir))
+	all_loads = []
+
+	load_indexes = JsonDatabaseClient._load_indexes
+	monkeypatch.setattr(JsonDatabaseClient, "_load_indexes", lambda self, table: all_loads.append(table) or load_indexes(self, table))
+
+	client.insert_one(table, { "id": 1 })
+	client.insert_one(table, { "id": 1 })
+	assert len(all_loads) == 1
+
+	administration.create_index(table, "id_unique", [ ("id", "ascending") ], is_unique = True)
+
+	client.insert_one(table, { "id": 2 })
+	with pytest.raises(ValueError):
+		client.insert_one(table, { "id": 2 })
+	assert len(all_loads) == 2
+
+	client.close()
@@ -0,0 +1,61 @@
+""" Unit tests for JsonDatabaseClient """
+
+import os
+
+import pytest
+
+from bhamon_orchestra_model.database.json_database_administration import JsonDatabaseAdministration
+from bhamon_orchestra_model.database.json_database_client import JsonDatabaseClient
+from bhamon_orchestra_model.database.data_serializer import create_serializer
+
+
+def create_serializer_or_skip(format_name):
+	if format_name == "msgpack":
+		pytest.importorskip("msgpack")
+	return create_serializer(format_name)
+
+
+@pytest.mark.parametrize("format_name", [ "json", "msgpack" ])
+def test_serializer(tmpdir, format_name):
+	""" Test database operations with a serializer """
+
+	serializer = create_serializer_or_skip(format_name)
+	table = "record"
+	record = { "id": 1, "key": "value", "data": { "list": [ 1, 2 ], "none": None } }
+
+	administration = JsonDatabaseAdministration(str(tmpdir), serializer)
+	administration.create_index(table, "id_unique", [ ("id", "ascending") ], is_unique = True)
+
+	client = JsonDatabaseClient(str(tmpdir), serializer)
+	client.insert_one(table, record)
+
+	assert os.path.exists(os.path.join(str(tmpdir), table + serializer.file_extension))
+	assert client.find_many(table, {}) == [ record ]
+
+	with pytest.raises(ValueError):
+		client.insert_one(table, record)
+
+
+@pytest.mark.parametrize("format_name", [ "msgpack" ])
+def test_convert_format(tmpdir, format_name):
+	""" Test converting a database to another format """
+
+	serializer = create_serializer_or_skip(format_name)
+	table = "record"
+	record = { "id": 1, "key": "value" }
+
+	administration = JsonDatabaseAdministration(str(tmpdir))
+	administration.create_index(table, "id_unique", [ ("id", "ascending") ], is_unique = True)
+	JsonDatabaseClient(str(tmpdir)).insert_one(table, record)
+
+	administration.convert_format(serializer, simulate = True)
+	assert sorted(os.listdir(str(tmpdir))) == [ "admin.json", "record.json" ]
+
+	administration.convert_format(serializer)
+	assert sorted(os.listdir(str(tmpdir))) == sorted([ "admin" + serializer.file_extension, "record" + serializer.file_extension ])
+
+	client = JsonDatabaseClient(str(tmpdir), serializer)
+	assert client.find_many(table, {}) == [ record ]
+
+	with pytest.raises(ValueError):
+		client.insert_one(table, record)
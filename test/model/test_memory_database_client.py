@@ -1,5 +1,8 @@
 """ Unit tests for MemoryDatabaseClient """
 
+import pytest
+
+from bhamon_orchestra_model.database.memory_database_administration import MemoryDatabaseAdministration
 from bhamon_orchestra_model.database.memory_database_client import MemoryDatabaseClient
 
 
@@ -40,3 +43,231 @@ def test_many():
 	client.delete_one(table, third_record)
 	assert client.find_many(table, {}) == [ first_record, second_record ]
 	assert client.count(table, {}) == 2
+
+
+def test_index():
+	""" Test database operations on a table with a unique index """
+
+	client = MemoryDatabaseClient()
+	table = "record"
+	record = { "id": 1, "key": "first" }
+
+	client.create_index(table, "id_unique", [ "id" ], is_unique = True)
+
+	client.insert_one(table, record)
+	assert client.count(table, {}) == 1
+
+	with pytest.raises(ValueError):
+		client.insert_one(table, { "id": 1, "key": "second" })
+	assert client.count(table, {}) == 1
+
+
+def test_index_update():
+	""" Test updates cannot move a record onto the key of another record in a unique index """
+
+	client = MemoryDatabaseClient()
+	table = "record"
+
+	client.create_index(table, "id_unique", [ "id" ], is_unique = True)
+	client.insert_many(table, [ { "id": 1, "key": "first" }, { "id": 2, "key": "second" } ])
+
+	client.update_one(table, { "id": 1 }, { "id": 1, "key": "updated" })
+	assert client.find_one(table, { "id": 1 }) == { "id": 1, "key": "updated" }
+
+	with pytest.raises(ValueError):
+		client.update_one(table, { "id": 2 }, { "id": 1 })
+	with pytest.raises(ValueError):
+		client.update_many(table, { "key": "second" }, { "id": 1 })
+
+	assert client.find_many(table, { "id": 1 }) == [ { "id": 1, "key": "updated" } ]
+	assert client.find_many(table, { "id": 2 }) == [ { "id": 2, "key": "second" } ]
+
+
+def test_index_lookup():
+	""" Test queries on an indexed field remain consistent as records are updated and deleted """
+
+	client = MemoryDatabaseClient()
+	table = "record"
+
+	client.create_index(table, "status", [ "status" ])
+
+	first_record = { "id": 1, "status": "pending" }
+	second_record = { "id": 2, "status": "pending" }
+	third_record = { "id": 3, "status": "running" }
+
+	client.insert_one(table, first_record)
+	client.insert_one(table, second_record)
+	client.insert_one(table, third_record)
+	assert client.find_many(table, { "status": "pending" }) == [ first_record, second_record ]
+	assert client.count(table, { "status": "running" }) == 1
+
+	client.update_one(table, { "id": 1 }, { "status": "running" })
+	assert client.find_many(table, { "status": "pending" }) == [ second_record ]
+	assert client.find_many(table, { "status": "running" }) == [ first_record, third_record ]
+	assert client.find_one(table, { "status": "running", "id": 3 }) == third_record
+
+	client.delete_one(table, { "status": "running" })
+	assert client.find_many(table, { "status": "running" }) == [ third_record ]
+	assert client.count(table, { "status": "done" }) == 0
+
+
+def test_bulk_write():
+	""" Test applying a batch of write operations """
+
+	client = MemoryDatabaseClient()
+	table = "record"
+
+	client.insert_many(table, [ { "id": 1, "key": "first" }, { "id": 2, "key": "second" } ])
+	assert client.count(table, {}) == 2
+
+	client.bulk_write(table, [
+		{ "operation": "insert_one", "data": { "id": 3, "key": "third" } },
+		{ "operation": "update_one", "filter": { "id": 1 }, "data": { "key": "updated" } },
+		{ "operation": "delete_one", "filter": { "id": 2 } },
+	])
+
+	assert client.find_many(table, {}) == [ { "id": 1, "key": "updated" }, { "id": 3, "key": "third" } ]
+
+	client.update_many(table, {}, { "key": "all" })
+	assert client.count(table, { "key": "all" }) == 2
+
+
+def test_projection():
+	""" Test retrieving only some fields from records """
+
+	client = MemoryDatabaseClient()
+	table = "record"
+	record = { "id": 1, "key": "first", "results": { "revision": "abc", "steps": [ 1, 2 ] } }
+
+	client.insert_one(table, record)
+
+	assert client.find_many(table, {}, projection = [ "id", "results.revision", "results.missing", "missing.field" ]) == [ { "id": 1, "results": { "revision": "abc" } } ]
+	assert client.find_one(table, { "id": 1 }, projection = [ "key" ]) == { "key": "first" }
+	assert client.find_one(table, { "id": 1 }) == record
+
+
+def test_iter_many():
+	""" Test iterating on records while the table changes """
+
+	client = MemoryDatabaseClient()
+	table = "record"
+
+	client.insert_many(table, [ { "id": 1 }, { "id": 2 } ])
+
+	results = []
+	for record in client.iter_many(table, {}):
+		results.append(record)
+		client.insert_one(table, { "id": record["id"] + 2 })
+
+	assert results == [ { "id": 1 }, { "id": 2 } ]
+	assert client.count(table, {}) == 4
+
+
+def test_index_lookup_with_operators():
+	""" Test filtering records with query operators on indexed fields """
+
+	client = MemoryDatabaseClient()
+	table = "record"
+	first_record = { "id": 1, "status": "pending", "worker": None }
+	second_record = { "id": 2, "status": "running", "worker": "worker_01" }
+	third_record = { "id": 3, "status": "succeeded" }
+
+	client.create_index(table, "status", [ "status" ])
+	client.create_index(table, "worker", [ "worker" ])
+	client.insert_many(table, [ first_record, second_record, third_record ])
+
+	assert client.find_many(table, { "status": { "$in": [ "running", "pending" ] } }) == [ first_record, second_record ]
+	assert client.find_many(table, { "worker": { "$in": [ None ] } }) == [ first_record, third_record ]
+	assert client.find_many(table, { "worker": { "$ne": None }, "status": { "$in": [ "running" ] } }) == [ second_record ]
+	assert client.find_many(table, { "id": { "$gte": 2 } }) == [ second_record, third_record ]
+
+	with pytest.raises(ValueError):
+		client.find_many(table, { "id": { "$regex": "1" } })
+
+
+def test_filter_alternatives():
+	""" Test filtering records with alternative filters """
+
+	client = MemoryDatabaseClient()
+	table = "record"
+	first_record = { "id": 1, "date": "2020-01-01" }
+	second_record = { "id": 2, "date": "2020-01-02" }
+	third_record = { "id": 3, "date": "2020-01-02" }
+
+	client.insert_many(table, [ first_record, second_record, third_record ])
+
+	keyset_filter = { "date": { "$lte": "2020-01-02" }, "$or": [ { "date": { "$lt": "2020-01-02" } }, { "id": { "$lt": 3 } } ] }
+	assert client.find_many(table, keyset_filter) == [ first_record, second_record ]
+
+
+def test_query_index():
+	""" Test finding which index is used by a query """
+
+	client = MemoryDatabaseClient()
+	administration = MemoryDatabaseAdministration(client)
+	administration.initialize()
+
+	assert administration.analyze_query("run", { "project": "project", "identifier": "run" })["index"] == "identifier_unique"
+	assert administration.analyze_query("run", { "worker": None, "status": "pending" })["index"] == "worker_status"
+	assert administration.analyze_query("run", { "status": { "$in": [ "pending", "running" ] } })["index"] == "status"
+	assert administration.analyze_query("run", { "status": { "$ne": "pending" } })["is_collection_scan"] is True
+
+
+def test_order_by():
+	""" Test sorting records on several keys, with and without a limit """
+
+	client = MemoryDatabaseClient()
+	table = "record"
+	record_collection = [ { "id": index, "group": index % 3, "date": "2020-01-0%s" % (index % 4) } for index in range(12) ]
+	record_collection.append({ "id": 12, "group": None })
+
+	client.insert_many(table, record_collection)
+
+	order_by = [ ("group", "ascending"), ("date", "descending") ]
+	expected_records = sorted(record_collection[:12], key = lambda record: record["date"], reverse = True)
+	expected_records = [ record_collection[12] ] + sorted(expected_records, key = lambda record: record["group"])
+
+	assert client.find_many(table, {}, order_by = order_by) == expected_records
+	assert client.find_many(table, {}, skip = 2, limit = 5, order_by = order_by) == expected_records[2:7]
+	assert client.find_many(table, { "group": 1 }, limit = 2, order_by = order_by) == [ record for record in expected_records if record["group"] == 1 ][:2]
+	assert client.find_many(table, {}, skip = 20, limit = 5, order_by = order_by) == []
+	assert client.find_many(table, {}, limit = 3, order_by = [ ("group", "descending"), ("id", "descending") ]) == [ record_collection[11], record_collection[8], record_collection[5] ]
+	assert client.find_many(table, {}, skip = 12, order_by = [ ("group", "descending") ]) == [ record_collection[12] ]
+
+
+def test_order_by_paging():
+	""" Test paging through records with tied sort values in mixed directions returns every record once, in order """
+
+	client = MemoryDatabaseClient()
+	table = "record"
+	record_collection = [ { "id": index, "group": index % 2, "date": "2020-01-0%s" % (index % 3) } for index in range(40) ]
+
+	client.insert_many(table, record_collection)
+
+	order_by = [ ("group", "ascending"), ("date", "descending") ]
+	expected_records = client.find_many(table, {}, order_by = order_by)
+	all_pages = [ client.find_many(table, {}, skip = skip, limit = 4, order_by = order_by) for skip in range(0, 40, 4) ]
+
+	assert [ record for page in all_pages for record in page ] == expected_records
+	assert len({ record["id"] for page in all_pages for record in page }) == 40
+
+
+def test_watch_changes():
+	""" Test change notifications for writes through the client """
+
+	client = MemoryDatabaseClient()
+	all_changes = []
+
+	stop_watching = client.watch_changes([ "record" ], all_changes.append)
+
+	client.insert_one("record", { "id": 1, "key": "first" })
+	client.insert_one("other", { "id": 1 })
+	client.update_one("record", { "id": 1 }, { "key": "updated" })
+	client.update_one("record", { "id": 2 }, { "key": "updated" })
+	client.delete_one("record", { "id": 1 })
+	assert all_changes == [ "record", "record", "record" ]
+
+	stop_watching()
+
+	client.insert_one("record", { "id": 2, "key": "second" })
+	assert all_changes == [ "record", "record", "record" ]
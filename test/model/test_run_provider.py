@@ -0,0 +1,142 @@
+""" Unit tests for RunProvider """
+
+import concurrent.futures
+import datetime
+import io
+import json
+import threading
+import zipfile
+
+import pytest
+
+from bhamon_orchestra_model.async_run_provider import AsyncRunProvider
+from bhamon_orchestra_model.database.memory_database_client import MemoryDatabaseClient
+from bhamon_orchestra_model.database.memory_file_storage import MemoryFileStorage
+from bhamon_orchestra_model.run_provider import RunProvider
+
+from ..fakes.fake_date_time_provider import FakeDateTimeProvider
+
+
+def test_get_list_with_cursor():
+	""" Test paginating runs with cursors, including runs updated at the same time """
+
+	database_client_instance = MemoryDatabaseClient()
+	date_time_provider_instance = FakeDateTimeProvider()
+	provider = RunProvider(database_client_instance, None, date_time_provider_instance)
+
+	all_runs = []
+	for index in range(7):
+		date_time_provider_instance.now_value = datetime.datetime(2020, 1, 1, 0, 0, index // 2)
+		all_runs.append(provider.create("examples", "empty", {}, None))
+
+	order_by = [ ("update_date", "descending") ]
+	expected_runs = sorted(all_runs, key = lambda run: (run["update_date"], run["identifier"]), reverse = True)
+
+	pages = []
+	cursor = None
+	while len(pages) == 0 or len(pages[-1]) == 3:
+		pages.append(provider.get_list(project = "examples", limit = 3, order_by = order_by, after = cursor))
+		cursor = provider.get_cursor(pages[-1][-1]) if len(pages[-1]) > 0 else None
+
+	assert [ len(page) for page in pages ] == [ 3, 3, 1 ]
+	assert [ run["identifier"] for page in pages for run in page ] == [ run["identifier"] for run in expected_runs ]
+
+	ascending_runs = provider.get_list(project = "examples", order_by = [ ("update_date", "ascending") ], after = provider.get_cursor(expected_runs[-3]))
+	assert [ run["identifier"] for run in ascending_runs ] == [ run["identifier"] for run in reversed(expected_runs[:4]) ]
+
+
+def test_get_list_with_invalid_cursor():
+	""" Test paginating runs with a cursor fails without a matching order """
+
+	database_client_instance = MemoryDatabaseClient()
+	date_time_provider_instance = FakeDateTimeProvider()
+	provider = RunProvider(database_client_instance, None, date_time_provider_instance)
+
+	run = provider.create("examples", "empty", {}, None)
+
+	with pytest.raises(ValueError):
+		provider.get_list(project = "examples", after = provider.get_cursor(run))
+	with pytest.raises(ValueError):
+		provider.get_list(project = "examples", order_by = [ ("creation_date", "descending") ], after = provider.get_cursor(run))
+	with pytest.raises(ValueError):
+		provider.get_list(project = "examples", order_by = [ ("update_date", "descending") ], after = "invalid")
+
+
+def test_get_queue_statistics():
+	""" Test counting queued runs by priority """
+
+	database_client_instance = MemoryDatabaseClient()
+	date_time_provider_instance = FakeDateTimeProvider()
+	provider = RunProvider(database_client_instance, None, date_time_provider_instance)
+
+	all_runs = []
+	for index, priority in enumerate([ 0, 0, 10, 0, 5 ]):
+		date_time_provider_instance.now_value = datetime.datetime(2020, 1, 1, 0, 0, index)
+		all_runs.append(provider.create("examples", "empty", {}, None, priority = priority))
+
+	provider.update_status(all_runs[0], worker = "worker_01")
+	provider.update_status(all_runs[1], status = "running")
+	provider.create("other", "empty", {}, None)
+
+	with pytest.raises(ValueError):
+		provider.create("examples", "empty", {}, None, priority = "high")
+
+	assert provider.get(all_runs[2]["project"], all_runs[2]["identifier"])["priority"] == 10
+	assert provider.get_queue_statistics("examples") == {
+		"queued_run_count": 3,
+		"queued_run_count_by_priority": { "0": 1, "5": 1, "10": 1 },
+		"oldest_queued_run_creation_date": all_runs[2]["creation_date"],
+		"assigned_run_count": 1,
+		"running_run_count": 1,
+	}
+
+
+def test_get_archive():
+	""" Test the run archive is streamed with the run record and its logs """
+
+	database_client_instance = MemoryDatabaseClient()
+	file_storage_instance = MemoryFileStorage()
+	date_time_provider_instance = FakeDateTimeProvider()
+	provider = RunProvider(database_client_instance, file_storage_instance, date_time_provider_instance)
+
+	run = provider.create("examples", "empty", {}, None)
+	provider.update_steps(run, [ { "index": 0, "name": "first" }, { "index": 1, "name": "second" } ])
+	provider.append_step_log("examples", run["identifier"], 0, "line é\n" * 100)
+
+	archive = provider.get_archive("examples", run["identifier"], chunk_size = 7)
+	assert archive["file_name"] == run["identifier"] + ".zip"
+
+	with zipfile.ZipFile(io.BytesIO(b"".join(archive["data"]))) as archive_file:
+		assert archive_file.testzip() is None
+		assert archive_file.namelist() == [ "run.json", "step_0_first.log", "step_1_second.log" ]
+		assert json.loads(archive_file.read("run.json").decode("utf-8"))["identifier"] == run["identifier"]
+		assert archive_file.read("step_0_first.log").decode("utf-8") == "line é\n" * 100
+		assert archive_file.read("step_1_second.log") == b""
+
+	assert provider.get_archive("examples", "missing") is None
+
+
+@pytest.mark.asyncio
+async def test_archive_step_logs(monkeypatch):
+	""" Test logs are compressed in the archive executor rather than in the database executor """
+
+	database_client_instance = MemoryDatabaseClient()
+	file_storage_instance = MemoryFileStorage()
+	date_time_provider_instance = FakeDateTimeProvider()
+	provider = RunProvider(database_client_instance, file_storage_instance, date_time_provider_instance)
+
+	run = provider.create("examples", "empty", {}, None)
+	provider.update_steps(run, [ { "index": 0, "name": "first" }, { "index": 1, "name": "second" } ])
+	provider.append_step_log("examples", run["identifier"], 0, "line\n" * 100)
+
+	all_archive_threads = []
+	archive_file = file_storage_instance.archive
+	monkeypatch.setattr(file_storage_instance, "archive", lambda file_path: all_archive_threads.append(threading.current_thread().name) or archive_file(file_path))
+
+	with concurrent.futures.ThreadPoolExecutor(max_workers = 1, thread_name_prefix = "database") as database_executor:
+		with concurrent.futures.ThreadPoolExecutor(max_workers = 1, thread_name_prefix = "archive") as archive_executor:
+			async_provider = AsyncRunProvider(provider, database_executor, archive_executor)
+			assert await async_provider.archive_step_logs("examples", run["identifier"]) == 1
+
+	assert len(all_archive_threads) == 1
+	assert all_archive_threads[0].startswith("archive")
@@ -0,0 +1,107 @@
+""" Unit tests for RunRetention """
+
+import datetime
+
+from bhamon_orchestra_model.database.memory_database_client import MemoryDatabaseClient
+from bhamon_orchestra_model.database.memory_file_storage import MemoryFileStorage
+from bhamon_orchestra_model.job_provider import JobProvider
+from bhamon_orchestra_model.run_provider import RunProvider
+from bhamon_orchestra_model.run_retention import RunRetention
+
+from ..fakes.fake_date_time_provider import FakeDateTimeProvider
+
+
+def create_job(identifier):
+	return { "identifier": identifier, "display_name": identifier, "description": "", "workspace": "examples", "steps": [], "parameters": [], "properties": {} }
+
+
+def create_runs(date_time_provider, run_provider, job, status_collection):
+	""" Create a completed run per status, one day apart, with a log for each """
+
+	all_runs = []
+
+	for index, status in enumerate(status_collection):
+		date_time_provider.now_value = datetime.datetime(2020, 1, 1) + datetime.timedelta(days = index)
+		run = run_provider.create("examples", job, {}, None)
+		run_provider.update_steps(run, [ { "index": 0, "name": "main" } ])
+		run_provider.append_step_log("examples", run["identifier"], 0, "log\n")
+		run_provider.update_status(run, status = status)
+		all_runs.append(run)
+
+	return all_runs
+
+
+def test_collect():
+	""" Test collecting runs with keep counts, ages and a longer age for failures """
+
+	database_client_instance = MemoryDatabaseClient()
+	file_storage_instance = MemoryFileStorage()
+	date_time_provider_instance = FakeDateTimeProvider()
+	job_provider = JobProvider(database_client_instance, date_time_provider_instance)
+	run_provider = RunProvider(database_client_instance, file_storage_instance, date_time_provider_instance)
+
+	job_provider.create_or_update_many("examples", [ create_job("build"), create_job("test") ])
+	build_runs = create_runs(date_time_provider_instance, run_provider, "build", [ "succeeded", "failed", "succeeded", "succeeded", "running" ])
+	test_runs = create_runs(date_time_provider_instance, run_provider, "test", [ "succeeded", "succeeded", "succeeded" ])
+
+	policy_collection = [
+		{ "project": "examples", "maximum_age_days": 2, "failure_maximum_age_days": 10 },
+		{ "project": "examples", "job": "test", "keep_count": 1 },
+	]
+
+	run_retention = RunRetention(job_provider, run_provider, date_time_provider_instance, policy_collection)
+	date_time_provider_instance.now_value = datetime.datetime(2020, 1, 6)
+
+	assert run_retention.find_policy("examples", "test") == policy_collection[1]
+	assert run_retention.find_policy("other", "test") is None
+
+	expected_runs = [ build_runs[0], build_runs[2], test_runs[0], test_runs[1] ]
+
+	result = run_retention.collect(simulate = True)
+	assert [ run["identifier"] for run in result["runs"] ] == [ run["identifier"] for run in expected_runs ]
+	assert result["log_size"] == 4 * len("log\n")
+	assert run_provider.count() == 8
+
+	result = run_retention.collect(batch_size = 3)
+	assert result["run_count"] == 3
+	assert not result["is_complete"]
+
+	result = run_retention.collect(batch_size = 3)
+	assert result["run_count"] == 1
+	assert result["is_complete"]
+
+	assert sorted(run["identifier"] for run in run_provider.get_list()) == sorted(run["identifier"] for run in build_runs[1:2] + build_runs[3:] + test_runs[2:])
+	assert file_storage_instance.storage.keys() == { "projects/examples/runs/%s/step_0_main.log" % run["identifier"] for run in build_runs[1:2] + build_runs[3:] + test_runs[2:] }
+	assert run_retention.get_statistics()["deleted_run_count"] == 4
+	assert run_retention.get_statistics()["deleted_log_size"] == 4 * len("log\n")
+
+
+def test_collect_with_failure(monkeypatch):
+	""" Test a run which fails to be deleted does not prevent deleting the others """
+
+	database_client_instance = MemoryDatabaseClient()
+	file_storage_instance = MemoryFileStorage()
+	date_time_provider_instance = FakeDateTimeProvider()
+	job_provider = JobProvider(database_client_instance, date_time_provider_instance)
+	run_provider = RunProvider(database_client_instance, file_storage_instance, date_time_provider_instance)
+
+	job_provider.create_or_update_many("examples", [ create_job("build") ])
+	build_runs = create_runs(date_time_provider_instance, run_provider, "build", [ "succeeded", "succeeded", "succeeded" ])
+
+	run_retention = RunRetention(job_provider, run_provider, date_time_provider_instance, [ { "maximum_age_days": 1 } ])
+	date_time_provider_instance.now_value = datetime.datetime(2020, 1, 10)
+
+	delete_file = file_storage_instance.delete
+	failing_path = "projects/examples/runs/%s/step_0_main.log" % build_runs[0]["identifier"]
+
+	def delete_file_or_fail(file_path):
+		if file_path == failing_path:
+			raise OSError("Failed to delete '%s'" % file_path)
+		delete_file(file_path)
+
+	monkeypatch.setattr(file_storage_instance, "delete", delete_file_or_fail)
+
+	result = run_retention.collect()
+	assert [ run["identifier"] for run in result["runs"] ] == [ run["identifier"] for run in build_runs[1:] ]
+	assert [ run["identifier"] for run in run_provider.get_list() ] == [ build_runs[0]["identifier"] ]
+	assert run_retention.get_statistics()["deleted_run_count"] == 2
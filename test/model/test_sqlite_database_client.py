@@ -0,0 +1,182 @@
+""" Unit tests for SqliteDatabaseClient """
+
+import os
+
+import pytest
+
+from bhamon_orchestra_model.database.memory_database_client import MemoryDatabaseClient
+from bhamon_orchestra_model.database.sqlite_database_administration import SqliteDatabaseAdministration
+from bhamon_orchestra_model.database.sqlite_database_client import SqliteDatabaseClient
+
+
+all_records = [
+	{ "id": 1, "status": "pending", "worker": None, "size": 5, "data": { "key": "a" } },
+	{ "id": 2, "status": "running", "worker": "worker_01", "size": 2.5, "data": { "key": "b" } },
+	{ "id": 3, "status": "completed", "worker": "worker_02", "size": "large" },
+	{ "id": 4, "status": "pending", "size": None, "data": { "key": "a" } },
+	{ "id": 5, "status": "running", "worker": "worker_01", "size": 10, "tags": [ "x" ] },
+]
+
+all_filters = [
+	{},
+	{ "status": "pending" },
+	{ "worker": None },
+	{ "worker": "worker_01", "status": "running" },
+	{ "data.key": "a" },
+	{ "data": { "key": "a" } },
+	{ "tags": [ "x" ] },
+	{ "status": { "$in": [ "pending", "completed" ] } },
+	{ "worker": { "$in": [ None, "worker_02" ] } },
+	{ "worker": { "$ne": None } },
+	{ "worker": { "$ne": "worker_01" } },
+	{ "worker": { "$exists": False } },
+	{ "size": { "$gt": 2 } },
+	{ "size": { "$lte": "m" } },
+	{ "size": { "$gte": 2.5, "$lt": 10 } },
+	{ "$or": [ { "status": "completed" }, { "size": { "$gte": 10 } } ] },
+	{ "$or": [ { "status": "completed" }, { "data": { "key": "b" } } ] },
+]
+
+
+def create_client(tmpdir):
+	return SqliteDatabaseClient(os.path.join(str(tmpdir), "database.sqlite"))
+
+
+def test_single(tmpdir):
+	""" Test database operations with a single record """
+
+	client = create_client(tmpdir)
+	table = "record"
+	record = { "id": 1, "key": "value" }
+
+	assert client.count(table, {}) == 0
+
+	client.insert_one(table, record)
+	assert client.count(table, {}) == 1
+	assert client.find_one(table, { "id": 1 }) == record
+
+	client.update_one(table, { "id": 1 }, { "key": "updated" })
+	assert client.find_one(table, { "id": 1 }) == { "id": 1, "key": "updated" }
+
+	client.delete_one(table, { "id": 1 })
+	assert client.count(table, {}) == 0
+
+	client.close()
+
+
+@pytest.mark.parametrize("filter", all_filters)
+def test_filter(tmpdir, filter): # pylint: disable = redefined-builtin
+	""" Test filters return the same results as with the memory database client """
+
+	client = create_client(tmpdir)
+	reference_client = MemoryDatabaseClient()
+
+	for database_client in [ client, reference_client ]:
+		database_client.insert_many("record", all_records)
+
+	assert client.find_many("record", filter) == reference_client.find_many("record", filter)
+	assert client.count("record", filter) == reference_client.count("record", filter)
+
+	client.create_index("record", "status_worker", [ ("status", "ascending"), ("worker", "ascending") ])
+	assert client.find_many("record", filter) == reference_client.find_many("record", filter)
+
+	client.close()
+
+
+def test_order_by(tmpdir):
+	""" Test sorting and limiting results, with filters translated to SQL and filters applied in Python """
+
+	client = create_client(tmpdir)
+	table = "record"
+
+	all_records = [ { "id": index, "group": index % 3, "data": { "key": index % 2 } } for index in range(20) ] # pylint: disable = redefined-outer-name
+	client.insert_many(table, all_records)
+
+	order_by = [ ("group", "descending"), ("id", "ascending") ]
+	expected_records = sorted(all_records, key = lambda record: (-record["group"], record["id"]))
+
+	assert client.find_many(table, {}, order_by = order_by) == expected_records
+	assert client.find_many(table, {}, skip = 5, limit = 4, order_by = order_by) == expected_records[5:9]
+	assert client.find_many(table, {}, limit = 0) == []
+
+	expected_records = [ record for record in expected_records if record["data"] == { "key": 1 } ]
+	assert client.find_many(table, { "data": { "key": 1 } }, skip = 2, limit = 3, order_by = order_by) == expected_records[2:5]
+
+	client.close()
+
+
+def test_index(tmpdir):
+	""" Test database operations on a table with a unique index """
+
+	client = create_client(tmpdir)
+	table = "record"
+
+	client.create_index(table, "id_unique", [ ("id", "ascending") ], is_unique = True)
+	client.insert_one(table, { "id": 1, "key": "first" })
+
+	with pytest.raises(ValueError):
+		client.insert_one(table, { "id": 1, "key": "second" })
+	with pytest.raises(ValueError):
+		client.create_index(table, "id_unique", [ ("id", "ascending") ], is_unique = True)
+
+	with pytest.raises(ValueError):
+		client.bulk_write(table, [
+			{ "operation": "insert_one", "data": { "id": 2, "key": "second" } },
+			{ "operation": "insert_one", "data": { "id": 2, "key": "third" } },
+		])
+
+	assert client.find_many(table, {}) == [ { "id": 1, "key": "first" }, { "id": 2, "key": "second" } ]
+
+	client.close()
+
+
+def test_bulk_write_failure(tmpdir):
+	""" Test a batch failing keeps the operations applied before the error, and notifies listeners only if items changed """
+
+	client = create_client(tmpdir)
+	table = "record"
+	all_notifications = []
+
+	client.create_index(table, "id_unique", [ ("id", "ascending") ], is_unique = True)
+	client.insert_one(table, { "id": 1, "key": "first" })
+	client.watch_changes([ table ], all_notifications.append)
+
+	with pytest.raises(ValueError):
+		client.bulk_write(table, [ { "operation": "insert_one", "data": { "id": 1, "key": "second" } } ])
+	assert all_notifications == []
+
+	client.update_one(table, { "id": 3 }, { "key": "third" })
+	assert all_notifications == []
+
+	with pytest.raises(ValueError):
+		client.bulk_write(table, [
+			{ "operation": "insert_one", "data": { "id": 2, "key": "second" } },
+			{ "operation": "update_one", "filter": { "id": 2 }, "data": { "id": 1 } },
+		])
+
+	assert all_notifications == [ table ]
+	assert client.find_many(table, {}) == [ { "id": 1, "key": "first" }, { "id": 2, "key": "second" } ]
+
+	client.close()
+
+
+def test_analyze_query(tmpdir):
+	""" Test queries on indexed fields use the indexes """
+
+	client = create_client(tmpdir)
+	administration = SqliteDatabaseAdministration(client)
+	administration.initialize()
+
+	analysis = administration.analyze_query("run", { "project": "examples" }, [ ("update_date", "descending"), ("identifier", "descending") ])
+	assert analysis == { "table": "run", "index": "update_date", "is_collection_scan": False }
+
+	analysis = administration.analyze_query("run", { "status": { "$in": [ "pending", "running" ] } })
+	assert analysis == { "table": "run", "index": "status", "is_collection_scan": False }
+
+	analysis = administration.analyze_query("run", { "job": "empty" })
+	assert analysis == { "table": "run", "index": None, "is_collection_scan": True }
+
+	analysis = administration.analyze_query("schedule", { "update_date": { "$gte": "2020-01-01T00:00:00Z" } }, [ ("update_date", "ascending") ])
+	assert analysis == { "table": "schedule", "index": "update_date", "is_collection_scan": False }
+
+	administration.close()
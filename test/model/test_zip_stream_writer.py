@@ -0,0 +1,29 @@
+""" Unit tests for ZipStreamWriter """
+
+import io
+import zipfile
+
+import pytest
+
+from bhamon_orchestra_model.zip_stream_writer import ZipStreamWriter
+
+
+@pytest.mark.parametrize("force_zip64", [ False, True ])
+def test_write(force_zip64):
+	""" Test writing entries from chunks produces an archive readable by zipfile """
+
+	archive_writer = ZipStreamWriter()
+	date_time = (2020, 1, 2, 3, 4, 6)
+	all_chunks = []
+
+	all_chunks += archive_writer.write_entry("empty.txt", [], date_time, force_zip64 = force_zip64)
+	all_chunks += archive_writer.write_entry("data.txt", [ b"0123456789" * 1000, b"", "é\n".encode("utf-8") ], date_time, force_zip64 = force_zip64)
+	all_chunks += archive_writer.finish()
+
+	with zipfile.ZipFile(io.BytesIO(b"".join(all_chunks))) as archive_file:
+		assert archive_file.testzip() is None
+		assert archive_file.namelist() == [ "empty.txt", "data.txt" ]
+		assert archive_file.read("empty.txt") == b""
+		assert archive_file.read("data.txt") == b"0123456789" * 1000 + "é\n".encode("utf-8")
+		assert archive_file.getinfo("data.txt").date_time == date_time
+		assert archive_file.getinfo("data.txt").compress_size < 1000
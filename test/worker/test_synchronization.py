@@ -0,0 +1,35 @@
+# pylint: disable = protected-access
+
+""" Unit tests for Synchronization """
+
+import os
+
+import pytest
+
+from bhamon_orchestra_worker.synchronization import Synchronization
+
+
+@pytest.mark.parametrize("log_data, master_log_text", [
+	(b"first line\nsecond line\n", "first line\n"),
+	(b"first line\r\nsecond line\r\n", "first line\n"),
+	("café €\nnaïve\n".encode("utf-8"), "café €\n"),
+	("café €\nnaïve\n".encode("utf-8"), "café €\nnaï"),
+	(b"first line\nsecond line\n", "first"),
+	(b"first line\r\nsecond line\r\n", "first line\nsec"),
+	(b"first line\nsecond line\n", "first line\nsecond line\n"),
+])
+def test_seek_log_file(tmpdir, log_data, master_log_text):
+	""" Test moving to the cursor from the master, which counts utf-8 bytes with line feeds, in logs with other line endings and multi-byte characters """
+
+	log_file_path = os.path.join(str(tmpdir), "step.log")
+	with open(log_file_path, mode = "wb") as log_file:
+		log_file.write(log_data)
+
+	synchronization = Synchronization({ "run_identifier": "run", "job": { "steps": [] } })
+
+	with open(log_file_path, mode = "r", encoding = "utf-8") as log_file:
+		synchronization._seek_log_file(log_file, len(master_log_text.encode("utf-8")))
+		remaining_text = log_file.read()
+
+	all_text = log_data.decode("utf-8").replace("\r\n", "\n")
+	assert master_log_text + remaining_text == all_text
@@ -108,7 +108,7 @@ def abort(project_identifier, run_identifier): # pylint: disable = unused-argume
 
 
 def download_archive(project_identifier, run_identifier): # pylint: disable = unused-argument
-	archive_response = service_client.send_request("GET", "/project/{project_identifier}/run/{run_identifier}/download".format(**locals()))
-	return flask.Response(archive_response.content,
+	archive_response = service_client.send_request("GET", "/project/{project_identifier}/run/{run_identifier}/download".format(**locals()), stream = True)
+	return flask.Response(service_client.iterate_content(archive_response),
 		headers = { "Content-Disposition": archive_response.headers["Content-Disposition"] },
 		mimetype = archive_response.headers["Content-Type"])
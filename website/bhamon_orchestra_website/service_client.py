@@ -37,16 +37,23 @@ def post(route, data = None):
 	return send_request("POST", route, headers = { "Accept": "application/json" }, data = data).json()
 
 
-def send_request(method, route, headers = None, parameters = None, data = None):
+def send_request(method, route, headers = None, parameters = None, data = None, stream = False): # pylint: disable = too-many-arguments
 	authentication = _get_authentication()
 	if parameters is None:
 		parameters = {}
 
-	response = requests.request(method, flask.current_app.service_url + route, auth = authentication, headers = headers, params = parameters, json = data)
+	response = requests.request(method, flask.current_app.service_url + route, auth = authentication, headers = headers, params = parameters, json = data, stream = stream)
 	response.raise_for_status()
 	return response
 
 
+def iterate_content(response, chunk_size = 64 * 1024):
+	try:
+		yield from response.iter_content(chunk_size = chunk_size)
+	finally:
+		response.close()
+
+
 def _get_authentication():
 	if "token" not in flask.session:
 		return None
@@ -92,9 +92,7 @@ class Synchronization:
 
 			while step["log_status"] == "running":
 				if "log_file_cursor" in step:
-					# The cursor is based on a universal size (to support universal newlines), so we have to use read instead of seek
-					step["log_file"].seek(0)
-					step["log_file"].read(step["log_file_cursor"])
+					self._seek_log_file(step["log_file"], step["log_file_cursor"])
 					del step["log_file_cursor"]
 
 				log_lines = self._read_lines(step["log_file"], 1024)
@@ -112,6 +110,33 @@ class Synchronization:
 				step["log_status"] = "done"
 
 
+	def _seek_log_file(self, log_file, cursor): # pylint: disable = no-self-use
+		""" Move to a cursor from the master, which is a byte offset in its copy of the log, holding the lines sent so far as utf-8 with line feeds """
+
+		log_file.seek(0)
+		position = 0
+
+		while position < cursor:
+			last_position = log_file.tell()
+			next_line = log_file.readline()
+
+			if not next_line:
+				break
+
+			line_size = len(next_line.encode("utf-8"))
+
+			if position + line_size > cursor:
+				log_file.seek(last_position)
+				while position < cursor:
+					next_character = log_file.read(1)
+					if not next_character:
+						break
+					position += len(next_character.encode("utf-8"))
+				break
+
+			position += line_size
+
+
 	def _read_lines(self, log_file, limit): # pylint: disable = no-self-use
 		all_lines = []
 